@@ -3,7 +3,8 @@
 Eden CLI - Command line interface for Project Eden
 """
 import click
-from typing import List
+import datetime
+from typing import List, Tuple
 import os
 import sys
 from click.formatting import HelpFormatter
@@ -17,9 +18,12 @@ DEFAULT_CONFIG_PATH = os.path.join(project_root, "db/db/config.json")
 
 import project_eden.db.data_ingestor as data_ingestor
 import project_eden.db.create_tables as create_tables
+from project_eden.utils.quota import get_quota_tracker
+from project_eden.utils.run_state import get_run_state_store
 from project_eden.pipeline import (
     financial_data_ingestion_pipeline,
     financial_data_ingestion_parallel_pipeline,
+    financial_data_ingestion_sharded_pipeline,
 )
 
 
@@ -40,6 +44,8 @@ def custom_cli_help(ctx):
   init      Initialize database tables and ingest financial data
   ingest    Ingest financial data for specified company tickers
   create    Create database tables for financial data
+  quota     Show the remaining API quota
+  runs      List recent ingestion runs and their progress
 
 Run 'eden COMMAND --help' for more information on a command.
 """
@@ -64,6 +70,18 @@ Run 'eden COMMAND --help' for more information on a command.
 cli.get_help = custom_cli_help
 
 
+def get_shard_results(pipeline_run) -> List[Tuple[str, bool]]:
+    """Collect (ticker, success) pairs from the single result artifact of every shard step."""
+    results = []
+    for step_name in pipeline_run.steps.keys():
+        # Mapped invocations are named ingest_ticker_shard_step, ingest_ticker_shard_step_2, etc.
+        if "ingest_ticker_shard_step" in step_name:
+            shard_result = pipeline_run.steps[step_name].outputs["output"][0].load()
+            results.extend((ticker, True) for ticker in shard_result["succeeded"])
+            results.extend((ticker, False) for ticker in shard_result["failed"])
+    return results
+
+
 @cli.command(help="Ingest financial data for specified company tickers.  "
                   "\n\nTICKERS: One or more stock ticker symbols (e.g., AAPL MSFT GOOG). If not provided, all "
                   "publicly traded companies registered to the SEC (https://www.sec.gov/files/company_tickers.json) "
@@ -100,8 +118,71 @@ cli.get_help = custom_cli_help
     default=False,
     help="Use parallel execution with rate limiting (requires --pipeline flag)",
 )
+@click.option(
+    "--async",
+    "use_async",
+    is_flag=True,
+    default=False,
+    help="Keep requests for many tickers in flight at once using the asyncio fetch engine",
+)
+@click.option(
+    "--incremental/--full-resync",
+    default=False,
+    help="Only fetch prices and statements newer than each ticker's last stored ones, "
+         "or re-fetch and re-compare the full history (default: --full-resync)",
+)
+@click.option(
+    "--write-mode",
+    type=click.Choice(["merge", "upsert"], case_sensitive=False),
+    default="merge",
+    help="How fetched rows are written: compare them with the stored rows (merge), or let the "
+         "database insert and update them with INSERT ... ON CONFLICT (upsert)",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of tickers processed at once by a pool of worker threads sharing the rate "
+         "limiter (not available with --async; with --pipeline, only together with --shard-size)",
+)
+@click.option(
+    "--shard-size",
+    type=click.IntRange(min=1),
+    default=None,
+    help="With --pipeline --parallel, map one ZenML step over shards of this many tickers, each "
+         "processed by --workers threads, instead of one step per ticker",
+)
+@click.option(
+    "--priority",
+    type=click.Choice(["interactive", "incremental", "backfill"], case_sensitive=False),
+    default=None,
+    help="Rate limiter priority lane of the run's requests (default: interactive for listed "
+         "tickers, otherwise incremental with --incremental and backfill without)",
+)
+@click.option(
+    "--resume",
+    "run_id",
+    default=None,
+    help="Resume an earlier run by its id, skipping completed work and retrying failed or pending "
+         "items with the run's period and fetch options (see 'eden runs')",
+)
 @click.argument("tickers", nargs=-1, required=False)
-def ingest(config: str, file: str = None, period: str = None, pipeline: bool = False, parallel: bool = False, tickers: List[str] = None):
+def ingest(
+    config: str,
+    file: str = None,
+    period: str = None,
+    pipeline: bool = False,
+    parallel: bool = False,
+    use_async: bool = False,
+    incremental: bool = False,
+    write_mode: str = "merge",
+    priority: str = None,
+    workers: int = 1,
+    shard_size: int = None,
+    run_id: str = None,
+    tickers: List[str] = None,
+):
     """
     Ingest financial data for specified company tickers.   Type `eden ingest --help` for more information.
 
@@ -130,19 +211,60 @@ def ingest(config: str, file: str = None, period: str = None, pipeline: bool = F
         # Non-pipeline mode: Use None to mean "both periods"
         period_value = None if period == "all" or period is None else period
 
+    if workers > 1 and (use_async or (pipeline and not shard_size)):
+        print("Error: --workers cannot be combined with the --async flag, or with --pipeline "
+              "without --shard-size")
+        return
+
+    if shard_size and not (pipeline and parallel):
+        print("Error: --shard-size requires the --pipeline and --parallel flags")
+        return
+
+    if run_id and (tickers or pipeline):
+        print("Error: --resume cannot be combined with tickers, --file or --pipeline")
+        return
+    if run_id:
+        try:
+            get_run_state_store(data_ingestor.load_config(config)).get_run(run_id)
+        except KeyError:
+            print(f"Error: no ingestion run {run_id} (see 'eden runs')")
+            return
+
     if pipeline:
         # Validate parallel flag
         if parallel and not pipeline:
             print("Error: --parallel flag requires --pipeline flag")
             return
+        if parallel and use_async:
+            print("Error: --async flag cannot be combined with --parallel flag")
+            return
 
         # Use ZenML pipeline for execution
-        if parallel:
+        if parallel and shard_size:
+            print(
+                f"Running ingestion using ZenML parallel pipeline over shards of {shard_size} "
+                f"tickers..."
+            )
+            pipeline_run = financial_data_ingestion_sharded_pipeline(
+                config_file=config,
+                tickers=tickers,
+                period=period_value,
+                incremental=incremental,
+                write_mode=write_mode,
+                priority=priority,
+                shard_size=shard_size,
+                workers=workers,
+            )
+            results = get_shard_results(pipeline_run)
+        elif parallel:
             print("Running ingestion using ZenML parallel pipeline with rate limiting...")
             pipeline_run = financial_data_ingestion_parallel_pipeline(
                 config_file=config,
                 tickers=tickers,
-                period=period_value
+                period=period_value,
+                incremental=incremental,
+                write_mode=write_mode,
+                priority=priority,
             )
             # Extract results from parallel pipeline (.map() creates multiple step instances)
             # Each mapped invocation creates a separate step (ingest_ticker_data_parallel_step,
@@ -160,7 +282,11 @@ def ingest(config: str, file: str = None, period: str = None, pipeline: bool = F
             results = financial_data_ingestion_pipeline(
                 config_file=config,
                 tickers=tickers,
-                period=period_value
+                period=period_value,
+                use_async=use_async,
+                incremental=incremental,
+                write_mode=write_mode,
+                priority=priority,
             )
 
         # Report results
@@ -173,7 +299,17 @@ def ingest(config: str, file: str = None, period: str = None, pipeline: bool = F
             print(f"Failed: {len(failed)} tickers - {failed}")
     else:
         # Use direct execution (original behavior)
-        data_ingestor.driver(config_file=config, tickers=tickers, period=period_value)
+        data_ingestor.driver(
+            config_file=config,
+            tickers=tickers,
+            period=period_value,
+            use_async=use_async,
+            incremental=incremental,
+            write_mode=write_mode,
+            priority=priority,
+            workers=workers,
+            resume=run_id,
+        )
 
 
 @cli.command()
@@ -247,8 +383,63 @@ create.get_help = custom_format_help
     default=False,
     help="Use parallel execution with rate limiting (requires --pipeline flag)",
 )
+@click.option(
+    "--async",
+    "use_async",
+    is_flag=True,
+    default=False,
+    help="Keep requests for many tickers in flight at once using the asyncio fetch engine",
+)
+@click.option(
+    "--incremental/--full-resync",
+    default=False,
+    help="Only fetch prices and statements newer than each ticker's last stored ones, "
+         "or re-fetch and re-compare the full history (default: --full-resync)",
+)
+@click.option(
+    "--write-mode",
+    type=click.Choice(["merge", "upsert"], case_sensitive=False),
+    default="merge",
+    help="How fetched rows are written: compare them with the stored rows (merge), or let the "
+         "database insert and update them with INSERT ... ON CONFLICT (upsert)",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of tickers processed at once by a pool of worker threads sharing the rate "
+         "limiter (not available with --async; with --pipeline, only together with --shard-size)",
+)
+@click.option(
+    "--shard-size",
+    type=click.IntRange(min=1),
+    default=None,
+    help="With --pipeline --parallel, map one ZenML step over shards of this many tickers, each "
+         "processed by --workers threads, instead of one step per ticker",
+)
+@click.option(
+    "--priority",
+    type=click.Choice(["interactive", "incremental", "backfill"], case_sensitive=False),
+    default=None,
+    help="Rate limiter priority lane of the run's requests (default: interactive for listed "
+         "tickers, otherwise incremental with --incremental and backfill without)",
+)
 @click.argument("tickers", nargs=-1, required=False)
-def init(config: str, file: str = None, period: str = None, pipeline: bool = False, parallel: bool = False, tickers: List[str] = None):
+def init(
+    config: str,
+    file: str = None,
+    period: str = None,
+    pipeline: bool = False,
+    parallel: bool = False,
+    use_async: bool = False,
+    incremental: bool = False,
+    write_mode: str = "merge",
+    priority: str = None,
+    workers: int = 1,
+    shard_size: int = None,
+    tickers: List[str] = None,
+):
     """
     Initialize database tables and ingest financial data.
 
@@ -279,19 +470,50 @@ def init(config: str, file: str = None, period: str = None, pipeline: bool = Fal
         # Non-pipeline mode: Use None to mean "both periods"
         period_value = None if period == "all" or period is None else period
 
+    if workers > 1 and (use_async or (pipeline and not shard_size)):
+        print("Error: --workers cannot be combined with the --async flag, or with --pipeline "
+              "without --shard-size")
+        return
+
+    if shard_size and not (pipeline and parallel):
+        print("Error: --shard-size requires the --pipeline and --parallel flags")
+        return
+
     if pipeline:
         # Validate parallel flag
         if parallel and not pipeline:
             print("Error: --parallel flag requires --pipeline flag")
             return
+        if parallel and use_async:
+            print("Error: --async flag cannot be combined with --parallel flag")
+            return
 
         # Use ZenML pipeline for execution
-        if parallel:
+        if parallel and shard_size:
+            print(
+                f"Running ingestion using ZenML parallel pipeline over shards of {shard_size} "
+                f"tickers..."
+            )
+            pipeline_run = financial_data_ingestion_sharded_pipeline(
+                config_file=config,
+                tickers=tickers_list,
+                period=period_value,
+                incremental=incremental,
+                write_mode=write_mode,
+                priority=priority,
+                shard_size=shard_size,
+                workers=workers,
+            )
+            results = get_shard_results(pipeline_run)
+        elif parallel:
             print("Running ingestion using ZenML parallel pipeline with rate limiting...")
             pipeline_run = financial_data_ingestion_parallel_pipeline(
                 config_file=config,
                 tickers=tickers_list,
-                period=period_value
+                period=period_value,
+                incremental=incremental,
+                write_mode=write_mode,
+                priority=priority,
             )
             # Extract results from parallel pipeline (.map() creates multiple step instances)
             # Each mapped invocation creates a separate step (ingest_ticker_data_parallel_step,
@@ -309,7 +531,11 @@ def init(config: str, file: str = None, period: str = None, pipeline: bool = Fal
             results = financial_data_ingestion_pipeline(
                 config_file=config,
                 tickers=tickers_list,
-                period=period_value
+                period=period_value,
+                use_async=use_async,
+                incremental=incremental,
+                write_mode=write_mode,
+                priority=priority,
             )
 
         # Report results
@@ -322,7 +548,16 @@ def init(config: str, file: str = None, period: str = None, pipeline: bool = Fal
             print(f"Failed: {len(failed)} tickers - {failed}")
     else:
         # Use direct execution (original behavior)
-        data_ingestor.driver(config_file=config, tickers=tickers_list, period=period_value)
+        data_ingestor.driver(
+            config_file=config,
+            tickers=tickers_list,
+            period=period_value,
+            use_async=use_async,
+            incremental=incremental,
+            write_mode=write_mode,
+            priority=priority,
+            workers=workers,
+        )
 
 
 # Override the get_help method to provide custom formatted help
@@ -350,5 +585,74 @@ def custom_init_help(ctx):
 init.get_help = custom_init_help
 
 
+@cli.command()
+@click.option(
+    "--config",
+    "-c",
+    type=click.Path(exists=True),
+    default=DEFAULT_CONFIG_PATH,
+    help="Path to the configuration file",
+)
+@click.option(
+    "--period",
+    "-p",
+    type=click.Choice(["quarter", "fy", "all"]),
+    default="all",
+    help="Data period the ticker estimate is made for",
+)
+def quota(config: str, period: str = "all"):
+    """Show the API calls and bandwidth used and how many tickers the remaining quota affords."""
+    config_dict = data_ingestor.load_config(config)
+    tracker = get_quota_tracker(config_dict)
+    if tracker is None:
+        print("No API quota is configured (see the api.quota section of the configuration).")
+        return
+
+    usage = tracker.get_usage()
+    print(f"Calls today: {usage['daily_calls']}" + (
+        f" of {tracker.daily_call_limit}" if tracker.daily_call_limit is not None else ""
+    ))
+    print(f"Bandwidth this month: {usage['monthly_bytes'] / 1024 ** 3:.2f} GB" + (
+        f" of {tracker.monthly_bandwidth_bytes / 1024 ** 3:.2f} GB"
+        if tracker.monthly_bandwidth_bytes is not None else ""
+    ))
+    affordable = tracker.get_affordable_tickers(data_ingestor.get_calls_per_ticker(period))
+    if affordable is not None:
+        print(f"Tickers still affordable: about {affordable}")
+
+
+@cli.command()
+@click.option(
+    "--config",
+    "-c",
+    type=click.Path(exists=True),
+    default=DEFAULT_CONFIG_PATH,
+    help="Path to the configuration file",
+)
+@click.option(
+    "--limit",
+    "-n",
+    type=click.IntRange(min=1),
+    default=10,
+    help="Number of most recent runs to show",
+)
+def runs(config: str, limit: int = 10):
+    """List recent ingestion runs and their progress, to be resumed with 'eden ingest --resume'."""
+    config_dict = data_ingestor.load_config(config)
+    recent_runs = get_run_state_store(config_dict).list_runs(limit)
+    if not recent_runs:
+        print("No ingestion runs recorded yet.")
+        return
+
+    for run in recent_runs:
+        started = datetime.datetime.fromtimestamp(run["created_at"]).strftime("%Y-%m-%d %H:%M")
+        status = "complete" if not run["failed"] and not run["pending"] else "incomplete"
+        print(
+            f"{run['run_id']}  started {started}  "
+            f"{run['cursor']}/{run['num_tickers']} ticker(s) reached  "
+            f"{run['done']} done, {run['failed']} failed, {run['pending']} pending ({status})"
+        )
+
+
 if __name__ == "__main__":
     cli()
\ No newline at end of file
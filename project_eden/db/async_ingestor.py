@@ -0,0 +1,447 @@
+"""
+Asynchronous fetch engine for financial data ingestion.
+
+Requests for many tickers are kept in flight at the same time, so throughput is
+set by the API rate limit (enforced with an ``AsyncTokenBucketRateLimiter``)
+instead of by round-trip latency.  Blocking HTTP calls run on a thread pool
+through the shared keep-alive HTTP client, while database writes are applied one
+ticker at a time on a single connection by a dedicated writer.
+"""
+import asyncio
+import datetime
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
+
+from project_eden.db.connection_pool import get_connection_pool
+from project_eden.db.create_tables import check_unique_constraints
+from project_eden.db.data_ingestor import (
+    Datasets,
+    add_fetched_datasets_to_db,
+    combine_price_chunks,
+    create_key_index,
+    get_dataset_params,
+    get_dataset_requests,
+    get_cached_response,
+    get_fetched_window_start,
+    get_incremental_fetch_params,
+    get_incremental_state,
+    get_ipo_date_from_profile,
+    get_jsonparsed_data,
+    get_ticker_jobs,
+    is_chunked_price_request,
+    print_quota_status,
+    print_response_cache_stats,
+    record_ticker_job,
+)
+from project_eden.db.utils import warm_company_id_cache
+from project_eden.utils.http_client import HTTPClient, get_http_client
+from project_eden.utils.rate_limiter import APIKeyPool, create_async_api_key_pool
+from project_eden.utils.retry import RetryHandler, get_retry_handler
+from project_eden.utils.run_state import IngestionRun
+
+DEFAULT_MAX_CONCURRENT_REQUESTS = 32
+
+
+async def gather_dataset_async(
+    ticker: str,
+    dataset: str,
+    key_pool: APIKeyPool,
+    executor: ThreadPoolExecutor,
+    key: str = None,
+    config: Dict[str, Any] = None,
+    client: Optional[HTTPClient] = None,
+    retry_handler: Optional[RetryHandler] = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """
+    Asynchronously gather a dataset from the financial API and convert to DataFrame.
+
+    Every API request (including each chunk of a chunked price request) acquires
+    one token from ``key_pool`` right before it is sent, and is sent with the key
+    the token was taken from.  All requests for
+    the dataset are in flight at the same time.  Responses found in the response
+    cache need neither a request nor a token.  Retried requests take a new token.
+
+    Parameters
+    ----------
+    ticker : str
+        The stock ticker symbol
+    dataset : str
+        The dataset name to retrieve
+    key_pool : APIKeyPool
+        Pool of API keys and their asyncio rate limiters shared by every request of the run
+    executor : ThreadPoolExecutor
+        Thread pool used to run the blocking HTTP calls
+    key : str, optional
+        The API key for authentication. If None, the key is chosen by ``key_pool``
+    config : Dict[str, Any], optional
+        Configuration dictionary
+    client : HTTPClient, optional
+        Keep-alive HTTP client used for the requests. If None, uses the global client
+    retry_handler : RetryHandler, optional
+        Handler retrying transient failures.  If None, requests are not retried
+    **kwargs
+        Additional parameters to pass to the API
+
+    Returns
+    -------
+    pd.DataFrame
+        DataFrame containing the retrieved data
+    """
+    api_version, requests = get_dataset_requests(ticker, dataset, config, **kwargs)
+    if not requests:
+        return pd.DataFrame()
+    loop = asyncio.get_running_loop()
+
+    async def fetch(params):
+        cached_data = get_cached_response(dataset, ticker, config, api_version, **params)
+        if cached_data is not None:
+            return cached_data
+
+        async def send_request():
+            while True:
+                pool_key = await key_pool.acquire_async(key)
+                request_key = key if key is not None else pool_key
+                try:
+                    json_data = await loop.run_in_executor(
+                        executor,
+                        functools.partial(
+                            get_jsonparsed_data,
+                            dataset,
+                            ticker,
+                            request_key,
+                            config=config,
+                            api_version=api_version,
+                            client=client,
+                            check_cache=False,
+                            acquire_token=False,
+                            retry=False,
+                            **params,
+                        ),
+                    )
+                except Exception as error:
+                    # A rejected key is dropped from the pool and the request is sent
+                    # again with another one
+                    if key_pool.record_error(request_key, error):
+                        continue
+                    raise
+                key_pool.record_success(request_key)
+                return json_data
+
+        if retry_handler is None:
+            return await send_request()
+        return await retry_handler.call_async(send_request)
+
+    responses = await asyncio.gather(*(fetch(params) for params in requests))
+
+    if is_chunked_price_request(dataset, requests[0]):
+        return combine_price_chunks(
+            [pd.DataFrame.from_records(json_data) for json_data in responses if json_data]
+        )
+    return pd.DataFrame.from_records(responses[0])
+
+
+async def fetch_ticker_datasets_async(
+    symbol: str,
+    datasets: List[Datasets],
+    period: str,
+    key_pool: APIKeyPool,
+    executor: ThreadPoolExecutor,
+    config: Dict[str, Any],
+    client: Optional[HTTPClient] = None,
+    since_dates: Optional[Dict[Datasets, datetime.date]] = None,
+    limits: Optional[Dict[Datasets, int]] = None,
+    retry_handler: Optional[RetryHandler] = None,
+) -> Dict[Datasets, pd.DataFrame]:
+    """
+    Fetch every dataset for one ticker and period concurrently.
+
+    Price history is requested once the PROFILE response is in, so that it can
+    start at the company's IPO date, unless it is fetched incrementally from a
+    date in ``since_dates``.
+
+    Parameters
+    ----------
+    symbol : str
+        Stock symbol to fetch
+    datasets : List[Datasets]
+        Datasets to fetch
+    period : str
+        Data period ("quarter" or "fy")
+    key_pool : APIKeyPool
+        Pool of API keys and their asyncio rate limiters shared by every request of the run
+    executor : ThreadPoolExecutor
+        Thread pool used to run the blocking HTTP calls
+    config : Dict[str, Any]
+        Configuration dictionary
+    client : HTTPClient, optional
+        Keep-alive HTTP client used for the requests. If None, uses the global client
+    since_dates : Dict[Datasets, datetime.date], optional
+        First date to fetch for datasets that are fetched incrementally
+    limits : Dict[Datasets, int], optional
+        Number of most recent records to fetch for datasets that are fetched incrementally
+    retry_handler : RetryHandler, optional
+        Handler retrying transient failures.  If None, requests are not retried
+
+    Returns
+    -------
+    Dict[Datasets, pd.DataFrame]
+        Fetched DataFrames keyed by dataset, in the order of ``datasets``
+    """
+    def fetch(dataset, params):
+        return asyncio.ensure_future(
+            gather_dataset_async(
+                symbol,
+                dataset.value,
+                key_pool,
+                executor,
+                config=config,
+                client=client,
+                retry_handler=retry_handler,
+                **params,
+            )
+        )
+
+    since_dates = since_dates or {}
+    limits = limits or {}
+    price = Datasets.HISTORTICAL_PRICE_EOD_FULL
+    tasks = {}
+    for dataset in datasets:
+        if dataset != price:
+            params = get_dataset_params(dataset, period)
+            if dataset in limits:
+                params["limit"] = limits[dataset]
+            tasks[dataset] = fetch(dataset, params)
+    try:
+        if price in datasets:
+            price_params = get_dataset_params(price, period)
+            if price in since_dates:
+                price_params["from"] = since_dates[price].strftime("%Y-%m-%d")
+            elif Datasets.PROFILE in tasks:
+                # Start the price history at the IPO date to skip the empty pre-IPO range
+                price_start_date = get_ipo_date_from_profile(await tasks[Datasets.PROFILE])
+                if price_start_date is not None:
+                    price_params["from"] = price_start_date
+            tasks[price] = fetch(price, price_params)
+
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    return {dataset: tasks[dataset].result() for dataset in datasets}
+
+
+async def ingest_tickers_async(
+    tickers: List[str],
+    config: Dict[str, Any],
+    period: Optional[str] = None,
+    connection=None,
+    max_concurrent_requests: Optional[int] = None,
+    incremental: bool = False,
+    write_mode: str = "merge",
+    run: Optional[IngestionRun] = None,
+) -> List[str]:
+    """
+    Ingest tickers with many API requests in flight at once.
+
+    Fetching for up to ``max_concurrent_requests`` tickers runs concurrently and
+    is metered by asyncio rate limiters built from the rate limits of the configured
+    API keys (shared with other processes when the ``"file"`` rate limiter backend is
+    configured).  Fetched tickers are handed to a single database
+    writer through a bounded queue, so fetchers pause when the writer falls behind.
+
+    Parameters
+    ----------
+    tickers : List[str]
+        Stock symbols to process
+    config : Dict[str, Any]
+        Configuration dictionary
+    period : str, optional
+        Period for ingestion for each ticker.  Options are "quarter", "fy", "all" or None.
+        "all" and None ingest both "quarter" and "fy" data.
+    connection : optional
+        Database connection used by the writer. If None, a connection is checked out from
+        the database connection pool and returned when the run completes.
+    max_concurrent_requests : int, optional
+        Maximum number of tickers (and HTTP requests) in flight.  If None, uses
+        ``api.max_concurrent_requests`` from config, defaulting to 32.
+    incremental : bool, default=False
+        Only fetch prices from each symbol's last stored date on, and only the statements
+        reported since its last stored period.  The stored dates and periods are read
+        once, before fetching starts.
+    write_mode : str, default="merge"
+        How fetched rows are written: "merge" compares them with the stored rows, "upsert"
+        lets the database insert and update them with INSERT ... ON CONFLICT
+    run : IngestionRun, optional
+        Checkpointed run being processed.  If given, only the items the run has not
+        completed are processed, and the outcome of every pass is recorded.
+
+    Returns
+    -------
+    List[str]
+        List of symbols that failed processing
+    """
+    if max_concurrent_requests is None:
+        max_concurrent_requests = config["api"].get(
+            "max_concurrent_requests", DEFAULT_MAX_CONCURRENT_REQUESTS
+        )
+
+    owns_connection = connection is None
+    if owns_connection:
+        pool = get_connection_pool(config)
+        connection = pool.getconn()
+    check_unique_constraints(connection, write_mode)
+    warm_company_id_cache(connection)
+
+    key_pool = create_async_api_key_pool(config)
+    retry_handler = get_retry_handler(config)
+    client = get_http_client(config)
+    ticker_jobs = get_ticker_jobs(tickers, period, run)
+    symbols_with_failure = []
+    tickers = list(ticker_jobs)
+
+    latest_price_dates = {}
+    latest_statement_periods = {}
+    if incremental:
+        with connection.cursor() as cursor:
+            latest_price_dates, latest_statement_periods = get_incremental_state(
+                cursor, tickers, period
+            )
+    key_index = create_key_index(tickers, latest_price_dates) if write_mode == "merge" else None
+
+    loop = asyncio.get_running_loop()
+    ticker_slots = asyncio.Semaphore(max_concurrent_requests)
+    write_queue = asyncio.Queue(maxsize=max_concurrent_requests)
+
+    async def fetch_ticker(symbol):
+        async with ticker_slots:
+            for job_period, datasets in ticker_jobs[symbol]:
+                since_dates, limits = get_incremental_fetch_params(
+                    symbol, job_period, datasets, latest_price_dates, latest_statement_periods
+                )
+                try:
+                    frames = await fetch_ticker_datasets_async(
+                        symbol,
+                        datasets,
+                        job_period,
+                        key_pool,
+                        fetch_executor,
+                        config,
+                        client,
+                        since_dates=since_dates,
+                        limits=limits,
+                        retry_handler=retry_handler,
+                    )
+                    # Only merge the statement periods covered by the responses
+                    for dataset in limits:
+                        since_dates[dataset] = get_fetched_window_start(frames[dataset])
+                except Exception as e:
+                    print(f"Error fetching {symbol} ({job_period}): {e}")
+                    frames = None
+                await write_queue.put((symbol, job_period, datasets, frames, since_dates))
+
+    async def write_results():
+        while True:
+            item = await write_queue.get()
+            if item is None:
+                return
+            symbol, job_period, datasets, frames, since_dates = item
+            if frames is None:
+                if symbol not in symbols_with_failure:
+                    symbols_with_failure.append(symbol)
+                record_ticker_job(run, symbol, job_period, datasets, False)
+                continue
+            success = await loop.run_in_executor(
+                write_executor,
+                functools.partial(
+                    add_fetched_datasets_to_db,
+                    connection,
+                    symbol,
+                    frames,
+                    period=job_period,
+                    failure_list=symbols_with_failure,
+                    since_dates=since_dates,
+                    write_mode=write_mode,
+                    key_index=key_index,
+                ),
+            )
+            record_ticker_job(run, symbol, job_period, datasets, success)
+
+    print(
+        f"Async ingestion of {len(tickers)} ticker(s) with up to "
+        f"{max_concurrent_requests} concurrent requests..."
+    )
+    print_quota_status(config, len(tickers), period)
+    try:
+        with ThreadPoolExecutor(
+            max_workers=max_concurrent_requests, thread_name_prefix="eden-fetch"
+        ) as fetch_executor, ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="eden-write"
+        ) as write_executor:
+            writer = asyncio.create_task(write_results())
+            await asyncio.gather(*(fetch_ticker(symbol) for symbol in tickers))
+            await write_queue.put(None)
+            await writer
+    finally:
+        if owns_connection:
+            pool.putconn(connection)
+
+    print_response_cache_stats(config)
+    return symbols_with_failure
+
+
+def run_async_ingestion(
+    tickers: List[str],
+    config: Dict[str, Any],
+    period: Optional[str] = None,
+    connection=None,
+    max_concurrent_requests: Optional[int] = None,
+    incremental: bool = False,
+    write_mode: str = "merge",
+    run: Optional[IngestionRun] = None,
+) -> List[str]:
+    """
+    Run ``ingest_tickers_async`` to completion from synchronous code.
+
+    Parameters
+    ----------
+    tickers : List[str]
+        Stock symbols to process
+    config : Dict[str, Any]
+        Configuration dictionary
+    period : str, optional
+        Period for ingestion for each ticker ("quarter", "fy", "all" or None)
+    connection : optional
+        Database connection used by the writer
+    max_concurrent_requests : int, optional
+        Maximum number of tickers (and HTTP requests) in flight
+    incremental : bool, default=False
+        Only fetch prices from each symbol's last stored date on
+    write_mode : str, default="merge"
+        How fetched rows are written: "merge" compares them with the stored rows, "upsert"
+        lets the database insert and update them with INSERT ... ON CONFLICT
+    run : IngestionRun, optional
+        Checkpointed run being processed
+
+    Returns
+    -------
+    List[str]
+        List of symbols that failed processing
+    """
+    return asyncio.run(
+        ingest_tickers_async(
+            tickers,
+            config,
+            period=period,
+            connection=connection,
+            max_concurrent_requests=max_concurrent_requests,
+            incremental=incremental,
+            write_mode=write_mode,
+            run=run,
+        )
+    )
@@ -0,0 +1,266 @@
+"""
+Pool of database connections shared by every ingestion path of a process.
+
+Opening a PostgreSQL connection costs a round trip for authentication (and TLS)
+and a backend process on the server.  The pool keeps idle connections open
+between tickers, steps and worker threads, and caps the number of connections
+a process opens at ``max_connections`` so that a high worker count cannot
+exceed the server's ``max_connections``.  Connections that sat idle for a while
+are checked with a ``SELECT 1`` before they are handed out again.
+"""
+import contextlib
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+from project_eden.db.utils import get_connection_params
+
+DEFAULT_MIN_CONNECTIONS = 1
+DEFAULT_MAX_CONNECTIONS = 10
+DEFAULT_HEALTH_CHECK_SECONDS = 30.0
+DEFAULT_CHECKOUT_TIMEOUT_SECONDS = 60.0
+
+
+class DatabaseConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+
+    Connections are checked out with ``getconn`` (or the ``connection`` context
+    manager) and must be returned with ``putconn``.  When every connection is in
+    use, checkouts wait for one to be returned.
+
+    Parameters
+    ----------
+    db_config : Dict[str, Any]
+        The ``database`` section of the configuration (connection parameters)
+    min_connections : int
+        Number of connections opened when the pool is created
+    max_connections : int
+        Maximum number of connections open at once, idle or in use
+    health_check_seconds : float
+        Connections idle for at least this long are checked with ``SELECT 1`` on
+        checkout and replaced if the check fails.  With 0, every checkout is checked.
+    timeout_seconds : float
+        Maximum time to wait for a connection when all of them are in use
+    """
+
+    def __init__(
+        self,
+        db_config: Dict[str, Any],
+        min_connections: int = DEFAULT_MIN_CONNECTIONS,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        health_check_seconds: float = DEFAULT_HEALTH_CHECK_SECONDS,
+        timeout_seconds: float = DEFAULT_CHECKOUT_TIMEOUT_SECONDS,
+    ):
+        if max_connections < 1 or not 0 <= min_connections <= max_connections:
+            raise ValueError(
+                f"Expected 0 <= min_connections <= max_connections and max_connections >= 1, "
+                f"got {min_connections} and {max_connections}"
+            )
+
+        self.connection_params = get_connection_params(db_config)
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.health_check_seconds = health_check_seconds
+        self.timeout_seconds = timeout_seconds
+
+        # Idle connections with the time they were returned, most recently returned last
+        self._idle: List[Tuple[Any, float]] = []
+        self._num_open = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+        for _ in range(min_connections):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._num_open += 1
+
+    def _connect(self):
+        return psycopg2.connect(**self.connection_params)
+
+    def _is_healthy(self, connection, returned_at: float) -> bool:
+        if connection.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_seconds:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self):
+        """
+        Check out a connection, opening one if none is idle and the pool is not full.
+
+        Returns
+        -------
+        connection
+            A psycopg2 connection with no transaction in progress
+
+        Raises
+        ------
+        psycopg2.pool.PoolError
+            If the pool is closed, or no connection was returned within ``timeout_seconds``
+        """
+        deadline = time.monotonic() + self.timeout_seconds
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+                if self._idle:
+                    connection, returned_at = self._idle.pop()
+                    break
+                if self._num_open < self.max_connections:
+                    self._num_open += 1
+                    connection = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolError(
+                        f"No database connection available within {self.timeout_seconds:g}s "
+                        f"(all {self.max_connections} in use)"
+                    )
+                self._condition.wait(remaining)
+
+        # Health checks and new connections take round trips, so they run outside the lock
+        try:
+            if connection is not None and not self._is_healthy(connection, returned_at):
+                self._close_quietly(connection)
+                connection = None
+            if connection is None:
+                connection = self._connect()
+        except Exception:
+            with self._condition:
+                self._num_open -= 1
+                self._condition.notify()
+            raise
+        return connection
+
+    def putconn(self, connection, close: bool = False):
+        """
+        Return a connection to the pool.
+
+        A transaction left open is rolled back.  Broken connections are closed, and
+        a new one is opened on a later checkout.
+
+        Parameters
+        ----------
+        connection
+            Connection checked out with ``getconn``
+        close : bool, default=False
+            Close the connection instead of keeping it idle
+        """
+        if not close and not connection.closed:
+            status = connection.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    connection.rollback()
+                except psycopg2.Error:
+                    close = True
+
+        with self._condition:
+            keep = not (close or connection.closed or self._closed)
+            if keep:
+                self._idle.append((connection, time.monotonic()))
+            else:
+                self._num_open -= 1
+            self._condition.notify()
+        if not keep:
+            self._close_quietly(connection)
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Check out a connection for the duration of a ``with`` block."""
+        connection = self.getconn()
+        try:
+            yield connection
+        finally:
+            self.putconn(connection)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return the number of open and idle connections."""
+        with self._condition:
+            return {"open": self._num_open, "idle": len(self._idle)}
+
+    def closeall(self):
+        """Close the idle connections; connections in use are closed when returned."""
+        with self._condition:
+            self._closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._num_open -= len(idle)
+            self._idle = []
+            self._condition.notify_all()
+        for connection in idle:
+            self._close_quietly(connection)
+
+
+# Global connection pool instance
+_global_connection_pool: Optional[DatabaseConnectionPool] = None
+_connection_pool_lock = threading.Lock()
+
+
+def get_connection_pool(config: Dict[str, Any]) -> DatabaseConnectionPool:
+    """
+    Get or create the global connection pool.
+
+    Parameters
+    ----------
+    config : Dict[str, Any]
+        Configuration dictionary.  Connections use the ``database`` section, and
+        ``database.pool`` may set ``min_connections``, ``max_connections``,
+        ``health_check_seconds`` and ``timeout_seconds``.  Only used when creating
+        the pool.
+
+    Returns
+    -------
+    DatabaseConnectionPool
+        The global connection pool
+    """
+    global _global_connection_pool
+
+    with _connection_pool_lock:
+        if _global_connection_pool is None:
+            db_config = config["database"]
+            pool_config = db_config.get("pool", {})
+            _global_connection_pool = DatabaseConnectionPool(
+                db_config,
+                min_connections=pool_config.get("min_connections", DEFAULT_MIN_CONNECTIONS),
+                max_connections=pool_config.get("max_connections", DEFAULT_MAX_CONNECTIONS),
+                health_check_seconds=pool_config.get(
+                    "health_check_seconds", DEFAULT_HEALTH_CHECK_SECONDS
+                ),
+                timeout_seconds=pool_config.get(
+                    "timeout_seconds", DEFAULT_CHECKOUT_TIMEOUT_SECONDS
+                ),
+            )
+            print(
+                f"Database connection pool: {_global_connection_pool.min_connections}-"
+                f"{_global_connection_pool.max_connections} connection(s) to "
+                f"{db_config.get('host')}/{db_config.get('database')}"
+            )
+
+        return _global_connection_pool
+
+
+def reset_connection_pool():
+    """Close and reset the global connection pool (useful for testing)."""
+    global _global_connection_pool
+    with _connection_pool_lock:
+        if _global_connection_pool is not None:
+            _global_connection_pool.closeall()
+        _global_connection_pool = None
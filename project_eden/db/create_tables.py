@@ -6,7 +6,12 @@ from psycopg2 import sql
 from enum import Enum
 
 from typing import Optional, Tuple, Dict, Any, List
-from project_eden.db.utils import connect
+from project_eden.db.utils import (
+    CONTENT_HASH_COLUMN,
+    STAGING_TABLE_PREFIX,
+    connect,
+    get_staging_table_name,
+)
 
 
 DEFAULT_COMPANY_TABLE_COLUMNS_TO_TYPE = {
@@ -236,6 +241,14 @@ POSTGRES_COLUMN_NAMES_TO_FMP_COLUMN_NAMES = {
     x: y for y, x in FMP_COLUMN_NAMES_TO_POSTGRES_COLUMN_NAMES.items()
 }
 
+# Hex digest of the 64-bit hash of a row's normalized values
+CONTENT_HASH_TYPE = "char(16)"
+
+# Columns identifying a row, backed by unique constraints
+COMPANY_UNIQUE_KEYS = ["symbol"]
+STATEMENT_UNIQUE_KEYS = ["symbol", "calendaryear", "period"]
+PRICE_UNIQUE_KEYS = ["symbol", "date"]
+
 POSTGRES_TYPE_TO_PYTHON_TYPE = {
     "serial": int,
     "int": int,
@@ -263,6 +276,30 @@ class AvailableTables(Enum):
     PRICE = "price"
 
 
+# Tables written by the ingestion, which upserts through staging tables
+INGESTED_TABLES = [
+    AvailableTables.COMPANY,
+    AvailableTables.INCOME_STATEMENT_FY,
+    AvailableTables.INCOME_STATEMENT_QUARTER,
+    AvailableTables.BALANCE_SHEET_FY,
+    AvailableTables.BALANCE_SHEET_QUARTER,
+    AvailableTables.CASH_FLOW_STATEMENT_FY,
+    AvailableTables.CASH_FLOW_STATEMENT_QUARTER,
+    AvailableTables.PRICE,
+]
+
+# Natural key of each fact table, which upserts rely on with ON CONFLICT
+FACT_TABLE_UNIQUE_KEYS = {
+    AvailableTables.INCOME_STATEMENT_FY: STATEMENT_UNIQUE_KEYS,
+    AvailableTables.INCOME_STATEMENT_QUARTER: STATEMENT_UNIQUE_KEYS,
+    AvailableTables.BALANCE_SHEET_FY: STATEMENT_UNIQUE_KEYS,
+    AvailableTables.BALANCE_SHEET_QUARTER: STATEMENT_UNIQUE_KEYS,
+    AvailableTables.CASH_FLOW_STATEMENT_FY: STATEMENT_UNIQUE_KEYS,
+    AvailableTables.CASH_FLOW_STATEMENT_QUARTER: STATEMENT_UNIQUE_KEYS,
+    AvailableTables.PRICE: PRICE_UNIQUE_KEYS,
+}
+
+
 def postgres_type_to_python_type(column_name: str, is_postgres_column_name: bool = True) -> type:
     column_name = (
         column_name
@@ -285,6 +322,7 @@ def create_company_table(
     table_name: str = "company",
     foreign_key_ref_tuple: Optional[Tuple[str, str, str]] = None,
 ) -> None:
+    indexes = []
     if command is None:
         column_column_type = ""
         for column, column_type in DEFAULT_COMPANY_TABLE_COLUMNS_TO_TYPE.items():
@@ -298,10 +336,14 @@ def create_company_table(
             foreign_key_info = None
         foreign_key_info = "," + foreign_key_info if foreign_key_info is not None else ""
 
+        # One row per symbol, so concurrent workers can register companies with ON CONFLICT
+        unique_constraint = f",UNIQUE({', '.join(COMPANY_UNIQUE_KEYS)})"
+
         command = f"""
             CREATE TABLE {table_name} (
                     {column_column_type}
                     {foreign_key_info}
+                    {unique_constraint}
                 )
             """
 
@@ -312,16 +354,16 @@ def create_company_table(
         cursor = connection.cursor()
         cursor.execute(command)
 
-        # Create indexes if not using the default command
-        if command is None:
-            for index_cmd in indexes:
-                cursor.execute(index_cmd)
+        # Create indexes if not using a custom command
+        for index_cmd in indexes:
+            cursor.execute(index_cmd)
 
         # close communication with the PostgreSQL database server
         cursor.close()
         # commit the changes
         connection.commit()
     except (Exception, psycopg2.DatabaseError) as error:
+        connection.rollback()
         print(error)
 
 
@@ -331,10 +373,12 @@ def create_income_statement_table(
     table_name: str = "income_statement_fy",
     foreign_key_ref_tuple: Optional[Tuple[str, str, str]] = None,
 ) -> None:
+    indexes = []
     if command is None:
         column_column_type = ""
         for column, column_type in DEFAULT_INCOME_STATEMENT_TABLE_COLUMNS_TO_TYPE.items():
             column_column_type += ("," if column_column_type else "") + f"{column} {column_type}"
+        column_column_type += f",{CONTENT_HASH_COLUMN} {CONTENT_HASH_TYPE}"
         if foreign_key_ref_tuple is not None:
             foreign_key_info = (
                 f"foreign key ({foreign_key_ref_tuple[0]}) references "
@@ -344,10 +388,14 @@ def create_income_statement_table(
             foreign_key_info = None
         foreign_key_info = "," + foreign_key_info if foreign_key_info is not None else ""
 
+        # One row per reported period, so rows can be upserted with ON CONFLICT
+        unique_constraint = f",UNIQUE({', '.join(STATEMENT_UNIQUE_KEYS)})"
+
         command = f"""
             CREATE TABLE {table_name} (
                     {column_column_type}
                     {foreign_key_info}
+                    {unique_constraint}
                 )
             """
 
@@ -356,22 +404,23 @@ def create_income_statement_table(
             f"CREATE INDEX idx_{table_name}_company_id ON {table_name}(company_id);",
             f"CREATE INDEX idx_{table_name}_symbol ON {table_name}(symbol);",
             f"CREATE INDEX idx_{table_name}_date ON {table_name}(date);",
+            get_content_hash_index(table_name, STATEMENT_UNIQUE_KEYS),
         ]
 
     try:
         cursor = connection.cursor()
         cursor.execute(command)
 
-        # Create indexes if not using the default command
-        if command is None:
-            for index_cmd in indexes:
-                cursor.execute(index_cmd)
+        # Create indexes if not using a custom command
+        for index_cmd in indexes:
+            cursor.execute(index_cmd)
 
         # close communication with the PostgreSQL database server
         cursor.close()
         # commit the changes
         connection.commit()
     except (Exception, psycopg2.DatabaseError) as error:
+        connection.rollback()
         print(error)
 
 
@@ -381,10 +430,12 @@ def create_balance_sheet_table(
     table_name: str = "balance_sheet_fy",
     foreign_key_ref_tuple: Optional[Tuple[str, str, str]] = None,
 ) -> None:
+    indexes = []
     if command is None:
         column_column_type = ""
         for column, column_type in DEFAULT_BALANCE_SHEET_TABLE_COLUMNS_TO_TYPE.items():
             column_column_type += ("," if column_column_type else "") + f"{column} {column_type}"
+        column_column_type += f",{CONTENT_HASH_COLUMN} {CONTENT_HASH_TYPE}"
         if foreign_key_ref_tuple is not None:
             foreign_key_info = (
                 f"foreign key ({foreign_key_ref_tuple[0]}) references "
@@ -394,10 +445,14 @@ def create_balance_sheet_table(
             foreign_key_info = None
         foreign_key_info = "," + foreign_key_info if foreign_key_info is not None else ""
 
+        # One row per reported period, so rows can be upserted with ON CONFLICT
+        unique_constraint = f",UNIQUE({', '.join(STATEMENT_UNIQUE_KEYS)})"
+
         command = f"""
             CREATE TABLE {table_name} (
                     {column_column_type}
                     {foreign_key_info}
+                    {unique_constraint}
                 )
             """
 
@@ -406,22 +461,23 @@ def create_balance_sheet_table(
             f"CREATE INDEX idx_{table_name}_company_id ON {table_name}(company_id);",
             f"CREATE INDEX idx_{table_name}_symbol ON {table_name}(symbol);",
             f"CREATE INDEX idx_{table_name}_date ON {table_name}(date);",
+            get_content_hash_index(table_name, STATEMENT_UNIQUE_KEYS),
         ]
 
     try:
         cursor = connection.cursor()
         cursor.execute(command)
 
-        # Create indexes if not using the default command
-        if command is None:
-            for index_cmd in indexes:
-                cursor.execute(index_cmd)
+        # Create indexes if not using a custom command
+        for index_cmd in indexes:
+            cursor.execute(index_cmd)
 
         # close communication with the PostgreSQL database server
         cursor.close()
         # commit the changes
         connection.commit()
     except (Exception, psycopg2.DatabaseError) as error:
+        connection.rollback()
         print(error)
 
 
@@ -431,10 +487,12 @@ def create_cash_flow_statement_table(
     table_name: str = "cash_flow_statement_fy",
     foreign_key_ref_tuple: Optional[Tuple[str, str, str]] = None,
 ) -> None:
+    indexes = []
     if command is None:
         column_column_type = ""
         for column, column_type in DEFAULT_CASHFLOW_STATEMENT_TABLE_COLUMNS_TO_TYPE.items():
             column_column_type += ("," if column_column_type else "") + f"{column} {column_type}"
+        column_column_type += f",{CONTENT_HASH_COLUMN} {CONTENT_HASH_TYPE}"
         if foreign_key_ref_tuple is not None:
             foreign_key_info = (
                 f"foreign key ({foreign_key_ref_tuple[0]}) references "
@@ -444,10 +502,14 @@ def create_cash_flow_statement_table(
             foreign_key_info = None
         foreign_key_info = "," + foreign_key_info if foreign_key_info is not None else ""
 
+        # One row per reported period, so rows can be upserted with ON CONFLICT
+        unique_constraint = f",UNIQUE({', '.join(STATEMENT_UNIQUE_KEYS)})"
+
         command = f"""
             CREATE TABLE {table_name} (
                     {column_column_type}
                     {foreign_key_info}
+                    {unique_constraint}
                 )
             """
 
@@ -456,22 +518,23 @@ def create_cash_flow_statement_table(
             f"CREATE INDEX idx_{table_name}_company_id ON {table_name}(company_id);",
             f"CREATE INDEX idx_{table_name}_symbol ON {table_name}(symbol);",
             f"CREATE INDEX idx_{table_name}_date ON {table_name}(date);",
+            get_content_hash_index(table_name, STATEMENT_UNIQUE_KEYS),
         ]
 
     try:
         cursor = connection.cursor()
         cursor.execute(command)
 
-        # Create indexes if not using the default command
-        if command is None:
-            for index_cmd in indexes:
-                cursor.execute(index_cmd)
+        # Create indexes if not using a custom command
+        for index_cmd in indexes:
+            cursor.execute(index_cmd)
 
         # close communication with the PostgreSQL database server
         cursor.close()
         # commit the changes
         connection.commit()
     except (Exception, psycopg2.DatabaseError) as error:
+        connection.rollback()
         print(error)
 
 
@@ -481,10 +544,12 @@ def create_price_table(
     table_name: str = "price",
     foreign_key_ref_tuple: Optional[Tuple[str, str, str]] = None,
 ) -> None:
+    indexes = []
     if command is None:
         column_column_type = ""
         for column, column_type in DEFAULT_PRICE_COLUMNS_TO_TYPE.items():
             column_column_type += ("," if column_column_type else "") + f"{column} {column_type}"
+        column_column_type += f",{CONTENT_HASH_COLUMN} {CONTENT_HASH_TYPE}"
 
         # Add foreign key constraint
         if foreign_key_ref_tuple is None:
@@ -495,14 +560,17 @@ def create_price_table(
             f"{foreign_key_ref_tuple[1]}({foreign_key_ref_tuple[2]})"
         )
 
-        # Add unique constraint for company_id, symbol, date
-        unique_constraint = "UNIQUE(company_id, symbol, date)"
+        # Add unique constraints for company_id, symbol, date and, for upserts, symbol, date
+        unique_constraint = (
+            f"UNIQUE(company_id, symbol, date), UNIQUE({', '.join(PRICE_UNIQUE_KEYS)})"
+        )
 
         # Add indexes
         indexes = [
             f"CREATE INDEX idx_{table_name}_company_id ON {table_name}(company_id);",
             f"CREATE INDEX idx_{table_name}_symbol ON {table_name}(symbol);",
             f"CREATE INDEX idx_{table_name}_date ON {table_name}(date);",
+            get_content_hash_index(table_name, PRICE_UNIQUE_KEYS),
         ]
 
         command = f"""
@@ -517,19 +585,44 @@ def create_price_table(
         cursor = connection.cursor()
         cursor.execute(command)
 
-        # Create indexes if not using the default command
-        if command is None:
-            for index_cmd in indexes:
-                cursor.execute(index_cmd)
+        # Create indexes if not using a custom command
+        for index_cmd in indexes:
+            cursor.execute(index_cmd)
 
         # Close communication with the PostgreSQL database server
         cursor.close()
         # Commit the changes
         connection.commit()
     except (Exception, psycopg2.DatabaseError) as error:
+        connection.rollback()
         print(error)
 
 
+def get_content_hash_index(table_name: str, key_columns: List[str]) -> str:
+    """
+    Get the statement creating the index of a table's keys and content hashes.
+
+    The content hash is an included column, so that the stored keys and hashes of a
+    run's tickers can be read with an index-only scan.
+
+    Parameters
+    ----------
+    table_name : str
+        Name of the table
+    key_columns : List[str]
+        Columns of the table's natural key
+
+    Returns
+    -------
+    str
+        The ``CREATE INDEX IF NOT EXISTS`` statement
+    """
+    return (
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{CONTENT_HASH_COLUMN} "
+        f"ON {table_name}({', '.join(key_columns)}) INCLUDE ({CONTENT_HASH_COLUMN});"
+    )
+
+
 def add_columns_if_not_exists(conn, table_name, columns):
     with conn.cursor() as cur:
         for column_name, column_type in columns.items():
@@ -563,6 +656,331 @@ def add_columns_if_not_exists(conn, table_name, columns):
         conn.commit()
 
 
+def has_unique_constraint(cursor, table_name, columns) -> bool:
+    """
+    Tell whether a table has a unique (or primary key) constraint on exactly ``columns``.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    table_name : str
+        Name of the table.  A missing table has no constraint.
+    columns : List[str]
+        Columns of the constraint, in any order
+
+    Returns
+    -------
+    bool
+        True if ``INSERT ... ON CONFLICT (columns)`` can rely on the constraint
+    """
+    cursor.execute(
+        """
+        SELECT 1
+        FROM pg_constraint c
+        WHERE c.conrelid = to_regclass(%s)
+        AND c.contype IN ('u', 'p')
+        AND ARRAY(
+            SELECT a.attname::text
+            FROM unnest(c.conkey) AS k(attnum)
+            JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+            ORDER BY 1
+        ) = %s::text[]
+        """,
+        (table_name, sorted(columns)),
+    )
+    return cursor.fetchone() is not None
+
+
+def add_unique_constraint_if_not_exists(conn, table_name, columns):
+    """
+    Add a unique constraint on ``columns`` to an existing table unless it already exists.
+
+    The constraint gets Postgres' default name (``<table>_<columns>_key``), the name it
+    has on tables created with the constraint.
+
+    Parameters
+    ----------
+    conn
+        Database connection
+    table_name : str
+        Name of the table
+    columns : List[str]
+        Columns of the constraint
+
+    Raises
+    ------
+    RuntimeError
+        If the constraint could not be added, e.g. because of duplicate rows
+    """
+    constraint_name = f"{table_name}_{'_'.join(columns)}_key"
+    try:
+        with conn.cursor() as cur:
+            if not has_unique_constraint(cur, table_name, columns):
+                print(f"Adding unique constraint {constraint_name}")
+                cur.execute(
+                    sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} UNIQUE ({})").format(
+                        sql.Identifier(table_name),
+                        sql.Identifier(constraint_name),
+                        sql.SQL(", ").join(sql.Identifier(column) for column in columns),
+                    )
+                )
+        conn.commit()
+    except (Exception, psycopg2.DatabaseError) as error:
+        conn.rollback()
+        raise RuntimeError(
+            f"Could not add unique constraint {constraint_name}: {error}"
+        ) from error
+
+
+def delete_duplicate_rows(conn, table_name, key_columns) -> int:
+    """
+    Delete the rows sharing their key with a more recently inserted row.
+
+    Rows written before the table had a unique constraint on its key can be
+    duplicated, which prevents adding the constraint.  The row with the highest
+    ``id`` of each key is kept.  Rows with a NULL key column are left alone, as
+    they never conflict.
+
+    Parameters
+    ----------
+    conn
+        Database connection
+    table_name : str
+        Name of the table, with an ``id`` column
+    key_columns : List[str]
+        Columns identifying a row
+
+    Returns
+    -------
+    int
+        Number of deleted rows
+    """
+    keys = sql.SQL(", ").join(sql.Identifier(column) for column in key_columns)
+    keys_present = sql.SQL(" AND ").join(
+        sql.SQL("{} IS NOT NULL").format(sql.Identifier(column)) for column in key_columns
+    )
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                sql.SQL(
+                    """
+                    DELETE FROM {table} WHERE id IN (
+                        SELECT id FROM (
+                            SELECT id,
+                            row_number() OVER (PARTITION BY {keys} ORDER BY id DESC) AS n
+                            FROM {table} WHERE {keys_present}
+                        ) AS ranked
+                        WHERE n > 1
+                    )
+                    """
+                ).format(table=sql.Identifier(table_name), keys=keys, keys_present=keys_present)
+            )
+            deleted = cur.rowcount
+        conn.commit()
+    except (Exception, psycopg2.DatabaseError) as error:
+        conn.rollback()
+        raise RuntimeError(f"Could not delete duplicate rows of {table_name}: {error}") from error
+    if deleted:
+        print(f"Deleted {deleted} duplicate {table_name} rows")
+    return deleted
+
+
+def get_company_id_tables(cursor) -> List[str]:
+    """Get the tables with a ``company_id`` column, other than the staging tables."""
+    cursor.execute(
+        """
+        SELECT c.table_name
+        FROM information_schema.columns c
+        JOIN information_schema.tables t
+        ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+        WHERE c.table_schema = current_schema()
+        AND c.column_name = 'company_id'
+        AND t.table_type = 'BASE TABLE'
+        AND c.table_name NOT LIKE %s
+        ORDER BY c.table_name
+        """,
+        (STAGING_TABLE_PREFIX.replace("_", "\\_") + "%",),
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def merge_duplicate_companies(conn) -> int:
+    """
+    Merge the company rows sharing a symbol into the one with the lowest id.
+
+    Databases written by concurrent workers before companies were registered with
+    ``ON CONFLICT`` can hold several rows per symbol, which prevents adding
+    ``UNIQUE(symbol)``.  The rows referencing a duplicate company are moved to the
+    surviving id before the duplicates are deleted, in one transaction.
+
+    Parameters
+    ----------
+    conn
+        Database connection
+
+    Returns
+    -------
+    int
+        Number of deleted company rows
+    """
+    duplicates = sql.SQL(
+        """
+        (SELECT id, min(id) OVER (PARTITION BY symbol) AS surviving_id
+         FROM company WHERE symbol IS NOT NULL) AS d
+        """
+    )
+    try:
+        with conn.cursor() as cur:
+            for table_name in get_company_id_tables(cur):
+                cur.execute(
+                    sql.SQL(
+                        "UPDATE {} AS t SET company_id = d.surviving_id FROM {} "
+                        "WHERE t.company_id = d.id AND d.id <> d.surviving_id"
+                    ).format(sql.Identifier(table_name), duplicates)
+                )
+                if cur.rowcount:
+                    print(f"Moved {cur.rowcount} {table_name} rows to the surviving company ids")
+            cur.execute(
+                sql.SQL(
+                    "DELETE FROM company AS c USING {} "
+                    "WHERE c.id = d.id AND d.id <> d.surviving_id"
+                ).format(duplicates)
+            )
+            deleted = cur.rowcount
+        conn.commit()
+    except (Exception, psycopg2.DatabaseError) as error:
+        conn.rollback()
+        raise RuntimeError(f"Could not merge duplicate companies: {error}") from error
+    if deleted:
+        print(f"Deleted {deleted} duplicate company rows")
+    return deleted
+
+
+def check_unique_constraints(conn, write_mode: str = "merge"):
+    """
+    Check that the constraints ingestion relies on exist, before ingesting.
+
+    Companies are always registered with ``ON CONFLICT (symbol)``; upserts also need
+    the natural keys of the fact tables.
+
+    Parameters
+    ----------
+    conn
+        Database connection
+    write_mode : str, default="merge"
+        How fetched rows are written ("merge" or "upsert")
+
+    Raises
+    ------
+    RuntimeError
+        If a constraint is missing.  ``eden create`` adds it to an existing database.
+    """
+    required = {AvailableTables.COMPANY: COMPANY_UNIQUE_KEYS}
+    if write_mode == "upsert":
+        required.update(FACT_TABLE_UNIQUE_KEYS)
+    with conn.cursor() as cur:
+        missing = [
+            f"{table.value}({', '.join(columns)})"
+            for table, columns in required.items()
+            if not has_unique_constraint(cur, table.value, columns)
+        ]
+    conn.rollback()
+    if missing:
+        raise RuntimeError(
+            f"Missing unique constraint(s) on {', '.join(missing)}. "
+            f"Run `eden create` to upgrade the database before ingesting."
+        )
+
+
+def add_content_hash_column(conn, table_name, key_columns):
+    """
+    Add the content hash column and its index to an existing fact table.
+
+    The hash of rows stored before is NULL until they are fetched again.
+
+    Parameters
+    ----------
+    conn
+        Database connection
+    table_name : str
+        Name of the table
+    key_columns : List[str]
+        Columns of the table's natural key
+    """
+    try:
+        add_columns_if_not_exists(conn, table_name, {CONTENT_HASH_COLUMN: CONTENT_HASH_TYPE})
+        with conn.cursor() as cur:
+            cur.execute(get_content_hash_index(table_name, key_columns))
+        conn.commit()
+    except (Exception, psycopg2.DatabaseError) as error:
+        conn.rollback()
+        print(f"Could not add {CONTENT_HASH_COLUMN} to {table_name}: {error}")
+
+
+def migrate_tables(connection):
+    """
+    Bring tables created by earlier versions up to the current schema.
+
+    Parameters
+    ----------
+    connection
+        Database connection
+    """
+    # Fact rows are deduplicated first, so that moving the rows of duplicate companies
+    # to one id cannot break UNIQUE(company_id, symbol, date) on price
+    for table, key_columns in FACT_TABLE_UNIQUE_KEYS.items():
+        delete_duplicate_rows(connection, table.value, key_columns)
+        add_unique_constraint_if_not_exists(connection, table.value, key_columns)
+        add_content_hash_column(connection, table.value, key_columns)
+    merge_duplicate_companies(connection)
+    add_unique_constraint_if_not_exists(
+        connection, AvailableTables.COMPANY.value, COMPANY_UNIQUE_KEYS
+    )
+
+
+def create_staging_tables(connection, tables: Optional[List[AvailableTables]] = None):
+    """
+    Create the UNLOGGED staging tables batched upserts copy their rows into.
+
+    Each staging table has the columns of its table, without constraints.  Columns
+    added to a table since its staging table was created are added as well.  Staging
+    tables are not WAL-logged and only hold rows within a transaction, so they are
+    never backed up or replicated.
+
+    Parameters
+    ----------
+    connection
+        Database connection
+    tables : List[AvailableTables], optional
+        Tables to create staging tables for.  If None, every table in ``INGESTED_TABLES``.
+    """
+    for table in INGESTED_TABLES if tables is None else tables:
+        staging_table = get_staging_table_name(table.value)
+        try:
+            with connection.cursor() as cur:
+                cur.execute(
+                    sql.SQL(
+                        "CREATE UNLOGGED TABLE IF NOT EXISTS {} AS SELECT * FROM {} WITH NO DATA"
+                    ).format(sql.Identifier(staging_table), sql.Identifier(table.value))
+                )
+                cur.execute(
+                    """
+                    SELECT attname, format_type(atttypid, atttypmod)
+                    FROM pg_attribute
+                    WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+                    ORDER BY attnum
+                """,
+                    (table.value,),
+                )
+                columns = dict(cur.fetchall())
+            connection.commit()
+            add_columns_if_not_exists(connection, staging_table, columns)
+        except (Exception, psycopg2.DatabaseError) as error:
+            connection.rollback()
+            print(f"Could not create staging table {staging_table}: {error}")
+
+
 def load_config(config_file: str) -> Dict[str, Any]:
     """
     Load configuration from a JSON file.
@@ -697,6 +1115,10 @@ def driver(config_file: str = "config.json", tables: Optional[List[str]] = None)
     # Create the tables
     create_tables(tables_to_create, connection)
 
+    # Add constraints introduced since existing tables were created
+    migrate_tables(connection)
+    create_staging_tables(connection, [t for t in tables_to_create if t in INGESTED_TABLES])
+
     print("Table creation completed.")
     connection.close()
 
@@ -1,21 +1,28 @@
+import numpy as np
 import pandas as pd
-import certifi
 import json
 import time
 import os
 import datetime
-import ssl
 from enum import Enum
-from typing import Optional, Dict, Any, List
-from urllib.request import urlopen, Request
+from typing import Optional, Dict, Any, List, Tuple
 from urllib.error import HTTPError
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from psycopg2.extras import execute_values
 
+from project_eden.db.connection_pool import get_connection_pool
 from project_eden.db.utils import (
+    CONTENT_HASH_COLUMN,
     connect,
-    insert_records_from_df,
+    copy_records_from_df,
+    get_company_id_cache,
+    get_connection_params,
+    get_staging_table_name,
+    get_table_column_types,
+    upsert_records_from_df,
+    warm_company_id_cache,
 )
+from project_eden.db.key_index import ExistingKeyIndex
 from project_eden.db.create_tables import (
     DEFAULT_COMPANY_TABLE_COLUMNS_TO_TYPE,
     DEFAULT_SHARES_COLUMNS_TO_TYPE,
@@ -23,9 +30,19 @@ from project_eden.db.create_tables import (
     DEFAULT_INCOME_STATEMENT_TABLE_COLUMNS_TO_TYPE,
     DEFAULT_CASHFLOW_STATEMENT_TABLE_COLUMNS_TO_TYPE,
     DEFAULT_BALANCE_SHEET_TABLE_COLUMNS_TO_TYPE,
-    postgres_type_to_python_type,
     DEFAULT_PRICE_COLUMNS_TO_TYPE,
+    COMPANY_UNIQUE_KEYS,
+    STATEMENT_UNIQUE_KEYS,
+    PRICE_UNIQUE_KEYS,
+    check_unique_constraints,
 )
+from project_eden.utils.http_client import HTTPClient, RequestNotSentError, get_http_client
+from project_eden.utils.quota import get_quota_tracker
+from project_eden.utils.rate_limiter import get_api_key_pool, get_api_keys, set_priority_lane
+from project_eden.utils.retry import get_retry_handler
+from project_eden.utils.run_state import IngestionRun, get_run_state_store
+from project_eden.utils.response_cache import ResponseCache, get_response_cache
+from project_eden.utils.trading_calendar import next_market_close, plan_trading_day_chunks
 
 
 INCOME_STATEMENT = "income-statement"
@@ -45,6 +62,98 @@ class Datasets(Enum):
     HISTORTICAL_PRICE_EOD_FULL = HISTORTICAL_PRICE_EOD_FULL
 
 
+# Datasets ingested for the quarterly pass of a ticker
+DEFAULT_QUARTER_DATASETS = [
+    Datasets.PROFILE,
+    Datasets.INCOME_STATEMENT,
+    Datasets.CASH_FLOW_STATEMENT,
+    Datasets.BALANCE_SHEET_STATEMENT,
+    Datasets.HISTORTICAL_PRICE_EOD_FULL,
+]
+
+# Datasets ingested for the fiscal year pass of a ticker (PROFILE and prices are not
+# period-specific)
+DEFAULT_FY_DATASETS = [
+    Datasets.INCOME_STATEMENT,
+    Datasets.CASH_FLOW_STATEMENT,
+    Datasets.BALANCE_SHEET_STATEMENT,
+]
+
+
+def get_period_datasets(period: Optional[str]) -> List[Tuple[str, List[Datasets]]]:
+    """
+    Get the (period, datasets) passes to run for each ticker.
+
+    Parameters
+    ----------
+    period : str, optional
+        "quarter", "fy", "all" or None.  "all" and None ingest both periods.
+
+    Returns
+    -------
+    List[Tuple[str, List[Datasets]]]
+        List of (period, datasets) tuples
+    """
+    if period is None or period == "all":
+        return [("quarter", DEFAULT_QUARTER_DATASETS), ("fy", DEFAULT_FY_DATASETS)]
+    return [(period, DEFAULT_QUARTER_DATASETS)]
+
+
+def get_ticker_jobs(
+    tickers: List[str], period: Optional[str], run: Optional[IngestionRun] = None
+) -> Dict[str, List[Tuple[str, List[Datasets]]]]:
+    """
+    Get the (period, datasets) passes to run for each ticker, in processing order.
+
+    Parameters
+    ----------
+    tickers : List[str]
+        Stock symbols to process
+    period : str, optional
+        "quarter", "fy", "all" or None.  "all" and None ingest both periods.
+    run : IngestionRun, optional
+        Checkpointed run being processed.  If given, only the passes and datasets the
+        run has not completed yet are returned, and ``tickers`` and ``period`` are ignored.
+
+    Returns
+    -------
+    Dict[str, List[Tuple[str, List[Datasets]]]]
+        List of (period, datasets) tuples for each upper-cased symbol
+    """
+    if run is not None:
+        return {
+            symbol: [
+                (job_period, [Datasets(name) for name in names]) for job_period, names in jobs
+            ]
+            for symbol, jobs in run.get_pending_work().items()
+        }
+    jobs = get_period_datasets(period)
+    return {symbol: jobs for symbol in dict.fromkeys(symbol.upper() for symbol in tickers)}
+
+
+def record_ticker_job(
+    run: Optional[IngestionRun], symbol: str, period: str, datasets: List[Datasets], success: bool
+):
+    """
+    Record the outcome of a ticker's (period, datasets) pass in a checkpointed run.
+
+    Parameters
+    ----------
+    run : IngestionRun, optional
+        Checkpointed run being processed.  If None, nothing is recorded.
+    symbol : str
+        Stock symbol
+    period : str
+        Period of the pass ("quarter" or "fy")
+    datasets : List[Datasets]
+        Datasets of the pass
+    success : bool
+        Whether the datasets were committed
+    """
+    if run is not None:
+        run.record(symbol, period, [dataset.value for dataset in datasets], success)
+
+
 dataset_to_base_url_key = {
     Datasets.INCOME_STATEMENT: "base_url",
     Datasets.BALANCE_SHEET_STATEMENT: "base_url",
@@ -55,6 +164,46 @@ dataset_to_base_url_key = {
 }
 
 
+# Start of the price history requested when a symbol's IPO date is unknown
+DEFAULT_PRICE_HISTORY_START = "1900-01-01"
+
+# Days before the last stored bar that an incremental price refresh re-fetches, so that
+# late corrections by the provider are picked up
+INCREMENTAL_PRICE_OVERLAP_DAYS = 5
+
+# Financial statement datasets, stored in one table per period
+STATEMENT_DATASETS = [
+    Datasets.INCOME_STATEMENT,
+    Datasets.CASH_FLOW_STATEMENT,
+    Datasets.BALANCE_SHEET_STATEMENT,
+]
+
+# Datasets whose stored keys are looked up in the run's existing key index
+KEY_INDEXED_DATASETS = STATEMENT_DATASETS + [Datasets.HISTORTICAL_PRICE_EOD_FULL]
+
+# Stored periods that an incremental statement refresh re-fetches, so that restatements of
+# recent periods are picked up
+INCREMENTAL_STATEMENT_OVERLAP_PERIODS = 2
+
+PERIOD_TO_MONTHS = {"quarter": 3, "fy": 12}
+
+# Postgres column types written as integers
+INTEGER_COLUMN_TYPES = {"smallint", "int", "bigint", "serial"}
+
+# How fetched rows are written: "merge" compares them with the stored rows in Python,
+# "upsert" leaves that to the database (INSERT ... ON CONFLICT DO UPDATE)
+WRITE_MODES = ["merge", "upsert"]
+
+# Lifetime of cached API responses in seconds, overridable per dataset with
+# ``cache.ttl_seconds`` in config.  Price responses stay valid until the next market close.
+DEFAULT_CACHE_TTL_SECONDS = {
+    Datasets.PROFILE: 24 * 60 * 60,
+    Datasets.INCOME_STATEMENT: 24 * 60 * 60,
+    Datasets.CASH_FLOW_STATEMENT: 24 * 60 * 60,
+    Datasets.BALANCE_SHEET_STATEMENT: 24 * 60 * 60,
+}
+
+
 def get_default_params_for_dataset(dataset: Datasets, period: str) -> dict:
     if period not in ["quarter", "fy"]:
         raise ValueError("period must be either 'quarter' or 'period'.")
@@ -64,7 +213,7 @@ def get_default_params_for_dataset(dataset: Datasets, period: str) -> dict:
         Datasets.CASH_FLOW_STATEMENT: {"period": period},
         Datasets.INCOME_STATEMENT: {"period": period},
         Datasets.HISTORTICAL_PRICE_EOD_FULL: {
-            "from": "1900-01-01",
+            "from": DEFAULT_PRICE_HISTORY_START,
             "to": datetime.date.today().strftime("%Y-%m-%d"),
         },
     }
@@ -72,48 +221,6 @@ def get_default_params_for_dataset(dataset: Datasets, period: str) -> dict:
     return dataset_to_default_params.get(dataset, {})
 
 
-def split_date_range_into_chunks(start_date_str: str, end_date_str: str, max_days: int = 4900) -> List[tuple]:
-    """
-    Split a date range into chunks to handle API limits.
-
-    The FMP API returns at most 5,000 records. To be safe, we use chunks of 4,900 days
-    to account for weekends and holidays (which don't have trading data).
-
-    Parameters
-    ----------
-    start_date_str : str
-        Start date in YYYY-MM-DD format
-    end_date_str : str
-        End date in YYYY-MM-DD format
-    max_days : int, default=4900
-        Maximum number of days per chunk (default 4900 to stay under 5000 record limit)
-
-    Returns
-    -------
-    List[tuple]
-        List of (from_date, to_date) tuples as strings in YYYY-MM-DD format
-    """
-    start_date = datetime.datetime.strptime(start_date_str, "%Y-%m-%d").date()
-    end_date = datetime.datetime.strptime(end_date_str, "%Y-%m-%d").date()
-
-    chunks = []
-    current_start = start_date
-
-    while current_start < end_date:
-        # Calculate the end of this chunk
-        current_end = min(current_start + datetime.timedelta(days=max_days), end_date)
-
-        chunks.append((
-            current_start.strftime("%Y-%m-%d"),
-            current_end.strftime("%Y-%m-%d")
-        ))
-
-        # Move to the next chunk (add 1 day to avoid overlap)
-        current_start = current_end + datetime.timedelta(days=1)
-
-    return chunks
-
-
 datasets_to_api_version = {
     Datasets.HISTORTICAL_PRICE_EOD_FULL: "stable",
     Datasets.PROFILE: "v3",
@@ -152,6 +259,146 @@ dataset_to_table_columns = {
 }
 
 
+def get_cache_ttl(
+    dataset: Datasets, config: Dict[str, Any], now: Optional[datetime.datetime] = None
+) -> float:
+    """
+    Get the number of seconds a response for a dataset stays valid in the response cache.
+
+    Parameters
+    ----------
+    dataset : Datasets
+        The dataset of the response
+    config : Dict[str, Any]
+        Configuration dictionary.  ``cache.ttl_seconds`` may map dataset names to TTLs.
+    now : datetime.datetime, optional
+        Timezone-aware current time. If None, uses the current time
+
+    Returns
+    -------
+    float
+        The TTL in seconds
+    """
+    ttl_seconds = config.get("cache", {}).get("ttl_seconds", {})
+    if dataset.value in ttl_seconds:
+        return float(ttl_seconds[dataset.value])
+    if dataset == Datasets.HISTORTICAL_PRICE_EOD_FULL:
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        return (next_market_close(now) - now).total_seconds()
+    return DEFAULT_CACHE_TTL_SECONDS.get(dataset, 0)
+
+
+def is_cacheable_response(json_data: Any) -> bool:
+    """
+    Tell whether a parsed API response may be stored in the response cache.
+
+    Every dataset is returned as a list of records.  Error payloads such as
+    ``{"Error Message": ...}`` and empty lists are not cached, so that a bad response
+    is not served again for the whole TTL.
+
+    Parameters
+    ----------
+    json_data : Any
+        The parsed JSON response
+
+    Returns
+    -------
+    bool
+        True if the response is a non-empty list
+    """
+    return isinstance(json_data, list) and len(json_data) > 0
+
+
+def get_cached_response(
+    dataset_name: str,
+    ticker: str,
+    config: Dict[str, Any],
+    api_version: str = "v3",
+    base_url: str = None,
+    **kwargs,
+) -> Optional[Any]:
+    """
+    Look up an API response in the response cache.
+
+    Parameters
+    ----------
+    dataset_name : str
+        The name of the dataset to retrieve
+    ticker : str
+        The stock ticker symbol
+    config : Dict[str, Any]
+        Configuration dictionary
+    api_version : str, default="v3"
+        The API version of the request
+    base_url : str, optional
+        The base URL of the request (not part of the cache key)
+    **kwargs
+        Query parameters of the request
+
+    Returns
+    -------
+    Any, optional
+        The cached parsed JSON response, or None if it is not cached or caching is disabled
+    """
+    cache = get_response_cache(config)
+    if cache is None:
+        return None
+    return cache.get(ResponseCache.make_key(dataset_name, api_version, ticker, kwargs))
+
+
+def print_response_cache_stats(config: Dict[str, Any]):
+    """Print the response cache hit and miss counts of the run, if caching is enabled."""
+    cache = get_response_cache(config)
+    if cache is not None:
+        stats = cache.get_stats()
+        print(f"Response cache: {stats['hits']} hit(s), {stats['misses']} miss(es)")
+
+
+def get_calls_per_ticker(period: Optional[str]) -> int:
+    """Return the number of API calls needed to ingest one ticker (one per dataset and period)."""
+    return sum(len(datasets) for _, datasets in get_period_datasets(period))
+
+
+def print_quota_status(
+    config: Dict[str, Any], num_tickers: int, period: Optional[str] = None
+) -> Optional[int]:
+    """
+    Print the remaining API quota and how many tickers it still affords, if quotas are configured.
+
+    Parameters
+    ----------
+    config : Dict[str, Any]
+        Configuration dictionary
+    num_tickers : int
+        Number of tickers about to be ingested
+    period : str, optional
+        Data period of the run ("quarter", "fy", "all" or None)
+
+    Returns
+    -------
+    int, optional
+        Number of tickers the remaining quota affords, or None if quotas are not configured
+    """
+    quota = get_quota_tracker(config)
+    if quota is None:
+        return None
+
+    remaining = quota.get_remaining()
+    affordable = quota.get_affordable_tickers(get_calls_per_ticker(period))
+    parts = []
+    if remaining["daily_calls"] is not None:
+        parts.append(f"{remaining['daily_calls']} call(s) left today")
+    if remaining["monthly_bytes"] is not None:
+        parts.append(f"{remaining['monthly_bytes'] / 1024 ** 2:.0f} MB left this month")
+    print(f"API quota: {', '.join(parts)}")
+    if affordable is not None and affordable < num_tickers:
+        print(
+            f"Warning: the remaining API quota only affords about {affordable} of "
+            f"{num_tickers} ticker(s); the run stops once it is used up."
+        )
+    return affordable
+
+
 def get_jsonparsed_data(
     dataset_name: str,
     ticker: str,
@@ -159,11 +406,27 @@ def get_jsonparsed_data(
     base_url: str = None,
     config: Dict[str, Any] = None,
     api_version: str = "v3",
+    client: Optional[HTTPClient] = None,
+    check_cache: bool = True,
+    acquire_token: bool = True,
+    retry: bool = True,
     **kwargs,
 ) -> dict:
     """
     Receive the content of from a url of the form f"{base_url}/{dataset_name}/{ticker}?apikey={key}".
 
+    If the response cache is enabled, cached responses are returned without a request
+    and fresh responses are stored in the cache (see ``is_cacheable_response``).  A
+    token is taken from the global API key pool right before the request is sent, so
+    only requests that actually reach the API are metered, and the request is sent
+    with the key that had the most tokens available (see
+    ``project_eden.utils.rate_limiter.APIKeyPool``).  Throttled, failed and timed out
+    requests are retried with backoff by the global retry handler (see
+    ``project_eden.utils.retry``).  If API quotas are configured, every request is
+    counted against them right before it is sent (see ``QuotaTracker.reserve``) and its
+    response size once it is received, and ``QuotaExceededError`` is raised once they
+    are used up.  Requests that could not be sent are not counted.
+
     Parameters
     ----------
     dataset_name : str
@@ -171,13 +434,24 @@ def get_jsonparsed_data(
     ticker : str
         The stock ticker symbol
     key : str, optional
-        The API key for authentication. If None, uses the key from config
+        The API key for authentication. If None, the key is chosen by the API key pool
     base_url : str, optional
         The base URL for the API. If None, uses the URL from config
     config : Dict[str, Any], optional
         Configuration dictionary. If None, loads from config.json
     api_version : str, default="v3"
         The API version to use.  Options are "v3" and "stable"
+    client : HTTPClient, optional
+        Keep-alive HTTP client used for the request. If None, uses the global client
+    check_cache : bool, default=True
+        Look the response up in the response cache first.  Callers that already did
+        the lookup pass False.
+    acquire_token : bool, default=True
+        Take a token from the global API key pool before sending the request.  Callers
+        that meter requests with their own pool pass False, along with the ``key`` they
+        acquired.
+    retry : bool, default=True
+        Retry transient failures.  Callers that retry with their own handler pass False.
     **kwargs
         Additional query parameters to include in the URL
 
@@ -189,38 +463,167 @@ def get_jsonparsed_data(
     if config is None:
         config = load_config()
 
-    if key is None:
-        key = config["api"]["key"]
+    cache = get_response_cache(config)
+    if cache is not None:
+        cache_key = ResponseCache.make_key(dataset_name, api_version, ticker, kwargs)
+        if check_cache:
+            cached_data = cache.get(cache_key)
+            if cached_data is not None:
+                return cached_data
 
     if base_url is None:
         base_url = config["api"]["base_url"]
 
-    if api_version == "v3":
-        url = f"{base_url}/{dataset_name}/{ticker}?apikey={key}"
-        for wkargs_key, value in kwargs.items():
-            url += f"&{wkargs_key}={value}"
-    elif api_version == "stable":
-        url = f"{base_url}/{dataset_name}?symbol={ticker}"
-        for wkargs_key, value in kwargs.items():
-            url += f"&{wkargs_key}={value}"
-        url += f"&apikey={key}"
-    else:
+    if api_version not in ("v3", "stable"):
         raise ValueError(f"Invalid api_version: {api_version}.  Options are 'v3' and 'stable'.")
 
-    context = ssl.create_default_context(cafile=certifi.where())
-    response = urlopen(url, context=context)
-    data = response.read().decode("utf-8")
-    return json.loads(data)
+    def get_url(api_key):
+        if api_version == "v3":
+            url = f"{base_url}/{dataset_name}/{ticker}?apikey={api_key}"
+            for wkargs_key, value in kwargs.items():
+                url += f"&{wkargs_key}={value}"
+        else:
+            url = f"{base_url}/{dataset_name}?symbol={ticker}"
+            for wkargs_key, value in kwargs.items():
+                url += f"&{wkargs_key}={value}"
+            url += f"&apikey={api_key}"
+        return url
+
+    if client is None:
+        client = get_http_client(config)
+
+    quota = get_quota_tracker(config)
+    key_pool = get_api_key_pool(config) if acquire_token else None
+    if key is None and key_pool is None:
+        key = get_api_keys(config)[0][0]
+
+    def send_request():
+        while True:
+            request_key = key
+            if key_pool is not None:
+                pool_key = key_pool.acquire(key)
+                request_key = key if key is not None else pool_key
+            if quota is not None:
+                # Checked and counted at once, so concurrent requests cannot overshoot
+                quota.reserve()
+            try:
+                body = client.get(get_url(request_key))
+            except Exception as error:
+                if quota is not None and isinstance(error, RequestNotSentError):
+                    quota.release()
+                # A rejected key is dropped from the pool and the request is sent again
+                # with another one
+                if key_pool is not None and key_pool.record_error(request_key, error):
+                    continue
+                raise
+            if quota is not None:
+                quota.record(0, len(body))
+            if key_pool is not None:
+                key_pool.record_success(request_key)
+            return json.loads(body.decode("utf-8"))
+
+    json_data = get_retry_handler(config).call(send_request) if retry else send_request()
+    if cache is not None and is_cacheable_response(json_data):
+        cache.set(cache_key, json_data, get_cache_ttl(Datasets(dataset_name), config))
+    return json_data
+
+
+def get_dataset_requests(
+    ticker: str, dataset: str, config: Dict[str, Any], **kwargs
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Build the API requests needed to fetch a dataset for a ticker.
+
+    For price data (HISTORTICAL_PRICE_EOD_FULL) with a date range, the range is split
+    into chunks of at most 4,900 exchange trading days to handle the API's 5,000 record
+    limit and one request is built per chunk.  A range without trading days needs no
+    request at all.
+
+    Parameters
+    ----------
+    ticker : str
+        The stock ticker symbol
+    dataset : str
+        The dataset name to retrieve
+    config : Dict[str, Any]
+        Configuration dictionary
+    **kwargs
+        Additional parameters to pass to the API
+
+    Returns
+    -------
+    Tuple[str, List[Dict[str, Any]]]
+        The API version and one dictionary of query parameters per request
+    """
+    kwargs_to_use = {}
+    if "base_url" not in kwargs:
+        kwargs_to_use["base_url"] = config["api"][dataset_to_base_url_key[Datasets(dataset)]]
+
+    kwargs_to_use.update(kwargs)
+
+    api_version = datasets_to_api_version.get(Datasets(dataset), "v3")
+
+    if is_chunked_price_request(dataset, kwargs_to_use):
+        date_chunks = plan_trading_day_chunks(kwargs_to_use["from"], kwargs_to_use["to"])
+        requests = []
+        for chunk_from, chunk_to in date_chunks:
+            chunk_kwargs = kwargs_to_use.copy()
+            chunk_kwargs["from"] = chunk_from
+            chunk_kwargs["to"] = chunk_to
+            requests.append(chunk_kwargs)
+        return api_version, requests
+
+    return api_version, [kwargs_to_use]
+
+
+def is_chunked_price_request(dataset: str, params: Dict[str, Any]) -> bool:
+    """Return True if the request is a price request over a date range that must be chunked."""
+    return (
+        Datasets(dataset) == Datasets.HISTORTICAL_PRICE_EOD_FULL
+        and "from" in params
+        and "to" in params
+    )
+
+
+def combine_price_chunks(dataframes: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Combine price chunks (in chunk order) into a single DataFrame.
+
+    Parameters
+    ----------
+    dataframes : List[pd.DataFrame]
+        The non-empty DataFrames returned for each chunk
+
+    Returns
+    -------
+    pd.DataFrame
+        The combined DataFrame with duplicates at chunk boundaries removed
+    """
+    if not dataframes:
+        return pd.DataFrame()
+
+    combined_df = pd.concat(dataframes, ignore_index=True)
+    # Remove duplicates that might occur at chunk boundaries
+    if "date" in combined_df.columns:
+        combined_df = combined_df.drop_duplicates(subset=["date"], keep="first")
+    return combined_df
 
 
 def gather_dataset(
-    ticker: str, dataset: str, key: str = None, config: Dict[str, Any] = None, **kwargs
+    ticker: str,
+    dataset: str,
+    key: str = None,
+    config: Dict[str, Any] = None,
+    client: Optional[HTTPClient] = None,
+    **kwargs,
 ) -> pd.DataFrame:
     """
     Gather dataset from the financial API and convert to DataFrame.
 
     For price data (HISTORTICAL_PRICE_EOD_FULL), this function automatically handles
-    the API's 5,000 record limit by splitting large date ranges into chunks.
+    the API's 5,000 record limit by splitting large date ranges into chunks.  The chunks
+    are fetched concurrently (up to ``api.max_concurrent_chunks`` at a time) and then
+    combined in date order.
 
     Parameters
     ----------
@@ -229,9 +632,11 @@ def gather_dataset(
     dataset : str
         The dataset name to retrieve
     key : str, optional
-        The API key for authentication. If None, uses the key from config
+        The API key for authentication. If None, the key is chosen by the API key pool
     config : Dict[str, Any], optional
         Configuration dictionary. If None, loads from config.json
+    client : HTTPClient, optional
+        Keep-alive HTTP client used for the requests. If None, uses the global client
     **kwargs
         Additional parameters to pass to the API
 
@@ -241,51 +646,48 @@ def gather_dataset(
         DataFrame containing the retrieved data
     """
     kwargs = kwargs if kwargs else {}
-    kwargs_to_use = {}
-    if "base_url" not in kwargs:
-        kwargs_to_use["base_url"] = config["api"][dataset_to_base_url_key[Datasets(dataset)]]
-
-    kwargs_to_use.update(kwargs)
-
-    api_version = datasets_to_api_version.get(Datasets(dataset), "v3")
+    api_version, requests = get_dataset_requests(ticker, dataset, config, **kwargs)
+    if not requests:
+        print(f"--No trading days in the requested range for {ticker}, skipping request.")
+        return pd.DataFrame()
 
     # Special handling for price data to account for 5,000 record API limit
-    if Datasets(dataset) == Datasets.HISTORTICAL_PRICE_EOD_FULL and "from" in kwargs_to_use and "to" in kwargs_to_use:
-        from_date = kwargs_to_use["from"]
-        to_date = kwargs_to_use["to"]
+    if is_chunked_price_request(dataset, requests[0]):
+        print(
+            f"--Fetching price data for {ticker} in {len(requests)} chunk(s) "
+            "to handle API limit..."
+        )
 
-        # Split the date range into chunks
-        date_chunks = split_date_range_into_chunks(from_date, to_date)
+        # Cached chunks need no request (and no rate limiter token)
+        chunk_results = [
+            get_cached_response(dataset, ticker, config, api_version, **chunk_kwargs)
+            for chunk_kwargs in requests
+        ]
+        missing = [i for i, json_data in enumerate(chunk_results) if json_data is None]
 
-        print(f"--Fetching price data for {ticker} in {len(date_chunks)} chunk(s) to handle API limit...")
+        def fetch_chunk(chunk_kwargs):
+            return get_jsonparsed_data(
+                dataset,
+                ticker,
+                key,
+                config=config,
+                api_version=api_version,
+                client=client,
+                check_cache=False,
+                **chunk_kwargs,
+            )
 
-        # If we need multiple chunks, acquire additional rate limiter tokens
-        # (the first chunk is already accounted for in the caller's token acquisition)
-        if len(date_chunks) > 1:
-            try:
-                from project_eden.utils.rate_limiter import get_rate_limiter
-                rate_limiter = get_rate_limiter(config)
-                extra_calls = len(date_chunks) - 1
-                print(f"  --Acquiring {extra_calls} additional rate limiter tokens for chunked requests...")
-                rate_limiter.acquire(extra_calls)
-            except ImportError:
-                # If rate limiter is not available, continue without it
-                # (for backward compatibility with non-parallel execution)
-                pass
+        # Fetch the missing chunks concurrently; map() yields results in chunk (date) order
+        if missing:
+            max_workers = min(len(missing), config["api"].get("max_concurrent_chunks", 8))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                fetched = executor.map(fetch_chunk, [requests[i] for i in missing])
+                for i, json_data in zip(missing, fetched):
+                    chunk_results[i] = json_data
 
         all_dataframes = []
-        for i, (chunk_from, chunk_to) in enumerate(date_chunks, 1):
-            print(f"  --Chunk {i}/{len(date_chunks)}: {chunk_from} to {chunk_to}")
-
-            # Update kwargs with the chunk's date range
-            chunk_kwargs = kwargs_to_use.copy()
-            chunk_kwargs["from"] = chunk_from
-            chunk_kwargs["to"] = chunk_to
-
-            # Fetch data for this chunk
-            json_data = get_jsonparsed_data(
-                dataset, ticker, key, config=config, api_version=api_version, **chunk_kwargs
-            )
+        for i, (chunk_kwargs, json_data) in enumerate(zip(requests, chunk_results), 1):
+            print(f"  --Chunk {i}/{len(requests)}: {chunk_kwargs['from']} to {chunk_kwargs['to']}")
 
             if json_data:
                 chunk_df = pd.DataFrame.from_records(json_data)
@@ -295,23 +697,504 @@ def gather_dataset(
                 print(f"  --No data returned for this chunk")
 
         # Combine all chunks
-        if all_dataframes:
-            combined_df = pd.concat(all_dataframes, ignore_index=True)
-            # Remove duplicates that might occur at chunk boundaries
-            if "date" in combined_df.columns:
-                combined_df = combined_df.drop_duplicates(subset=["date"], keep="first")
+        combined_df = combine_price_chunks(all_dataframes)
+        if not combined_df.empty:
             print(f"--Total records after combining chunks: {len(combined_df)}")
-            return combined_df
-        else:
-            return pd.DataFrame()
+        return combined_df
     else:
         # Standard single API call for non-price datasets
         json_data = get_jsonparsed_data(
-            dataset, ticker, key, config=config, api_version=api_version, **kwargs_to_use
+            dataset,
+            ticker,
+            key,
+            config=config,
+            api_version=api_version,
+            client=client,
+            **requests[0],
         )
         return pd.DataFrame.from_records(json_data)
 
 
+def get_price_start_date(cursor, symbol: str) -> Optional[str]:
+    """
+    Get the first date to request prices for, based on the company's stored IPO date.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    symbol : str
+        Stock symbol
+
+    Returns
+    -------
+    str, optional
+        The IPO date in YYYY-MM-DD format, or None if it is not known
+    """
+    cursor.execute("SELECT ipodate FROM company WHERE symbol = %s", (symbol,))
+    row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    return row[0].strftime("%Y-%m-%d")
+
+
+def get_latest_price_date(cursor, symbol: str) -> Optional[datetime.date]:
+    """
+    Get the date of the most recent price bar stored for a symbol.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    symbol : str
+        Stock symbol
+
+    Returns
+    -------
+    datetime.date, optional
+        The latest stored date, or None if no prices are stored
+    """
+    cursor.execute("SELECT max(date) FROM price WHERE symbol = %s", (symbol,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def get_latest_price_dates(cursor, symbols: List[str]) -> Dict[str, datetime.date]:
+    """
+    Get the date of the most recent price bar stored for each of several symbols.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    symbols : List[str]
+        Stock symbols
+
+    Returns
+    -------
+    Dict[str, datetime.date]
+        Latest stored date per symbol.  Symbols without prices are omitted.
+    """
+    cursor.execute(
+        "SELECT symbol, max(date) FROM price WHERE symbol = ANY(%s) GROUP BY symbol",
+        (list(symbols),),
+    )
+    return {symbol: latest_date for symbol, latest_date in cursor.fetchall()}
+
+
+def get_incremental_price_start(latest_date: datetime.date) -> datetime.date:
+    """Get the first date to re-fetch for a symbol whose latest stored bar is ``latest_date``."""
+    return latest_date - datetime.timedelta(days=INCREMENTAL_PRICE_OVERLAP_DAYS)
+
+
+def get_latest_statement_period(
+    cursor, table_name: str, symbol: str
+) -> Optional[Tuple[datetime.date, int, str]]:
+    """
+    Get the most recent statement period stored for a symbol.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    table_name : str
+        Statement table (e.g. "income_statement_quarter")
+    symbol : str
+        Stock symbol
+
+    Returns
+    -------
+    Tuple[datetime.date, int, str], optional
+        The (date, calendaryear, period) of the latest stored statement, or None if no
+        statements are stored
+    """
+    cursor.execute(
+        f"SELECT date, calendaryear, period FROM {table_name} "
+        "WHERE symbol = %s ORDER BY date DESC LIMIT 1",
+        (symbol,),
+    )
+    return cursor.fetchone()
+
+
+def get_latest_statement_periods(
+    cursor, table_name: str, symbols: List[str]
+) -> Dict[str, Tuple[datetime.date, int, str]]:
+    """
+    Get the most recent statement period stored for each of several symbols.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    table_name : str
+        Statement table (e.g. "income_statement_quarter")
+    symbols : List[str]
+        Stock symbols
+
+    Returns
+    -------
+    Dict[str, Tuple[datetime.date, int, str]]
+        Latest stored (date, calendaryear, period) per symbol.  Symbols without
+        statements are omitted.
+    """
+    cursor.execute(
+        f"SELECT DISTINCT ON (symbol) symbol, date, calendaryear, period FROM {table_name} "
+        "WHERE symbol = ANY(%s) ORDER BY symbol, date DESC",
+        (list(symbols),),
+    )
+    return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+
+def get_incremental_statement_limit(
+    latest_date: datetime.date, period: str, today: Optional[datetime.date] = None
+) -> int:
+    """
+    Get the number of statements to request for a symbol whose latest stored statement
+    ends on ``latest_date``.
+
+    This covers every period that may have been reported since, plus
+    ``INCREMENTAL_STATEMENT_OVERLAP_PERIODS`` stored periods.
+
+    Parameters
+    ----------
+    latest_date : datetime.date
+        Date of the latest stored statement
+    period : str
+        Data period ("quarter" or "fy")
+    today : datetime.date, optional
+        Current date. If None, uses today's date
+
+    Returns
+    -------
+    int
+        Value for the API's ``limit`` parameter
+    """
+    today = today or datetime.date.today()
+    months_elapsed = (today.year - latest_date.year) * 12 + today.month - latest_date.month
+    new_periods = max(months_elapsed, 0) // PERIOD_TO_MONTHS[period]
+    return new_periods + INCREMENTAL_STATEMENT_OVERLAP_PERIODS
+
+
+def get_fetched_window_start(new_data_df: pd.DataFrame) -> Optional[datetime.date]:
+    """Get the earliest date in a fetched dataset, or None if it is empty."""
+    if new_data_df.empty or "date" not in new_data_df.columns:
+        return None
+    return pd.to_datetime(new_data_df["date"]).min().date()
+
+
+def get_ipo_date_from_profile(profile_df: pd.DataFrame) -> Optional[str]:
+    """
+    Get the IPO date from a PROFILE DataFrame returned by the API.
+
+    Parameters
+    ----------
+    profile_df : pd.DataFrame
+        DataFrame returned by the API for the PROFILE dataset
+
+    Returns
+    -------
+    str, optional
+        The IPO date in YYYY-MM-DD format, or None if it is missing or invalid
+    """
+    if profile_df.empty or "ipoDate" not in profile_df.columns:
+        return None
+    ipo_date = pd.to_datetime(profile_df["ipoDate"].iloc[0], errors="coerce")
+    if pd.isna(ipo_date):
+        return None
+    return ipo_date.strftime("%Y-%m-%d")
+
+
+def get_dataset_params(dataset: Datasets, period: str, **kwargs) -> Dict[str, Any]:
+    """
+    Merge the default API parameters for a dataset with caller-supplied parameters.
+
+    Parameters
+    ----------
+    dataset : Datasets
+        The dataset being fetched
+    period : str
+        Data period ("quarter" or "fy")
+    **kwargs
+        Caller-supplied parameters, which take precedence over the defaults
+
+    Returns
+    -------
+    Dict[str, Any]
+        The parameters to pass to the API
+    """
+    default_params = get_default_params_for_dataset(Datasets(dataset), period)
+    kwargs_to_use = kwargs.copy()
+    for param, value in default_params.items():
+        if param not in kwargs:
+            kwargs_to_use.update({param: value})
+    return kwargs_to_use
+
+
+def get_dataset_to_table_name(period: str) -> Dict[Datasets, str]:
+    """
+    Get the dataset to table name mapping for a period.
+
+    Parameters
+    ----------
+    period : str
+        Data period ("quarter" or "fy")
+
+    Returns
+    -------
+    Dict[Datasets, str]
+        Mapping of dataset to database table name
+    """
+    if period == "quarter":
+        return dataset_to_table_name_quarter
+    elif period == "fy":
+        return dataset_to_table_name_fy
+    else:
+        raise ValueError("period must be either 'quarter' or 'fy'")
+
+
+def get_incremental_state(
+    cursor, symbols: List[str], period: Optional[str]
+) -> Tuple[Dict[str, datetime.date], Dict[Tuple[str, Datasets], Dict[str, tuple]]]:
+    """
+    Read the latest stored price date and statement periods of many symbols at once.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    symbols : List[str]
+        Stock symbols
+    period : str, optional
+        "quarter", "fy", "all" or None, as for ``get_period_datasets``
+
+    Returns
+    -------
+    Tuple[Dict[str, datetime.date], Dict[Tuple[str, Datasets], Dict[str, tuple]]]
+        Latest price date per symbol, and latest statement period per symbol for each
+        (period, statement dataset), to be passed to ``get_incremental_fetch_params``
+    """
+    latest_price_dates = get_latest_price_dates(cursor, symbols)
+    latest_statement_periods = {}
+    for job_period, datasets in get_period_datasets(period):
+        table_names = get_dataset_to_table_name(job_period)
+        for dataset in datasets:
+            if dataset in STATEMENT_DATASETS:
+                latest_statement_periods[job_period, dataset] = get_latest_statement_periods(
+                    cursor, table_names[dataset], symbols
+                )
+    return latest_price_dates, latest_statement_periods
+
+
+def create_key_index(
+    symbols: List[str], latest_price_dates: Optional[Dict[str, datetime.date]] = None
+) -> ExistingKeyIndex:
+    """
+    Create the index of the keys stored for a run's tickers.
+
+    Parameters
+    ----------
+    symbols : List[str]
+        Stock symbols of the run
+    latest_price_dates : Dict[str, datetime.date], optional
+        Latest stored price date per symbol of an incremental run (see
+        ``get_incremental_state``).  Prices before the earliest incremental price window
+        are not fetched, so they are not indexed.
+
+    Returns
+    -------
+    ExistingKeyIndex
+        Index loading the keys of each table on first use
+    """
+    since_date = None
+    if latest_price_dates:
+        since_date = min(get_incremental_price_start(date) for date in latest_price_dates.values())
+    return ExistingKeyIndex(symbols, since_date=since_date)
+
+
+def get_incremental_fetch_params(
+    symbol: str,
+    period: str,
+    datasets: List[Datasets],
+    latest_price_dates: Dict[str, datetime.date],
+    latest_statement_periods: Dict[Tuple[str, Datasets], Dict[str, tuple]],
+) -> Tuple[Dict[Datasets, datetime.date], Dict[Datasets, int]]:
+    """
+    Get the first price date and the statement limits of an incremental fetch.
+
+    Parameters
+    ----------
+    symbol : str
+        Stock symbol
+    period : str
+        Data period of the pass ("quarter" or "fy")
+    datasets : List[Datasets]
+        Datasets of the pass
+    latest_price_dates, latest_statement_periods
+        Stored state returned by ``get_incremental_state``
+
+    Returns
+    -------
+    Tuple[Dict[Datasets, datetime.date], Dict[Datasets, int]]
+        First date to fetch for the price history, and number of most recent records to
+        fetch for each statement dataset.  Datasets without stored data are fetched in full
+        and omitted.
+    """
+    since_dates = {}
+    if symbol in latest_price_dates:
+        since_dates[Datasets.HISTORTICAL_PRICE_EOD_FULL] = get_incremental_price_start(
+            latest_price_dates[symbol]
+        )
+    limits = {}
+    for dataset in datasets:
+        latest_period = latest_statement_periods.get((period, dataset), {}).get(symbol)
+        if latest_period is not None:
+            limits[dataset] = get_incremental_statement_limit(latest_period[0], period)
+    return since_dates, limits
+
+
+def fetch_ticker_datasets(
+    symbol: str,
+    datasets: List[Datasets],
+    period: str,
+    config: Dict[str, Any],
+    client: Optional[HTTPClient] = None,
+    since_dates: Optional[Dict[Datasets, datetime.date]] = None,
+    limits: Optional[Dict[Datasets, int]] = None,
+    key: Optional[str] = None,
+) -> Dict[Datasets, pd.DataFrame]:
+    """
+    Fetch every dataset for one ticker and period, without touching the database.
+
+    The price history starts at the IPO date from the PROFILE response (PROFILE is
+    fetched first), unless it is fetched incrementally from a date in ``since_dates``.
+
+    Parameters
+    ----------
+    symbol : str
+        Stock symbol to fetch
+    datasets : List[Datasets]
+        Datasets to fetch, in order
+    period : str
+        Data period ("quarter" or "fy")
+    config : Dict[str, Any]
+        Configuration dictionary
+    client : HTTPClient, optional
+        Keep-alive HTTP client used for the requests. If None, uses the global client
+    since_dates : Dict[Datasets, datetime.date], optional
+        First date to fetch for datasets that are fetched incrementally
+    limits : Dict[Datasets, int], optional
+        Number of most recent records to fetch for datasets that are fetched incrementally
+    key : str, optional
+        API key for the financial data provider. If None, every request uses the
+        configured key with the most rate limiter tokens available
+
+    Returns
+    -------
+    Dict[Datasets, pd.DataFrame]
+        Fetched DataFrames keyed by dataset, in the order of ``datasets``
+    """
+    since_dates = since_dates or {}
+    limits = limits or {}
+    frames = {}
+    for dataset in datasets:
+        params = get_dataset_params(dataset, period)
+        if dataset in limits:
+            params["limit"] = limits[dataset]
+        if dataset == Datasets.HISTORTICAL_PRICE_EOD_FULL:
+            if dataset in since_dates:
+                params["from"] = since_dates[dataset].strftime("%Y-%m-%d")
+            elif Datasets.PROFILE in frames:
+                # Start the price history at the IPO date to skip the empty pre-IPO range
+                price_start_date = get_ipo_date_from_profile(frames[Datasets.PROFILE])
+                if price_start_date is not None:
+                    params["from"] = price_start_date
+        frames[dataset] = gather_dataset(
+            symbol, dataset.value, key, config=config, client=client, **params
+        )
+    return frames
+
+
+def standardize_fetched_dataset(new_data_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rename the columns of a fetched dataset to the database column names.
+
+    Parameters
+    ----------
+    new_data_df : DataFrame
+        DataFrame returned by the API
+
+    Returns
+    -------
+    DataFrame
+        A copy with database column names and ``calendaryear`` as an integer
+    """
+    # Standardize column names to match database
+    new_data_df = new_data_df.rename(columns=FMP_COLUMN_NAMES_TO_POSTGRES_COLUMN_NAMES)
+
+    # Convert calendaryear to int for proper comparison
+    if "calendaryear" in new_data_df.columns:
+        new_data_df["calendaryear"] = new_data_df["calendaryear"].astype(int)
+    return new_data_df
+
+
+def process_fetched_dataset(
+    cursor,
+    symbol,
+    table_name,
+    new_data_df,
+    dataset,
+    since_date=None,
+    write_mode="merge",
+    diff_executor=None,
+    key_index=None,
+):
+    """
+    Standardize a freshly fetched dataset and merge it into its database table.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    symbol : str
+        Stock symbol being processed
+    table_name : str
+        Name of the database table
+    new_data_df : DataFrame
+        DataFrame returned by the API
+    dataset
+        The dataset being processed
+    since_date : datetime.date, optional
+        If given, the fetched data only covers dates from ``since_date`` on, and only
+        stored rows in that window are compared against it
+    write_mode : str, default="merge"
+        How fetched rows are written ("merge" or "upsert")
+    diff_executor : concurrent.futures.Executor, optional
+        Executor comparing the fetched rows with the stored rows (see ``diff_records``).
+        If None, they are compared in the calling thread.
+    key_index : ExistingKeyIndex, optional
+        Stored keys of the run's tickers (see ``process_dataset``)
+    """
+    if new_data_df.empty:
+        print(f"--No new data found for {symbol} in {table_name}, skipping.")
+        return
+
+    new_data_df = standardize_fetched_dataset(new_data_df)
+    columns_to_compare = get_columns_to_compare(dataset)
+
+    process_dataset(
+        cursor,
+        symbol,
+        table_name,
+        new_data_df,
+        columns_to_compare,
+        dataset,
+        since_date=since_date,
+        write_mode=write_mode,
+        diff_executor=diff_executor,
+        key_index=key_index,
+    )
+
+
 def add_datasets_to_db(
     connection,
     symbol,
@@ -320,6 +1203,11 @@ def add_datasets_to_db(
     failure_list=None,
     config=None,
     period="quarter",
+    client=None,
+    incremental=False,
+    write_mode="merge",
+    diff_executor=None,
+    key_index=None,
     **kwargs,
 ):
     """
@@ -334,29 +1222,42 @@ def add_datasets_to_db(
     datasets : list
         List of datasets to process
     key : str, optional
-        API key for the financial data provider. If None, uses the key from config
+        API key for the financial data provider. If None, every request uses the
+        configured key with the most rate limiter tokens available
     failure_list : list, optional
         List to append failed symbols to
     config : Dict[str, Any], optional
         Configuration dictionary. If None, loads from config.json
     period : str, default="quarter"
         Data period ("quarter" or "fy")
+    client : HTTPClient, optional
+        Keep-alive HTTP client used for API requests. If None, uses the global client
+    incremental : bool, default=False
+        Only fetch and merge prices from the last stored date on (minus a small overlap),
+        and only the statements reported since the last stored period
+    write_mode : str, default="merge"
+        How fetched rows are written: "merge" compares them with the stored rows, "upsert"
+        lets the database insert and update them with INSERT ... ON CONFLICT
+    diff_executor : concurrent.futures.Executor, optional
+        Executor comparing fetched rows with the stored rows, e.g. a process pool.
+        If None, they are compared in the calling thread.
+    key_index : ExistingKeyIndex, optional
+        Stored keys of the run's tickers, so that new rows are inserted without reading
+        the stored rows back.  If None, the stored rows of the symbol are read.
     **kwargs
         Additional arguments for dataset gathering
+
+    Returns
+    -------
+    bool
+        True if the datasets were committed, False if the symbol failed
     """
     if config is None:
         config = load_config()
 
-    if key is None:
-        key = config["api"]["key"]
     datasets = Datasets if datasets is None else datasets
 
-    if period == "quarter":
-        dataset_to_table_name_to_use = dataset_to_table_name_quarter
-    elif period == "fy":
-        dataset_to_table_name_to_use = dataset_to_table_name_fy
-    else:
-        raise ValueError("period must be either 'quarter' or 'fy'")
+    dataset_to_table_name_to_use = get_dataset_to_table_name(period)
 
     try:
         with connection.cursor() as cursor:
@@ -365,34 +1266,129 @@ def add_datasets_to_db(
                 print(f"--Processing {symbol} for {table_name} table.")
 
                 # Fetch new data from API
-                default_params = get_default_params_for_dataset(Datasets(dataset), period)
-                kwargs_to_use = kwargs.copy()
-                for param, value in default_params.items():
-                    if param not in kwargs:
-                        kwargs_to_use.update({param: value})
+                kwargs_to_use = get_dataset_params(dataset, period, **kwargs)
+                since_date = None
+                if dataset == Datasets.HISTORTICAL_PRICE_EOD_FULL and "from" not in kwargs:
+                    latest_date = get_latest_price_date(cursor, symbol) if incremental else None
+                    if latest_date is not None:
+                        since_date = get_incremental_price_start(latest_date)
+                        kwargs_to_use["from"] = since_date.strftime("%Y-%m-%d")
+                    else:
+                        # Skip the empty pre-IPO range (PROFILE is processed first, so the
+                        # IPO date of a new company is already in this transaction)
+                        price_start_date = get_price_start_date(cursor, symbol)
+                        if price_start_date is not None:
+                            kwargs_to_use["from"] = price_start_date
+                incremental_statements = False
+                if incremental and dataset in STATEMENT_DATASETS and "limit" not in kwargs:
+                    latest_period = get_latest_statement_period(cursor, table_name, symbol)
+                    if latest_period is not None:
+                        incremental_statements = True
+                        kwargs_to_use["limit"] = get_incremental_statement_limit(
+                            latest_period[0], period
+                        )
                 new_data_df = gather_dataset(
-                    symbol, dataset.value, key, config=config, **kwargs_to_use
+                    symbol, dataset.value, key, config=config, client=client, **kwargs_to_use
+                )
+                if incremental_statements:
+                    # Only merge the periods covered by the response
+                    since_date = get_fetched_window_start(new_data_df)
+
+                process_fetched_dataset(
+                    cursor,
+                    symbol,
+                    table_name,
+                    new_data_df,
+                    dataset,
+                    since_date=since_date,
+                    write_mode=write_mode,
+                    diff_executor=diff_executor,
+                    key_index=key_index,
                 )
 
-                if new_data_df.empty:
-                    print(f"--No new data found for {symbol} in {table_name}, skipping.")
-                    continue
+        connection.commit()
+        print(f"{symbol} processing complete.")
+        print("")
+        return True
+
+    except Exception as e:
+        print(f"Error processing {symbol}: {e}")
+        import traceback
 
-                # Standardize column names to match database
-                new_data_df.rename(columns=FMP_COLUMN_NAMES_TO_POSTGRES_COLUMN_NAMES, inplace=True)
-                columns_to_compare = get_columns_to_compare(dataset)
+        traceback.print_exc()
+        connection.rollback()
+        # A company id registered in the rolled back transaction no longer exists
+        get_company_id_cache().invalidate(symbol)
+        if failure_list is not None:
+            failure_list.append(symbol)
+        return False
+
+
+def add_fetched_datasets_to_db(
+    connection,
+    symbol,
+    dataset_frames,
+    period="quarter",
+    failure_list=None,
+    since_dates=None,
+    write_mode="merge",
+    diff_executor=None,
+    key_index=None,
+):
+    """
+    Add already fetched datasets for a symbol to the database in one transaction.
+
+    Parameters
+    ----------
+    connection
+        Database connection
+    symbol : str
+        Stock symbol to process
+    dataset_frames : Dict[Datasets, pd.DataFrame]
+        DataFrames returned by the API, keyed by dataset and in processing order
+    period : str, default="quarter"
+        Data period ("quarter" or "fy")
+    failure_list : list, optional
+        List to append failed symbols to
+    since_dates : Dict[Datasets, datetime.date], optional
+        For datasets fetched incrementally, the first date covered by the fetched data
+    write_mode : str, default="merge"
+        How fetched rows are written ("merge" or "upsert")
+    diff_executor : concurrent.futures.Executor, optional
+        Executor comparing fetched rows with the stored rows, e.g. a process pool.
+        If None, they are compared in the calling thread.
+    key_index : ExistingKeyIndex, optional
+        Stored keys of the run's tickers (see ``add_datasets_to_db``)
 
-                # Convert calendaryear to int for proper comparison
-                if "calendaryear" in new_data_df.columns:
-                    new_data_df["calendaryear"] = new_data_df["calendaryear"].astype(int)
+    Returns
+    -------
+    bool
+        True if the datasets were committed, False if the symbol failed
+    """
+    dataset_to_table_name_to_use = get_dataset_to_table_name(period)
+    since_dates = since_dates or {}
 
-                process_dataset(
-                    cursor, symbol, table_name, new_data_df, columns_to_compare, dataset
+    try:
+        with connection.cursor() as cursor:
+            for dataset, new_data_df in dataset_frames.items():
+                table_name = dataset_to_table_name_to_use[dataset]
+                print(f"--Processing {symbol} for {table_name} table.")
+                process_fetched_dataset(
+                    cursor,
+                    symbol,
+                    table_name,
+                    new_data_df,
+                    dataset,
+                    since_date=since_dates.get(dataset),
+                    write_mode=write_mode,
+                    diff_executor=diff_executor,
+                    key_index=key_index,
                 )
 
         connection.commit()
         print(f"{symbol} processing complete.")
         print("")
+        return True
 
     except Exception as e:
         print(f"Error processing {symbol}: {e}")
@@ -400,8 +1396,67 @@ def add_datasets_to_db(
 
         traceback.print_exc()
         connection.rollback()
-        if failure_list is not None:
+        # A company id registered in the rolled back transaction no longer exists
+        get_company_id_cache().invalidate(symbol)
+        if failure_list is not None and symbol not in failure_list:
             failure_list.append(symbol)
+        return False
+
+
+def upsert_fetched_datasets_batch(
+    cursor, writes: List[Tuple[str, str, Dict[Datasets, pd.DataFrame]]]
+) -> int:
+    """
+    Upsert the fetched datasets of many tickers with one statement per table.
+
+    The rows of every ticker are grouped by table, copied into the table's UNLOGGED
+    staging table (see ``create_staging_tables``) and merged with a single
+    ``INSERT ... ON CONFLICT DO UPDATE``, so that the round trips are per batch
+    instead of per ticker and dataset.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    writes : List[Tuple[str, str, Dict[Datasets, pd.DataFrame]]]
+        (symbol, period, DataFrames returned by the API keyed by dataset) of each pass
+
+    Returns
+    -------
+    int
+        Number of rows inserted or updated
+    """
+    table_frames = {}
+    table_keys = {}
+    for symbol, period, dataset_frames in writes:
+        dataset_to_table_name_to_use = get_dataset_to_table_name(period)
+        for dataset, new_data_df in dataset_frames.items():
+            table_name = dataset_to_table_name_to_use[dataset]
+            if new_data_df.empty:
+                print(f"--No new data found for {symbol} in {table_name}, skipping.")
+                continue
+            new_data_df = standardize_fetched_dataset(new_data_df)
+            columns = add_content_hashes(
+                cursor, table_name, new_data_df, get_columns_to_compare(dataset)
+            )
+            table_frames.setdefault(table_name, []).append(new_data_df[columns])
+            table_keys[table_name] = get_upsert_keys(dataset)
+
+    total_row_count = 0
+    for table_name, frames in table_frames.items():
+        row_count = upsert_records_from_df(
+            cursor,
+            pd.concat(frames, ignore_index=True),
+            table_name,
+            table_keys[table_name],
+            staging_table=get_staging_table_name(table_name),
+        )
+        print(
+            f"--Upserted {row_count} new or changed records for {len(frames)} ticker(s) "
+            f"in {table_name}"
+        )
+        total_row_count += row_count
+    return total_row_count
 
 
 def get_columns_to_compare(dataset):
@@ -426,10 +1481,26 @@ def get_columns_to_compare(dataset):
     return list(set(columns_to_compare))
 
 
-def process_dataset(cursor, symbol, table_name, new_data_df, columns_to_compare, dataset):
+def process_dataset(
+    cursor,
+    symbol,
+    table_name,
+    new_data_df,
+    columns_to_compare,
+    dataset,
+    since_date=None,
+    write_mode="merge",
+    diff_executor=None,
+    key_index=None,
+):
     """
     Process a dataset by either updating existing records or inserting new ones.
 
+    With ``write_mode="upsert"``, the stored rows are not read back; new and changed
+    rows are written with a single ``INSERT ... ON CONFLICT DO UPDATE``.  With a
+    ``key_index``, rows of statements and prices whose key is not stored are inserted
+    directly, and only the stored rows sharing a key with a fetched row are read back.
+
     Parameters
     ----------
     cursor
@@ -444,23 +1515,117 @@ def process_dataset(cursor, symbol, table_name, new_data_df, columns_to_compare,
         List of columns to compare
     dataset
         The dataset being processed
+    since_date : datetime.date, optional
+        If given, only existing records dated on or after ``since_date`` are compared
+    write_mode : str, default="merge"
+        How rows are written ("merge" or "upsert")
+    diff_executor : concurrent.futures.Executor, optional
+        Executor comparing the new rows with the stored rows (see ``diff_records``).
+        If None, they are compared in the calling thread.
+    key_index : ExistingKeyIndex, optional
+        Stored keys of the run's tickers.  If None, every stored row of the symbol (from
+        ``since_date`` on) is read back.
     """
-    # Fetch existing data from database
-    cursor.execute(f"SELECT * FROM {table_name} WHERE symbol = '{symbol}'")
-    existing_records = cursor.fetchall()
+    columns_to_compare = add_content_hashes(cursor, table_name, new_data_df, columns_to_compare)
+
+    if write_mode == "upsert":
+        row_count = upsert_records_from_df(
+            cursor, new_data_df[columns_to_compare], table_name, get_upsert_keys(dataset)
+        )
+        print(f"--Upserted {row_count} new or changed records for {symbol} in {table_name}")
+        return
+
+    if key_index is not None and dataset in KEY_INDEXED_DATASETS:
+        merge_keys = get_merge_keys(dataset, new_data_df)
+        is_stored = key_index.is_stored(cursor, table_name, merge_keys, symbol, new_data_df)
+        new_records = new_data_df[~is_stored]
+        if not new_records.empty:
+            print(f"--Inserting {len(new_records)} new records for {symbol} in {table_name}")
+            copy_records_from_df(cursor, new_records[columns_to_compare], table_name)
+        # Stored rows with the same content hash are unchanged and not read back
+        is_unchanged = key_index.is_unchanged(cursor, table_name, merge_keys, symbol, new_data_df)
+        new_data_df = new_data_df[is_stored & ~is_unchanged].copy()
+        if new_data_df.empty:
+            return
+        existing_records = get_stored_records(
+            cursor, symbol, table_name, columns_to_compare, merge_keys, new_data_df
+        )
+    else:
+        # Fetch existing data from database
+        query = f"SELECT * FROM {table_name} WHERE symbol = %s"
+        params = [symbol]
+        if since_date is not None:
+            query += " AND date >= %s"
+            params.append(since_date)
+        cursor.execute(query, params)
+        existing_records = cursor.fetchall()
 
     if existing_records:
         process_existing_records(
-            cursor, symbol, table_name, new_data_df, columns_to_compare, existing_records, dataset
+            cursor,
+            symbol,
+            table_name,
+            new_data_df,
+            columns_to_compare,
+            existing_records,
+            dataset,
+            diff_executor=diff_executor,
         )
     else:
         # If no existing records, insert all new data
         print(f"--Inserting new records for {symbol} in {table_name}")
-        insert_records_from_df(cursor, new_data_df[columns_to_compare], table_name)
+        copy_records_from_df(cursor, new_data_df[columns_to_compare], table_name)
+
+
+def get_stored_records(cursor, symbol, table_name, columns, merge_keys, new_data_df) -> list:
+    """
+    Read the stored rows of a symbol that share a key with the fetched rows.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    symbol : str
+        Stock symbol
+    table_name : str
+        Name of the database table
+    columns : list
+        Columns to read
+    merge_keys : list
+        Columns identifying a row, starting with ``symbol``
+    new_data_df : DataFrame
+        Fetched rows of the symbol, with the key columns
+
+    Returns
+    -------
+    list
+        The stored rows, with the cursor's description naming ``columns``
+    """
+    key_columns = merge_keys[1:]
+    key_values = []
+    for key in key_columns:
+        if key == "date":
+            key_values.append(pd.to_datetime(new_data_df[key]).dt.date.tolist())
+        else:
+            key_values.append(new_data_df[key].tolist())
+    cursor.execute(
+        f"SELECT {', '.join(columns)} FROM {table_name} WHERE symbol = %s "
+        f"AND ({', '.join(key_columns)}) IN "
+        f"(SELECT * FROM unnest({', '.join(['%s'] * len(key_columns))}))",
+        [symbol, *key_values],
+    )
+    return cursor.fetchall()
 
 
 def process_existing_records(
-    cursor, symbol, table_name, new_data_df, columns_to_compare, existing_records, dataset
+    cursor,
+    symbol,
+    table_name,
+    new_data_df,
+    columns_to_compare,
+    existing_records,
+    dataset,
+    diff_executor=None,
 ):
     """
     Process records when there are existing entries in the database.
@@ -481,6 +1646,8 @@ def process_existing_records(
         Existing records from the database
     dataset
         The dataset being processed
+    diff_executor : concurrent.futures.Executor, optional
+        Executor running ``diff_records``.  If None, it runs in the calling thread.
     """
     # Convert existing records to DataFrame
     existing_df = pd.DataFrame(existing_records, columns=[desc[0] for desc in cursor.description])
@@ -488,19 +1655,70 @@ def process_existing_records(
     # Identify records to update or insert
     merge_keys = get_merge_keys(dataset, new_data_df)
 
-    # Handle date in merge_keys, since JSON returns date as string
-    if "date" in merge_keys:
-        new_data_df["date"] = pd.to_datetime(new_data_df["date"]).dt.date
-
-    comparison = new_data_df.merge(
-        existing_df[columns_to_compare], on=merge_keys, how="left", indicator=True
+    diff_args = (
+        new_data_df,
+        existing_df[columns_to_compare],
+        columns_to_compare,
+        merge_keys,
+        table_name,
     )
+    if diff_executor is None:
+        new_records, update_values = diff_records(*diff_args)
+    else:
+        new_records, update_values = diff_executor.submit(diff_records, *diff_args).result()
 
     # Handle new records (left_only)
-    process_new_records(cursor, symbol, table_name, comparison, columns_to_compare, merge_keys)
+    process_new_records(cursor, symbol, table_name, new_records, columns_to_compare, merge_keys)
 
     # Handle updates (both present but different values)
-    process_updates(cursor, symbol, table_name, comparison, columns_to_compare, merge_keys)
+    apply_updates(cursor, symbol, table_name, update_values, merge_keys)
+
+
+def diff_records(
+    new_data_df: pd.DataFrame,
+    existing_df: pd.DataFrame,
+    columns_to_compare: List[str],
+    merge_keys: List[str],
+    table_name: str,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Compare fetched rows with the stored rows.
+
+    Needs no database access, so that it can run in a worker process.
+
+    Parameters
+    ----------
+    new_data_df : DataFrame
+        DataFrame containing new data
+    existing_df : DataFrame
+        Stored rows, restricted to ``columns_to_compare``
+    columns_to_compare : list
+        List of columns to compare
+    merge_keys : list
+        List of columns used as merge keys
+    table_name : str
+        Name of the database table
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, pd.DataFrame]
+        The rows of the merge that are not stored yet (see ``process_new_records``), and
+        the changed values of the stored rows (see ``get_update_values``)
+    """
+    # Handle date in merge_keys, since JSON returns date as string
+    if "date" in merge_keys:
+        new_data_df["date"] = pd.to_datetime(new_data_df["date"]).dt.date
+
+    comparison = new_data_df.merge(existing_df, on=merge_keys, how="left", indicator=True)
+    if CONTENT_HASH_COLUMN in columns_to_compare:
+        # Rows with the stored content hash are unchanged, without comparing every column
+        unchanged = (
+            comparison[f"{CONTENT_HASH_COLUMN}_x"] == comparison[f"{CONTENT_HASH_COLUMN}_y"]
+        )
+        comparison = comparison[~unchanged]
+    new_records = comparison[comparison["_merge"] == "left_only"]
+    update_values = get_update_values(table_name, comparison, columns_to_compare, merge_keys)
+    return new_records, update_values
 
 
 def get_merge_keys(dataset, new_data_df):
@@ -531,6 +1749,28 @@ def get_merge_keys(dataset, new_data_df):
         )
 
 
+def get_upsert_keys(dataset):
+    """
+    Get the columns of the unique constraint identifying a row of a dataset's table.
+
+    Parameters
+    ----------
+    dataset
+        The dataset being processed
+
+    Returns
+    -------
+    list
+        A list of column names
+    """
+    if dataset == Datasets.PROFILE:
+        return COMPANY_UNIQUE_KEYS
+    elif dataset == Datasets.HISTORTICAL_PRICE_EOD_FULL:
+        return PRICE_UNIQUE_KEYS
+    else:
+        return STATEMENT_UNIQUE_KEYS
+
+
 def process_new_records(cursor, symbol, table_name, comparison, columns_to_compare, merge_keys):
     """
     Process records that exist in the new data but not in the database.
@@ -564,7 +1804,7 @@ def process_new_records(cursor, symbol, table_name, comparison, columns_to_compa
         new_records_clean = new_records.rename(
             columns={f"{col}_x": col for col in columns_to_compare}
         )[columns_to_compare]
-        insert_records_from_df(cursor, new_records_clean, table_name)
+        copy_records_from_df(cursor, new_records_clean, table_name)
 
 
 def process_updates(cursor, symbol, table_name, comparison, columns_to_compare, merge_keys):
@@ -586,36 +1826,61 @@ def process_updates(cursor, symbol, table_name, comparison, columns_to_compare,
     merge_keys : list
         List of columns used as merge keys
     """
+    apply_updates(
+        cursor,
+        symbol,
+        table_name,
+        get_update_values(table_name, comparison, columns_to_compare, merge_keys),
+        merge_keys,
+    )
+
+
+def get_update_values(table_name, comparison, columns_to_compare, merge_keys) -> pd.DataFrame:
+    """
+    Get the changed values of the records that exist in both datasets.
+
+    Changes are detected column by column on whole arrays (see ``get_changed_mask``)
+    rather than cell by cell.
+
+    Parameters
+    ----------
+    table_name : str
+        Name of the database table
+    comparison : DataFrame
+        DataFrame containing comparison results
+    columns_to_compare : list
+        List of columns to compare
+    merge_keys : list
+        List of columns used as merge keys
+
+    Returns
+    -------
+    pd.DataFrame
+        Merge keys (except symbol) and the new value of every changed cell, NA
+        elsewhere, for the rows with at least one change
+    """
     updates = comparison[comparison["_merge"] == "both"]
-    # {index: [i1, ...], <merge_key1>: [val, ...], <merge_key2>: [val, ...],... , col: [(old_val, new_val), ...], ...}
-    update_values = defaultdict(list)
-    for index, row in updates.iterrows():
-        # First, add merge key values (needed for WHERE clause in UPDATE)
-        for key in merge_keys:
-            if key != "symbol":  # symbol is passed separately to apply_updates
-                update_values[key].append(row[key])
-
-        # Then process non-merge-key columns for updates
-        for col in columns_to_compare:
-            if col in merge_keys:
-                continue
+    column_types = get_column_postgres_types(table_name)
 
-            new_val = row[f"{col}_x"] if f"{col}_x" in row else row[col]
-            old_val = row[f"{col}_y"] if f"{col}_y" in row else None
+    # First, add merge key values (needed for WHERE clause in UPDATE); symbol is passed
+    # separately to apply_updates
+    update_columns = {key: updates[key] for key in merge_keys if key != "symbol"}
 
-            if should_update_value(new_val, old_val, col) and col not in merge_keys:
-                # update_values[col].append((old_val, new_val))
-                update_values[col].append(new_val)
-            elif col not in merge_keys:
-                update_values[col].append(pd.NA)
-        update_values["index"].append(index)
+    # Then keep the new value of every changed non-merge-key cell, and NA elsewhere
+    for col in columns_to_compare:
+        if col in merge_keys:
+            continue
+
+        new_values = updates[f"{col}_x"] if f"{col}_x" in updates.columns else updates[col]
+        if f"{col}_y" in updates.columns:
+            old_values = updates[f"{col}_y"]
+        else:
+            old_values = pd.Series(None, index=updates.index, dtype=object)
 
-        # if update_needed:
-        #     apply_updates(cursor, symbol, table_name, row, update_values, merge_keys)
+        changed = get_changed_mask(new_values, old_values, column_types.get(col, "text"))
+        update_columns[col] = new_values.astype(object).where(changed, pd.NA)
 
-    # apply updates in bulk
-    update_values = pd.DataFrame(update_values, index=update_values["index"])
-    update_values = update_values.drop(columns=["index"])
+    update_values = pd.DataFrame(update_columns, index=updates.index)
 
     # Drop rows where ALL non-merge-key columns are NA (no updates needed for that row)
     non_merge_cols = [col for col in update_values.columns if col not in merge_keys]
@@ -623,83 +1888,201 @@ def process_updates(cursor, symbol, table_name, comparison, columns_to_compare,
         update_values = update_values.dropna(subset=non_merge_cols, how="all", axis=0)
 
     # Drop columns where ALL values are NA (no updates needed for that column)
-    update_values = update_values.dropna(how="all", axis=1)
+    return update_values.dropna(how="all", axis=1)
 
-    apply_updates(
-        cursor,
-        symbol,
-        table_name,
-        update_values,
-        merge_keys,
-    )
 
+def get_integer_values(values: pd.Series) -> pd.Series:
+    """
+    Convert values to nullable 64-bit integers, truncated as they are written.
+
+    Integers are kept exact (not converted to float, which only holds 53 bits), while
+    values that cannot be parsed or stored as a bigint become NA.
 
-def should_update_value(new_val, old_val, col):
+    Parameters
+    ----------
+    values : pd.Series
+        Values to convert
+
+    Returns
+    -------
+    pd.Series
+        Values as ``Int64``, aligned with ``values``
+    """
+    numbers = pd.to_numeric(values, errors="coerce", dtype_backend="numpy_nullable")
+    if pd.api.types.is_integer_dtype(numbers.dtype):
+        return numbers.astype("Int64")
+    numbers = numbers.astype("Float64")
+    integers = np.trunc(numbers.where(numbers.abs() < 2.0**63)).astype("Int64")
+    if values.dtype == object:
+        # Integers mixed with floats or missing values were parsed as floats
+        exact = values.map(
+            lambda value: isinstance(value, (int, np.integer))
+            and not isinstance(value, bool)
+            and abs(value) < 2**63
+        ).to_numpy(dtype=bool)
+        if exact.any():
+            integers.iloc[exact] = pd.array(list(values[exact]), dtype="Int64")
+    return integers
+
+
+def get_changed_mask(new_values: pd.Series, old_values: pd.Series, column_type: str) -> np.ndarray:
     """
-    Determine if a value should be updated based on comparison logic.
+    Determine which values should be updated, comparing whole columns at once.
+
+    A value is updated if it is present and the stored value is missing or differs.
+    Real values are compared after rounding to 4 decimals, integer values exactly after
+    truncation (as they are written), dates and timestamps by calendar date after a
+    single parse, and anything else as text.  New values that cannot be parsed as the
+    column type are always updated.
 
     Parameters
     ----------
-    new_val
-        The new value from the API
-    old_val
-        The existing value in the database
-    col : str
-        The column name
+    new_values : pd.Series
+        The new values from the API
+    old_values : pd.Series
+        The existing values in the database, aligned with ``new_values``
+    column_type : str
+        Postgres type of the column
 
     Returns
     -------
-    bool
-        True if the value should be updated, False otherwise
+    np.ndarray
+        Boolean mask, True where the value should be updated
     """
-    # If both values are present, compare them
-    if pd.notna(new_val) and pd.notna(old_val):
-        # Handle date comparisons
-        if isinstance(new_val, str) and isinstance(old_val, (datetime.date, datetime.datetime)):
-            try:
-                new_date = datetime.datetime.strptime(
-                    new_val, "%Y-%m-%d" if " " not in new_val else "%Y-%m-%d %H:%M:%S"
-                ).date()
-                old_date = old_val
-                if hasattr(old_val, "date") and callable(getattr(old_val, "date")):
-                    old_date = old_val.date()
-                return new_date != old_date
-            except ValueError:
-                return True
-        # Handle type differences
-        elif type(new_val) != type(old_val):
-            try:
-                new_val = postgres_type_to_python_type(col)(new_val)
-                return new_val != old_val
-            except ValueError:
-                return True
-        # Handle numeric comparisons
-        elif isinstance(new_val, (int, float)) and isinstance(old_val, (int, float)):
-            try:
-                # Convert both to float for consistent comparison
-                new_float = float(new_val)
-                old_float = float(old_val)
-
-                # For very small values, use absolute difference
-                if abs(new_float) < 1e-10 and abs(old_float) < 1e-10:
-                    return abs(new_float - old_float) > 1e-10
-
-                # For PostgreSQL numeric/decimal fields, round to 5 decimal places
-                # This matches PostgreSQL's typical numeric precision
-                new_rounded = round(new_float, 4)
-                old_rounded = round(old_float, 4)
-
-                # Compare the rounded values
-                return new_rounded != old_rounded
-            except (ValueError, TypeError):
-                return True
-        # Direct comparison
+    base_type = column_type.split()[0]
+    new_present = new_values.notna().to_numpy()
+    old_present = old_values.notna().to_numpy()
+
+    if base_type in INTEGER_COLUMN_TYPES:
+        new_numbers = get_integer_values(new_values).array
+        old_numbers = get_integer_values(old_values).array
+        # Values missing on either side compare as NA
+        differs = (new_numbers != old_numbers).fillna(True).to_numpy(dtype=bool)
+    elif base_type == "real":
+        new_numbers = pd.to_numeric(new_values, errors="coerce").to_numpy(dtype=float)
+        old_numbers = pd.to_numeric(old_values, errors="coerce").to_numpy(dtype=float)
+        # For very small values, use absolute difference
+        tiny = (np.abs(new_numbers) < 1e-10) & (np.abs(old_numbers) < 1e-10)
+        differs = np.where(
+            tiny,
+            np.abs(new_numbers - old_numbers) > 1e-10,
+            np.round(new_numbers, 4) != np.round(old_numbers, 4),
+        )
+        differs |= np.isnan(new_numbers)
+    elif base_type in ("date", "timestamp"):
+        new_dates = pd.to_datetime(new_values, errors="coerce", format="mixed").dt.normalize()
+        old_dates = pd.to_datetime(old_values, errors="coerce", format="mixed").dt.normalize()
+        differs = (new_dates != old_dates).to_numpy() | new_dates.isna().to_numpy()
+    elif base_type == "bool":
+        differs = new_values.astype(bool).to_numpy() != old_values.astype(bool).to_numpy()
+    else:
+        differs = new_values.astype(str).to_numpy() != old_values.astype(str).to_numpy()
+
+    return new_present & (~old_present | differs)
+
+
+def get_content_hashes(df: pd.DataFrame, column_types: Dict[str, str]) -> pd.Series:
+    """
+    Hash the normalized values of every row, to detect changed rows with one comparison.
+
+    Values are normalized the way ``get_changed_mask`` compares them: real values are
+    rounded to 4 decimals, integer values truncated, dates and timestamps reduced to
+    the calendar date and anything else compared as text.  Rows whose values only
+    differ by float noise therefore get the same hash.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Rows to hash, with database column names
+    column_types : Dict[str, str]
+        Postgres type of each column (see ``get_column_postgres_types``)
+
+    Returns
+    -------
+    pd.Series
+        Hex digest of the 64-bit hash of each row, aligned with ``df``
+    """
+    normalized = {}
+    for col in sorted(df.columns):
+        base_type = column_types.get(col, "text").split()[0]
+        values = df[col]
+        if base_type in INTEGER_COLUMN_TYPES:
+            normalized[col] = get_integer_values(values)
+        elif base_type == "real":
+            numbers = pd.to_numeric(values, errors="coerce").astype(float)
+            # Adding 0.0 turns -0.0 into 0.0
+            normalized[col] = numbers.round(4) + 0.0
+        elif base_type in ("date", "timestamp"):
+            dates = pd.to_datetime(values, errors="coerce", format="mixed")
+            normalized[col] = dates.dt.normalize()
         else:
-            return new_val != old_val
-    # If new value exists but old is null
-    elif pd.notna(new_val) and pd.isna(old_val):
-        return True
-    return False
+            normalized[col] = values.astype(object).where(values.notna(), None).map(
+                lambda value: None if value is None else str(value)
+            )
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(normalized, index=df.index), index=False)
+    return hashes.map("{:016x}".format)
+
+
+def add_content_hashes(cursor, table_name, new_data_df, columns_to_compare) -> list:
+    """
+    Add the content hash of every fetched row, if the table has a content hash column.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    table_name : str
+        Name of the database table
+    new_data_df : DataFrame
+        Standardized fetched rows, to which the ``content_hash`` column is added
+    columns_to_compare : list
+        Columns written to the table
+
+    Returns
+    -------
+    list
+        ``columns_to_compare``, with ``content_hash`` if it was added
+    """
+    # Tables created before the column existed get it from ``eden create``
+    if CONTENT_HASH_COLUMN not in get_table_column_types(cursor, table_name):
+        return columns_to_compare
+    new_data_df[CONTENT_HASH_COLUMN] = get_content_hashes(
+        new_data_df[columns_to_compare], get_column_postgres_types(table_name)
+    )
+    return columns_to_compare + [CONTENT_HASH_COLUMN]
+
+
+# Column type dictionaries of the tables written by the ingestor
+table_to_columns = {
+    "company": DEFAULT_COMPANY_TABLE_COLUMNS_TO_TYPE,
+    "income_statement_fy": DEFAULT_INCOME_STATEMENT_TABLE_COLUMNS_TO_TYPE,
+    "income_statement_quarter": DEFAULT_INCOME_STATEMENT_TABLE_COLUMNS_TO_TYPE,
+    "balance_sheet_fy": DEFAULT_BALANCE_SHEET_TABLE_COLUMNS_TO_TYPE,
+    "balance_sheet_quarter": DEFAULT_BALANCE_SHEET_TABLE_COLUMNS_TO_TYPE,
+    "cash_flow_statement_fy": DEFAULT_CASHFLOW_STATEMENT_TABLE_COLUMNS_TO_TYPE,
+    "cash_flow_statement_quarter": DEFAULT_CASHFLOW_STATEMENT_TABLE_COLUMNS_TO_TYPE,
+    "price": DEFAULT_PRICE_COLUMNS_TO_TYPE,
+}
+
+
+def get_column_postgres_types(table_name: str) -> Dict[str, str]:
+    """
+    Get the Postgres column types of a table, keyed by Postgres column name.
+
+    Parameters
+    ----------
+    table_name : str
+        Name of the table
+
+    Returns
+    -------
+    Dict[str, str]
+        Mapping of column name to column type (e.g. "bigint", "serial primary key")
+    """
+    return {
+        FMP_COLUMN_NAMES_TO_POSTGRES_COLUMN_NAMES.get(col, col): col_type
+        for col, col_type in table_to_columns.get(table_name, {}).items()
+    }
 
 
 def convert_value_to_postgres_type(value, column_name, table_name):
@@ -723,25 +2106,7 @@ def convert_value_to_postgres_type(value, column_name, table_name):
     if pd.isna(value) or value is None:
         return None
 
-    # Map table names to their column type dictionaries
-    table_to_columns = {
-        "company": DEFAULT_COMPANY_TABLE_COLUMNS_TO_TYPE,
-        "income_statement_fy": DEFAULT_INCOME_STATEMENT_TABLE_COLUMNS_TO_TYPE,
-        "income_statement_quarter": DEFAULT_INCOME_STATEMENT_TABLE_COLUMNS_TO_TYPE,
-        "balance_sheet_fy": DEFAULT_BALANCE_SHEET_TABLE_COLUMNS_TO_TYPE,
-        "balance_sheet_quarter": DEFAULT_BALANCE_SHEET_TABLE_COLUMNS_TO_TYPE,
-        "cash_flow_statement_fy": DEFAULT_CASHFLOW_STATEMENT_TABLE_COLUMNS_TO_TYPE,
-        "cash_flow_statement_quarter": DEFAULT_CASHFLOW_STATEMENT_TABLE_COLUMNS_TO_TYPE,
-        "price": DEFAULT_PRICE_COLUMNS_TO_TYPE,
-    }
-
-    # Get the column type for this table
-    column_types = table_to_columns.get(table_name, {})
-    column_types = {
-        FMP_COLUMN_NAMES_TO_POSTGRES_COLUMN_NAMES.get(col, col): col_type
-        for col, col_type in column_types.items()
-    }
-    column_type = column_types.get(column_name, "text")
+    column_type = get_column_postgres_types(table_name).get(column_name, "text")
 
     # Extract base type (remove "primary key" etc.)
     base_type = column_type.split()[0]
@@ -813,22 +2178,7 @@ def apply_updates(cursor, symbol, table_name, update_values, merge_keys):
         data.append(tuple(row_data))
 
     # Get column type mappings for casting
-    table_to_columns = {
-        "company": DEFAULT_COMPANY_TABLE_COLUMNS_TO_TYPE,
-        "income_statement_fy": DEFAULT_INCOME_STATEMENT_TABLE_COLUMNS_TO_TYPE,
-        "income_statement_quarter": DEFAULT_INCOME_STATEMENT_TABLE_COLUMNS_TO_TYPE,
-        "balance_sheet_fy": DEFAULT_BALANCE_SHEET_TABLE_COLUMNS_TO_TYPE,
-        "balance_sheet_quarter": DEFAULT_BALANCE_SHEET_TABLE_COLUMNS_TO_TYPE,
-        "cash_flow_statement_fy": DEFAULT_CASHFLOW_STATEMENT_TABLE_COLUMNS_TO_TYPE,
-        "cash_flow_statement_quarter": DEFAULT_CASHFLOW_STATEMENT_TABLE_COLUMNS_TO_TYPE,
-        "price": DEFAULT_PRICE_COLUMNS_TO_TYPE,
-    }
-
-    column_types = table_to_columns.get(table_name, {})
-    column_types = {
-        FMP_COLUMN_NAMES_TO_POSTGRES_COLUMN_NAMES.get(col, col): col_type
-        for col, col_type in column_types.items()
-    }
+    column_types = get_column_postgres_types(table_name)
 
     # Create SET clause with proper type casting
     # Exclude merge keys from SET clause (they're only needed for WHERE clause)
@@ -889,7 +2239,7 @@ def apply_updates(cursor, symbol, table_name, update_values, merge_keys):
         print(f"--No columns to update for {symbol} in {table_name} (only merge keys present)")
 
 
-def get_company_tickers(config=None):
+def get_company_tickers(config=None, client=None):
     """
     Fetch the latest company tickers JSON from SEC website.
 
@@ -897,6 +2247,8 @@ def get_company_tickers(config=None):
     ----------
     config : Dict[str, Any], optional
         Configuration dictionary. If None, loads from config.json
+    client : HTTPClient, optional
+        Keep-alive HTTP client used for the request. If None, uses the global client
 
     Returns
     -------
@@ -915,12 +2267,11 @@ def get_company_tickers(config=None):
         "User-Agent": config["api"]["user_agent"],
     }
 
+    if client is None:
+        client = get_http_client(config)
+
     try:
-        req = Request(url, headers=headers)
-        context = ssl.create_default_context(cafile=certifi.where())
-        response = urlopen(req, context=context)
-        data = response.read().decode("utf-8")
-        return json.loads(data)
+        return client.get_json(url, headers=headers)
     except HTTPError as e:
         print(f"Error fetching company tickers: {e}")
         print("Falling back to local file...")
@@ -950,7 +2301,7 @@ def connect_to_database(config=None):
     if config is None:
         config = load_config()
 
-    db_config = config["database"]
+    db_config = get_connection_params(config["database"])
     connection = connect(db_config)
 
     def _mask_password(config):
@@ -1015,6 +2366,10 @@ def process_symbol(
     include_daily_eod_price=True,
     config=None,
     datasets: Optional[List[Datasets]] = None,
+    client=None,
+    incremental=False,
+    write_mode="merge",
+    key_index=None,
 ):
     """
     Process a single symbol by adding its datasets to the database.
@@ -1026,7 +2381,8 @@ def process_symbol(
     symbol : str
         Stock symbol to process
     api_key : str, optional
-        API key for the financial data provider. If None, uses the key from config
+        API key for the financial data provider. If None, every request uses the
+        configured key with the most rate limiter tokens available
     failure_list : list, optional
         List to append failed symbols to
     period : str, default="quarter"
@@ -1037,12 +2393,24 @@ def process_symbol(
         Configuration dictionary. If None, loads from config.json
     datasets: List[Datasets], optional
         List of datasets to process.  If None, processes all datasets.
+    client : HTTPClient, optional
+        Keep-alive HTTP client used for API requests. If None, uses the global client
+    incremental : bool, default=False
+        Only fetch and merge prices from the last stored date on
+    write_mode : str, default="merge"
+        How fetched rows are written: "merge" compares them with the stored rows, "upsert"
+        lets the database insert and update them with INSERT ... ON CONFLICT
+    key_index : ExistingKeyIndex, optional
+        Stored keys of the run's tickers (see ``add_datasets_to_db``)
+
+    Returns
+    -------
+    bool
+        True if the datasets were committed, False if the symbol failed
     """
     if config is None:
         config = load_config()
 
-    if api_key is None:
-        api_key = config["api"]["key"]
     print(f"Processing {symbol}")
     datasets = (
         datasets
@@ -1055,7 +2423,7 @@ def process_symbol(
             Datasets.HISTORTICAL_PRICE_EOD_FULL,
         ]
     )
-    add_datasets_to_db(
+    return add_datasets_to_db(
         connection,
         symbol,
         datasets=datasets,
@@ -1063,88 +2431,252 @@ def process_symbol(
         failure_list=failure_list,
         config=config,
         period=period,
+        client=client,
+        incremental=incremental,
+        write_mode=write_mode,
+        key_index=key_index,
+    )
+
+
+def get_default_priority(tickers: Optional[List[str]], incremental: bool) -> str:
+    """
+    Return the rate limiter priority lane of a run that does not choose one.
+
+    Runs for explicitly listed tickers are interactive, while runs over every
+    company are incremental refreshes or, when re-fetching full histories, backfills.
+
+    Parameters
+    ----------
+    tickers : list, optional
+        Stock symbols to process, or None for every company
+    incremental : bool
+        Whether only data newer than the stored data is fetched
+
+    Returns
+    -------
+    str
+        ``"interactive"``, ``"incremental"`` or ``"backfill"``
+    """
+    if tickers:
+        return "interactive"
+    return "incremental" if incremental else "backfill"
+
+
+def print_run_summary(run: IngestionRun):
+    """
+    Print the progress of a checkpointed run and how to resume it if it is not complete.
+
+    Parameters
+    ----------
+    run : IngestionRun
+        Checkpointed run
+    """
+    summary = run.get_summary()
+    print(
+        f"Ingestion run {run.run_id}: {summary['done']} item(s) done, {summary['failed']} failed, "
+        f"{summary['pending']} pending "
+        f"({summary['cursor']}/{summary['num_tickers']} ticker(s) reached)."
     )
+    if summary["failed"] or summary["pending"]:
+        print(f"Resume with: eden ingest --resume {run.run_id}")
 
 
 def ingest_tickers(
-    tickers=None, api_key=None, config_file="config.json", period: Optional[str] = None
+    tickers=None,
+    api_key=None,
+    config_file="config.json",
+    period: Optional[str] = None,
+    use_async: bool = False,
+    max_concurrent_requests: Optional[int] = None,
+    incremental: bool = False,
+    write_mode: str = "merge",
+    priority: Optional[str] = None,
+    workers: int = 1,
+    resume: Optional[str] = None,
 ):
     """
     Main function to process quarterly financial data for all companies, or only selected companies.
 
+    Every call is a checkpointed run: the status of each (ticker, period, dataset) item
+    is stored by the run state store (see ``project_eden.utils.run_state``) as it is
+    committed, so that an interrupted or partly failed run can be resumed.
+
     Parameters
     ----------
     tickers : list, optional
         List of stock symbols to process. If None, processes all companies.
     api_key : str, optional
-        API key for the financial data provider. If None, uses the key from config
+        API key for the financial data provider. If None, every request uses the
+        configured key with the most rate limiter tokens available
     config_file : str, default="config.json"
         Path to the JSON configuration file
     period : str, optional
-        Period for ingestion for each ticker.  Options are "quarter", "fy", or None.  If None, both "quarter" and "fy"
-        data will be ingested.
+        Period for ingestion for each ticker.  Options are "quarter", "fy", or None.  If None,
+        both "quarter" and "fy" data will be ingested.
+    use_async : bool, default=False
+        Use the asyncio fetch engine, which keeps requests for many tickers in flight at once
+    max_concurrent_requests : int, optional
+        Maximum number of tickers in flight for the asyncio fetch engine.  If None, uses
+        ``api.max_concurrent_requests`` from config.
+    incremental : bool, default=False
+        Only fetch prices from each symbol's last stored date on (minus a small overlap)
+        and insert just the new rows, instead of re-downloading the full history
+    write_mode : str, default="merge"
+        How fetched rows are written: "merge" compares them with the stored rows, "upsert"
+        lets the database insert and update them with INSERT ... ON CONFLICT
+    priority : str, optional
+        Rate limiter priority lane of the run's requests ("interactive", "incremental" or
+        "backfill").  If None, chosen by ``get_default_priority``.
+    workers : int, default=1
+        Number of tickers processed at once by the worker pool engine (see
+        ``project_eden.db.parallel_ingestor``).  With 1, tickers are processed one by one.
+    resume : str, optional
+        Id of a run to resume.  Only the items the run has not completed are processed,
+        with the run's period, incremental, write mode and priority options; ``tickers``,
+        ``period``, ``incremental`` and ``write_mode`` are ignored.
 
     Returns
     -------
     list
         List of symbols that failed processing
+
+    Raises
+    ------
+    KeyError
+        If ``resume`` is not the id of a stored run
     """
     # Load configuration
     config = load_config(config_file)
-    # Initialize list to track failures
-    symbols_with_failure = []
+    run_store = get_run_state_store(config)
+    if resume is not None:
+        options = run_store.get_run(resume)["options"]
+        period = options.get("period")
+        incremental = options.get("incremental", False)
+        write_mode = options.get("write_mode", "merge")
+        priority = priority or options.get("priority")
 
-    # Connect to the database
-    connection = connect_to_database(config)
+    if write_mode not in WRITE_MODES:
+        raise ValueError(f"write_mode must be one of {WRITE_MODES}, got {write_mode!r}")
 
-    # If api_key is not provided, use the one from config
-    if api_key is None:
-        api_key = config["api"]["key"]
+    priority = priority or get_default_priority(tickers, incremental)
+    set_priority_lane(priority)
+    print(f"Rate limiter priority: {priority}")
 
-    # Get company tickers
-    ticker_dict = get_company_tickers(config)
-    if tickers is None:
-        tickers = [value_dict["ticker"] for value_dict in ticker_dict.values()]
+    # Initialize list to track failures
+    symbols_with_failure = []
 
-    # Initialize rate limiting variables
-    counter = 0
-    start_time = time.time()
+    # Share one keep-alive HTTP client across every API call in this run
+    client = get_http_client(config)
 
-    # Process each symbol
-    for symbol in tickers:
-        symbol = symbol.upper()
+    if resume is not None:
+        run = IngestionRun(run_store, resume)
+        print(f"Resuming ingestion run {resume}")
+    else:
+        # Get company tickers
+        ticker_dict = get_company_tickers(config, client=client)
+        if tickers is None:
+            tickers = [value_dict["ticker"] for value_dict in ticker_dict.values()]
+        jobs = [
+            (job_period, [dataset.value for dataset in datasets])
+            for job_period, datasets in get_period_datasets(period)
+        ]
+        options = {
+            "period": period,
+            "incremental": incremental,
+            "write_mode": write_mode,
+            "priority": priority,
+        }
+        run_id = run_store.create_run(
+            list(dict.fromkeys(symbol.upper() for symbol in tickers)), jobs, options=options
+        )
+        run = IngestionRun(run_store, run_id)
+        print(f"Started ingestion run {run_id}")
 
-        # Handle API rate limiting
-        counter, start_time = handle_rate_limiting(counter, start_time, config)
+    ticker_jobs = get_ticker_jobs(tickers, period, run)
+    tickers = list(ticker_jobs)
 
-        # Process the current symbol
-        if period is None:
-            process_symbol(
-                connection, symbol, api_key, symbols_with_failure, period="quarter", config=config
-            )
-            datasets = [
-                Datasets.PROFILE,
-                Datasets.INCOME_STATEMENT,
-                Datasets.CASH_FLOW_STATEMENT,
-                Datasets.BALANCE_SHEET_STATEMENT,
-            ]
-            process_symbol(
-                connection,
-                symbol,
-                api_key,
-                symbols_with_failure,
-                period="fy",
-                config=config,
-                datasets=datasets,
+    # Database connections are checked out from the process' pool
+    pool = get_connection_pool(config)
+    connection = None
+    try:
+        if use_async:
+            from project_eden.db.async_ingestor import run_async_ingestion
+
+            connection = pool.getconn()
+            return run_async_ingestion(
+                tickers,
+                config,
+                period=period,
+                connection=connection,
+                max_concurrent_requests=max_concurrent_requests,
+                incremental=incremental,
+                write_mode=write_mode,
+                run=run,
             )
-            counter += 5 + 4  # 5 for quarter, 4 for fy
-        else:
-            process_symbol(
-                connection, symbol, api_key, symbols_with_failure, period=period, config=config
+
+        if workers > 1:
+            from project_eden.db.parallel_ingestor import ingest_tickers_parallel
+
+            # The writer threads check out their own connections
+            return ingest_tickers_parallel(
+                tickers,
+                config,
+                period=period,
+                workers=workers,
+                incremental=incremental,
+                write_mode=write_mode,
+                run=run,
             )
-            counter += 5  # 5 for quarter
 
-    return symbols_with_failure
+        connection = pool.getconn()
+        check_unique_constraints(connection, write_mode)
+
+        # Resolve every known symbol's company id once instead of once per inserted batch
+        warm_company_id_cache(connection)
+
+        key_index = None
+        if write_mode == "merge":
+            latest_price_dates = None
+            if incremental:
+                with connection.cursor() as cursor:
+                    latest_price_dates = get_latest_price_dates(cursor, tickers)
+                connection.rollback()
+            key_index = create_key_index(tickers, latest_price_dates)
+
+        quota = get_quota_tracker(config)
+        print_quota_status(config, len(tickers), period)
+
+        # Process each symbol (every API request takes a token from the global rate limiter)
+        for i, symbol in enumerate(tickers):
+            if quota is not None and quota.is_exhausted():
+                print(f"API quota used up, skipping the remaining {len(tickers) - i} ticker(s).")
+                symbols_with_failure.extend(tickers[i:])
+                break
+
+            # Process the current symbol, one (period, datasets) pass at a time
+            for job_period, datasets in ticker_jobs[symbol]:
+                success = process_symbol(
+                    connection,
+                    symbol,
+                    api_key,
+                    symbols_with_failure,
+                    period=job_period,
+                    config=config,
+                    datasets=datasets,
+                    client=client,
+                    incremental=incremental,
+                    write_mode=write_mode,
+                    key_index=key_index,
+                )
+                record_ticker_job(run, symbol, job_period, datasets, success)
+
+        print_response_cache_stats(config)
+        return symbols_with_failure
+    finally:
+        if connection is not None:
+            pool.putconn(connection)
+        # Also reached on Ctrl-C, so the run id to resume is always shown
+        print_run_summary(run)
 
 
 def load_config(config_file="config.json") -> Dict[str, Any]:
@@ -1166,8 +2698,30 @@ def load_config(config_file="config.json") -> Dict[str, Any]:
         return json.load(f)
 
 
-def driver(config_file="config.json", tickers=None, period: Optional[str] = None):
-    failed_symbols = ingest_tickers(tickers=tickers, config_file=config_file, period=period)
+def driver(
+    config_file="config.json",
+    tickers=None,
+    period: Optional[str] = None,
+    use_async: bool = False,
+    max_concurrent_requests: Optional[int] = None,
+    incremental: bool = False,
+    write_mode: str = "merge",
+    priority: Optional[str] = None,
+    workers: int = 1,
+    resume: Optional[str] = None,
+):
+    failed_symbols = ingest_tickers(
+        tickers=tickers,
+        config_file=config_file,
+        period=period,
+        use_async=use_async,
+        max_concurrent_requests=max_concurrent_requests,
+        incremental=incremental,
+        write_mode=write_mode,
+        priority=priority,
+        workers=workers,
+        resume=resume,
+    )
     print(f"The following symbols failed: {failed_symbols}")
 
 
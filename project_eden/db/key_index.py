@@ -0,0 +1,204 @@
+"""
+Run-level index of the keys already stored in the fact tables.
+
+Merging fetched rows used to start with a ``SELECT *`` of every stored row of
+the ticker, only to learn which of the fetched rows were new.  For ``price``,
+that pulled the whole price history over the wire for every ticker.  The index
+loads the natural keys of a table (e.g. ``symbol, calendaryear, period``) for
+every ticker of a run with a single projection query, the first time the table
+is written, along with the content hash of each stored row.  Fetched rows
+whose key is not in the index are inserted without reading anything back, rows
+with the stored content hash are skipped, and only the other stored rows
+sharing a key with a fetched row are read to be compared.
+"""
+import datetime
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from project_eden.db.utils import CONTENT_HASH_COLUMN, get_table_column_types
+
+# Rows per round trip when streaming the keys of a table
+KEY_INDEX_FETCH_SIZE = 100000
+
+
+def normalize_key_frame(keys_df: pd.DataFrame) -> pd.DataFrame:
+    """Convert ``date`` key columns to datetime64, so stored and fetched keys compare equal."""
+    if "date" in keys_df.columns:
+        keys_df = keys_df.assign(date=pd.to_datetime(keys_df["date"]))
+    return keys_df
+
+
+class ExistingKeyIndex:
+    """
+    Thread-safe index of the stored keys of a run's tickers, loaded once per table.
+
+    The index is only valid for the run it is created for: every ticker is written
+    once per run, so the keys stored before its turn are the keys loaded by the index.
+    A key missing from the index is inserted as a new row, while a key wrongly in the
+    index only costs a lookup, so rows written since the index was loaded are safe.
+
+    Parameters
+    ----------
+    symbols : List[str]
+        Stock symbols of the run
+    since_date : datetime.date, optional
+        If given, only keys dated on or after ``since_date`` are loaded for tables keyed
+        by ``date``, e.g. the start of the price window of an incremental run.  Fetched
+        rows dated before it are looked up as if they were stored.
+    """
+
+    def __init__(self, symbols: List[str], since_date: Optional[datetime.date] = None):
+        self.symbols = list(symbols)
+        self.since_date = since_date
+        self._keys: Dict[Tuple[str, Tuple[str, ...]], Dict[str, pd.Series]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, cursor, table_name: str, key_columns: List[str]) -> Dict[str, pd.Series]:
+        columns = list(key_columns)
+        if CONTENT_HASH_COLUMN in get_table_column_types(cursor, table_name):
+            columns.append(CONTENT_HASH_COLUMN)
+        query = f"SELECT {', '.join(columns)} FROM {table_name} WHERE symbol = ANY(%s)"
+        params = [self.symbols]
+        if self.since_date is not None and "date" in key_columns:
+            query += " AND date >= %s"
+            params.append(self.since_date)
+
+        # Stream the keys with a server-side cursor instead of buffering every row at once
+        chunks = []
+        with cursor.connection.cursor(name=f"eden_key_index_{table_name}") as key_cursor:
+            key_cursor.itersize = KEY_INDEX_FETCH_SIZE
+            key_cursor.execute(query, params)
+            while True:
+                rows = key_cursor.fetchmany(KEY_INDEX_FETCH_SIZE)
+                if not rows:
+                    break
+                chunks.append(normalize_key_frame(pd.DataFrame(rows, columns=columns)))
+
+        if not chunks:
+            return {}
+        keys_df = pd.concat(chunks, ignore_index=True)
+        if CONTENT_HASH_COLUMN not in keys_df.columns:
+            keys_df[CONTENT_HASH_COLUMN] = None
+        # Keys stored more than once (tables without their unique constraint) are kept once
+        # without a hash, so their fetched rows are compared instead of skipped
+        duplicated = keys_df.duplicated(subset=key_columns, keep=False)
+        if duplicated.any():
+            keys_df[CONTENT_HASH_COLUMN] = keys_df[CONTENT_HASH_COLUMN].astype(object)
+            keys_df.loc[duplicated, CONTENT_HASH_COLUMN] = None
+            keys_df = keys_df.drop_duplicates(subset=key_columns)
+        print(f"--Indexed {len(keys_df)} stored keys of {table_name}")
+        return {
+            symbol: pd.Series(
+                group[CONTENT_HASH_COLUMN].to_numpy(dtype=object),
+                index=pd.MultiIndex.from_frame(group[key_columns[1:]]),
+            )
+            for symbol, group in keys_df.groupby("symbol")
+        }
+
+    def get_keys(self, cursor, table_name: str, key_columns: List[str], symbol: str) -> pd.Series:
+        """
+        Get the stored keys and content hashes of a symbol, loading the table's keys on first use.
+
+        Parameters
+        ----------
+        cursor
+            Database cursor, used to load the keys on first use
+        table_name : str
+            Name of the table
+        key_columns : List[str]
+            Columns identifying a row: ``symbol``, then at least one other column
+        symbol : str
+            Stock symbol
+
+        Returns
+        -------
+        pd.Series
+            Content hash (None if not stored) of each stored row, indexed by the values of
+            the key columns other than ``symbol``
+        """
+        index_key = (table_name, tuple(key_columns))
+        with self._lock:
+            if index_key not in self._keys:
+                self._keys[index_key] = self._load(cursor, table_name, key_columns)
+            table_keys = self._keys[index_key]
+        if symbol in table_keys:
+            return table_keys[symbol]
+        return pd.Series(
+            [], index=pd.MultiIndex.from_tuples([], names=key_columns[1:]), dtype=object
+        )
+
+    def is_stored(
+        self,
+        cursor,
+        table_name: str,
+        key_columns: List[str],
+        symbol: str,
+        new_data_df: pd.DataFrame,
+    ) -> np.ndarray:
+        """
+        Tell which fetched rows of a symbol may already be stored.
+
+        Parameters
+        ----------
+        cursor
+            Database cursor, used to load the keys on first use
+        table_name : str
+            Name of the table
+        key_columns : List[str]
+            Columns identifying a row: ``symbol``, then at least one other column
+        symbol : str
+            Stock symbol of the rows
+        new_data_df : DataFrame
+            Fetched rows, with the key columns
+
+        Returns
+        -------
+        np.ndarray
+            Boolean mask of the rows whose key is stored (or dated before ``since_date``)
+        """
+        stored_keys = self.get_keys(cursor, table_name, key_columns, symbol).index
+        new_keys = normalize_key_frame(new_data_df[key_columns[1:]])
+        mask = pd.MultiIndex.from_frame(new_keys).isin(stored_keys)
+        if self.since_date is not None and "date" in new_keys.columns:
+            mask |= (new_keys["date"] < pd.Timestamp(self.since_date)).to_numpy()
+        return mask
+
+    def is_unchanged(
+        self,
+        cursor,
+        table_name: str,
+        key_columns: List[str],
+        symbol: str,
+        new_data_df: pd.DataFrame,
+    ) -> np.ndarray:
+        """
+        Tell which fetched rows of a symbol are stored with the same content hash.
+
+        Parameters
+        ----------
+        cursor
+            Database cursor, used to load the keys on first use
+        table_name : str
+            Name of the table
+        key_columns : List[str]
+            Columns identifying a row: ``symbol``, then at least one other column
+        symbol : str
+            Stock symbol of the rows
+        new_data_df : DataFrame
+            Fetched rows, with the key columns and, if the table has one, ``content_hash``
+
+        Returns
+        -------
+        np.ndarray
+            Boolean mask of the rows that do not need to be compared or written
+        """
+        if CONTENT_HASH_COLUMN not in new_data_df.columns:
+            return np.zeros(len(new_data_df), dtype=bool)
+
+        stored_hashes = self.get_keys(cursor, table_name, key_columns, symbol)
+        new_keys = pd.MultiIndex.from_frame(normalize_key_frame(new_data_df[key_columns[1:]]))
+        stored_hashes = stored_hashes.reindex(new_keys).to_numpy(dtype=object)
+        return stored_hashes == new_data_df[CONTENT_HASH_COLUMN].to_numpy(dtype=object)
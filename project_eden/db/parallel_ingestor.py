@@ -0,0 +1,262 @@
+"""
+Worker pool engine for financial data ingestion.
+
+Tickers are fetched by a pool of worker threads and written by a few writer
+threads behind a bounded queue, so that no transaction waits on the network and
+the fetchers stop when the database falls behind (see ``write_behind``).
+All workers draw their API tokens from the global rate limiter (or API key pool)
+and share one keep-alive HTTP client.  Comparing fetched rows with the stored
+rows is CPU bound and holds the GIL, so it is handed to a pool of worker
+processes while the threads wait on the network and the database.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from project_eden.db.connection_pool import get_connection_pool
+from project_eden.db.create_tables import check_unique_constraints, create_staging_tables
+from project_eden.db.data_ingestor import (
+    create_key_index,
+    fetch_ticker_datasets,
+    get_fetched_window_start,
+    get_incremental_fetch_params,
+    get_incremental_state,
+    get_ticker_jobs,
+    print_quota_status,
+    print_response_cache_stats,
+    record_ticker_job,
+)
+from project_eden.db.utils import warm_company_id_cache
+from project_eden.db.write_behind import WriteBehindQueue, get_write_behind_settings
+from project_eden.utils.http_client import get_http_client
+from project_eden.utils.quota import get_quota_tracker
+from project_eden.utils.rate_limiter import get_api_key_pool
+from project_eden.utils.run_state import IngestionRun
+
+DEFAULT_SHARD_SIZE = 100
+
+
+def get_ticker_shards(tickers: List[str], shard_size: int = DEFAULT_SHARD_SIZE) -> List[List[str]]:
+    """
+    Split tickers into shards, each ingested by one worker pool.
+
+    Parameters
+    ----------
+    tickers : List[str]
+        Stock symbols to process
+    shard_size : int, default=100
+        Maximum number of tickers per shard
+
+    Returns
+    -------
+    List[List[str]]
+        Upper-cased, de-duplicated symbols in shards of at most ``shard_size``
+    """
+    if shard_size < 1:
+        raise ValueError(f"shard_size must be at least 1, got {shard_size}")
+
+    tickers = list(dict.fromkeys(symbol.upper() for symbol in tickers))
+    return [tickers[start:start + shard_size] for start in range(0, len(tickers), shard_size)]
+
+
+def get_diff_processes(workers: int, diff_processes: Optional[int] = None) -> int:
+    """
+    Get the number of processes comparing fetched rows with the stored rows.
+
+    Parameters
+    ----------
+    workers : int
+        Number of worker threads
+    diff_processes : int, optional
+        Requested number of processes.  If None, one per worker thread, up to the
+        number of CPUs.
+
+    Returns
+    -------
+    int
+        Number of processes, 0 to compare rows in the worker threads
+    """
+    if diff_processes is None:
+        return min(workers, os.cpu_count() or 1)
+    return max(0, diff_processes)
+
+
+def ingest_tickers_parallel(
+    tickers: List[str],
+    config: Dict[str, Any],
+    period: Optional[str] = None,
+    workers: int = 4,
+    diff_processes: Optional[int] = None,
+    incremental: bool = False,
+    write_mode: str = "merge",
+    run: Optional[IngestionRun] = None,
+    writers: Optional[int] = None,
+    write_queue_size: Optional[int] = None,
+    write_batch_size: Optional[int] = None,
+) -> List[str]:
+    """
+    Ingest tickers with a pool of fetcher threads feeding a write-behind queue.
+
+    Every fetcher fetches one ticker at a time, both periods in a row, with the
+    same datasets as the sequential engine, and puts the parsed DataFrames in a
+    bounded queue consumed by a few writer threads (see ``WriteBehindQueue``).
+    The rate limit is enforced per request by the global API key pool, so the
+    number of workers only sets how many tickers are being fetched at once.
+
+    Parameters
+    ----------
+    tickers : List[str]
+        Stock symbols to process
+    config : Dict[str, Any]
+        Configuration dictionary
+    period : str, optional
+        Period for ingestion for each ticker.  Options are "quarter", "fy", "all" or None.
+        "all" and None ingest both "quarter" and "fy" data.
+    workers : int, default=4
+        Number of fetcher threads
+    diff_processes : int, optional
+        Number of processes comparing fetched rows with the stored rows (see
+        ``get_diff_processes``).  With 0, rows are compared in the writer threads.
+    incremental : bool, default=False
+        Only fetch prices and statements newer than each ticker's last stored ones
+    write_mode : str, default="merge"
+        How fetched rows are written: "merge" compares them with the stored rows, "upsert"
+        lets the database insert and update them with INSERT ... ON CONFLICT
+    run : IngestionRun, optional
+        Checkpointed run being processed.  If given, only the items the run has not
+        completed are processed, and the outcome of every pass is recorded.
+    writers : int, optional
+        Number of writer threads, each checking out a connection from the database
+        connection pool per batch.  If None, uses ``write_behind.writers`` from config (2).
+    write_queue_size : int, optional
+        Number of fetched tickers waiting to be written before the fetchers stop.  If None,
+        uses ``write_behind.queue_size`` from config (twice the number of workers).
+    write_batch_size : int, optional
+        Maximum number of queued tickers written in one transaction (with
+        ``write_mode="upsert"``, with one statement per table).  If None, uses
+        ``write_behind.batch_size`` from config (4).
+
+    Returns
+    -------
+    List[str]
+        List of symbols that failed processing
+    """
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+
+    settings = get_write_behind_settings(config, workers)
+    writers = settings["writers"] if writers is None else writers
+    write_queue_size = settings["queue_size"] if write_queue_size is None else write_queue_size
+    write_batch_size = settings["batch_size"] if write_batch_size is None else write_batch_size
+    if min(writers, write_queue_size, write_batch_size) < 1:
+        raise ValueError(
+            f"writers, write_queue_size and write_batch_size must be at least 1, got "
+            f"{writers}, {write_queue_size} and {write_batch_size}"
+        )
+
+    ticker_jobs = get_ticker_jobs(tickers, period, run)
+    tickers = list(ticker_jobs)
+    client = get_http_client(config)
+    quota = get_quota_tracker(config)
+    # Created before the workers start so that they share one pool
+    get_api_key_pool(config)
+    symbols_with_failure = []
+
+    pool = get_connection_pool(config)
+    if writers > pool.max_connections:
+        print(
+            f"Only {pool.max_connections} database connection(s) for {writers} writer thread(s); "
+            f"raise database.pool.max_connections to write more tickers at once."
+        )
+
+    latest_price_dates = {}
+    latest_statement_periods = {}
+    with pool.connection() as connection:
+        check_unique_constraints(connection, write_mode)
+        warm_company_id_cache(connection)
+        if write_mode == "upsert":
+            # Batches of upserts are staged in UNLOGGED tables shared by the writers
+            create_staging_tables(connection)
+        if incremental:
+            with connection.cursor() as cursor:
+                latest_price_dates, latest_statement_periods = get_incremental_state(
+                    cursor, tickers, period
+                )
+            connection.rollback()
+    key_index = create_key_index(tickers, latest_price_dates) if write_mode == "merge" else None
+
+    def fetch_ticker(symbol):
+        if quota is not None and quota.is_exhausted():
+            symbols_with_failure.append(symbol)
+            return
+        print(f"Processing {symbol}")
+        passes = []
+        for job_period, datasets in ticker_jobs[symbol]:
+            since_dates, limits = get_incremental_fetch_params(
+                symbol, job_period, datasets, latest_price_dates, latest_statement_periods
+            )
+            try:
+                frames = fetch_ticker_datasets(
+                    symbol,
+                    datasets,
+                    job_period,
+                    config,
+                    client=client,
+                    since_dates=since_dates,
+                    limits=limits,
+                )
+                # Only merge the statement periods covered by the responses
+                for dataset in limits:
+                    since_dates[dataset] = get_fetched_window_start(frames[dataset])
+            except Exception as e:
+                print(f"Error fetching {symbol} ({job_period}): {e}")
+                frames = None
+            passes.append((job_period, datasets, frames, since_dates))
+        # Blocks while the writers are behind
+        write_behind.put(symbol, passes)
+
+    def on_written(symbol, job_period, datasets, success):
+        if not success:
+            symbols_with_failure.append(symbol)
+        record_ticker_job(run, symbol, job_period, datasets, success)
+
+    num_processes = 0 if write_mode == "upsert" else get_diff_processes(workers, diff_processes)
+    print(
+        f"Parallel ingestion of {len(tickers)} ticker(s) with {workers} fetcher thread(s), "
+        f"{writers} writer thread(s) and {num_processes} diff process(es)..."
+    )
+    print_quota_status(config, len(tickers), period)
+
+    diff_executor = None
+    if num_processes:
+        # Worker processes are spawned rather than forked from this multithreaded process
+        diff_executor = ProcessPoolExecutor(
+            max_workers=num_processes, mp_context=multiprocessing.get_context("spawn")
+        )
+    write_behind = WriteBehindQueue(
+        pool,
+        writers=writers,
+        queue_size=write_queue_size,
+        batch_size=write_batch_size,
+        write_mode=write_mode,
+        diff_executor=diff_executor,
+        on_written=on_written,
+        key_index=key_index,
+    )
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="eden-fetch")
+    try:
+        for future in [executor.submit(fetch_ticker, symbol) for symbol in tickers]:
+            future.result()
+    finally:
+        # On Ctrl-C, drop the queued tickers (they stay pending in the run), let the
+        # fetchers finish their current ticker and write everything already fetched
+        executor.shutdown(wait=True, cancel_futures=True)
+        write_behind.close()
+        if diff_executor is not None:
+            diff_executor.shutdown()
+
+    if quota is not None and quota.is_exhausted():
+        print("API quota used up, the remaining tickers were skipped.")
+    print_response_cache_stats(config)
+    return list(dict.fromkeys(symbols_with_failure))
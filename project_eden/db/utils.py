@@ -1,7 +1,28 @@
+import io
+import threading
 import psycopg2
 import pandas as pd
 import numpy as np
 from configparser import ConfigParser
+from typing import Any, Dict, Iterable, Optional
+
+# Marker for NULL values in COPY data
+COPY_NULL = "\\N"
+
+# Prefix of the UNLOGGED tables batched upserts are staged in
+STAGING_TABLE_PREFIX = "staging_"
+
+# Prefix of the per-statement temporary tables, distinct from the staging tables so
+# that a temporary table never shadows the shared staging table of the session
+TEMP_TABLE_PREFIX = "tmp_"
+
+# Column of the fact tables holding the hash of a row's normalized values
+CONTENT_HASH_COLUMN = "content_hash"
+
+INTEGER_DATA_TYPES = {"smallint", "integer", "bigint"}
+
+# Column data types per table, as reported by information_schema
+_table_column_types: Dict[str, Dict[str, str]] = {}
 
 
 def load_config(filename="database_v2.ini", section="postgresql"):
@@ -17,9 +38,26 @@ def load_config(filename="database_v2.ini", section="postgresql"):
     return config
 
 
+def get_connection_params(db_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get the psycopg2 connection parameters of the ``database`` config section.
+
+    Parameters
+    ----------
+    db_config : Dict[str, Any]
+        The ``database`` section of the configuration
+
+    Returns
+    -------
+    Dict[str, Any]
+        The section without the connection pool settings
+    """
+    return {key: value for key, value in db_config.items() if key != "pool"}
+
+
 def connect(config):
     try:
-        conn = psycopg2.connect(**config)
+        conn = psycopg2.connect(**get_connection_params(config))
         # Now you can use the connection (e.g., create a cursor and execute queries)
         return conn
     except Exception as e:
@@ -43,6 +81,354 @@ def insert_records_from_df(cursor, df: pd.DataFrame, table_name):
             insert_record_with_company_id(cursor, table_name, columns, row)
 
 
+def get_table_column_types(cursor, table_name, columns: Iterable[str] = ()) -> Dict[str, str]:
+    """
+    Get the data type of every column of a table.
+
+    The types are looked up once per table and reloaded when one of ``columns`` is
+    unknown (e.g. after a column was added).
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    table_name : str
+        Name of the table
+    columns : Iterable[str], optional
+        Columns that must be present in the result
+
+    Returns
+    -------
+    Dict[str, str]
+        Mapping of column name to ``information_schema`` data type
+    """
+    column_types = _table_column_types.get(table_name)
+    if column_types is None or any(column not in column_types for column in columns):
+        cursor.execute(
+            "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = %s",
+            (table_name,),
+        )
+        column_types = dict(cursor.fetchall())
+        _table_column_types[table_name] = column_types
+    return column_types
+
+
+def register_company(cursor, symbol) -> int:
+    """
+    Get the id of a company, inserting a bare company row if the symbol is unknown.
+
+    Safe under concurrent workers: ``ON CONFLICT`` relies on the unique constraint on
+    ``company.symbol``, so a symbol registered by another transaction is looked up
+    instead of inserted twice.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    symbol : str
+        Stock symbol
+
+    Returns
+    -------
+    int
+        The company id
+    """
+    cursor.execute(
+        "INSERT INTO company (symbol) VALUES (%s) ON CONFLICT (symbol) DO NOTHING RETURNING id",
+        (symbol,),
+    )
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute("SELECT id FROM company WHERE symbol = %s", (symbol,))
+        row = cursor.fetchone()
+    return row[0]
+
+
+class CompanyIdCache:
+    """
+    Thread-safe in-process cache of company ids by symbol.
+
+    Ids of companies registered in a transaction that is later rolled back must be
+    dropped with ``invalidate``.
+    """
+
+    def __init__(self):
+        self._company_ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def warm(self, cursor):
+        """Load the ids of every company with a single query."""
+        cursor.execute("SELECT symbol, id FROM company")
+        company_ids = dict(cursor.fetchall())
+        with self._lock:
+            self._company_ids.update(company_ids)
+
+    def get_ids(self, cursor, symbols: Iterable[str]) -> Dict[str, int]:
+        """
+        Get the company id of each symbol, registering unknown symbols.
+
+        Parameters
+        ----------
+        cursor
+            Database cursor
+        symbols : Iterable[str]
+            Stock symbols
+
+        Returns
+        -------
+        Dict[str, int]
+            Mapping of symbol to company id
+        """
+        symbols = list(symbols)
+        with self._lock:
+            missing = [symbol for symbol in symbols if symbol not in self._company_ids]
+
+        if missing:
+            cursor.execute("SELECT symbol, id FROM company WHERE symbol = ANY(%s)", (missing,))
+            company_ids = dict(cursor.fetchall())
+            for symbol in missing:
+                if symbol not in company_ids:
+                    company_ids[symbol] = register_company(cursor, symbol)
+            with self._lock:
+                self._company_ids.update(company_ids)
+
+        with self._lock:
+            return {symbol: self._company_ids[symbol] for symbol in symbols}
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """Forget the id of ``symbol``, or of every symbol if None."""
+        with self._lock:
+            if symbol is None:
+                self._company_ids.clear()
+            else:
+                self._company_ids.pop(symbol, None)
+
+
+# Global company id cache shared by every worker thread of the process
+_global_company_id_cache: Optional[CompanyIdCache] = None
+_company_id_cache_lock = threading.Lock()
+
+
+def get_company_id_cache() -> CompanyIdCache:
+    """
+    Get or create the global company id cache.
+
+    Returns
+    -------
+    CompanyIdCache
+        The global company id cache
+    """
+    global _global_company_id_cache
+
+    with _company_id_cache_lock:
+        if _global_company_id_cache is None:
+            _global_company_id_cache = CompanyIdCache()
+        return _global_company_id_cache
+
+
+def reset_company_id_cache():
+    """Reset the global company id cache (useful for testing)."""
+    global _global_company_id_cache
+    with _company_id_cache_lock:
+        _global_company_id_cache = None
+
+
+def warm_company_id_cache(connection):
+    """
+    Load every known company id into the global cache at the start of a run.
+
+    Parameters
+    ----------
+    connection
+        Database connection
+    """
+    with connection.cursor() as cursor:
+        get_company_id_cache().warm(cursor)
+    connection.commit()
+
+
+def get_company_ids(cursor, symbols: Iterable[str]) -> Dict[str, int]:
+    """
+    Get the company id of each symbol from the global cache, registering unknown symbols.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    symbols : Iterable[str]
+        Stock symbols
+
+    Returns
+    -------
+    Dict[str, int]
+        Mapping of symbol to company id
+    """
+    return get_company_id_cache().get_ids(cursor, symbols)
+
+
+def prepare_copy_frame(cursor, df: pd.DataFrame, table_name) -> pd.DataFrame:
+    """
+    Prepare a DataFrame to be written with ``COPY``.
+
+    For every table but ``company``, the ``company_id`` column is filled in from the
+    ``symbol`` column, resolving each symbol once.  Integer columns are converted to
+    nullable integers.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    df : pd.DataFrame
+        Rows to write; the columns must be columns of the table
+    table_name : str
+        Name of the table
+
+    Returns
+    -------
+    pd.DataFrame
+        The prepared copy of ``df``
+    """
+    df = df.copy()
+    if table_name != "company":
+        if "company_id" in df.columns:
+            raise ValueError("company_id exists in columns, this is a foreign key")
+        if "symbol" not in df.columns:
+            raise ValueError("symbol not found in columns")
+        company_ids = get_company_ids(cursor, df["symbol"].unique())
+        df.insert(0, "company_id", df["symbol"].map(company_ids))
+
+    # Integer columns often arrive as floats (because of missing values), which COPY
+    # would reject, so store them as nullable integers
+    column_types = get_table_column_types(cursor, table_name, df.columns)
+    for column in df.columns:
+        if column_types.get(column) in INTEGER_DATA_TYPES:
+            df[column] = pd.to_numeric(df[column]).round().astype("Int64")
+    return df
+
+
+def copy_frame(cursor, df: pd.DataFrame, table_name):
+    """Stream a prepared DataFrame into ``table_name`` with ``COPY ... FROM STDIN``."""
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep=COPY_NULL)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table_name} ({', '.join(df.columns)}) FROM STDIN "
+        f"WITH (FORMAT csv, NULL '{COPY_NULL}')",
+        buffer,
+    )
+
+
+def copy_records_from_df(cursor, df: pd.DataFrame, table_name):
+    """
+    Bulk insert the rows of a DataFrame with a single ``COPY ... FROM STDIN``.
+
+    For every table but ``company``, the ``company_id`` column is filled in from the
+    ``symbol`` column, resolving each symbol once.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    df : pd.DataFrame
+        Rows to insert; the columns must be columns of the table
+    table_name : str
+        Name of the table
+    """
+    if df.empty:
+        return
+
+    copy_frame(cursor, prepare_copy_frame(cursor, df, table_name), table_name)
+
+
+def get_staging_table_name(table_name: str) -> str:
+    """Get the name of the UNLOGGED staging table of ``table_name``."""
+    return f"{STAGING_TABLE_PREFIX}{table_name}"
+
+
+def upsert_records_from_df(
+    cursor, df: pd.DataFrame, table_name, conflict_keys, staging_table: Optional[str] = None
+) -> int:
+    """
+    Insert new rows and update changed rows of a DataFrame in a single statement.
+
+    The rows are copied into a staging table and merged with
+    ``INSERT ... ON CONFLICT DO UPDATE``.  A stored row is only rewritten if one of its
+    values is distinct from the new one, or, when the rows carry a content hash, if its
+    hash is; missing (NULL) new values keep the stored value.
+
+    Parameters
+    ----------
+    cursor
+        Database cursor
+    df : pd.DataFrame
+        Rows to write; the columns must be columns of the table
+    table_name : str
+        Name of the table
+    conflict_keys : List[str]
+        Columns of a unique constraint of the table identifying a row
+    staging_table : str, optional
+        Existing table with the columns of ``table_name`` to stage the rows in, such as
+        the UNLOGGED table named by ``get_staging_table_name``.  The staged rows are
+        deleted again before the transaction commits, so other transactions never see
+        them and concurrent writers can share the table.  If None, a temporary table
+        prefixed with ``TEMP_TABLE_PREFIX`` is created for the statement.
+
+    Returns
+    -------
+    int
+        Number of rows inserted or updated
+    """
+    if df.empty:
+        return 0
+
+    # A row may only be affected once per statement
+    df = df.drop_duplicates(subset=conflict_keys, keep="first")
+    df = prepare_copy_frame(cursor, df, table_name)
+    columns = list(df.columns)
+    column_list = ", ".join(columns)
+
+    temporary = staging_table is None
+    if temporary:
+        staging_table = f"{TEMP_TABLE_PREFIX}{table_name}"
+        cursor.execute(f"DROP TABLE IF EXISTS pg_temp.{staging_table}")
+        cursor.execute(
+            f"CREATE TEMP TABLE {staging_table} ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {table_name} WITH NO DATA"
+        )
+    copy_frame(cursor, df, staging_table)
+
+    update_columns = [c for c in columns if c not in conflict_keys and c != "company_id"]
+    new_values = [f"COALESCE(EXCLUDED.{c}, {table_name}.{c})" for c in update_columns]
+    if update_columns:
+        if CONTENT_HASH_COLUMN in update_columns:
+            # One comparison per row, which also ignores float rounding of stored values
+            changed = (
+                f"{table_name}.{CONTENT_HASH_COLUMN} "
+                f"IS DISTINCT FROM EXCLUDED.{CONTENT_HASH_COLUMN}"
+            )
+        else:
+            stored_values = ", ".join(f"{table_name}.{c}" for c in update_columns)
+            changed = f"ROW({stored_values}) IS DISTINCT FROM ROW({', '.join(new_values)})"
+        conflict_action = (
+            f"DO UPDATE SET ({', '.join(update_columns)}) = ROW({', '.join(new_values)}) "
+            f"WHERE {changed}"
+        )
+    else:
+        conflict_action = "DO NOTHING"
+
+    cursor.execute(
+        f"INSERT INTO {table_name} ({column_list}) "
+        f"SELECT {column_list} FROM {staging_table} "
+        f"ON CONFLICT ({', '.join(conflict_keys)}) {conflict_action}"
+    )
+    row_count = cursor.rowcount
+    if not temporary:
+        # Staged rows are never committed, so only this transaction's rows are visible;
+        # DELETE (unlike TRUNCATE) does not block the other writers staging in the table
+        cursor.execute(f"DELETE FROM {staging_table}")
+    return row_count
+
+
 def insert_record_with_company_id(cursor, table_name, columns, values):
     placeholders = ", ".join(["%s"] * len(columns))  # Create placeholders for each column
 
@@ -52,15 +438,12 @@ def insert_record_with_company_id(cursor, table_name, columns, values):
         raise ValueError("symbol not found in columns")
     symbol_value = [values.values[ind] for ind, column in enumerate(columns) if column == "symbol"]
     symbol_value = symbol_value[0]
+    company_id = get_company_ids(cursor, [symbol_value])[symbol_value]
     command = (
         f"INSERT INTO {table_name} ({'company_id, ' + ', '.join(columns)}) "
-        f"VALUES ((SELECT c.id FROM company c WHERE c.symbol = '{symbol_value}'), {placeholders})"
+        f"VALUES (%s, {placeholders})"
     )
-    try:
-        cursor.execute(command, tuple(values))
-    except psycopg2.errors.NotNullViolation:
-        cursor.execute(f"INSERT INTO company (symbol) VALUES ('{symbol_value}')")
-        cursor.execute(command)
+    cursor.execute(command, (company_id, *values))
 
 
 def insert_records_from_df_given_symbol(cursor, df: pd.DataFrame, table_name, symbol):
@@ -76,15 +459,12 @@ def insert_record_given_symbol(cursor, table_name, symbol, columns, values):
     if "company_id" in columns:
         raise ValueError("company_id exists in columns, this is a foreign key")
 
+    company_id = get_company_ids(cursor, [symbol])[symbol]
     command = (
         f"INSERT INTO {table_name} ({'company_id, ' + ', '.join(columns)}) "
-        f"VALUES ((SELECT c.id FROM company c WHERE c.symbol = '{symbol}'), {placeholders})"
+        f"VALUES (%s, {placeholders})"
     )
-    try:
-        cursor.execute(command, tuple(values))
-    except psycopg2.errors.NotNullViolation:
-        cursor.execute(f"INSERT INTO company (symbol) VALUES ('{symbol}')")
-        cursor.execute(command)
+    cursor.execute(command, (company_id, *values))
 
 
 def update_column_target_symbol(
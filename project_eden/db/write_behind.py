@@ -0,0 +1,222 @@
+"""
+Write-behind queue decoupling API fetches from database writes.
+
+Fetcher threads put the parsed DataFrames of a ticker into a bounded queue and
+go on with the next ticker, while a small pool of writer threads takes them off
+the queue and merges them into the database.  No transaction is held open while
+a request is in flight, so the network and the database are busy at the same
+time.  When the writers fall behind, the queue fills up and ``put`` blocks the
+fetchers until there is room again.
+
+Writers merge several queued tickers in one transaction.  In upsert mode, the
+rows of a whole batch are copied into UNLOGGED staging tables and merged with
+one ``INSERT ... ON CONFLICT`` per table.  If a batch fails, it is rolled back
+and its tickers are written again one transaction at a time, so that only the
+failing ticker is reported.
+"""
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from project_eden.db.connection_pool import DatabaseConnectionPool
+from project_eden.db.data_ingestor import (
+    add_fetched_datasets_to_db,
+    get_dataset_to_table_name,
+    process_fetched_dataset,
+    upsert_fetched_datasets_batch,
+)
+from project_eden.db.key_index import ExistingKeyIndex
+from project_eden.db.utils import get_company_id_cache
+
+DEFAULT_WRITERS = 2
+DEFAULT_WRITE_BATCH_SIZE = 4
+
+# (period, datasets, fetched DataFrames or None if the fetch failed, since dates)
+FetchedPass = Tuple[str, List[Any], Optional[Dict[Any, Any]], Dict[Any, Any]]
+
+
+def get_write_behind_settings(config: Dict[str, Any], workers: int) -> Dict[str, int]:
+    """
+    Get the write-behind queue settings from config.
+
+    Parameters
+    ----------
+    config : Dict[str, Any]
+        Configuration dictionary.  The optional ``write_behind`` section may set
+        ``writers``, ``queue_size`` and ``batch_size``.
+    workers : int
+        Number of fetcher threads
+
+    Returns
+    -------
+    Dict[str, int]
+        ``writers`` (default 2), ``queue_size`` (default twice the number of
+        fetchers) and ``batch_size`` (default 4)
+    """
+    write_behind_config = config.get("write_behind", {})
+    return {
+        "writers": max(1, write_behind_config.get("writers", DEFAULT_WRITERS)),
+        "queue_size": max(1, write_behind_config.get("queue_size", 2 * workers)),
+        "batch_size": max(1, write_behind_config.get("batch_size", DEFAULT_WRITE_BATCH_SIZE)),
+    }
+
+
+class WriteBehindQueue:
+    """
+    Bounded queue of fetched tickers consumed by a pool of writer threads.
+
+    Parameters
+    ----------
+    pool : DatabaseConnectionPool
+        Pool the writers check their connections out of
+    writers : int
+        Number of writer threads
+    queue_size : int
+        Maximum number of tickers waiting to be written; ``put`` blocks when it is reached
+    batch_size : int
+        Maximum number of queued tickers merged in one transaction
+    write_mode : str
+        How fetched rows are written ("merge" or "upsert")
+    diff_executor : concurrent.futures.Executor, optional
+        Executor comparing fetched rows with the stored rows (see ``diff_records``)
+    on_written : Callable[[str, str, List, bool], None], optional
+        Called with (symbol, period, datasets, success) once a pass is committed or has failed
+    key_index : ExistingKeyIndex, optional
+        Stored keys of the run's tickers, shared by the writers (see ``add_datasets_to_db``)
+    """
+
+    def __init__(
+        self,
+        pool: DatabaseConnectionPool,
+        writers: int = DEFAULT_WRITERS,
+        queue_size: int = 16,
+        batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+        write_mode: str = "merge",
+        diff_executor=None,
+        on_written: Optional[Callable[[str, str, List[Any], bool], None]] = None,
+        key_index: Optional[ExistingKeyIndex] = None,
+    ):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.write_mode = write_mode
+        self.diff_executor = diff_executor
+        self.on_written = on_written
+        self.key_index = key_index
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = [
+            threading.Thread(target=self._write_loop, name=f"eden-write-{i}", daemon=True)
+            for i in range(writers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def put(self, symbol: str, passes: List[FetchedPass]):
+        """
+        Queue the fetched passes of a ticker, waiting while the queue is full.
+
+        Parameters
+        ----------
+        symbol : str
+            Stock symbol
+        passes : List[FetchedPass]
+            (period, datasets, frames, since_dates) of each pass, written in order in the
+            same transaction.  Passes whose fetch failed have ``frames`` set to None.
+        """
+        self._queue.put((symbol, passes))
+
+    def close(self):
+        """Write every queued ticker, then stop the writers."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _report(self, symbol, job_period, datasets, success):
+        if self.on_written is not None:
+            self.on_written(symbol, job_period, datasets, success)
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            writes = []
+            for symbol, passes in batch:
+                for job_period, datasets, frames, since_dates in passes:
+                    if frames is None:
+                        self._report(symbol, job_period, datasets, False)
+                    else:
+                        writes.append((symbol, job_period, datasets, frames, since_dates))
+            if writes:
+                try:
+                    with self.pool.connection() as connection:
+                        results = self._write_batch(connection, writes)
+                except Exception as e:
+                    print(f"Error writing {', '.join(dict.fromkeys(w[0] for w in writes))}: {e}")
+                    results = [False] * len(writes)
+                for (symbol, job_period, datasets, _, _), success in zip(writes, results):
+                    self._report(symbol, job_period, datasets, success)
+            if stop:
+                return
+
+    def _write_batch(self, connection, writes) -> List[bool]:
+        if len(writes) > 1 or self.write_mode == "upsert":
+            try:
+                with connection.cursor() as cursor:
+                    if self.write_mode == "upsert":
+                        upsert_fetched_datasets_batch(
+                            cursor,
+                            [(symbol, period, frames) for symbol, period, _, frames, _ in writes],
+                        )
+                    else:
+                        for symbol, job_period, _, frames, since_dates in writes:
+                            table_names = get_dataset_to_table_name(job_period)
+                            for dataset, new_data_df in frames.items():
+                                print(f"--Processing {symbol} for {table_names[dataset]} table.")
+                                process_fetched_dataset(
+                                    cursor,
+                                    symbol,
+                                    table_names[dataset],
+                                    new_data_df,
+                                    dataset,
+                                    since_date=since_dates.get(dataset),
+                                    write_mode=self.write_mode,
+                                    diff_executor=self.diff_executor,
+                                    key_index=self.key_index,
+                                )
+                connection.commit()
+                for symbol in dict.fromkeys(write[0] for write in writes):
+                    print(f"{symbol} processing complete.")
+                return [True] * len(writes)
+            except Exception as e:
+                connection.rollback()
+                for symbol, *_ in writes:
+                    # A company id registered in the rolled back transaction no longer exists
+                    get_company_id_cache().invalidate(symbol)
+                print(f"Batch of {len(writes)} pass(es) failed ({e}), writing them one at a time.")
+
+        return [
+            add_fetched_datasets_to_db(
+                connection,
+                symbol,
+                frames,
+                period=job_period,
+                since_dates=since_dates,
+                write_mode=self.write_mode,
+                diff_executor=self.diff_executor,
+                key_index=self.key_index,
+            )
+            for symbol, job_period, _, frames, since_dates in writes
+        ]
@@ -3,9 +3,11 @@ from project_eden.pipeline.data_ingestion_etl import (
 )
 from project_eden.pipeline.data_ingestion_parallel import (
     financial_data_ingestion_parallel_pipeline,
+    financial_data_ingestion_sharded_pipeline,
 )
 
 __all__ = [
     "financial_data_ingestion_pipeline",
     "financial_data_ingestion_parallel_pipeline",
+    "financial_data_ingestion_sharded_pipeline",
 ]
@@ -1,6 +1,6 @@
 from zenml import pipeline
 from typing import List, Optional
-from project_eden.db.data_ingestor import Datasets
+from project_eden.db.data_ingestor import Datasets, get_default_priority
 from project_eden.steps.data_ingestion import (
     load_configuration_step,
     get_tickers_step,
@@ -14,6 +14,10 @@ def financial_data_ingestion_pipeline(
     tickers: Optional[List[str]] = None,
     datasets: Optional[List[Datasets]] = None,
     period: str = "quarter",
+    use_async: bool = False,
+    incremental: bool = False,
+    write_mode: str = "merge",
+    priority: Optional[str] = None,
 ):
     """
     ZenML pipeline for ingesting financial data with rate limiting.
@@ -38,12 +42,25 @@ def financial_data_ingestion_pipeline(
     period : str, default="quarter"
         Period for data ingestion ("quarter", "fy", or "all").
         If "all", ingests both quarterly and fiscal year data.
+    use_async : bool, default=False
+        Keep requests for many tickers in flight at once using the asyncio fetch engine
+    incremental : bool, default=False
+        Only fetch prices and statements newer than each ticker's last stored ones
+    write_mode : str, default="merge"
+        How fetched rows are written: "merge" compares them with the stored rows, "upsert"
+        lets the database insert and update them with INSERT ... ON CONFLICT
+    priority : Optional[str], default=None
+        Rate limiter priority lane of the requests ("interactive", "incremental" or
+        "backfill").  If None, explicitly listed tickers are interactive and runs over
+        every company are incremental refreshes or backfills.
 
     Returns
     -------
     List[Tuple[str, bool]]
         List of tuples containing (ticker, success_status) for each processed ticker
     """
+    priority = priority or get_default_priority(tickers, incremental)
+
     # Step 1: Load configuration
     config = load_configuration_step(config_file=config_file)
 
@@ -55,7 +72,11 @@ def financial_data_ingestion_pipeline(
         tickers_list=tickers_list,
         config=config,
         datasets=datasets,
-        period=period
+        period=period,
+        use_async=use_async,
+        incremental=incremental,
+        write_mode=write_mode,
+        priority=priority,
     )
 
     return results
@@ -6,12 +6,15 @@ while respecting API rate limits through a shared token bucket rate limiter.
 """
 from zenml import pipeline, unmapped
 from typing import List, Optional
-from project_eden.db.data_ingestor import Datasets
+from project_eden.db.data_ingestor import Datasets, get_default_priority
+from project_eden.db.parallel_ingestor import DEFAULT_SHARD_SIZE
 from project_eden.steps.data_ingestion import (
     load_configuration_step,
     get_tickers_step,
     initialize_rate_limiter_step,
     ingest_ticker_data_parallel_step,
+    get_ticker_shards_step,
+    ingest_ticker_shard_step,
 )
 
 
@@ -21,6 +24,9 @@ def financial_data_ingestion_parallel_pipeline(
     tickers: Optional[List[str]] = None,
     datasets: Optional[List[Datasets]] = None,
     period: str = "quarter",
+    incremental: bool = False,
+    write_mode: str = "merge",
+    priority: Optional[str] = None,
 ):
     """
     ZenML dynamic pipeline for parallel ingestion of financial data with rate limiting.
@@ -49,6 +55,15 @@ def financial_data_ingestion_parallel_pipeline(
     period : str, default="quarter"
         Period for data ingestion ("quarter", "fy", or "all").
         If "all", ingests both quarterly and fiscal year data.
+    incremental : bool, default=False
+        Only fetch prices and statements newer than each ticker's last stored ones
+    write_mode : str, default="merge"
+        How fetched rows are written: "merge" compares them with the stored rows, "upsert"
+        lets the database insert and update them with INSERT ... ON CONFLICT
+    priority : Optional[str], default=None
+        Rate limiter priority lane of the requests ("interactive", "incremental" or
+        "backfill").  If None, explicitly listed tickers are interactive and runs over
+        every company are incremental refreshes or backfills.
 
     Returns
     -------
@@ -71,6 +86,8 @@ def financial_data_ingestion_parallel_pipeline(
     ...     period="all"
     ... )
     """
+    priority = priority or get_default_priority(tickers, incremental)
+
     # Step 1: Load configuration
     config = load_configuration_step(config_file=config_file)
 
@@ -86,8 +103,87 @@ def financial_data_ingestion_parallel_pipeline(
     results = ingest_ticker_data_parallel_step.map(
         ticker=tickers_list,
         config_file=unmapped(config_file),
-        period=unmapped(period)
+        period=unmapped(period),
+        incremental=unmapped(incremental),
+        write_mode=unmapped(write_mode),
+        priority=unmapped(priority),
     )
 
     return results
 
+
+@pipeline(dynamic=True, enable_cache=False)
+def financial_data_ingestion_sharded_pipeline(
+    config_file: str = "config.json",
+    tickers: Optional[List[str]] = None,
+    period: str = "quarter",
+    incremental: bool = False,
+    write_mode: str = "merge",
+    priority: Optional[str] = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    workers: int = 4,
+):
+    """
+    ZenML dynamic pipeline ingesting shards of tickers in parallel.
+
+    Like ``financial_data_ingestion_parallel_pipeline``, but maps one step over shards
+    of ``shard_size`` tickers instead of one step per ticker, so the step orchestration,
+    configuration loading and artifact writes are paid once per shard.  Each shard is
+    processed by an in-step pool of ``workers`` threads sharing the rate limiter, and
+    returns a single artifact listing its succeeded and failed tickers.
+
+    Parameters
+    ----------
+    config_file : str, default="config.json"
+        Path to the configuration file
+    tickers : Optional[List[str]], default=None
+        List of stock ticker symbols to process. If None, processes all companies.
+    period : str, default="quarter"
+        Period for data ingestion ("quarter", "fy", or "all").
+        If "all", ingests both quarterly and fiscal year data.
+    incremental : bool, default=False
+        Only fetch prices and statements newer than each ticker's last stored ones
+    write_mode : str, default="merge"
+        How fetched rows are written: "merge" compares them with the stored rows, "upsert"
+        lets the database insert and update them with INSERT ... ON CONFLICT
+    priority : Optional[str], default=None
+        Rate limiter priority lane of the requests.  If None, chosen as in
+        ``financial_data_ingestion_parallel_pipeline``.
+    shard_size : int, default=100
+        Maximum number of tickers per mapped step
+    workers : int, default=4
+        Number of worker threads within each mapped step
+
+    Returns
+    -------
+    List[Dict[str, List[str]]]
+        For each shard, its tickers under ``"succeeded"`` and ``"failed"``
+
+    Examples
+    --------
+    Run with all tickers for both periods, 200 tickers per step:
+    >>> financial_data_ingestion_sharded_pipeline(
+    ...     config_file="config.json",
+    ...     period="all",
+    ...     shard_size=200,
+    ...     workers=8,
+    ... )
+    """
+    priority = priority or get_default_priority(tickers, incremental)
+
+    config = load_configuration_step(config_file=config_file)
+    tickers_list = get_tickers_step(config=config, tickers=tickers)
+    initialize_rate_limiter_step(config=config)
+    shards = get_ticker_shards_step(tickers_list=tickers_list, shard_size=shard_size)
+
+    results = ingest_ticker_shard_step.map(
+        shard=shards,
+        config_file=unmapped(config_file),
+        period=unmapped(period),
+        incremental=unmapped(incremental),
+        write_mode=unmapped(write_mode),
+        priority=unmapped(priority),
+        workers=unmapped(workers),
+    )
+
+    return results
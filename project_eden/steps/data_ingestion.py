@@ -1,17 +1,28 @@
 from zenml import step
 from typing import List, Optional, Dict, Any, Tuple
 import pandas as pd
-import time
 from project_eden.db.data_ingestor import (
     get_company_tickers,
     gather_dataset,
     load_config,
     Datasets,
-    connect_to_database,
     add_datasets_to_db,
     handle_rate_limiting,
+    print_quota_status,
+    print_response_cache_stats,
 )
-from project_eden.utils.rate_limiter import get_rate_limiter
+from project_eden.db.async_ingestor import run_async_ingestion
+from project_eden.db.connection_pool import get_connection_pool
+from project_eden.db.create_tables import check_unique_constraints
+from project_eden.db.parallel_ingestor import (
+    DEFAULT_SHARD_SIZE,
+    get_ticker_shards,
+    ingest_tickers_parallel,
+)
+from project_eden.db.utils import warm_company_id_cache
+from project_eden.utils.rate_limiter import get_api_key_pool, set_priority_lane
+from project_eden.utils.http_client import get_http_client
+from project_eden.utils.quota import get_quota_tracker
 
 @step
 def load_configuration_step(config_file: str = "config.json") -> Dict[str, Any]:
@@ -25,7 +36,7 @@ def get_tickers_step(
 ) -> List[str]:
     """Get list of tickers to process."""
     if tickers is None:
-        ticker_dict = get_company_tickers(config)
+        ticker_dict = get_company_tickers(config, client=get_http_client(config))
         return [value_dict["ticker"] for value_dict in ticker_dict.values()]
     return [ticker.upper() for ticker in tickers]
 
@@ -84,12 +95,12 @@ def ingest_ticker_data_step(
     ticker: str,
     config: Dict[str, Any],
     datasets: Optional[List[Datasets]] = None,
-    period: str = "quarter"
+    period: str = "quarter",
+    incremental: bool = False,
+    write_mode: str = "merge",
 ) -> Tuple[str, bool]:
     """Ingest all datasets for a single ticker."""
     try:
-        connection = connect_to_database(config)
-
         datasets_to_process = datasets or [
             Datasets.PROFILE,
             Datasets.INCOME_STATEMENT,
@@ -98,15 +109,18 @@ def ingest_ticker_data_step(
             Datasets.HISTORTICAL_PRICE_EOD_FULL,
         ]
 
-        add_datasets_to_db(
-            connection=connection,
-            symbol=ticker,
-            datasets=datasets_to_process,
-            config=config,
-            period=period
-        )
+        with get_connection_pool(config).connection() as connection:
+            check_unique_constraints(connection, write_mode)
+            add_datasets_to_db(
+                connection=connection,
+                symbol=ticker,
+                datasets=datasets_to_process,
+                config=config,
+                period=period,
+                incremental=incremental,
+                write_mode=write_mode,
+            )
 
-        connection.close()
         return ticker, True
 
     except Exception as e:
@@ -119,13 +133,18 @@ def ingest_all_tickers_step(
     tickers_list: List[str],
     config: Dict[str, Any],
     datasets: Optional[List[Datasets]] = None,
-    period: str = "quarter"
+    period: str = "quarter",
+    use_async: bool = False,
+    incremental: bool = False,
+    write_mode: str = "merge",
+    priority: Optional[str] = None,
 ) -> List[Tuple[str, bool]]:
     """
     Ingest data for all tickers with rate limiting.
 
     This step processes each ticker sequentially with proper rate limiting
-    to respect API constraints.
+    to respect API constraints, or, with ``use_async``, keeps requests for many
+    tickers in flight at once using the asyncio fetch engine.
 
     Parameters
     ----------
@@ -138,15 +157,34 @@ def ingest_all_tickers_step(
     period : str, default="quarter"
         Period for data ingestion ("quarter", "fy", or "all").
         If "all", ingests both quarterly and fiscal year data.
+    use_async : bool, default=False
+        Use the asyncio fetch engine (only the default datasets are ingested)
+    incremental : bool, default=False
+        Only fetch prices and statements newer than each ticker's last stored ones
+    write_mode : str, default="merge"
+        How fetched rows are written: "merge" compares them with the stored rows, "upsert"
+        lets the database insert and update them with INSERT ... ON CONFLICT
+    priority : str, optional
+        Rate limiter priority lane of the requests ("interactive", "incremental" or
+        "backfill").  If None, the process' current lane is kept.
 
     Returns
     -------
     List[Tuple[str, bool]]
         List of tuples containing (ticker, success_status) for each processed ticker
     """
-    # Initialize rate limiting variables
-    counter = 0
-    start_time = time.time()
+    if priority is not None:
+        set_priority_lane(priority)
+
+    if use_async:
+        failed = run_async_ingestion(
+            tickers_list,
+            config,
+            period=period,
+            incremental=incremental,
+            write_mode=write_mode,
+        )
+        return [(ticker, ticker.upper() not in failed) for ticker in tickers_list]
 
     # Determine if we need to process both periods
     process_both_periods = period is None or period == "all"
@@ -165,7 +203,6 @@ def ingest_all_tickers_step(
             Datasets.CASH_FLOW_STATEMENT,
             Datasets.BALANCE_SHEET_STATEMENT,
         ]
-        api_calls_per_ticker = len(datasets_quarter) + len(datasets_fy)
     else:
         # Single period processing
         datasets_to_process = datasets or [
@@ -175,56 +212,76 @@ def ingest_all_tickers_step(
             Datasets.BALANCE_SHEET_STATEMENT,
             Datasets.HISTORTICAL_PRICE_EOD_FULL,
         ]
-        api_calls_per_ticker = len(datasets_to_process)
 
     results = []
+    client = get_http_client(config)
+    pool = get_connection_pool(config)
 
-    for ticker in tickers_list:
-        # Apply rate limiting before processing each ticker
-        counter += api_calls_per_ticker
-        counter, start_time = handle_rate_limiting(counter, start_time, config)
+    # Resolve every known symbol's company id once for the whole run
+    with pool.connection() as connection:
+        check_unique_constraints(connection, write_mode)
+        warm_company_id_cache(connection)
 
-        # Ingest data for the ticker
-        try:
-            connection = connect_to_database(config)
+    quota = get_quota_tracker(config)
+    print_quota_status(config, len(tickers_list), period)
 
-            if process_both_periods:
-                # Process quarterly data
-                add_datasets_to_db(
-                    connection=connection,
-                    symbol=ticker,
-                    datasets=datasets_quarter,
-                    config=config,
-                    period="quarter"
-                )
+    # Every API request takes a token from the global rate limiter when it is sent
+    for i, ticker in enumerate(tickers_list):
+        if quota is not None and quota.is_exhausted():
+            print(f"API quota used up, skipping the remaining {len(tickers_list) - i} ticker(s).")
+            results.extend((remaining, False) for remaining in tickers_list[i:])
+            break
 
-                # Process fiscal year data
-                add_datasets_to_db(
-                    connection=connection,
-                    symbol=ticker,
-                    datasets=datasets_fy,
-                    config=config,
-                    period="fy"
-                )
-                print(f"Successfully processed {ticker} (both periods)")
-            else:
-                # Process single period
-                add_datasets_to_db(
-                    connection=connection,
-                    symbol=ticker,
-                    datasets=datasets_to_process,
-                    config=config,
-                    period=period
-                )
-                print(f"Successfully processed {ticker}")
+        # Ingest data for the ticker
+        try:
+            # Pooled connections are reused from one ticker to the next
+            with pool.connection() as connection:
+                if process_both_periods:
+                    # Process quarterly data
+                    add_datasets_to_db(
+                        connection=connection,
+                        symbol=ticker,
+                        datasets=datasets_quarter,
+                        config=config,
+                        period="quarter",
+                        client=client,
+                        incremental=incremental,
+                        write_mode=write_mode,
+                    )
+
+                    # Process fiscal year data
+                    add_datasets_to_db(
+                        connection=connection,
+                        symbol=ticker,
+                        datasets=datasets_fy,
+                        config=config,
+                        period="fy",
+                        client=client,
+                        incremental=incremental,
+                        write_mode=write_mode,
+                    )
+                    print(f"Successfully processed {ticker} (both periods)")
+                else:
+                    # Process single period
+                    add_datasets_to_db(
+                        connection=connection,
+                        symbol=ticker,
+                        datasets=datasets_to_process,
+                        config=config,
+                        period=period,
+                        client=client,
+                        incremental=incremental,
+                        write_mode=write_mode,
+                    )
+                    print(f"Successfully processed {ticker}")
 
-            connection.close()
             results.append((ticker, True))
 
         except Exception as e:
             print(f"Error processing {ticker}: {e}")
             results.append((ticker, False))
 
+    print_response_cache_stats(config)
     return results
 
 
@@ -246,9 +303,12 @@ def initialize_rate_limiter_step(config: Dict[str, Any]) -> Dict[str, Any]:
     Dict[str, Any]
         The same config (for chaining)
     """
-    rate_limiter = get_rate_limiter(config)
-    print(f"Rate limiter initialized: {config['api']['rate_limit_per_min']} calls/min")
-    print(f"Available tokens: {rate_limiter.get_available_tokens():.2f}")
+    key_pool = get_api_key_pool(config)
+    print(
+        f"Rate limiter initialized: {key_pool.rate_limit_per_min:.0f} calls/min "
+        f"over {len(key_pool.limiters)} API key(s)"
+    )
+    print(f"Available tokens: {key_pool.get_available_tokens():.2f}")
     return config
 
 
@@ -257,13 +317,18 @@ def ingest_ticker_data_parallel_step(
     ticker: str,
     config_file: str,
     datasets: Optional[List[Datasets]] = None,
-    period: str = "quarter"
+    period: str = "quarter",
+    incremental: bool = False,
+    write_mode: str = "merge",
+    priority: Optional[str] = None,
 ) -> Tuple[str, bool]:
     """
     Ingest all datasets for a single ticker with rate limiting for parallel execution.
 
     This step uses a shared rate limiter to coordinate with other parallel workers,
     ensuring the total API call rate across all workers doesn't exceed the limit.
+    A token is acquired right before each API request is sent, so cached responses
+    and skipped datasets cost nothing and database work overlaps with waiting.
 
     Parameters
     ----------
@@ -276,6 +341,14 @@ def ingest_ticker_data_parallel_step(
     period : str, default="quarter"
         Period for data ingestion ("quarter", "fy", or "all").
         If "all", ingests both quarterly and fiscal year data.
+    incremental : bool, default=False
+        Only fetch prices and statements newer than the ticker's last stored ones
+    write_mode : str, default="merge"
+        How fetched rows are written: "merge" compares them with the stored rows, "upsert"
+        lets the database insert and update them with INSERT ... ON CONFLICT
+    priority : str, optional
+        Rate limiter priority lane of the requests ("interactive", "incremental" or
+        "backfill").  If None, the process' current lane is kept.
 
     Returns
     -------
@@ -283,9 +356,15 @@ def ingest_ticker_data_parallel_step(
         Tuple of (ticker, success_status)
     """
     try:
+        if priority is not None:
+            set_priority_lane(priority)
+
         # Load configuration
         config = load_config(config_file)
 
+        # Shared keep-alive HTTP client (one per worker process, safe across threads)
+        client = get_http_client(config)
+
         # Determine if we need to process both periods
         process_both_periods = period is None or period == "all"
 
@@ -306,36 +385,33 @@ def ingest_ticker_data_parallel_step(
                 Datasets.BALANCE_SHEET_STATEMENT,
             ]
 
-            num_api_calls = len(datasets_quarter) + len(datasets_fy)
-
-            # Acquire tokens from the shared rate limiter before making API calls
-            rate_limiter = get_rate_limiter(config)
-            print(f"[{ticker}] Acquiring {num_api_calls} tokens from rate limiter (both periods)...")
-            rate_limiter.acquire(num_api_calls)
-            print(f"[{ticker}] Tokens acquired, starting ingestion for both periods...")
-
-            # Now we have permission to make the API calls
-            connection = connect_to_database(config)
-
-            # Process quarterly data
-            add_datasets_to_db(
-                connection=connection,
-                symbol=ticker,
-                datasets=datasets_quarter,
-                config=config,
-                period="quarter"
-            )
+            print(f"[{ticker}] Starting ingestion for both periods...")
+            with get_connection_pool(config).connection() as connection:
+                check_unique_constraints(connection, write_mode)
+                # Process quarterly data
+                add_datasets_to_db(
+                    connection=connection,
+                    symbol=ticker,
+                    datasets=datasets_quarter,
+                    config=config,
+                    period="quarter",
+                    client=client,
+                    incremental=incremental,
+                    write_mode=write_mode,
+                )
 
-            # Process fiscal year data
-            add_datasets_to_db(
-                connection=connection,
-                symbol=ticker,
-                datasets=datasets_fy,
-                config=config,
-                period="fy"
-            )
+                # Process fiscal year data
+                add_datasets_to_db(
+                    connection=connection,
+                    symbol=ticker,
+                    datasets=datasets_fy,
+                    config=config,
+                    period="fy",
+                    client=client,
+                    incremental=incremental,
+                    write_mode=write_mode,
+                )
 
-            connection.close()
             print(f"[{ticker}] Successfully processed both periods")
             return ticker, True
         else:
@@ -347,29 +423,103 @@ def ingest_ticker_data_parallel_step(
                 Datasets.BALANCE_SHEET_STATEMENT,
                 Datasets.HISTORTICAL_PRICE_EOD_FULL,
             ]
-            num_api_calls = len(datasets_to_process)
-
-            # Acquire tokens from the shared rate limiter before making API calls
-            rate_limiter = get_rate_limiter(config)
-            print(f"[{ticker}] Acquiring {num_api_calls} tokens from rate limiter...")
-            rate_limiter.acquire(num_api_calls)
-            print(f"[{ticker}] Tokens acquired, starting ingestion...")
-
-            # Now we have permission to make the API calls
-            connection = connect_to_database(config)
-
-            add_datasets_to_db(
-                connection=connection,
-                symbol=ticker,
-                datasets=datasets_to_process,
-                config=config,
-                period=period
-            )
+            print(f"[{ticker}] Starting ingestion...")
+            with get_connection_pool(config).connection() as connection:
+                check_unique_constraints(connection, write_mode)
+                add_datasets_to_db(
+                    connection=connection,
+                    symbol=ticker,
+                    datasets=datasets_to_process,
+                    config=config,
+                    period=period,
+                    client=client,
+                    incremental=incremental,
+                    write_mode=write_mode,
+                )
 
-            connection.close()
             print(f"[{ticker}] Successfully processed")
             return ticker, True
 
     except Exception as e:
         print(f"[{ticker}] Error processing: {e}")
-        return ticker, False
\ No newline at end of file
+        return ticker, False
+
+
+@step
+def get_ticker_shards_step(
+    tickers_list: List[str], shard_size: int = DEFAULT_SHARD_SIZE
+) -> List[List[str]]:
+    """Split the tickers into shards of at most ``shard_size``, one per mapped step."""
+    shards = get_ticker_shards(tickers_list, shard_size)
+    print(f"Split {sum(len(shard) for shard in shards)} ticker(s) into {len(shards)} shard(s)")
+    return shards
+
+
+@step
+def ingest_ticker_shard_step(
+    shard: List[str],
+    config_file: str,
+    period: str = "quarter",
+    incremental: bool = False,
+    write_mode: str = "merge",
+    priority: Optional[str] = None,
+    workers: int = 4,
+) -> Dict[str, List[str]]:
+    """
+    Ingest a shard of tickers with an in-step pool of worker threads.
+
+    Mapping this step over shards instead of mapping ``ingest_ticker_data_parallel_step``
+    over tickers pays the step orchestration, configuration loading and artifact writes
+    once per shard.  Within the step, tickers are processed by the worker pool engine
+    (see ``project_eden.db.parallel_ingestor``), whose requests take tokens from the
+    shared rate limiter.
+
+    Parameters
+    ----------
+    shard : List[str]
+        Stock ticker symbols to process
+    config_file : str
+        Path to configuration file
+    period : str, default="quarter"
+        Period for data ingestion ("quarter", "fy", or "all").
+        If "all", ingests both quarterly and fiscal year data.
+    incremental : bool, default=False
+        Only fetch prices and statements newer than each ticker's last stored ones
+    write_mode : str, default="merge"
+        How fetched rows are written: "merge" compares them with the stored rows, "upsert"
+        lets the database insert and update them with INSERT ... ON CONFLICT
+    priority : str, optional
+        Rate limiter priority lane of the requests ("interactive", "incremental" or
+        "backfill").  If None, the process' current lane is kept.
+    workers : int, default=4
+        Number of worker threads processing the shard's tickers
+
+    Returns
+    -------
+    Dict[str, List[str]]
+        The shard's upper-cased symbols under ``"succeeded"`` and ``"failed"``
+    """
+    symbols = list(dict.fromkeys(ticker.upper() for ticker in shard))
+    try:
+        if priority is not None:
+            set_priority_lane(priority)
+
+        config = load_config(config_file)
+        failed = set(
+            ingest_tickers_parallel(
+                symbols,
+                config,
+                period=period,
+                workers=workers,
+                incremental=incremental,
+                write_mode=write_mode,
+            )
+        )
+    except Exception as e:
+        print(f"Error processing shard {symbols[0]}..{symbols[-1]}: {e}")
+        failed = set(symbols)
+
+    return {
+        "succeeded": [symbol for symbol in symbols if symbol not in failed],
+        "failed": [symbol for symbol in symbols if symbol in failed],
+    }
@@ -1,14 +1,89 @@
 """Utility modules for Project Eden."""
 
 from project_eden.utils.rate_limiter import (
+    APIKeyPool,
+    AsyncSharedTokenBucketRateLimiter,
+    AsyncTokenBucketRateLimiter,
+    PriorityLanes,
+    SharedTokenBucketRateLimiter,
     TokenBucketRateLimiter,
+    create_async_api_key_pool,
+    create_async_rate_limiter,
+    create_rate_limiter,
+    get_api_key_pool,
+    get_api_keys,
+    get_priority_lane,
     get_rate_limiter,
     reset_rate_limiter,
+    set_priority_lane,
+)
+from project_eden.utils.http_client import (
+    HTTPClient,
+    get_http_client,
+    reset_http_client,
+)
+from project_eden.utils.quota import (
+    QuotaExceededError,
+    QuotaTracker,
+    get_quota_tracker,
+    reset_quota_tracker,
+)
+from project_eden.utils.retry import (
+    AdaptiveRateController,
+    CircuitBreaker,
+    RetryHandler,
+    RetryPolicy,
+    get_circuit_breaker,
+    get_retry_handler,
+    reset_retry_handler,
+)
+from project_eden.utils.response_cache import (
+    ResponseCache,
+    get_response_cache,
+    reset_response_cache,
+)
+from project_eden.utils.run_state import (
+    IngestionRun,
+    RunStateStore,
+    get_run_state_store,
+    reset_run_state_store,
 )
 
 __all__ = [
+    "APIKeyPool",
+    "AsyncSharedTokenBucketRateLimiter",
+    "AsyncTokenBucketRateLimiter",
+    "PriorityLanes",
+    "SharedTokenBucketRateLimiter",
     "TokenBucketRateLimiter",
+    "create_async_api_key_pool",
+    "create_async_rate_limiter",
+    "create_rate_limiter",
+    "get_api_key_pool",
+    "get_api_keys",
+    "get_priority_lane",
     "get_rate_limiter",
     "reset_rate_limiter",
+    "set_priority_lane",
+    "HTTPClient",
+    "get_http_client",
+    "reset_http_client",
+    "QuotaExceededError",
+    "QuotaTracker",
+    "get_quota_tracker",
+    "reset_quota_tracker",
+    "AdaptiveRateController",
+    "CircuitBreaker",
+    "RetryHandler",
+    "RetryPolicy",
+    "get_circuit_breaker",
+    "get_retry_handler",
+    "reset_retry_handler",
+    "ResponseCache",
+    "get_response_cache",
+    "reset_response_cache",
+    "IngestionRun",
+    "RunStateStore",
+    "get_run_state_store",
+    "reset_run_state_store",
 ]
-
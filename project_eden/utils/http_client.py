@@ -0,0 +1,295 @@
+"""
+Thread-safe keep-alive HTTP client for API calls.
+
+This module provides an HTTP client that keeps a pool of persistent connections
+per host and a single shared SSL context, so repeated API calls reuse an open
+TCP/TLS connection instead of performing a new handshake (and re-parsing the CA
+bundle) for every request.
+"""
+import gzip
+import http.client
+import io
+import json
+import ssl
+import threading
+from typing import Dict, Any, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.parse import urlsplit, urljoin
+
+import certifi
+
+
+class RequestNotSentError(ConnectionError):
+    """Raised when no connection to the host could be opened, so the request was never sent."""
+
+
+class HTTPConnectionPool:
+    """
+    Thread-safe pool of persistent connections to a single host.
+
+    Connections are created on demand, so there is never any blocking when
+    more threads than ``max_idle`` make requests at the same time.  Only up to
+    ``max_idle`` connections are kept open between requests; extra connections
+    are closed when they are returned.
+
+    Parameters
+    ----------
+    scheme : str
+        Either "http" or "https"
+    host : str
+        Host name to connect to
+    port : int, optional
+        Port to connect to.  If None, the default port for the scheme is used.
+    ssl_context : ssl.SSLContext, optional
+        SSL context shared by all HTTPS connections
+    max_idle : int, default=10
+        Maximum number of idle connections kept open
+    timeout : float, default=30.0
+        Socket timeout in seconds
+    """
+
+    def __init__(
+        self,
+        scheme: str,
+        host: str,
+        port: Optional[int] = None,
+        ssl_context: Optional[ssl.SSLContext] = None,
+        max_idle: int = 10,
+        timeout: float = 30.0,
+    ):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout, context=self.ssl_context
+            )
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def get_connection(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """
+        Check out a connection from the pool.
+
+        Returns
+        -------
+        Tuple[http.client.HTTPConnection, bool]
+            The connection and whether it was reused from the idle pool
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._new_connection(), False
+
+    def release(self, connection: http.client.HTTPConnection) -> None:
+        """Return a healthy connection to the pool (or close it if the pool is full)."""
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class HTTPClient:
+    """
+    Thread-safe HTTP client with a keep-alive connection pool per host.
+
+    A single instance is meant to be shared by every caller in the process (see
+    ``get_http_client``).  All HTTPS connections share one SSL context.
+
+    Parameters
+    ----------
+    max_idle_per_host : int, default=10
+        Maximum number of idle keep-alive connections kept per host
+    timeout : float, default=30.0
+        Socket timeout in seconds
+    max_redirects : int, default=5
+        Maximum number of redirects followed for a single request
+    """
+
+    def __init__(self, max_idle_per_host: int = 10, timeout: float = 30.0, max_redirects: int = 5):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.ssl_context = ssl.create_default_context(cafile=certifi.where())
+        self._pools: Dict[Tuple[str, str, Optional[int]], HTTPConnectionPool] = {}
+        self._pools_lock = threading.Lock()
+
+    def _get_pool(self, scheme: str, host: str, port: Optional[int]) -> HTTPConnectionPool:
+        pool_key = (scheme, host, port)
+        with self._pools_lock:
+            pool = self._pools.get(pool_key)
+            if pool is None:
+                pool = HTTPConnectionPool(
+                    scheme,
+                    host,
+                    port,
+                    ssl_context=self.ssl_context,
+                    max_idle=self.max_idle_per_host,
+                    timeout=self.timeout,
+                )
+                self._pools[pool_key] = pool
+            return pool
+
+    def _request_once(
+        self, url: str, headers: Dict[str, str]
+    ) -> Tuple[http.client.HTTPResponse, bytes]:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {parts.scheme}")
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+        pool = self._get_pool(parts.scheme, parts.hostname, parts.port)
+
+        # A pooled connection may have been closed by the server while idle.  In
+        # that case retry exactly once on a brand-new connection.
+        for attempt in range(2):
+            connection, reused = pool.get_connection()
+            if connection.sock is None:
+                try:
+                    connection.connect()
+                except OSError as error:
+                    connection.close()
+                    raise RequestNotSentError(
+                        f"Could not connect to {parts.hostname}: {error}"
+                    ) from error
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                pool.release(connection)
+            return response, body
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> bytes:
+        """
+        Perform a GET request and return the (decompressed) response body.
+
+        Parameters
+        ----------
+        url : str
+            The URL to request
+        headers : Dict[str, str], optional
+            Extra request headers
+
+        Returns
+        -------
+        bytes
+            The response body
+
+        Raises
+        ------
+        urllib.error.HTTPError
+            If the server responds with a 4xx or 5xx status code
+        """
+        request_headers = {"Accept-Encoding": "gzip", "Connection": "keep-alive"}
+        if headers:
+            request_headers.update(headers)
+
+        for _ in range(self.max_redirects + 1):
+            response, body = self._request_once(url, request_headers)
+            if response.status in (301, 302, 303, 307, 308) and response.getheader("Location"):
+                url = urljoin(url, response.getheader("Location"))
+                continue
+            break
+
+        if response.getheader("Content-Encoding", "").lower() == "gzip":
+            body = gzip.decompress(body)
+
+        if response.status >= 400:
+            raise HTTPError(
+                url, response.status, response.reason, response.headers, io.BytesIO(body)
+            )
+        return body
+
+    def get_json(self, url: str, headers: Optional[Dict[str, str]] = None) -> Any:
+        """
+        Perform a GET request and parse the response body as JSON.
+
+        Parameters
+        ----------
+        url : str
+            The URL to request
+        headers : Dict[str, str], optional
+            Extra request headers
+
+        Returns
+        -------
+        Any
+            The parsed JSON response
+        """
+        return json.loads(self.get(url, headers=headers).decode("utf-8"))
+
+    def close(self) -> None:
+        """Close all idle connections in every host pool."""
+        with self._pools_lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close()
+
+
+# Global HTTP client instance (shared across all workers)
+_global_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client(config: Dict[str, Any] = None) -> HTTPClient:
+    """
+    Get or create the global HTTP client instance.
+
+    This ensures all workers in the process share the same connection pools and
+    SSL context.
+
+    Parameters
+    ----------
+    config : Dict[str, Any], optional
+        Configuration dictionary.  The optional ``api.max_connections_per_host``
+        and ``api.timeout`` settings are used when creating a new client.
+
+    Returns
+    -------
+    HTTPClient
+        The global HTTP client instance
+    """
+    global _global_http_client
+
+    with _http_client_lock:
+        if _global_http_client is None:
+            api_config = (config or {}).get("api", {})
+            _global_http_client = HTTPClient(
+                max_idle_per_host=api_config.get("max_connections_per_host", 10),
+                timeout=api_config.get("timeout", 30.0),
+            )
+
+        return _global_http_client
+
+
+def reset_http_client():
+    """Close and reset the global HTTP client (useful for testing)."""
+    global _global_http_client
+    with _http_client_lock:
+        if _global_http_client is not None:
+            _global_http_client.close()
+        _global_http_client = None
@@ -0,0 +1,340 @@
+"""
+Daily call and monthly bandwidth quotas of the API plan.
+
+Besides the per-minute rate enforced by the rate limiter, API plans cap the
+number of calls per day and the bandwidth per month.  Usage is counted in a
+SQLite database so that it persists across runs (and is shared by every process
+using the same file), and requests are refused once a budget is spent instead
+of failing mid-run on the provider's side.  Days and months are counted in UTC.
+"""
+import datetime
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+DEFAULT_QUOTA_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "project_eden", "quota.sqlite"
+)
+
+
+class QuotaExceededError(RuntimeError):
+    """Raised when a request would exceed the daily call or monthly bandwidth quota."""
+
+
+class QuotaTracker:
+    """
+    Thread- and process-safe tracker of the API calls and bytes used per day and month.
+
+    Parameters
+    ----------
+    path : str
+        Path of the SQLite database file.  Parent directories are created as needed.
+    daily_call_limit : int, optional
+        Maximum number of API calls per day.  If None, calls are only counted.
+    monthly_bandwidth_bytes : int, optional
+        Maximum number of response bytes per month.  If None, bytes are only counted.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_QUOTA_PATH,
+        daily_call_limit: Optional[int] = None,
+        monthly_bandwidth_bytes: Optional[int] = None,
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.daily_call_limit = daily_call_limit
+        self.monthly_bandwidth_bytes = monthly_bandwidth_bytes
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=30.0
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS usage (
+                period TEXT PRIMARY KEY,
+                calls INTEGER NOT NULL,
+                bytes INTEGER NOT NULL
+            )
+            """
+        )
+
+    @staticmethod
+    def _get_periods(now: Optional[datetime.datetime] = None) -> Dict[str, str]:
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        return {"day": f"day:{now:%Y-%m-%d}", "month": f"month:{now:%Y-%m}"}
+
+    def record(
+        self, num_calls: int = 1, num_bytes: int = 0, now: Optional[datetime.datetime] = None
+    ) -> None:
+        """
+        Count API calls and response bytes against the current day and month.
+
+        Parameters
+        ----------
+        num_calls : int, default=1
+            Number of API calls made
+        num_bytes : int, default=0
+            Number of response bytes received
+        now : datetime.datetime, optional
+            Timezone-aware time of the calls. If None, uses the current time
+        """
+        with self._lock:
+            self._add_usage(self._get_periods(now), num_calls, num_bytes)
+
+    def reserve(self, num_calls: int = 1, now: Optional[datetime.datetime] = None) -> None:
+        """
+        Check the budgets and count ``num_calls`` calls against them in one transaction.
+
+        Unlike ``check`` followed by ``record``, no other thread or process can spend the
+        same remaining calls in between, so concurrent requests never overshoot the
+        daily call limit.  Call this right before sending the requests, then add their
+        response bytes with ``record(0, num_bytes)``, or give the calls back with
+        ``release`` if the requests were not sent after all.
+
+        Parameters
+        ----------
+        num_calls : int, default=1
+            Number of API calls about to be made
+        now : datetime.datetime, optional
+            Timezone-aware current time. If None, uses the current time
+
+        Raises
+        ------
+        QuotaExceededError
+            If the daily calls or the monthly bandwidth are used up
+        """
+        periods = self._get_periods(now)
+        with self._lock:
+            # Take the write lock of the database before reading, so that the usage read
+            # is still current when it is incremented
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._check_usage(self._read_usage(periods), num_calls)
+                self._add_usage(periods, num_calls, 0)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def release(self, num_calls: int = 1, now: Optional[datetime.datetime] = None) -> None:
+        """
+        Give back calls counted by ``reserve`` for requests that were never sent.
+
+        Parameters
+        ----------
+        num_calls : int, default=1
+            Number of reserved API calls that were not made
+        now : datetime.datetime, optional
+            Timezone-aware time of the reservation. If None, uses the current time
+        """
+        with self._lock:
+            self._add_usage(self._get_periods(now), -num_calls, 0)
+
+    def _add_usage(self, periods: Dict[str, str], num_calls: int, num_bytes: int) -> None:
+        # Released calls never take the count below zero
+        self._connection.executemany(
+            "INSERT INTO usage (period, calls, bytes) VALUES (?1, max(?2, 0), ?3) "
+            "ON CONFLICT (period) DO UPDATE "
+            "SET calls = max(calls + ?2, 0), bytes = bytes + ?3",
+            [(period, num_calls, num_bytes) for period in periods.values()],
+        )
+
+    def _read_usage(self, periods: Dict[str, str]) -> Dict[str, int]:
+        rows = dict(
+            (period, (calls, num_bytes))
+            for period, calls, num_bytes in self._connection.execute(
+                "SELECT period, calls, bytes FROM usage WHERE period IN (?, ?)",
+                (periods["day"], periods["month"]),
+            )
+        )
+        daily_calls, _ = rows.get(periods["day"], (0, 0))
+        monthly_calls, monthly_bytes = rows.get(periods["month"], (0, 0))
+        return {
+            "daily_calls": daily_calls,
+            "monthly_calls": monthly_calls,
+            "monthly_bytes": monthly_bytes,
+        }
+
+    def _get_remaining(self, usage: Dict[str, int]) -> Dict[str, Optional[int]]:
+        return {
+            "daily_calls": None
+            if self.daily_call_limit is None
+            else max(0, self.daily_call_limit - usage["daily_calls"]),
+            "monthly_bytes": None
+            if self.monthly_bandwidth_bytes is None
+            else max(0, self.monthly_bandwidth_bytes - usage["monthly_bytes"]),
+        }
+
+    def _check_usage(self, usage: Dict[str, int], num_calls: int) -> None:
+        remaining = self._get_remaining(usage)
+        if remaining["daily_calls"] is not None and remaining["daily_calls"] < num_calls:
+            raise QuotaExceededError(
+                f"Daily API call quota of {self.daily_call_limit} calls is used up"
+            )
+        if remaining["monthly_bytes"] is not None and remaining["monthly_bytes"] <= 0:
+            raise QuotaExceededError(
+                f"Monthly API bandwidth quota of "
+                f"{self.monthly_bandwidth_bytes / 1024 ** 3:.1f} GB is used up"
+            )
+
+    def get_usage(self, now: Optional[datetime.datetime] = None) -> Dict[str, int]:
+        """
+        Return the calls made today and the calls and bytes used this month.
+
+        Parameters
+        ----------
+        now : datetime.datetime, optional
+            Timezone-aware current time. If None, uses the current time
+
+        Returns
+        -------
+        Dict[str, int]
+            ``daily_calls``, ``monthly_calls`` and ``monthly_bytes``
+        """
+        periods = self._get_periods(now)
+        with self._lock:
+            return self._read_usage(periods)
+
+    def get_remaining(self, now: Optional[datetime.datetime] = None) -> Dict[str, Optional[int]]:
+        """
+        Return what is left of each budget.
+
+        Parameters
+        ----------
+        now : datetime.datetime, optional
+            Timezone-aware current time. If None, uses the current time
+
+        Returns
+        -------
+        Dict[str, Optional[int]]
+            ``daily_calls`` and ``monthly_bytes`` left, or None for budgets without a limit
+        """
+        return self._get_remaining(self.get_usage(now))
+
+    def check(self, num_calls: int = 1, now: Optional[datetime.datetime] = None) -> None:
+        """
+        Make sure the budgets allow ``num_calls`` more calls.
+
+        Parameters
+        ----------
+        num_calls : int, default=1
+            Number of API calls about to be made
+        now : datetime.datetime, optional
+            Timezone-aware current time. If None, uses the current time
+
+        Raises
+        ------
+        QuotaExceededError
+            If the daily calls or the monthly bandwidth are used up
+        """
+        self._check_usage(self.get_usage(now), num_calls)
+
+    def is_exhausted(self, now: Optional[datetime.datetime] = None) -> bool:
+        """Return True if no further call fits in the budgets."""
+        try:
+            self.check(now=now)
+        except QuotaExceededError:
+            return True
+        return False
+
+    def get_affordable_tickers(
+        self,
+        calls_per_ticker: int,
+        bytes_per_ticker: Optional[int] = None,
+        now: Optional[datetime.datetime] = None,
+    ) -> Optional[int]:
+        """
+        Estimate how many more tickers the budgets allow.
+
+        Parameters
+        ----------
+        calls_per_ticker : int
+            Number of API calls needed per ticker
+        bytes_per_ticker : int, optional
+            Number of response bytes expected per ticker.  If None, it is estimated
+            from the average response size of this month's calls.
+        now : datetime.datetime, optional
+            Timezone-aware current time. If None, uses the current time
+
+        Returns
+        -------
+        int, optional
+            Number of tickers that fit in the budgets, or None if there are no limits
+        """
+        remaining = self.get_remaining(now)
+        affordable = []
+        if remaining["daily_calls"] is not None:
+            affordable.append(remaining["daily_calls"] // max(1, calls_per_ticker))
+        if remaining["monthly_bytes"] is not None:
+            if bytes_per_ticker is None:
+                usage = self.get_usage(now)
+                if usage["monthly_calls"]:
+                    bytes_per_ticker = (
+                        usage["monthly_bytes"] / usage["monthly_calls"] * calls_per_ticker
+                    )
+            if bytes_per_ticker:
+                affordable.append(int(remaining["monthly_bytes"] // bytes_per_ticker))
+            elif remaining["monthly_bytes"] <= 0:
+                affordable.append(0)
+        return min(affordable) if affordable else None
+
+    def close(self):
+        """Close the underlying database."""
+        with self._lock:
+            self._connection.close()
+
+
+# Global quota tracker instance (disabled until configured)
+_global_quota_tracker: Optional[QuotaTracker] = None
+_quota_tracker_lock = threading.Lock()
+
+
+def get_quota_tracker(config: Dict[str, Any] = None) -> Optional[QuotaTracker]:
+    """
+    Get or create the global quota tracker instance.
+
+    Parameters
+    ----------
+    config : Dict[str, Any], optional
+        Configuration dictionary.  Quotas are only tracked if ``api.quota`` sets
+        ``daily_calls`` or ``monthly_bandwidth_gb``; ``api.quota.path`` is the
+        location of the usage database.
+
+    Returns
+    -------
+    QuotaTracker, optional
+        The global quota tracker, or None if no quota is configured
+    """
+    global _global_quota_tracker
+
+    quota_config = (config or {}).get("api", {}).get("quota", {})
+    with _quota_tracker_lock:
+        if _global_quota_tracker is None:
+            daily_calls = quota_config.get("daily_calls")
+            monthly_bandwidth_gb = quota_config.get("monthly_bandwidth_gb")
+            if daily_calls is None and monthly_bandwidth_gb is None:
+                return None
+            _global_quota_tracker = QuotaTracker(
+                path=os.path.expanduser(quota_config.get("path", DEFAULT_QUOTA_PATH)),
+                daily_call_limit=daily_calls,
+                monthly_bandwidth_bytes=None
+                if monthly_bandwidth_gb is None
+                else int(monthly_bandwidth_gb * 1024 ** 3),
+            )
+
+        return _global_quota_tracker
+
+
+def reset_quota_tracker():
+    """Close and reset the global quota tracker (useful for testing)."""
+    global _global_quota_tracker
+    with _quota_tracker_lock:
+        if _global_quota_tracker is not None:
+            _global_quota_tracker.close()
+        _global_quota_tracker = None
@@ -2,11 +2,215 @@
 Thread-safe rate limiter for parallel API calls.
 
 This module provides a token bucket rate limiter that can be shared across
-parallel workers to ensure API rate limits are respected.
+parallel workers to ensure API rate limits are respected, an asyncio
+counterpart for coroutine-based fetching, a file-backed bucket that is
+shared by every process on the same host, and a pool that spreads requests
+over several API keys, each with its own bucket.
+
+Every bucket serves its waiters by priority lane (interactive, incremental,
+backfill), so a small interactive run is not starved by a backfill that
+saturates the rate limit.
 """
+import asyncio
+import hashlib
+import os
+import struct
 import threading
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple, Union
+from urllib.error import HTTPError
+
+from project_eden.utils.retry import AdaptiveRateController, is_throttling_error
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+RATE_LIMITER_BACKENDS = ["local", "file"]
+DEFAULT_RATE_LIMITER_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "project_eden", "rate_limiter.state"
+)
+
+# Priority lanes from the most to the least urgent, and their default weights.
+# When every lane has waiters, each lane gets a share of the tokens proportional
+# to its weight, so even backfill work is guaranteed 1/21 of the rate.
+PRIORITY_LANES = ["interactive", "incremental", "backfill"]
+DEFAULT_LANE_WEIGHTS = {"interactive": 16, "incremental": 4, "backfill": 1}
+DEFAULT_PRIORITY_LANE = "interactive"
+
+# Waiters on a shared bucket check it at least this often, and a lane whose waiters
+# have not checked it for LANE_STALE_SECONDS (e.g. because their process died) is
+# considered idle.
+MAX_POLL_SECONDS = 1.0
+LANE_STALE_SECONDS = 5.0
+
+# A backoff on a shared bucket that its process has not renewed for this long (e.g.
+# because the process died) is lifted
+BACKOFF_STALE_SECONDS = 60.0
+
+# Layout of the shared bucket state: available tokens and time of the last refill,
+# followed by the lane scheduler state (see PriorityLanes.pack), the backoff (rate
+# limit, Unix time it lapses, and process id and id of the limiter that set it) and
+# the Unix time until which the circuit breaker is open
+_STATE_FORMAT = "dd"
+_STATE_SIZE = struct.calcsize(_STATE_FORMAT)
+_LANES_FORMAT = "d" + "ddd" * len(PRIORITY_LANES)
+_LANES_SIZE = struct.calcsize(_LANES_FORMAT)
+_BACKOFF_FORMAT = "ddqq"
+_BACKOFF_OFFSET = _STATE_SIZE + _LANES_SIZE
+_BACKOFF_SIZE = struct.calcsize(_BACKOFF_FORMAT)
+_NO_BACKOFF = (0.0, 0.0, 0, 0)
+_CIRCUIT_FORMAT = "d"
+_CIRCUIT_OFFSET = _BACKOFF_OFFSET + _BACKOFF_SIZE
+_CIRCUIT_SIZE = struct.calcsize(_CIRCUIT_FORMAT)
+
+# Lane used by acquire() calls that do not name one (see set_priority_lane)
+_priority_lane = DEFAULT_PRIORITY_LANE
+
+
+def get_lane_weights(lane_weights: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """
+    Return the weight of every priority lane.
+
+    Parameters
+    ----------
+    lane_weights : Dict[str, float], optional
+        Weights overriding ``DEFAULT_LANE_WEIGHTS``
+
+    Returns
+    -------
+    Dict[str, float]
+        Weight of each lane in ``PRIORITY_LANES``
+    """
+    weights = dict(DEFAULT_LANE_WEIGHTS)
+    for lane, weight in (lane_weights or {}).items():
+        check_priority_lane(lane)
+        if weight <= 0:
+            raise ValueError(
+                f"The weight of priority lane {lane!r} must be positive, got {weight}"
+            )
+        weights[lane] = float(weight)
+    return weights
+
+
+def check_priority_lane(lane: str) -> str:
+    """Return ``lane`` if it is a known priority lane, otherwise raise a ValueError."""
+    if lane not in PRIORITY_LANES:
+        raise ValueError(f"Unknown priority lane {lane!r}, expected one of {PRIORITY_LANES}")
+    return lane
+
+
+def set_priority_lane(lane: str) -> None:
+    """
+    Set the priority lane of the rate limiter tokens requested by this process.
+
+    Parameters
+    ----------
+    lane : str
+        One of ``PRIORITY_LANES``
+    """
+    global _priority_lane
+    _priority_lane = check_priority_lane(lane)
+
+
+def get_priority_lane() -> str:
+    """Return the priority lane of the rate limiter tokens requested by this process."""
+    return _priority_lane
+
+
+class PriorityLanes:
+    """
+    Stride scheduler deciding which priority lane gets the next tokens of a bucket.
+
+    Each lane has a pass value that advances by ``1 / weight`` per token it takes,
+    and tokens go to the waiting lane with the lowest pass.  A lane that starts
+    waiting after being idle joins at the scheduler's virtual time (the pass of
+    the lane served last) so it cannot claim the tokens of the time it was idle,
+    but it is served ahead of lanes that have just taken tokens.  A lane with
+    weight 16 thus takes 16 tokens for each token of a lane with weight 1 while
+    both wait, and every lane takes all tokens while it is the only one waiting.
+
+    Parameters
+    ----------
+    lane_weights : Dict[str, float], optional
+        Weights overriding ``DEFAULT_LANE_WEIGHTS``
+    stale_after : float, optional
+        Seconds after which the waiters of a lane that has not polled are
+        forgotten.  Only needed when waiters can die without unregistering,
+        as with buckets shared by several processes.
+    """
+
+    def __init__(
+        self, lane_weights: Optional[Dict[str, float]] = None, stale_after: Optional[float] = None
+    ):
+        weights = get_lane_weights(lane_weights)
+        self.strides = [1.0 / weights[lane] for lane in PRIORITY_LANES]
+        self.stale_after = stale_after
+        self.virtual_time = 0.0
+        self.waiters = [0] * len(PRIORITY_LANES)
+        self.heartbeats = [0.0] * len(PRIORITY_LANES)
+        self.passes = [0.0] * len(PRIORITY_LANES)
+
+    @staticmethod
+    def get_index(lane: Optional[str] = None) -> int:
+        """Return the index of ``lane``, or of the process' priority lane if None."""
+        return PRIORITY_LANES.index(check_priority_lane(lane or _priority_lane))
+
+    def _is_waiting(self, index: int, now: float) -> bool:
+        if self.waiters[index] <= 0:
+            return False
+        if self.stale_after is not None and now - self.heartbeats[index] > self.stale_after:
+            self.waiters[index] = 0
+            return False
+        return True
+
+    def register(self, index: int, now: float) -> None:
+        """Count a new waiter of lane ``index``."""
+        if not self._is_waiting(index, now):
+            self.passes[index] = max(self.passes[index], self.virtual_time)
+        self.waiters[index] += 1
+        self.heartbeats[index] = now
+
+    def poll(self, index: int, now: float) -> None:
+        """Record that a waiter of lane ``index`` is still waiting."""
+        if not self._is_waiting(index, now):
+            # Forgotten as stale: wait again as a newly arrived waiter
+            self.register(index, now)
+        self.heartbeats[index] = now
+
+    def unregister(self, index: int) -> None:
+        """Remove a waiter of lane ``index`` that took its tokens or gave up."""
+        self.waiters[index] = max(0, self.waiters[index] - 1)
+
+    def is_turn(self, index: int, now: float) -> bool:
+        """Return True if lane ``index`` is the waiting lane to be served next."""
+        waiting = [i for i in range(len(PRIORITY_LANES)) if i == index or self._is_waiting(i, now)]
+        # Ties go to the heavier lane, then to the more urgent one
+        return min(waiting, key=lambda i: (self.passes[i], self.strides[i], i)) == index
+
+    def charge(self, index: int, num_tokens: int) -> None:
+        """Advance the pass of lane ``index`` for ``num_tokens`` taken tokens."""
+        self.virtual_time = max(self.virtual_time, self.passes[index])
+        self.passes[index] += num_tokens * self.strides[index]
+
+    def pack(self) -> bytes:
+        """Serialize the scheduler state for a shared state file."""
+        values = [self.virtual_time]
+        for waiters, heartbeat, lane_pass in zip(self.waiters, self.heartbeats, self.passes):
+            values.extend([waiters, heartbeat, lane_pass])
+        return struct.pack(_LANES_FORMAT, *values)
+
+    def unpack(self, data: bytes) -> None:
+        """Load the scheduler state written by ``pack``, or reset it if ``data`` is incomplete."""
+        if len(data) != _LANES_SIZE:
+            values = [0.0] * (1 + 3 * len(PRIORITY_LANES))
+        else:
+            values = struct.unpack(_LANES_FORMAT, data)
+        self.virtual_time = values[0]
+        self.waiters = [int(value) for value in values[1::3]]
+        self.heartbeats = list(values[2::3])
+        self.passes = list(values[3::3])
 
 
 class TokenBucketRateLimiter:
@@ -20,15 +224,18 @@ class TokenBucketRateLimiter:
     A ``threading.Condition`` is used instead of a manual lock-release/sleep/
     re-acquire pattern so that waiting threads are woken precisely when new
     tokens arrive, eliminating the race window that allowed multiple threads to
-    simultaneously consume the same tokens.
+    simultaneously consume the same tokens.  Waiters of different priority
+    lanes are served in the order decided by ``PriorityLanes``.
 
     Parameters
     ----------
     rate_limit_per_min : int
         Maximum number of API calls allowed per minute
+    lane_weights : Dict[str, float], optional
+        Weights of the priority lanes, overriding ``DEFAULT_LANE_WEIGHTS``
     """
 
-    def __init__(self, rate_limit_per_min: int):
+    def __init__(self, rate_limit_per_min: int, lane_weights: Optional[Dict[str, float]] = None):
         self.rate_limit_per_min = rate_limit_per_min
         # Start with an empty bucket so no initial burst is possible.
         self.tokens = 0.0
@@ -37,6 +244,7 @@ class TokenBucketRateLimiter:
         # Condition wraps the underlying lock; use self._cond.acquire/release
         # (or "with self._cond") everywhere instead of a bare Lock.
         self._cond = threading.Condition(threading.Lock())
+        self.lanes = PriorityLanes(lane_weights)
 
         # Token refill rate (tokens per second)
         self.refill_rate = rate_limit_per_min / 60.0
@@ -56,7 +264,7 @@ class TokenBucketRateLimiter:
     # Public API
     # ------------------------------------------------------------------
 
-    def acquire(self, num_tokens: int = 1) -> None:
+    def acquire(self, num_tokens: int = 1, lane: Optional[str] = None) -> None:
         """
         Acquire tokens for API calls. Blocks until sufficient tokens are
         available.
@@ -65,6 +273,9 @@ class TokenBucketRateLimiter:
         ----------
         num_tokens : int, default=1
             Number of tokens (API calls) to acquire
+        lane : str, optional
+            Priority lane of the request.  If None, uses the process' lane
+            (see ``set_priority_lane``)
         """
         if num_tokens > self.max_tokens:
             raise ValueError(
@@ -72,27 +283,40 @@ class TokenBucketRateLimiter:
                 f"{int(self.max_tokens)}.  Reduce the number of simultaneous "
                 "API calls or increase rate_limit_per_min."
             )
+        index = self.lanes.get_index(lane)
 
         with self._cond:
-            while True:
-                self._refill_tokens()
+            self.lanes.register(index, time.time())
+            try:
+                while True:
+                    self._refill_tokens()
 
-                if self.tokens >= num_tokens:
-                    self.tokens -= num_tokens
-                    return
+                    if not self.lanes.is_turn(index, self.last_update):
+                        # Woken up when a token is taken or a waiter leaves
+                        self._cond.wait(timeout=MAX_POLL_SECONDS)
+                        continue
 
-                # Calculate how long until enough tokens are available and
-                # wait with a timeout so we re-check after that interval.
-                tokens_needed = num_tokens - self.tokens
-                wait_time = tokens_needed / self.refill_rate
-                print(
-                    f"Rate limit: waiting {wait_time:.2f}s for "
-                    f"{num_tokens} token(s)..."
-                )
-                # Condition.wait() atomically releases the lock, sleeps for
-                # at most `wait_time` seconds, then re-acquires it before
-                # returning – no race window.
-                self._cond.wait(timeout=wait_time)
+                    if self.tokens >= num_tokens:
+                        self.tokens -= num_tokens
+                        self.lanes.charge(index, num_tokens)
+                        return
+
+                    # Calculate how long until enough tokens are available and
+                    # wait with a timeout so we re-check after that interval.
+                    tokens_needed = num_tokens - self.tokens
+                    wait_time = tokens_needed / self.refill_rate
+                    print(
+                        f"Rate limit: waiting {wait_time:.2f}s for "
+                        f"{num_tokens} token(s)..."
+                    )
+                    # Condition.wait() atomically releases the lock, sleeps for
+                    # at most `wait_time` seconds, then re-acquires it before
+                    # returning – no race window.
+                    self._cond.wait(timeout=wait_time)
+            finally:
+                self.lanes.unregister(index)
+                # The turn may have passed to a waiter of another lane
+                self._cond.notify_all()
 
     def get_available_tokens(self) -> float:
         """
@@ -107,27 +331,862 @@ class TokenBucketRateLimiter:
             self._refill_tokens()
             return self.tokens
 
+    def set_rate_limit(self, rate_limit_per_min: float) -> None:
+        """
+        Change the refill rate and bucket size, e.g. to back off after throttling.
+
+        Tokens accumulated so far are kept, up to the new bucket size.
+
+        Parameters
+        ----------
+        rate_limit_per_min : float
+            New maximum number of API calls allowed per minute
+        """
+        with self._cond:
+            self._refill_tokens()
+            self.rate_limit_per_min = rate_limit_per_min
+            self.max_tokens = float(rate_limit_per_min)
+            self.refill_rate = rate_limit_per_min / 60.0
+            self.tokens = min(self.tokens, self.max_tokens)
+            self._cond.notify_all()
+
+
+class AsyncTokenBucketRateLimiter:
+    """
+    Token bucket rate limiter for coroutines running on one event loop.
+
+    Uses the same bucket semantics as ``TokenBucketRateLimiter`` (starts empty,
+    refills at ``rate_limit_per_min / 60`` tokens per second, capped at
+    ``rate_limit_per_min``), but waiting coroutines yield to the event loop
+    instead of blocking a thread.  Waiters of different priority lanes are
+    served in the order decided by ``PriorityLanes``, and waiters of one lane
+    in FIFO order because the ``asyncio.Lock`` of each lane is fair.
+
+    Parameters
+    ----------
+    rate_limit_per_min : int
+        Maximum number of API calls allowed per minute
+    lane_weights : Dict[str, float], optional
+        Weights of the priority lanes, overriding ``DEFAULT_LANE_WEIGHTS``
+    """
+
+    def __init__(self, rate_limit_per_min: int, lane_weights: Optional[Dict[str, float]] = None):
+        self.rate_limit_per_min = rate_limit_per_min
+        self.tokens = 0.0
+        self.max_tokens = float(rate_limit_per_min)
+        self.last_update = time.time()
+        self.refill_rate = rate_limit_per_min / 60.0
+        self.lanes = PriorityLanes(lane_weights)
+        self._lane_locks = {lane: asyncio.Lock() for lane in PRIORITY_LANES}
+
+    def _refill_tokens(self) -> None:
+        """Refill tokens based on elapsed time."""
+        now = time.time()
+        elapsed = now - self.last_update
+        self.tokens = min(self.max_tokens, self.tokens + elapsed * self.refill_rate)
+        self.last_update = now
+
+    async def acquire(self, num_tokens: int = 1, lane: Optional[str] = None) -> None:
+        """
+        Acquire tokens for API calls, waiting asynchronously until they are available.
 
-# Global rate limiter instance (shared across all workers)
+        Parameters
+        ----------
+        num_tokens : int, default=1
+            Number of tokens (API calls) to acquire
+        lane : str, optional
+            Priority lane of the request.  If None, uses the process' lane
+            (see ``set_priority_lane``)
+        """
+        if num_tokens > self.max_tokens:
+            raise ValueError(
+                f"Requested {num_tokens} tokens but bucket maximum is "
+                f"{int(self.max_tokens)}.  Reduce the number of simultaneous "
+                "API calls or increase rate_limit_per_min."
+            )
+        index = self.lanes.get_index(lane)
+
+        # Holding the lane's lock while sleeping keeps later waiters of the lane
+        # queued behind the current one, so they are served first come, first served.
+        async with self._lane_locks[PRIORITY_LANES[index]]:
+            self.lanes.register(index, time.time())
+            try:
+                while True:
+                    self._refill_tokens()
+
+                    if not self.lanes.is_turn(index, self.last_update):
+                        # Check again once the lane being served may have taken a token
+                        await asyncio.sleep(min(MAX_POLL_SECONDS, 1.0 / self.refill_rate))
+                        continue
+
+                    if self.tokens >= num_tokens:
+                        self.tokens -= num_tokens
+                        self.lanes.charge(index, num_tokens)
+                        return
+
+                    tokens_needed = num_tokens - self.tokens
+                    await asyncio.sleep(tokens_needed / self.refill_rate)
+            finally:
+                self.lanes.unregister(index)
+
+    def get_available_tokens(self) -> float:
+        """
+        Return the current number of available tokens.
+
+        Returns
+        -------
+        float
+            Number of available tokens
+        """
+        self._refill_tokens()
+        return self.tokens
+
+    def set_rate_limit(self, rate_limit_per_min: float) -> None:
+        """
+        Change the refill rate and bucket size, e.g. to back off after throttling.
+
+        Tokens accumulated so far are kept, up to the new bucket size.
+
+        Parameters
+        ----------
+        rate_limit_per_min : float
+            New maximum number of API calls allowed per minute
+        """
+        self._refill_tokens()
+        self.rate_limit_per_min = rate_limit_per_min
+        self.max_tokens = float(rate_limit_per_min)
+        self.refill_rate = rate_limit_per_min / 60.0
+        self.tokens = min(self.tokens, self.max_tokens)
+
+
+def _unpack_backoff(data: bytes) -> Tuple[float, float, int, int]:
+    """Load the backoff of a shared state file, or no backoff if ``data`` is incomplete."""
+    if len(data) < _BACKOFF_SIZE:
+        return _NO_BACKOFF
+    return struct.unpack(_BACKOFF_FORMAT, data[:_BACKOFF_SIZE])
+
+
+class SharedTokenBucketRateLimiter:
+    """
+    Token bucket rate limiter shared by every process on a host.
+
+    The bucket state (available tokens and time of the last refill) lives in a
+    small file guarded by an exclusive ``flock``, so separate processes, such as
+    ZenML steps running in their own interpreters or containers that mount the
+    same directory, draw from one budget.  Bucket semantics match
+    ``TokenBucketRateLimiter``: a new state file starts empty, and tokens refill
+    at ``rate_limit_per_min / 60`` tokens per second up to ``rate_limit_per_min``.
+
+    The priority lane scheduler (see ``PriorityLanes``) is kept in the same file,
+    so an interactive run in one process is served ahead of a backfill running in
+    another.  Waiters poll the file at least every ``MAX_POLL_SECONDS``; the
+    waiters of a process that dies are forgotten after ``LANE_STALE_SECONDS``.
+
+    Throttling by the provider applies to every process, so a process that backs
+    off (see ``set_rate_limit``) publishes its reduced rate in the file as well,
+    and the bucket refills at the lowest rate published by a process within the
+    last ``BACKOFF_STALE_SECONDS``.  The file also records until when the circuit
+    breaker is open (see ``CircuitBreaker``), so a provider outage noticed by one
+    process pauses the others too.
+
+    ``flock`` is advisory and only reliable on local filesystems, so the state
+    file should not live on a network share.
+
+    Parameters
+    ----------
+    rate_limit_per_min : int
+        Maximum number of API calls allowed per minute
+    path : str
+        Path of the state file.  Parent directories are created as needed.
+    lane_weights : Dict[str, float], optional
+        Weights of the priority lanes, overriding ``DEFAULT_LANE_WEIGHTS``
+    """
+
+    def __init__(
+        self,
+        rate_limit_per_min: int,
+        path: str = DEFAULT_RATE_LIMITER_PATH,
+        lane_weights: Optional[Dict[str, float]] = None,
+    ):
+        if fcntl is None:
+            raise RuntimeError(
+                "The file rate limiter backend requires fcntl, "
+                "which is not available on this platform."
+            )
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.rate_limit_per_min = rate_limit_per_min
+        self.max_tokens = float(rate_limit_per_min)
+        self.refill_rate = rate_limit_per_min / 60.0
+        self.configured_rate_limit_per_min = rate_limit_per_min
+        self.path = path
+        self.lanes = PriorityLanes(lane_weights, stale_after=LANE_STALE_SECONDS)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        # flock is held per open file, so threads of this process also need a lock
+        self._lock = threading.Lock()
+
+    def _get_owner(self) -> Tuple[int, int]:
+        # The process id is read every time, as a forked process inherits the limiter
+        return os.getpid(), id(self)
+
+    def _get_limits(
+        self, backoff: Tuple[float, float, int, int], now: float
+    ) -> Tuple[float, float]:
+        """Return the refill rate and bucket size, reduced by the shared backoff while it lasts."""
+        rate_limit, until = backoff[:2]
+        if until > now and rate_limit < self.rate_limit_per_min:
+            return rate_limit / 60.0, float(rate_limit)
+        return self.refill_rate, self.max_tokens
+
+    def _renew_backoff(
+        self, backoff: Tuple[float, float, int, int], now: float
+    ) -> Tuple[float, float, int, int]:
+        """Return the shared backoff updated with this limiter's rate."""
+        owner = self._get_owner()
+        is_owner = tuple(backoff[2:]) == owner
+        if self.rate_limit_per_min < self.configured_rate_limit_per_min:
+            # A lower backoff of another process that is still active takes precedence
+            if is_owner or backoff[1] <= now or self.rate_limit_per_min <= backoff[0]:
+                return (float(self.rate_limit_per_min), now + BACKOFF_STALE_SECONDS) + owner
+        elif is_owner:
+            return _NO_BACKOFF
+        return backoff
+
+    def _update(
+        self,
+        index: Optional[int],
+        action: str,
+        num_tokens: int = 0,
+        rate_limit_per_min: Optional[float] = None,
+    ) -> float:
+        """
+        Update the shared bucket, backoff and lane state for a waiter of lane ``index``.
+
+        Parameters
+        ----------
+        index : int, optional
+            Index of the waiter's priority lane.  Not used by ``"set_rate"``.
+        action : str
+            ``"register"`` or ``"unregister"`` the waiter, ``"take"`` ``num_tokens``
+            tokens if enough are available and it is the lane's turn, or
+            ``"set_rate"`` to change this process' rate to ``rate_limit_per_min``
+        num_tokens : int, default=0
+            Number of tokens to take
+        rate_limit_per_min : float, optional
+            New rate limit of ``"set_rate"``
+
+        Returns
+        -------
+        float
+            0 if the tokens were taken (or for other actions), otherwise the
+            number of seconds to wait before trying again
+        """
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                data = os.pread(self._fd, _CIRCUIT_OFFSET, 0)
+                backoff = _unpack_backoff(data[_BACKOFF_OFFSET:])
+                if len(data) >= _STATE_SIZE:
+                    tokens, last_update = struct.unpack(_STATE_FORMAT, data[:_STATE_SIZE])
+                    refill_rate, max_tokens = self._get_limits(backoff, last_update)
+                    tokens = min(max_tokens, tokens + max(0.0, now - last_update) * refill_rate)
+                else:
+                    tokens = 0.0
+                self.lanes.unpack(data[_STATE_SIZE:_BACKOFF_OFFSET])
+
+                if action == "set_rate":
+                    self.rate_limit_per_min = rate_limit_per_min
+                    self.max_tokens = float(rate_limit_per_min)
+                    self.refill_rate = rate_limit_per_min / 60.0
+                backoff = self._renew_backoff(backoff, now)
+                refill_rate, max_tokens = self._get_limits(backoff, now)
+                tokens = min(tokens, max_tokens)
+
+                wait_time = 0.0
+                if action == "register":
+                    self.lanes.register(index, now)
+                elif action == "unregister":
+                    self.lanes.unregister(index)
+                elif action == "take":
+                    self.lanes.poll(index, now)
+                    if not self.lanes.is_turn(index, now):
+                        wait_time = min(MAX_POLL_SECONDS, 1.0 / refill_rate)
+                    elif tokens >= num_tokens:
+                        tokens -= num_tokens
+                        self.lanes.charge(index, num_tokens)
+                    else:
+                        wait_time = min(MAX_POLL_SECONDS, (num_tokens - tokens) / refill_rate)
+
+                state = struct.pack(_STATE_FORMAT, tokens, now) + self.lanes.pack()
+                os.pwrite(self._fd, state + struct.pack(_BACKOFF_FORMAT, *backoff), 0)
+                return wait_time
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _check_num_tokens(self, num_tokens: int) -> None:
+        if num_tokens > self.max_tokens:
+            raise ValueError(
+                f"Requested {num_tokens} tokens but bucket maximum is "
+                f"{int(self.max_tokens)}.  Reduce the number of simultaneous "
+                "API calls or increase rate_limit_per_min."
+            )
+
+    def acquire(self, num_tokens: int = 1, lane: Optional[str] = None) -> None:
+        """
+        Acquire tokens for API calls. Blocks until sufficient tokens are
+        available.
+
+        Parameters
+        ----------
+        num_tokens : int, default=1
+            Number of tokens (API calls) to acquire
+        lane : str, optional
+            Priority lane of the request.  If None, uses the process' lane
+            (see ``set_priority_lane``)
+        """
+        self._check_num_tokens(num_tokens)
+        index = self.lanes.get_index(lane)
+
+        self._update(index, "register")
+        try:
+            while True:
+                wait_time = self._update(index, "take", num_tokens)
+                if wait_time <= 0:
+                    return
+                time.sleep(wait_time)
+        finally:
+            self._update(index, "unregister")
+
+    async def acquire_async(self, num_tokens: int = 1, lane: Optional[str] = None) -> None:
+        """
+        Acquire tokens for API calls, waiting asynchronously until they are available.
+
+        Parameters
+        ----------
+        num_tokens : int, default=1
+            Number of tokens (API calls) to acquire
+        lane : str, optional
+            Priority lane of the request.  If None, uses the process' lane
+            (see ``set_priority_lane``)
+        """
+        self._check_num_tokens(num_tokens)
+        index = self.lanes.get_index(lane)
+
+        self._update(index, "register")
+        try:
+            while True:
+                wait_time = self._update(index, "take", num_tokens)
+                if wait_time <= 0:
+                    return
+                await asyncio.sleep(wait_time)
+        finally:
+            self._update(index, "unregister")
+
+    def get_available_tokens(self) -> float:
+        """
+        Return the current number of available tokens.
+
+        Returns
+        -------
+        float
+            Number of available tokens
+        """
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_SH)
+            try:
+                data = os.pread(self._fd, _CIRCUIT_OFFSET, 0)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        if len(data) < _STATE_SIZE:
+            return 0.0
+        tokens, last_update = struct.unpack(_STATE_FORMAT, data[:_STATE_SIZE])
+        now = time.time()
+        backoff = _unpack_backoff(data[_BACKOFF_OFFSET:])
+        refill_rate, max_tokens = self._get_limits(backoff, last_update)
+        tokens += max(0.0, now - last_update) * refill_rate
+        return min(self._get_limits(backoff, now)[1], max_tokens, tokens)
+
+    def set_rate_limit(self, rate_limit_per_min: float) -> None:
+        """
+        Change the refill rate and bucket size, e.g. to back off after throttling.
+
+        A rate below the one the limiter was created with is published in the state
+        file, so the other processes sharing the bucket slow down as well until it
+        is raised again or lapses (see ``BACKOFF_STALE_SECONDS``).
+
+        Parameters
+        ----------
+        rate_limit_per_min : float
+            New maximum number of API calls allowed per minute
+        """
+        self._update(None, "set_rate", rate_limit_per_min=rate_limit_per_min)
+
+    def get_circuit_open_until(self) -> float:
+        """
+        Return until when the circuit breaker shared through the state file is open.
+
+        Returns
+        -------
+        float
+            Unix time until which requests are paused, 0 if the breaker was never opened
+        """
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_SH)
+            try:
+                data = os.pread(self._fd, _CIRCUIT_SIZE, _CIRCUIT_OFFSET)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        if len(data) != _CIRCUIT_SIZE:
+            return 0.0
+        return struct.unpack(_CIRCUIT_FORMAT, data)[0]
+
+    def open_circuit(self, open_until: float) -> None:
+        """
+        Open the circuit breaker shared through the state file.
+
+        Parameters
+        ----------
+        open_until : float
+            Unix time until which requests are paused.  A breaker that is already
+            open for longer is left as it is.
+        """
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                data = os.pread(self._fd, _CIRCUIT_OFFSET + _CIRCUIT_SIZE, 0)
+                if len(data) < _STATE_SIZE:
+                    # Start a new bucket empty, as _update does
+                    os.pwrite(self._fd, struct.pack(_STATE_FORMAT, 0.0, time.time()), 0)
+                elif len(data) > _CIRCUIT_OFFSET:
+                    previous = struct.unpack(_CIRCUIT_FORMAT, data[_CIRCUIT_OFFSET:])[0]
+                    open_until = max(open_until, previous)
+                os.pwrite(self._fd, struct.pack(_CIRCUIT_FORMAT, open_until), _CIRCUIT_OFFSET)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        """Close the state file."""
+        with self._lock:
+            os.close(self._fd)
+
+
+class AsyncSharedTokenBucketRateLimiter:
+    """
+    Asyncio front end of a ``SharedTokenBucketRateLimiter``.
+
+    Coroutines of one priority lane on one event loop are served in FIFO order,
+    as with ``AsyncTokenBucketRateLimiter``, while the tokens themselves come
+    from the bucket shared with other processes.
+
+    Parameters
+    ----------
+    limiter : SharedTokenBucketRateLimiter
+        The shared bucket to draw tokens from
+    """
+
+    def __init__(self, limiter: SharedTokenBucketRateLimiter):
+        self.limiter = limiter
+        self.rate_limit_per_min = limiter.rate_limit_per_min
+        self.max_tokens = limiter.max_tokens
+        self._lane_locks = {lane: asyncio.Lock() for lane in PRIORITY_LANES}
+
+    async def acquire(self, num_tokens: int = 1, lane: Optional[str] = None) -> None:
+        """
+        Acquire tokens for API calls, waiting asynchronously until they are available.
+
+        Parameters
+        ----------
+        num_tokens : int, default=1
+            Number of tokens (API calls) to acquire
+        lane : str, optional
+            Priority lane of the request.  If None, uses the process' lane
+            (see ``set_priority_lane``)
+        """
+        lane = check_priority_lane(lane or get_priority_lane())
+        async with self._lane_locks[lane]:
+            await self.limiter.acquire_async(num_tokens, lane)
+
+    def get_available_tokens(self) -> float:
+        """
+        Return the current number of available tokens.
+
+        Returns
+        -------
+        float
+            Number of available tokens
+        """
+        return self.limiter.get_available_tokens()
+
+    def set_rate_limit(self, rate_limit_per_min: float) -> None:
+        """
+        Change the refill rate and bucket size used by this process.
+
+        Parameters
+        ----------
+        rate_limit_per_min : float
+            New maximum number of API calls allowed per minute
+        """
+        self.limiter.set_rate_limit(rate_limit_per_min)
+        self.rate_limit_per_min = self.limiter.rate_limit_per_min
+        self.max_tokens = self.limiter.max_tokens
+
+
+def get_rate_limiter_settings(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Read the rate limiter backend settings from the configuration.
+
+    Parameters
+    ----------
+    config : Dict[str, Any]
+        Configuration dictionary.  ``api.rate_limiter.backend`` selects the backend
+        (``"local"`` for a bucket per process, the default, or ``"file"`` for a bucket
+        shared by every process on the host), ``api.rate_limiter.path`` the state
+        file of the ``"file"`` backend and ``api.rate_limiter.lane_weights`` the
+        weights of the priority lanes.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The ``backend``, ``path`` and ``lane_weights`` settings
+    """
+    settings = config["api"].get("rate_limiter", {})
+    backend = settings.get("backend", "local")
+    if backend not in RATE_LIMITER_BACKENDS:
+        raise ValueError(
+            f"Unknown rate limiter backend {backend!r}, expected one of {RATE_LIMITER_BACKENDS}"
+        )
+    return {
+        "backend": backend,
+        "path": os.path.expanduser(settings.get("path", DEFAULT_RATE_LIMITER_PATH)),
+        "lane_weights": get_lane_weights(settings.get("lane_weights")),
+    }
+
+
+def get_state_path(path: str, key_name: Optional[str] = None) -> str:
+    """Return the state file of the ``"file"`` backend for one API key (or the only one)."""
+    return path if key_name is None else f"{path}.{key_name}"
+
+
+def create_rate_limiter(
+    rate_limit_per_min: int, config: Dict[str, Any], key_name: Optional[str] = None
+) -> Union[TokenBucketRateLimiter, SharedTokenBucketRateLimiter]:
+    """
+    Create a rate limiter using the configured backend.
+
+    Parameters
+    ----------
+    rate_limit_per_min : int
+        Maximum number of API calls allowed per minute
+    config : Dict[str, Any]
+        Configuration dictionary with the rate limiter backend settings
+        (see ``get_rate_limiter_settings``)
+    key_name : str, optional
+        Name of the API key the bucket belongs to, which keeps the state files of
+        different keys apart with the ``"file"`` backend
+
+    Returns
+    -------
+    TokenBucketRateLimiter or SharedTokenBucketRateLimiter
+        A new rate limiter
+    """
+    settings = get_rate_limiter_settings(config)
+    if settings["backend"] == "file":
+        return SharedTokenBucketRateLimiter(
+            rate_limit_per_min,
+            get_state_path(settings["path"], key_name),
+            settings["lane_weights"],
+        )
+    return TokenBucketRateLimiter(rate_limit_per_min, settings["lane_weights"])
+
+
+def create_async_rate_limiter(
+    config: Dict[str, Any],
+    rate_limit_per_min: Optional[int] = None,
+    key_name: Optional[str] = None,
+) -> Union[AsyncTokenBucketRateLimiter, AsyncSharedTokenBucketRateLimiter]:
+    """
+    Create a rate limiter for the coroutines of one event loop.
+
+    Parameters
+    ----------
+    config : Dict[str, Any]
+        Configuration dictionary containing rate_limit_per_min and, optionally,
+        the rate limiter backend settings (see ``get_rate_limiter_settings``)
+    rate_limit_per_min : int, optional
+        Maximum number of API calls allowed per minute.  If None, uses
+        ``api.rate_limit_per_min``
+    key_name : str, optional
+        Name of the API key the bucket belongs to (see ``create_rate_limiter``)
+
+    Returns
+    -------
+    AsyncTokenBucketRateLimiter or AsyncSharedTokenBucketRateLimiter
+        A new rate limiter using the configured backend
+    """
+    rate_limit = (
+        config["api"]["rate_limit_per_min"] if rate_limit_per_min is None else rate_limit_per_min
+    )
+    settings = get_rate_limiter_settings(config)
+    if settings["backend"] == "file":
+        return AsyncSharedTokenBucketRateLimiter(
+            SharedTokenBucketRateLimiter(
+                rate_limit, get_state_path(settings["path"], key_name), settings["lane_weights"]
+            )
+        )
+    return AsyncTokenBucketRateLimiter(rate_limit, settings["lane_weights"])
+
+
+def get_api_keys(config: Dict[str, Any]) -> List[Tuple[str, int]]:
+    """
+    Read the API keys and their rate limits from the configuration.
+
+    Parameters
+    ----------
+    config : Dict[str, Any]
+        Configuration dictionary.  ``api.keys`` lists the keys, either as strings or
+        as ``{"key": ..., "rate_limit_per_min": ...}`` objects; keys without their own
+        rate limit use ``api.rate_limit_per_min``.  Without ``api.keys``, the single
+        ``api.key`` is used.
+
+    Returns
+    -------
+    List[Tuple[str, int]]
+        (key, rate_limit_per_min) tuples
+    """
+    default_rate_limit = config["api"]["rate_limit_per_min"]
+    keys = config["api"].get("keys")
+    if not keys:
+        return [(config["api"]["key"], default_rate_limit)]
+
+    api_keys = []
+    for entry in keys:
+        if isinstance(entry, str):
+            api_keys.append((entry, default_rate_limit))
+        else:
+            api_keys.append((entry["key"], entry.get("rate_limit_per_min", default_rate_limit)))
+    return api_keys
+
+
+def get_key_name(key: str) -> str:
+    """Return a short name of an API key that is safe to print and to use in file names."""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:8]
+
+
+class APIKeyPool:
+    """
+    Spread API requests over several keys, each metered by its own token bucket.
+
+    Every request is sent with the key that will have a token soonest, counting
+    the requests already waiting on each key, so the total rate is the sum of the
+    keys' rates.  A key that is throttled has its
+    rate reduced (see ``AdaptiveRateController``) and so gets fewer requests until
+    it recovers, and a key the API rejects as invalid (HTTP 401) is taken out of
+    the pool.
+
+    The pool works with the blocking limiters (``acquire``) as well as with the
+    asyncio ones (``acquire_async``).
+
+    Parameters
+    ----------
+    limiters : Dict[str, Any]
+        Rate limiter of each API key
+    """
+
+    def __init__(self, limiters: Dict[str, Any]):
+        if not limiters:
+            raise ValueError("An API key pool needs at least one key.")
+        self.limiters = dict(limiters)
+        self.controllers = {
+            key: AdaptiveRateController(limiter) for key, limiter in self.limiters.items()
+        }
+        self.revoked = set()
+        self.pending = {key: 0 for key in self.limiters}
+        self._lock = threading.Lock()
+
+    @property
+    def rate_limit_per_min(self) -> float:
+        """Total rate of the keys still in the pool."""
+        return sum(
+            limiter.rate_limit_per_min
+            for key, limiter in self.limiters.items()
+            if key not in self.revoked
+        )
+
+    def get_available_tokens(self) -> float:
+        """Return the total number of available tokens of the keys still in the pool."""
+        return sum(
+            limiter.get_available_tokens()
+            for key, limiter in self.limiters.items()
+            if key not in self.revoked
+        )
+
+    def _choose_key(self, preferred: Optional[str] = None) -> str:
+        # Must be called with the lock held
+        if preferred in self.limiters and preferred not in self.revoked:
+            return preferred
+        active = [key for key in self.limiters if key not in self.revoked]
+        if not active:
+            raise RuntimeError("Every configured API key has been rejected by the API.")
+
+        def get_wait_time(key):
+            # Requests already waiting on a key are served before this one
+            limiter = self.limiters[key]
+            missing = self.pending[key] + 1 - limiter.get_available_tokens()
+            return missing * 60.0 / max(limiter.rate_limit_per_min, 1e-9)
+
+        return min(active, key=get_wait_time)
+
+    def _reserve_key(self, preferred: Optional[str] = None) -> str:
+        with self._lock:
+            key = self._choose_key(preferred)
+            self.pending[key] += 1
+        return key
+
+    def _release_key(self, key: str) -> None:
+        with self._lock:
+            self.pending[key] -= 1
+
+    def acquire(self, preferred: Optional[str] = None, lane: Optional[str] = None) -> str:
+        """
+        Take a token for one request, blocking until one is available.
+
+        Parameters
+        ----------
+        preferred : str, optional
+            Key to use if it is in the pool.  If None, the key that will have a
+            token soonest is used.
+        lane : str, optional
+            Priority lane of the request.  If None, uses the process' lane
+            (see ``set_priority_lane``)
+
+        Returns
+        -------
+        str
+            The API key to send the request with
+        """
+        key = self._reserve_key(preferred)
+        try:
+            self.limiters[key].acquire(1, lane)
+        finally:
+            self._release_key(key)
+        return key
+
+    async def acquire_async(
+        self, preferred: Optional[str] = None, lane: Optional[str] = None
+    ) -> str:
+        """
+        Take a token for one request, waiting asynchronously until one is available.
+
+        Parameters
+        ----------
+        preferred : str, optional
+            Key to use if it is in the pool.  If None, the key that will have a
+            token soonest is used.
+        lane : str, optional
+            Priority lane of the request.  If None, uses the process' lane
+            (see ``set_priority_lane``)
+
+        Returns
+        -------
+        str
+            The API key to send the request with
+        """
+        key = self._reserve_key(preferred)
+        try:
+            await self.limiters[key].acquire(1, lane)
+        finally:
+            self._release_key(key)
+        return key
+
+    def record_success(self, key: str) -> None:
+        """Record a clean response to a request sent with ``key``."""
+        if key in self.controllers:
+            self.controllers[key].record_success()
+
+    def record_error(self, key: str, error: Exception) -> bool:
+        """
+        Record a failed request sent with ``key``.
+
+        Parameters
+        ----------
+        key : str
+            The API key the request was sent with
+        error : Exception
+            The error raised by the request
+
+        Returns
+        -------
+        bool
+            True if the key was rejected and the request can be sent again right
+            away with another key
+        """
+        if key not in self.controllers:
+            return False
+        if is_throttling_error(error):
+            self.controllers[key].record_throttle()
+        elif isinstance(error, HTTPError) and error.code == 401:
+            with self._lock:
+                self.revoked.add(key)
+                remaining = len(self.limiters) - len(self.revoked)
+            print(f"API key {get_key_name(key)} was rejected, {remaining} key(s) left")
+            return remaining > 0
+        return False
+
+
+def create_async_api_key_pool(config: Dict[str, Any]) -> APIKeyPool:
+    """
+    Create a pool of the configured API keys for the coroutines of one event loop.
+
+    Parameters
+    ----------
+    config : Dict[str, Any]
+        Configuration dictionary (see ``get_api_keys`` and ``get_rate_limiter_settings``)
+
+    Returns
+    -------
+    APIKeyPool
+        A new pool of asyncio rate limiters
+    """
+    api_keys = get_api_keys(config)
+    return APIKeyPool(
+        {
+            key: create_async_rate_limiter(
+                config, rate_limit, None if len(api_keys) == 1 else get_key_name(key)
+            )
+            for key, rate_limit in api_keys
+        }
+    )
+
+
+# Global rate limiter and API key pool instances (shared across all workers)
 _global_rate_limiter = None
+_global_api_key_pool = None
 _rate_limiter_lock = threading.Lock()
 
 
-def get_rate_limiter(config: Dict[str, Any] = None) -> TokenBucketRateLimiter:
+def get_rate_limiter(
+    config: Dict[str, Any] = None
+) -> Union[TokenBucketRateLimiter, SharedTokenBucketRateLimiter]:
     """
     Get or create the global rate limiter instance.
     
-    This ensures all parallel workers share the same rate limiter.
+    This ensures all parallel workers share the same rate limiter.  With the
+    ``"file"`` backend the bucket is also shared with other processes on the host.
     
     Parameters
     ----------
     config : Dict[str, Any], optional
-        Configuration dictionary containing rate_limit_per_min.
+        Configuration dictionary containing rate_limit_per_min and, optionally,
+        the rate limiter backend settings (see ``get_rate_limiter_settings``).
         Only used when creating a new rate limiter.
     
     Returns
     -------
-    TokenBucketRateLimiter
+    TokenBucketRateLimiter or SharedTokenBucketRateLimiter
         The global rate limiter instance
     """
     global _global_rate_limiter
@@ -139,15 +1198,78 @@ def get_rate_limiter(config: Dict[str, Any] = None) -> TokenBucketRateLimiter:
                 config = load_config()
             
             rate_limit = config["api"]["rate_limit_per_min"]
-            _global_rate_limiter = TokenBucketRateLimiter(rate_limit)
-            print(f"Initialized rate limiter: {rate_limit} calls/min")
+            _global_rate_limiter = create_rate_limiter(rate_limit, config)
+            if isinstance(_global_rate_limiter, SharedTokenBucketRateLimiter):
+                print(
+                    f"Initialized shared rate limiter: {rate_limit} calls/min "
+                    f"({_global_rate_limiter.path})"
+                )
+            else:
+                print(f"Initialized rate limiter: {rate_limit} calls/min")
         
         return _global_rate_limiter
 
 
+def get_api_key_pool(config: Dict[str, Any] = None) -> APIKeyPool:
+    """
+    Get or create the global API key pool instance.
+
+    With a single API key the pool uses the global rate limiter (see
+    ``get_rate_limiter``); with several keys (``api.keys``) every key gets its own
+    rate limiter.
+
+    Parameters
+    ----------
+    config : Dict[str, Any], optional
+        Configuration dictionary (see ``get_api_keys``).  Only used when creating
+        a new pool.
+
+    Returns
+    -------
+    APIKeyPool
+        The global API key pool
+    """
+    global _global_api_key_pool
+
+    if config is None:
+        with _rate_limiter_lock:
+            if _global_api_key_pool is not None:
+                return _global_api_key_pool
+        from project_eden.db.data_ingestor import load_config
+        config = load_config()
+
+    api_keys = get_api_keys(config)
+    # Created outside the lock below, which get_rate_limiter takes as well
+    rate_limiter = get_rate_limiter(config) if len(api_keys) == 1 else None
+    with _rate_limiter_lock:
+        if _global_api_key_pool is None:
+            if rate_limiter is not None:
+                _global_api_key_pool = APIKeyPool({api_keys[0][0]: rate_limiter})
+            else:
+                _global_api_key_pool = APIKeyPool(
+                    {
+                        key: create_rate_limiter(rate_limit, config, get_key_name(key))
+                        for key, rate_limit in api_keys
+                    }
+                )
+                print(
+                    f"Initialized API key pool: {len(api_keys)} keys, "
+                    f"{_global_api_key_pool.rate_limit_per_min:.0f} calls/min in total"
+                )
+
+        return _global_api_key_pool
+
+
 def reset_rate_limiter():
-    """Reset the global rate limiter (useful for testing)."""
-    global _global_rate_limiter
+    """Reset the global rate limiter and API key pool (useful for testing)."""
+    global _global_rate_limiter, _global_api_key_pool
     with _rate_limiter_lock:
+        limiters = [_global_rate_limiter]
+        if _global_api_key_pool is not None:
+            limiters.extend(_global_api_key_pool.limiters.values())
+        for limiter in set(limiters):
+            if isinstance(limiter, SharedTokenBucketRateLimiter):
+                limiter.close()
         _global_rate_limiter = None
+        _global_api_key_pool = None
 
@@ -0,0 +1,242 @@
+"""
+On-disk cache for API responses.
+
+Responses are stored in a SQLite database keyed by dataset, API version, ticker
+and query parameters, so a re-run after a crash or a code fix does not spend the
+API budget again on data that was already downloaded.  Every entry has its own
+expiry time, and the least recently used entries are evicted once the cache
+grows past its size limit.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Any, Optional
+from urllib.parse import urlencode
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "project_eden", "responses.sqlite"
+)
+DEFAULT_MAX_SIZE_MB = 512
+
+# Query parameters that never change the response and must not end up on disk
+EXCLUDED_KEY_PARAMS = {"apikey"}
+
+
+class ResponseCache:
+    """
+    Thread-safe, size-bounded on-disk cache of parsed JSON responses.
+
+    Parameters
+    ----------
+    path : str
+        Path of the SQLite database file.  Parent directories are created as needed.
+    max_size_bytes : int
+        Maximum total size of the stored (compressed) responses
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_size_bytes: int = DEFAULT_MAX_SIZE_MB * 1024 * 1024,
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=30.0
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_access_idx ON responses (last_access)"
+        )
+
+    @staticmethod
+    def make_key(dataset: str, api_version: str, ticker: str, params: Dict[str, Any]) -> str:
+        """
+        Build the cache key of a request.
+
+        Parameters
+        ----------
+        dataset : str
+            The dataset name
+        api_version : str
+            The API version ("v3" or "stable")
+        ticker : str
+            The stock ticker symbol
+        params : Dict[str, Any]
+            Query parameters of the request.  The API key is ignored and the order of
+            the parameters does not matter.
+
+        Returns
+        -------
+        str
+            The cache key
+        """
+        query = urlencode(
+            sorted((k, str(v)) for k, v in params.items() if k not in EXCLUDED_KEY_PARAMS)
+        )
+        return f"{api_version}/{dataset}/{ticker}?{query}"
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a cached response and mark it as recently used.
+
+        Parameters
+        ----------
+        key : str
+            The cache key
+
+        Returns
+        -------
+        Any, optional
+            The parsed JSON response, or None if it is not cached or has expired
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        """
+        Store a response, evicting least recently used entries if the cache is full.
+
+        Parameters
+        ----------
+        key : str
+            The cache key
+        value : Any
+            The parsed JSON response
+        ttl_seconds : float
+            Number of seconds the response stays valid.  Nothing is stored if not positive.
+        """
+        if ttl_seconds <= 0:
+            return
+        blob = zlib.compress(json.dumps(value).encode("utf-8"))
+        if len(blob) > self.max_size_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now + ttl_seconds, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        """Drop expired entries, then least recently used ones, until the size limit is met."""
+        excess = self._get_size() - self.max_size_bytes
+        if excess <= 0:
+            return
+        self._connection.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        excess = self._get_size() - self.max_size_bytes
+
+        freed = 0
+        keys = []
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ):
+            if freed >= excess:
+                break
+            keys.append((key,))
+            freed += size
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", keys)
+
+    def _get_size(self) -> int:
+        query = "SELECT COALESCE(SUM(size), 0) FROM responses"
+        return self._connection.execute(query).fetchone()[0]
+
+    def get_size(self) -> int:
+        """Return the total size in bytes of the stored responses."""
+        with self._lock:
+            return self._get_size()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return the number of cache hits and misses since the cache was opened."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        """Remove every stored response."""
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+
+    def close(self):
+        """Close the underlying database."""
+        with self._lock:
+            self._connection.close()
+
+
+# Global response cache instance (disabled until enabled in config)
+_global_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache(config: Dict[str, Any] = None) -> Optional[ResponseCache]:
+    """
+    Get or create the global response cache instance.
+
+    Parameters
+    ----------
+    config : Dict[str, Any], optional
+        Configuration dictionary.  The cache is only used if ``cache.enabled`` is true;
+        ``cache.path`` and ``cache.max_size_mb`` are used when creating it.
+
+    Returns
+    -------
+    ResponseCache, optional
+        The global response cache, or None if caching is disabled
+    """
+    global _global_response_cache
+
+    cache_config = (config or {}).get("cache", {})
+    with _response_cache_lock:
+        if _global_response_cache is None:
+            if not cache_config.get("enabled", False):
+                return None
+            _global_response_cache = ResponseCache(
+                path=os.path.expanduser(cache_config.get("path", DEFAULT_CACHE_PATH)),
+                max_size_bytes=int(
+                    cache_config.get("max_size_mb", DEFAULT_MAX_SIZE_MB) * 1024 * 1024
+                ),
+            )
+
+        return _global_response_cache
+
+
+def reset_response_cache():
+    """Close and reset the global response cache (useful for testing)."""
+    global _global_response_cache
+    with _response_cache_lock:
+        if _global_response_cache is not None:
+            _global_response_cache.close()
+        _global_response_cache = None
@@ -0,0 +1,530 @@
+"""
+Retries, adaptive rate control and a circuit breaker for API calls.
+
+Transient failures (HTTP 429, 5xx and connection errors) are retried with
+exponential backoff and full jitter, honoring the ``Retry-After`` header when
+the provider sends one.  Throttling responses halve the rate limiter's refill
+rate, which is then ramped back up step by step while responses are clean.
+Repeated server errors open a circuit breaker that pauses every worker of the
+process (and, with the ``"file"`` rate limiter backend, every process on the
+host) until the provider has had time to recover, so no tokens are spent on
+calls that are bound to fail.
+"""
+import asyncio
+import email.utils
+import http.client
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.error import HTTPError, URLError
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY_SECONDS = 1.0
+DEFAULT_MAX_DELAY_SECONDS = 60.0
+DEFAULT_CIRCUIT_FAILURE_THRESHOLD = 5
+DEFAULT_CIRCUIT_RESET_SECONDS = 30.0
+
+# HTTP status codes worth retrying besides 5xx
+RETRYABLE_STATUS_CODES = {408, 429}
+THROTTLING_STATUS_CODES = {429}
+
+# How often callers re-check a half-open circuit breaker while its probe request is in flight
+HALF_OPEN_POLL_SECONDS = 1.0
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Parse a ``Retry-After`` header value.
+
+    Parameters
+    ----------
+    value : str, optional
+        Either a number of seconds or an HTTP date
+    now : float, optional
+        Current time as a Unix timestamp. If None, uses the current time
+
+    Returns
+    -------
+    float, optional
+        Number of seconds to wait, or None if the value is missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - (time.time() if now is None else now))
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Return the ``Retry-After`` delay sent with an HTTP error, if any."""
+    if isinstance(error, HTTPError) and error.headers is not None:
+        return parse_retry_after(error.headers.get("Retry-After"))
+    return None
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Return True if the error is transient and the request may succeed when retried."""
+    if isinstance(error, HTTPError):
+        return error.code in RETRYABLE_STATUS_CODES or error.code >= 500
+    return isinstance(error, (URLError, http.client.HTTPException, ConnectionError, TimeoutError))
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """Return True if the provider rejected the request because of its rate limit."""
+    return isinstance(error, HTTPError) and error.code in THROTTLING_STATUS_CODES
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+
+    Parameters
+    ----------
+    max_retries : int, default=5
+        Maximum number of retries after the first attempt
+    base_delay : float, default=1.0
+        Upper bound in seconds of the first backoff delay, doubled on every retry
+    max_delay : float, default=60.0
+        Upper bound in seconds of any backoff delay
+    """
+
+    def __init__(
+        self,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay: float = DEFAULT_BASE_DELAY_SECONDS,
+        max_delay: float = DEFAULT_MAX_DELAY_SECONDS,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def get_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Return how long to wait before the next attempt.
+
+        Parameters
+        ----------
+        attempt : int
+            Number of the failed attempt, starting at 0
+        retry_after : float, optional
+            Delay requested by the provider, which is always honored
+
+        Returns
+        -------
+        float
+            Number of seconds to wait
+        """
+        if retry_after is not None:
+            # Spread out the callers that were all told to come back at the same time
+            return retry_after + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker shared by every worker of a process.
+
+    After ``failure_threshold`` consecutive failed requests the breaker opens and
+    callers wait ``reset_timeout`` seconds.  The first caller after that is let
+    through as a probe while the others keep waiting: a successful probe closes
+    the breaker and a failed one opens it again.
+
+    With ``shared_state``, opening the breaker also pauses the other processes
+    using the same state, which wait until it is due to close without probing
+    themselves.
+
+    Parameters
+    ----------
+    failure_threshold : int, default=5
+        Number of consecutive failures that opens the breaker
+    reset_timeout : float, default=30.0
+        Number of seconds the breaker stays open
+    shared_state : optional
+        State shared with other processes, with ``get_circuit_open_until`` and
+        ``open_circuit`` methods taking Unix times, such as a
+        ``SharedTokenBucketRateLimiter``
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_CIRCUIT_RESET_SECONDS,
+        shared_state=None,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.shared_state = shared_state
+        self.state = "closed"
+        self.failures = 0
+        self.open_until = 0.0
+        self.probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def get_wait_time(self) -> float:
+        """
+        Return how long the caller must wait before sending a request.
+
+        Returns
+        -------
+        float
+            0 if the request may be sent now, otherwise the number of seconds to
+            wait before asking again
+        """
+        with self._lock:
+            if self.shared_state is not None:
+                # Opened by this or another process
+                shared_wait_time = self.shared_state.get_circuit_open_until() - time.time()
+                if shared_wait_time > 0:
+                    return shared_wait_time
+            if self.state == "closed":
+                return 0.0
+            now = time.monotonic()
+            if self.state == "open":
+                if now < self.open_until:
+                    return self.open_until - now
+                self.state = "half_open"
+                self.probe_started = now
+                return 0.0
+            # Half open: wait for the probe, unless it has been lost
+            if now - self.probe_started > self.reset_timeout:
+                self.probe_started = now
+                return 0.0
+            return HALF_OPEN_POLL_SECONDS
+
+    def wait(self) -> None:
+        """Block until the breaker lets a request through."""
+        while True:
+            wait_time = self.get_wait_time()
+            if wait_time <= 0:
+                return
+            time.sleep(wait_time)
+
+    async def wait_async(self) -> None:
+        """Wait asynchronously until the breaker lets a request through."""
+        while True:
+            wait_time = self.get_wait_time()
+            if wait_time <= 0:
+                return
+            await asyncio.sleep(wait_time)
+
+    def record_success(self) -> None:
+        """Record a request the provider answered, closing the breaker."""
+        with self._lock:
+            if self.state != "closed":
+                print("Circuit breaker closed: provider is responding again")
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        """Record a failed request, opening the breaker once there are too many in a row."""
+        with self._lock:
+            self.failures += 1
+            too_many_failures = self.failures >= self.failure_threshold
+            if self.state == "half_open" or (self.state == "closed" and too_many_failures):
+                self.state = "open"
+                self.open_until = time.monotonic() + self.reset_timeout
+                if self.shared_state is not None:
+                    self.shared_state.open_circuit(time.time() + self.reset_timeout)
+                print(
+                    f"Circuit breaker opened after {self.failures} consecutive failure(s): "
+                    f"pausing requests for {self.reset_timeout:.0f}s"
+                )
+
+
+class AdaptiveRateController:
+    """
+    Adjust a rate limiter's rate to what the provider can sustain.
+
+    The rate is halved (down to ``min_rate_fraction`` of the configured rate) when
+    a request is throttled, and raised by ``increase_fraction`` of the configured
+    rate after every ``success_threshold`` clean responses in a row until it is back
+    at the configured rate.
+
+    Parameters
+    ----------
+    rate_limiter
+        Rate limiter with ``rate_limit_per_min`` and ``set_rate_limit``
+    min_rate_fraction : float, default=0.1
+        Lowest rate, as a fraction of the configured rate
+    decrease_factor : float, default=0.5
+        Factor applied to the rate when a request is throttled
+    increase_fraction : float, default=0.05
+        Fraction of the configured rate added after a run of clean responses
+    success_threshold : int, default=20
+        Number of clean responses in a row needed before the rate is raised
+    decrease_cooldown : float, default=5.0
+        Minimum number of seconds between two decreases, so that a burst of
+        throttled responses to requests sent at the old rate only counts once
+    """
+
+    def __init__(
+        self,
+        rate_limiter,
+        min_rate_fraction: float = 0.1,
+        decrease_factor: float = 0.5,
+        increase_fraction: float = 0.05,
+        success_threshold: int = 20,
+        decrease_cooldown: float = 5.0,
+    ):
+        self.rate_limiter = rate_limiter
+        self.max_rate = float(rate_limiter.rate_limit_per_min)
+        self.min_rate = max(1.0, self.max_rate * min_rate_fraction)
+        self.decrease_factor = decrease_factor
+        self.increase_step = self.max_rate * increase_fraction
+        self.success_threshold = success_threshold
+        self.decrease_cooldown = decrease_cooldown
+        self.successes = 0
+        self.last_decrease = float("-inf")
+        self._lock = threading.Lock()
+
+    def record_throttle(self) -> None:
+        """Slow down after a throttling response."""
+        with self._lock:
+            self.successes = 0
+            now = time.monotonic()
+            if now - self.last_decrease < self.decrease_cooldown:
+                return
+            self.last_decrease = now
+            rate = max(self.min_rate, self.rate_limiter.rate_limit_per_min * self.decrease_factor)
+            if rate < self.rate_limiter.rate_limit_per_min:
+                self.rate_limiter.set_rate_limit(rate)
+                print(f"Throttled by the API: reducing rate limit to {rate:.0f} calls/min")
+
+    def record_success(self) -> None:
+        """Speed back up once enough responses in a row were clean."""
+        with self._lock:
+            if self.rate_limiter.rate_limit_per_min >= self.max_rate:
+                return
+            self.successes += 1
+            if self.successes < self.success_threshold:
+                return
+            self.successes = 0
+            rate = min(self.max_rate, self.rate_limiter.rate_limit_per_min + self.increase_step)
+            self.rate_limiter.set_rate_limit(rate)
+            print(f"Raising rate limit to {rate:.0f} calls/min")
+
+
+class RetryHandler:
+    """
+    Run API requests with retries, adaptive rate control and a circuit breaker.
+
+    Parameters
+    ----------
+    policy : RetryPolicy
+        Backoff policy of the retries
+    circuit_breaker : CircuitBreaker, optional
+        Circuit breaker shared by the callers
+    rate_controller : AdaptiveRateController, optional
+        Controller of the rate limiter that meters the requests
+    """
+
+    def __init__(
+        self,
+        policy: RetryPolicy,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        rate_controller: Optional[AdaptiveRateController] = None,
+    ):
+        self.policy = policy
+        self.circuit_breaker = circuit_breaker
+        self.rate_controller = rate_controller
+
+    def _record_success(self) -> None:
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success()
+        if self.rate_controller is not None:
+            self.rate_controller.record_success()
+
+    def _handle_error(self, error: Exception, attempt: int) -> float:
+        """Record a failed attempt and return the delay before the next one, or re-raise."""
+        if not is_retryable_error(error):
+            # The provider answered, so it is up even if the request was bad
+            if isinstance(error, HTTPError) and self.circuit_breaker is not None:
+                self.circuit_breaker.record_success()
+            raise error
+
+        if is_throttling_error(error):
+            if self.rate_controller is not None:
+                self.rate_controller.record_throttle()
+        elif self.circuit_breaker is not None:
+            self.circuit_breaker.record_failure()
+
+        if attempt >= self.policy.max_retries:
+            raise error
+
+        delay = self.policy.get_delay(attempt, get_retry_after(error))
+        print(
+            f"Request failed ({error}), retrying in {delay:.1f}s "
+            f"(attempt {attempt + 2}/{self.policy.max_retries + 1})..."
+        )
+        return delay
+
+    def call(self, func: Callable[[], Any]) -> Any:
+        """
+        Call ``func`` until it succeeds, retrying transient failures.
+
+        Parameters
+        ----------
+        func : Callable[[], Any]
+            Sends one request (including taking its rate limiter token)
+
+        Returns
+        -------
+        Any
+            The return value of ``func``
+        """
+        attempt = 0
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.wait()
+            try:
+                result = func()
+            except Exception as error:
+                time.sleep(self._handle_error(error, attempt))
+                attempt += 1
+                continue
+            self._record_success()
+            return result
+
+    async def call_async(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await ``func()`` until it succeeds, retrying transient failures.
+
+        Parameters
+        ----------
+        func : Callable[[], Awaitable[Any]]
+            Sends one request (including taking its rate limiter token)
+
+        Returns
+        -------
+        Any
+            The result of ``func()``
+        """
+        attempt = 0
+        while True:
+            if self.circuit_breaker is not None:
+                await self.circuit_breaker.wait_async()
+            try:
+                result = await func()
+            except Exception as error:
+                await asyncio.sleep(self._handle_error(error, attempt))
+                attempt += 1
+                continue
+            self._record_success()
+            return result
+
+
+def get_retry_policy(config: Dict[str, Any] = None) -> RetryPolicy:
+    """
+    Build the retry policy from the ``api.retry`` configuration section.
+
+    Parameters
+    ----------
+    config : Dict[str, Any], optional
+        Configuration dictionary.  ``api.retry.max_retries``,
+        ``api.retry.base_delay_seconds`` and ``api.retry.max_delay_seconds`` are used.
+
+    Returns
+    -------
+    RetryPolicy
+        The retry policy
+    """
+    retry_config = (config or {}).get("api", {}).get("retry", {})
+    return RetryPolicy(
+        max_retries=retry_config.get("max_retries", DEFAULT_MAX_RETRIES),
+        base_delay=retry_config.get("base_delay_seconds", DEFAULT_BASE_DELAY_SECONDS),
+        max_delay=retry_config.get("max_delay_seconds", DEFAULT_MAX_DELAY_SECONDS),
+    )
+
+
+# Global circuit breaker and retry handler instances (shared across all workers)
+_global_circuit_breaker: Optional[CircuitBreaker] = None
+_global_retry_handler: Optional[RetryHandler] = None
+_retry_lock = threading.Lock()
+
+
+def get_circuit_breaker(config: Dict[str, Any] = None) -> CircuitBreaker:
+    """
+    Get or create the global circuit breaker instance.
+
+    Parameters
+    ----------
+    config : Dict[str, Any], optional
+        Configuration dictionary.  ``api.retry.circuit_failure_threshold`` and
+        ``api.retry.circuit_reset_seconds`` are used when creating the breaker.
+        With the ``"file"`` rate limiter backend, the breaker is shared with the
+        other processes through the state file of the global rate limiter.
+
+    Returns
+    -------
+    CircuitBreaker
+        The global circuit breaker
+    """
+    global _global_circuit_breaker
+
+    shared_state = None
+    if _global_circuit_breaker is None and config is not None and "api" in config:
+        # Imported here, as the rate limiter module depends on this one
+        from project_eden.utils.rate_limiter import get_rate_limiter, get_rate_limiter_settings
+
+        if get_rate_limiter_settings(config)["backend"] == "file":
+            shared_state = get_rate_limiter(config)
+
+    with _retry_lock:
+        if _global_circuit_breaker is None:
+            retry_config = (config or {}).get("api", {}).get("retry", {})
+            _global_circuit_breaker = CircuitBreaker(
+                failure_threshold=retry_config.get(
+                    "circuit_failure_threshold", DEFAULT_CIRCUIT_FAILURE_THRESHOLD
+                ),
+                reset_timeout=retry_config.get(
+                    "circuit_reset_seconds", DEFAULT_CIRCUIT_RESET_SECONDS
+                ),
+                shared_state=shared_state,
+            )
+        return _global_circuit_breaker
+
+
+def get_retry_handler(config: Dict[str, Any] = None) -> RetryHandler:
+    """
+    Get or create the global retry handler.
+
+    The rates of the API keys are adjusted by the API key pool, which knows the key
+    each request was sent with, so the handler itself has no rate controller.
+
+    Parameters
+    ----------
+    config : Dict[str, Any], optional
+        Configuration dictionary.  Only used when creating the handler.
+
+    Returns
+    -------
+    RetryHandler
+        The global retry handler
+    """
+    global _global_retry_handler
+
+    circuit_breaker = get_circuit_breaker(config)
+    with _retry_lock:
+        if _global_retry_handler is None:
+            _global_retry_handler = RetryHandler(
+                get_retry_policy(config), circuit_breaker=circuit_breaker
+            )
+        return _global_retry_handler
+
+
+def reset_retry_handler():
+    """Reset the global retry handler and circuit breaker (useful for testing)."""
+    global _global_circuit_breaker, _global_retry_handler
+    with _retry_lock:
+        _global_circuit_breaker = None
+        _global_retry_handler = None
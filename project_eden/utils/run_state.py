@@ -0,0 +1,363 @@
+"""
+Durable state of ingestion runs.
+
+Every run gets an id, and the status of each (ticker, period, dataset) item is
+kept in a SQLite database together with the run's options and a cursor (the
+position of the furthest ticker reached).  A run that crashed, ran out of API
+quota or was interrupted can then be resumed: completed items are skipped and
+only pending and failed items are processed again.
+"""
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_RUN_STATE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "project_eden", "runs.sqlite"
+)
+DEFAULT_MAX_RUNS = 50
+
+RUN_ITEM_STATUSES = ["pending", "done", "failed"]
+
+
+class RunStateStore:
+    """
+    Thread-safe store of ingestion runs and the status of their items.
+
+    Parameters
+    ----------
+    path : str
+        Path of the SQLite database file.  Parent directories are created as needed.
+    max_runs : int
+        Number of most recent runs kept; older runs are deleted when a run is created
+    """
+
+    def __init__(self, path: str = DEFAULT_RUN_STATE_PATH, max_runs: int = DEFAULT_MAX_RUNS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=30.0
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                options TEXT NOT NULL,
+                num_tickers INTEGER NOT NULL,
+                cursor INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS run_items (
+                run_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                ticker TEXT NOT NULL,
+                period TEXT NOT NULL,
+                dataset TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (run_id, ticker, period, dataset)
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS run_items_status_idx "
+            "ON run_items (run_id, status, position)"
+        )
+
+    @staticmethod
+    def new_run_id() -> str:
+        """Return a new run id: the UTC start time followed by a random suffix."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return f"{now:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+    def create_run(
+        self,
+        tickers: List[str],
+        jobs: List[Tuple[str, List[str]]],
+        options: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Record a new run with every item pending.
+
+        Parameters
+        ----------
+        tickers : List[str]
+            Stock symbols of the run, in processing order
+        jobs : List[Tuple[str, List[str]]]
+            (period, dataset names) passes run for every ticker
+        options : Dict[str, Any], optional
+            JSON-serializable options needed to resume the run (e.g. the period)
+
+        Returns
+        -------
+        str
+            The id of the new run
+        """
+        run_id = self.new_run_id()
+        now = time.time()
+        items = [
+            (run_id, position, ticker, period, dataset, "pending", now)
+            for position, ticker in enumerate(tickers)
+            for period, datasets in jobs
+            for dataset in datasets
+        ]
+        with self._lock:
+            with self._connection:
+                self._connection.execute("BEGIN")
+                self._connection.execute(
+                    "INSERT INTO runs (run_id, created_at, updated_at, options, num_tickers) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (run_id, now, now, json.dumps(options or {}), len(tickers)),
+                )
+                self._connection.executemany(
+                    "INSERT INTO run_items "
+                    "(run_id, position, ticker, period, dataset, status, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    items,
+                )
+                self._prune()
+        return run_id
+
+    def _prune(self) -> None:
+        # Must be called with the lock held, inside a transaction
+        stale = [
+            row[0]
+            for row in self._connection.execute(
+                "SELECT run_id FROM runs ORDER BY created_at DESC, rowid DESC LIMIT -1 OFFSET ?",
+                (self.max_runs,),
+            )
+        ]
+        for run_id in stale:
+            self._connection.execute("DELETE FROM run_items WHERE run_id = ?", (run_id,))
+            self._connection.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def get_run(self, run_id: str) -> Dict[str, Any]:
+        """
+        Return a run's options, progress and item counts.
+
+        Parameters
+        ----------
+        run_id : str
+            Id of the run
+
+        Returns
+        -------
+        Dict[str, Any]
+            ``run_id``, ``created_at``, ``options``, ``num_tickers``, ``cursor`` and the
+            number of items per status (``pending``, ``done`` and ``failed``)
+
+        Raises
+        ------
+        KeyError
+            If there is no run with this id
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT created_at, options, num_tickers, cursor FROM runs WHERE run_id = ?",
+                (run_id,),
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"Unknown ingestion run {run_id!r}")
+            counts = dict(
+                self._connection.execute(
+                    "SELECT status, COUNT(*) FROM run_items WHERE run_id = ? GROUP BY status",
+                    (run_id,),
+                ).fetchall()
+            )
+        created_at, options, num_tickers, cursor = row
+        run = {
+            "run_id": run_id,
+            "created_at": created_at,
+            "options": json.loads(options),
+            "num_tickers": num_tickers,
+            "cursor": cursor,
+        }
+        run.update({status: counts.get(status, 0) for status in RUN_ITEM_STATUSES})
+        return run
+
+    def list_runs(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return the most recent runs, newest first (see ``get_run``)."""
+        with self._lock:
+            run_ids = [
+                row[0]
+                for row in self._connection.execute(
+                    "SELECT run_id FROM runs ORDER BY created_at DESC, rowid DESC LIMIT ?",
+                    (limit,),
+                )
+            ]
+        return [self.get_run(run_id) for run_id in run_ids]
+
+    def get_pending_work(self, run_id: str) -> Dict[str, List[Tuple[str, List[str]]]]:
+        """
+        Return the items of a run that are not done yet.
+
+        Parameters
+        ----------
+        run_id : str
+            Id of the run
+
+        Returns
+        -------
+        Dict[str, List[Tuple[str, List[str]]]]
+            (period, dataset names) passes left for every ticker, in processing order
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT ticker, period, dataset FROM run_items "
+                "WHERE run_id = ? AND status != 'done' ORDER BY position, rowid",
+                (run_id,),
+            ).fetchall()
+        work = {}
+        for ticker, period, dataset in rows:
+            jobs = work.setdefault(ticker, [])
+            if not jobs or jobs[-1][0] != period:
+                jobs.append((period, []))
+            jobs[-1][1].append(dataset)
+        return work
+
+    def record(
+        self,
+        run_id: str,
+        ticker: str,
+        period: str,
+        datasets: List[str],
+        success: bool,
+        error: Optional[str] = None,
+    ) -> None:
+        """
+        Record the outcome of a ticker's pass and move the cursor past the ticker.
+
+        Parameters
+        ----------
+        run_id : str
+            Id of the run
+        ticker : str
+            Stock symbol
+        period : str
+            Period of the pass
+        datasets : List[str]
+            Names of the datasets written in the pass
+        success : bool
+            Whether the pass was committed
+        error : str, optional
+            Reason of a failure
+        """
+        now = time.time()
+        status = "done" if success else "failed"
+        with self._lock:
+            with self._connection:
+                self._connection.execute("BEGIN")
+                self._connection.executemany(
+                    "UPDATE run_items SET status = ?, error = ?, updated_at = ? "
+                    "WHERE run_id = ? AND ticker = ? AND period = ? AND dataset = ?",
+                    [
+                        (status, error, now, run_id, ticker, period, dataset)
+                        for dataset in datasets
+                    ],
+                )
+                self._connection.execute(
+                    "UPDATE runs SET updated_at = ?, cursor = MAX(cursor, "
+                    "(SELECT MAX(position) + 1 FROM run_items WHERE run_id = ? AND ticker = ?)) "
+                    "WHERE run_id = ?",
+                    (now, run_id, ticker, run_id),
+                )
+
+    def close(self):
+        """Close the underlying database."""
+        with self._lock:
+            self._connection.close()
+
+
+class IngestionRun:
+    """
+    One run of a ``RunStateStore``, as seen by the ingestion engines.
+
+    Parameters
+    ----------
+    store : RunStateStore
+        Store holding the run
+    run_id : str
+        Id of the run
+    """
+
+    def __init__(self, store: RunStateStore, run_id: str):
+        self.store = store
+        self.run_id = run_id
+
+    def get_pending_work(self) -> Dict[str, List[Tuple[str, List[str]]]]:
+        """Return the (period, dataset names) passes left for every ticker, in processing order."""
+        return self.store.get_pending_work(self.run_id)
+
+    def record(
+        self,
+        ticker: str,
+        period: str,
+        datasets: List[str],
+        success: bool,
+        error: Optional[str] = None,
+    ) -> None:
+        """Record the outcome of a ticker's pass (see ``RunStateStore.record``)."""
+        self.store.record(self.run_id, ticker, period, datasets, success, error)
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Return the run's progress (see ``RunStateStore.get_run``)."""
+        return self.store.get_run(self.run_id)
+
+
+# Global run state store instance
+_global_run_state_store: Optional[RunStateStore] = None
+_run_state_store_lock = threading.Lock()
+
+
+def get_run_state_store(config: Dict[str, Any] = None) -> RunStateStore:
+    """
+    Get or create the global run state store instance.
+
+    Parameters
+    ----------
+    config : Dict[str, Any], optional
+        Configuration dictionary.  ``run_state.path`` is the location of the
+        database and ``run_state.max_runs`` the number of runs kept.  Only used
+        when creating the store.
+
+    Returns
+    -------
+    RunStateStore
+        The global run state store
+    """
+    global _global_run_state_store
+
+    run_state_config = (config or {}).get("run_state", {})
+    with _run_state_store_lock:
+        if _global_run_state_store is None:
+            _global_run_state_store = RunStateStore(
+                path=os.path.expanduser(run_state_config.get("path", DEFAULT_RUN_STATE_PATH)),
+                max_runs=run_state_config.get("max_runs", DEFAULT_MAX_RUNS),
+            )
+
+        return _global_run_state_store
+
+
+def reset_run_state_store():
+    """Close and reset the global run state store (useful for testing)."""
+    global _global_run_state_store
+    with _run_state_store_lock:
+        if _global_run_state_store is not None:
+            _global_run_state_store.close()
+        _global_run_state_store = None
@@ -0,0 +1,178 @@
+"""
+Exchange trading-day calendar for planning price requests.
+
+The FMP end-of-day price endpoint returns at most 5,000 records per request.
+Sizing request windows by calendar days wastes most of that budget on weekends
+and holidays, so this module counts NYSE trading days instead and plans date
+windows that each hold close to the record limit.
+"""
+import datetime
+from typing import List, Optional, Tuple, Union
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+from dateutil.relativedelta import MO
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar,
+    DateOffset,
+    GoodFriday,
+    Holiday,
+    USLaborDay,
+    USMemorialDay,
+    USThanksgivingDay,
+    nearest_workday,
+    sunday_to_monday,
+)
+
+# The NYSE also traded on Saturdays until this date
+LAST_SATURDAY_SESSION = datetime.date(1952, 9, 27)
+
+# Regular closing time of the NYSE
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+MARKET_CLOSE_TIME = datetime.time(16, 0)
+
+# Leave headroom below the API's 5,000 record limit for unscheduled sessions
+DEFAULT_MAX_TRADING_DAYS_PER_CHUNK = 4900
+
+DateLike = Union[str, datetime.date, pd.Timestamp]
+
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    """
+    Regular NYSE full-day holidays.
+
+    One-off closures (national days of mourning, weather, 9/11) are not included;
+    they only make a planned window hold slightly fewer records than expected.
+    """
+
+    rules = [
+        Holiday("New Year's Day", month=1, day=1, observance=sunday_to_monday),
+        Holiday(
+            "Martin Luther King Jr. Day",
+            start_date=datetime.datetime(1998, 1, 1),
+            month=1,
+            day=1,
+            offset=DateOffset(weekday=MO(3)),
+        ),
+        Holiday("Washington's Birthday", month=2, day=1, offset=DateOffset(weekday=MO(3))),
+        GoodFriday,
+        USMemorialDay,
+        Holiday(
+            "Juneteenth",
+            start_date=datetime.datetime(2022, 1, 1),
+            month=6,
+            day=19,
+            observance=nearest_workday,
+        ),
+        Holiday("Independence Day", month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday("Christmas Day", month=12, day=25, observance=nearest_workday),
+    ]
+
+
+_calendar = NYSEHolidayCalendar()
+
+
+def _to_date(value: DateLike) -> datetime.date:
+    return pd.Timestamp(value).date()
+
+
+def trading_days(start_date: DateLike, end_date: DateLike) -> pd.DatetimeIndex:
+    """
+    Return the NYSE trading days between two dates (inclusive).
+
+    Parameters
+    ----------
+    start_date : str, datetime.date or pd.Timestamp
+        First date of the range
+    end_date : str, datetime.date or pd.Timestamp
+        Last date of the range
+
+    Returns
+    -------
+    pd.DatetimeIndex
+        The trading days in the range
+    """
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    if start > end:
+        return pd.DatetimeIndex([])
+
+    holidays = _calendar.holidays(start=start, end=end)
+    days = pd.bdate_range(start, end, freq="C", holidays=holidays)
+
+    if start.date() <= LAST_SATURDAY_SESSION:
+        saturday_end = min(end, pd.Timestamp(LAST_SATURDAY_SESSION))
+        days = days.union(pd.date_range(start, saturday_end, freq="W-SAT"))
+    return days
+
+
+def is_trading_day(date: DateLike) -> bool:
+    """Return True if ``date`` is an NYSE trading day."""
+    return len(trading_days(date, date)) == 1
+
+
+def next_market_close(now: Optional[datetime.datetime] = None) -> datetime.datetime:
+    """
+    Return the next regular NYSE close after ``now``.
+
+    Parameters
+    ----------
+    now : datetime.datetime, optional
+        Timezone-aware reference time. If None, uses the current time
+
+    Returns
+    -------
+    datetime.datetime
+        The next close, in exchange local time
+    """
+    now = (now or datetime.datetime.now(MARKET_TIMEZONE)).astimezone(MARKET_TIMEZONE)
+    # Long holiday stretches never exceed a few days, so two weeks always contains a session
+    for day in trading_days(now.date(), now.date() + datetime.timedelta(days=14)):
+        close = datetime.datetime.combine(day.date(), MARKET_CLOSE_TIME, tzinfo=MARKET_TIMEZONE)
+        if close > now:
+            return close
+    raise ValueError(f"No trading day found after {now}")
+
+
+def plan_trading_day_chunks(
+    start_date: DateLike,
+    end_date: DateLike,
+    max_trading_days: int = DEFAULT_MAX_TRADING_DAYS_PER_CHUNK,
+) -> List[Tuple[str, str]]:
+    """
+    Split a date range into windows holding at most ``max_trading_days`` trading days.
+
+    Windows are contiguous and together cover the whole range, so a session
+    missing from the calendar is still fetched; it only changes the record count.
+
+    Parameters
+    ----------
+    start_date : str, datetime.date or pd.Timestamp
+        Start date of the range (YYYY-MM-DD if a string)
+    end_date : str, datetime.date or pd.Timestamp
+        End date of the range (YYYY-MM-DD if a string)
+    max_trading_days : int, default=4900
+        Maximum number of trading days per window
+
+    Returns
+    -------
+    List[Tuple[str, str]]
+        List of (from_date, to_date) tuples as strings in YYYY-MM-DD format.  Empty if
+        the range contains no trading days.
+    """
+    days = trading_days(start_date, end_date)
+    if len(days) == 0:
+        return []
+
+    chunks = []
+    current_start = _to_date(start_date)
+    final_end = _to_date(end_date)
+    for i in range(0, len(days), max_trading_days):
+        is_last = i + max_trading_days >= len(days)
+        current_end = final_end if is_last else days[i + max_trading_days - 1].date()
+        chunks.append((current_start.strftime("%Y-%m-%d"), current_end.strftime("%Y-%m-%d")))
+        current_start = current_end + datetime.timedelta(days=1)
+
+    return chunks
@@ -0,0 +1,188 @@
+"""
+Tests for the database connection pool.
+
+psycopg2.connect is replaced with a factory of fake connections, so no database
+server is needed.
+"""
+import unittest
+from unittest import mock
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+from project_eden.db.connection_pool import (
+    DatabaseConnectionPool,
+    get_connection_pool,
+    reset_connection_pool,
+)
+
+DB_CONFIG = {"host": "localhost", "database": "eden", "user": "postgres", "password": "secret"}
+
+
+def make_connection(**kwargs):
+    """Create a fake psycopg2 connection with no transaction in progress."""
+    connection = mock.MagicMock()
+    connection.closed = 0
+    connection.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+    return connection
+
+
+class TestDatabaseConnectionPool(unittest.TestCase):
+    def setUp(self):
+        """Replace psycopg2.connect with a factory of fake connections."""
+        patcher = mock.patch(
+            "project_eden.db.connection_pool.psycopg2.connect", side_effect=make_connection
+        )
+        self.connect = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_checkout_and_return(self):
+        """Test that returned connections are reused instead of opening new ones."""
+        pool = DatabaseConnectionPool(DB_CONFIG, min_connections=1, max_connections=2)
+        self.assertEqual(self.connect.call_count, 1)
+        self.connect.assert_called_with(**DB_CONFIG)
+
+        connection = pool.getconn()
+        self.assertEqual(pool.get_stats(), {"open": 1, "idle": 0})
+        pool.putconn(connection)
+        self.assertIs(pool.getconn(), connection)
+        self.assertEqual(self.connect.call_count, 1)
+
+        # A second connection is opened while the first one is in use
+        other = pool.getconn()
+        self.assertIsNot(other, connection)
+        self.assertEqual(pool.get_stats(), {"open": 2, "idle": 0})
+
+    def test_context_manager(self):
+        """Test that the connection context manager returns the connection to the pool."""
+        pool = DatabaseConnectionPool(DB_CONFIG, min_connections=0, max_connections=1)
+        with pool.connection() as connection:
+            self.assertEqual(pool.get_stats(), {"open": 1, "idle": 0})
+        self.assertEqual(pool.get_stats(), {"open": 1, "idle": 1})
+        self.assertIs(pool.getconn(), connection)
+
+    def test_checkout_waits_for_full_pool(self):
+        """Test that a checkout from a full pool times out if no connection is returned."""
+        pool = DatabaseConnectionPool(
+            DB_CONFIG, min_connections=0, max_connections=1, timeout_seconds=0.05
+        )
+        pool.getconn()
+        with self.assertRaises(PoolError):
+            pool.getconn()
+
+    def test_open_transaction_is_rolled_back(self):
+        """Test that a connection returned inside a transaction is rolled back and kept."""
+        pool = DatabaseConnectionPool(DB_CONFIG, min_connections=0, max_connections=1)
+        connection = pool.getconn()
+        connection.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+        pool.putconn(connection)
+        connection.rollback.assert_called_once()
+        connection.close.assert_not_called()
+        self.assertEqual(pool.get_stats(), {"open": 1, "idle": 1})
+
+    def test_broken_connections_are_discarded(self):
+        """Test that closed and broken connections are closed instead of kept idle."""
+        pool = DatabaseConnectionPool(DB_CONFIG, min_connections=0, max_connections=2)
+        closed, unknown = pool.getconn(), pool.getconn()
+        closed.closed = 1
+        unknown.info.transaction_status = extensions.TRANSACTION_STATUS_UNKNOWN
+        pool.putconn(closed)
+        pool.putconn(unknown)
+        unknown.close.assert_called_once()
+        self.assertEqual(pool.get_stats(), {"open": 0, "idle": 0})
+
+        # A failed rollback also discards the connection
+        connection = pool.getconn()
+        connection.info.transaction_status = extensions.TRANSACTION_STATUS_INERROR
+        connection.rollback.side_effect = psycopg2.OperationalError("server closed the connection")
+        pool.putconn(connection)
+        connection.close.assert_called_once()
+        self.assertEqual(pool.get_stats(), {"open": 0, "idle": 0})
+
+    def test_health_check(self):
+        """Test that idle connections failing SELECT 1 are replaced on checkout."""
+        pool = DatabaseConnectionPool(
+            DB_CONFIG, min_connections=1, max_connections=1, health_check_seconds=0
+        )
+        healthy = pool.getconn()
+        pool.putconn(healthy)
+        self.assertIs(pool.getconn(), healthy)
+        cursor = healthy.cursor.return_value.__enter__.return_value
+        cursor.execute.assert_called_with("SELECT 1")
+
+        cursor.execute.side_effect = psycopg2.OperationalError("server closed the connection")
+        pool.putconn(healthy)
+        replacement = pool.getconn()
+        self.assertIsNot(replacement, healthy)
+        healthy.close.assert_called_once()
+        self.assertEqual(pool.get_stats(), {"open": 1, "idle": 0})
+
+    def test_recently_returned_connections_are_not_checked(self):
+        """Test that connections idle for less than health_check_seconds skip the check."""
+        pool = DatabaseConnectionPool(
+            DB_CONFIG, min_connections=1, max_connections=1, health_check_seconds=60
+        )
+        connection = pool.getconn()
+        connection.cursor.assert_not_called()
+
+    def test_closeall(self):
+        """Test that closing the pool closes idle connections and refuses checkouts."""
+        pool = DatabaseConnectionPool(DB_CONFIG, min_connections=2, max_connections=2)
+        in_use = pool.getconn()
+        pool.closeall()
+        self.assertEqual(pool.get_stats(), {"open": 1, "idle": 0})
+        with self.assertRaises(PoolError):
+            pool.getconn()
+
+        # Connections in use are closed when they are returned
+        pool.putconn(in_use)
+        in_use.close.assert_called_once()
+        self.assertEqual(pool.get_stats(), {"open": 0, "idle": 0})
+
+    def test_invalid_sizes(self):
+        """Test that inconsistent pool sizes are rejected."""
+        with self.assertRaises(ValueError):
+            DatabaseConnectionPool(DB_CONFIG, min_connections=3, max_connections=2)
+        with self.assertRaises(ValueError):
+            DatabaseConnectionPool(DB_CONFIG, min_connections=0, max_connections=0)
+
+
+class TestGlobalConnectionPool(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch(
+            "project_eden.db.connection_pool.psycopg2.connect", side_effect=make_connection
+        )
+        self.connect = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(reset_connection_pool)
+
+    def test_pool_settings_from_config(self):
+        """Test that the pool is configured from database.pool, which is not a connect argument."""
+        pool_settings = {
+            "min_connections": 0,
+            "max_connections": 3,
+            "health_check_seconds": 5,
+            "timeout_seconds": 2,
+        }
+        pool = get_connection_pool({"database": dict(DB_CONFIG, pool=pool_settings)})
+        self.assertEqual(pool.min_connections, 0)
+        self.assertEqual(pool.max_connections, 3)
+        self.assertEqual(pool.health_check_seconds, 5)
+        self.assertEqual(pool.timeout_seconds, 2)
+
+        pool.getconn()
+        self.connect.assert_called_once_with(**DB_CONFIG)
+        self.assertIs(get_connection_pool({"database": DB_CONFIG}), pool)
+
+    def test_reset(self):
+        """Test that resetting closes the global pool and the next call creates a new one."""
+        pool = get_connection_pool({"database": DB_CONFIG})
+        reset_connection_pool()
+        with self.assertRaises(PoolError):
+            pool.getconn()
+        self.assertIsNot(get_connection_pool({"database": DB_CONFIG}), pool)
+
+
+if __name__ == "__main__":
+    unittest.main()
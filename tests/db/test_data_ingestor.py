@@ -0,0 +1,497 @@
+"""
+Tests for the database-free helpers of the data ingestor.
+"""
+import datetime
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from urllib.error import HTTPError
+
+import numpy as np
+import pandas as pd
+
+from project_eden.db.data_ingestor import (
+    DEFAULT_FY_DATASETS,
+    DEFAULT_QUARTER_DATASETS,
+    INCREMENTAL_PRICE_OVERLAP_DAYS,
+    INCREMENTAL_STATEMENT_OVERLAP_PERIODS,
+    Datasets,
+    add_content_hashes,
+    create_key_index,
+    diff_records,
+    get_column_postgres_types,
+    get_changed_mask,
+    get_jsonparsed_data,
+    get_content_hashes,
+    get_incremental_fetch_params,
+    get_incremental_price_start,
+    get_incremental_statement_limit,
+    get_ticker_jobs,
+    is_cacheable_response,
+)
+from project_eden.utils.http_client import RequestNotSentError
+from project_eden.utils.quota import QuotaExceededError, get_quota_tracker, reset_quota_tracker
+from project_eden.utils.run_state import IngestionRun, RunStateStore
+
+PRICE_COLUMN_TYPES = get_column_postgres_types("price")
+
+
+class TestIsCacheableResponse(unittest.TestCase):
+    def test_records_are_cached(self):
+        """Test that a non-empty list of records is cached."""
+        self.assertTrue(is_cacheable_response([{"symbol": "AAPL", "revenue": 1000}]))
+
+    def test_errors_and_empty_results_are_not_cached(self):
+        """Test that error payloads and empty results are not served again from the cache."""
+        self.assertFalse(is_cacheable_response({"Error Message": "Invalid API KEY."}))
+        self.assertFalse(is_cacheable_response([]))
+        self.assertFalse(is_cacheable_response({}))
+        self.assertFalse(is_cacheable_response(None))
+
+
+# (new value, stored value, whether the value is updated) per column type
+CHANGED_MASK_CASES = {
+    "real": [
+        (1.23451, 1.2345, False),
+        (1.2346, 1.2345, True),
+        ("1.5", 1.5, False),
+        (0.0, -0.0, False),
+        # Values below 1e-10 are compared by absolute difference
+        (1e-11, 2e-11, False),
+        (-5e-11, 0.0, False),
+        (1e-11, 2e-10, False),
+        (1.0, None, True),
+        (None, 1.0, False),
+        (None, None, False),
+        ("n/a", 1.0, True),
+    ],
+    "bigint": [
+        (100.7, 100, False),
+        (-1.9, -1, False),
+        (101.0, 100, True),
+        ("100", 100, False),
+        (2**53 + 1, 2**53, True),
+        (2**62 + 1, 2**62 + 1, False),
+        (5, None, True),
+        (None, 5, False),
+        ("n/a", 5, True),
+        (float("inf"), 5, True),
+    ],
+    "date": [
+        ("2024-01-02", datetime.date(2024, 1, 2), False),
+        ("2024-01-02 00:00:00", datetime.date(2024, 1, 2), False),
+        ("2024-01-02T16:00:00", datetime.date(2024, 1, 2), False),
+        ("2024-01-03", datetime.date(2024, 1, 2), True),
+        ("2024-01-02", None, True),
+        (None, datetime.date(2024, 1, 2), False),
+        ("not a date", datetime.date(2024, 1, 2), True),
+    ],
+    "timestamp": [
+        ("2024-01-02 09:30:00", datetime.datetime(2024, 1, 2, 16), False),
+        ("2024-01-03 09:30:00", datetime.datetime(2024, 1, 2, 16), True),
+    ],
+    "text": [
+        ("AAPL", "AAPL", False),
+        ("Apple Inc.", "AAPL", True),
+        (5, "5", False),
+        ("AAPL", None, True),
+        (None, "AAPL", False),
+    ],
+}
+
+
+class TestGetChangedMask(unittest.TestCase):
+    def test_single_values(self):
+        """Test the comparison of every case on its own."""
+        for column_type, cases in CHANGED_MASK_CASES.items():
+            for new_value, old_value, changed in cases:
+                with self.subTest(column_type=column_type, new=new_value, old=old_value):
+                    mask = get_changed_mask(
+                        pd.Series([new_value], dtype=object),
+                        pd.Series([old_value], dtype=object),
+                        column_type,
+                    )
+                    self.assertEqual(mask.tolist(), [changed])
+
+    def test_whole_columns(self):
+        """Test that the cases of a column type give the same result compared at once."""
+        for column_type, cases in CHANGED_MASK_CASES.items():
+            new_values, old_values, changed = zip(*cases)
+            with self.subTest(column_type=column_type):
+                mask = get_changed_mask(
+                    pd.Series(new_values, dtype=object),
+                    pd.Series(old_values, dtype=object),
+                    column_type,
+                )
+                self.assertEqual(mask.tolist(), list(changed))
+
+    def test_typed_columns(self):
+        """Test columns with the dtypes returned by the API and the database."""
+        mask = get_changed_mask(
+            pd.Series([100.0, np.nan, 250.9]), pd.Series([100, 7, 200]), "bigint"
+        )
+        self.assertEqual(mask.tolist(), [False, False, True])
+        mask = get_changed_mask(pd.Series([1.00001, np.nan]), pd.Series([1.0, np.nan]), "real")
+        self.assertEqual(mask.tolist(), [False, False])
+
+    def test_column_type_modifiers(self):
+        """Test that only the base type of the column type is used."""
+        mask = get_changed_mask(pd.Series([1.5]), pd.Series([1]), "serial primary key")
+        self.assertEqual(mask.tolist(), [False])
+
+    def test_unaligned_index(self):
+        """Test that values are compared by position, not by index label."""
+        mask = get_changed_mask(
+            pd.Series([1, 2], index=[5, 6]), pd.Series([1, 3], index=[0, 1]), "bigint"
+        )
+        self.assertEqual(mask.tolist(), [False, True])
+
+
+class TestGetContentHashes(unittest.TestCase):
+    def assert_same_hash(self, rows):
+        hashes = get_content_hashes(pd.DataFrame(rows), PRICE_COLUMN_TYPES)
+        self.assertEqual(hashes.nunique(), 1, hashes.tolist())
+
+    def test_float_noise(self):
+        """Test that values equal once rounded as they are stored hash the same."""
+        self.assert_same_hash(
+            {"open": [1.23456, 1.2345600001, np.float32(1.23456)], "volume": [100, 100.0, 100.7]}
+        )
+
+    def test_negative_zero(self):
+        """Test that -0.0 and 0.0 hash the same."""
+        self.assert_same_hash({"close": [0.0, -0.0, -0.00001], "volume": [0, -0.0, 0.2]})
+
+    def test_mixed_dates(self):
+        """Test that the same calendar date hashes the same whatever its representation."""
+        self.assert_same_hash(
+            {
+                "date": [
+                    "2024-01-02",
+                    "2024-01-02 00:00:00",
+                    datetime.date(2024, 1, 2),
+                    pd.Timestamp("2024-01-02 16:00"),
+                ]
+            }
+        )
+
+    def test_nulls(self):
+        """Test that every representation of NULL hashes the same."""
+        self.assert_same_hash(
+            {
+                "symbol": pd.Series([None, np.nan, pd.NA], dtype=object),
+                "open": pd.Series([None, np.nan, pd.NA], dtype=object),
+                "date": pd.Series([None, np.nan, pd.NaT], dtype=object),
+            }
+        )
+
+    def test_large_integers(self):
+        """Test that bigint values beyond the precision of a float hash differently."""
+        hashes = get_content_hashes(
+            pd.DataFrame({"volume": pd.Series([2**53, 2**53 + 1], dtype=object)}),
+            PRICE_COLUMN_TYPES,
+        )
+        self.assertEqual(hashes.nunique(), 2)
+
+    def test_changed_values(self):
+        """Test that rows differing in any value, or in a NULL, hash differently."""
+        hashes = get_content_hashes(
+            pd.DataFrame(
+                {
+                    "symbol": ["AAPL", "AAPL", "AAPL", "AAPL"],
+                    "open": [1.0, 1.0001, 1.0, None],
+                    "date": ["2024-01-02", "2024-01-02", "2024-01-03", "2024-01-02"],
+                }
+            ),
+            PRICE_COLUMN_TYPES,
+        )
+        self.assertEqual(hashes.nunique(), 4)
+        self.assertTrue(hashes.str.fullmatch("[0-9a-f]{16}").all())
+
+    def test_column_order(self):
+        """Test that the hash does not depend on the order of the columns."""
+        df = pd.DataFrame({"symbol": ["AAPL"], "open": [1.5], "volume": [10]})
+        self.assertEqual(
+            get_content_hashes(df, PRICE_COLUMN_TYPES).tolist(),
+            get_content_hashes(df[["volume", "open", "symbol"]], PRICE_COLUMN_TYPES).tolist(),
+        )
+
+
+class TestAddContentHashes(unittest.TestCase):
+    @mock.patch("project_eden.db.data_ingestor.get_table_column_types")
+    def test_table_with_hash_column(self, column_types):
+        """Test that the hash of the written columns is added when the table has the column."""
+        column_types.return_value = {"symbol": "text", "open": "real", "content_hash": "text"}
+        df = pd.DataFrame({"symbol": ["AAPL"], "open": [1.5], "label": ["ignored"]})
+        columns = add_content_hashes(None, "price", df, ["symbol", "open"])
+
+        self.assertEqual(columns, ["symbol", "open", "content_hash"])
+        self.assertEqual(
+            df["content_hash"].tolist(),
+            get_content_hashes(df[["symbol", "open"]], PRICE_COLUMN_TYPES).tolist(),
+        )
+
+    @mock.patch("project_eden.db.data_ingestor.get_table_column_types")
+    def test_table_without_hash_column(self, column_types):
+        """Test that tables created before the hash column are written without it."""
+        column_types.return_value = {"symbol": "text", "open": "real"}
+        df = pd.DataFrame({"symbol": ["AAPL"], "open": [1.5]})
+        self.assertEqual(
+            add_content_hashes(None, "price", df, ["symbol", "open"]), ["symbol", "open"]
+        )
+        self.assertNotIn("content_hash", df.columns)
+
+
+class TestDiffRecords(unittest.TestCase):
+    columns = ["symbol", "date", "open", "content_hash"]
+    merge_keys = ["symbol", "date"]
+
+    def make_rows(self, dates, opens, hashes=None):
+        df = pd.DataFrame({"symbol": "AAPL", "date": dates, "open": opens})
+        if hashes is None:
+            hashes = get_content_hashes(df, PRICE_COLUMN_TYPES)
+        return df.assign(content_hash=hashes)
+
+    def test_matching_hashes_are_dropped(self):
+        """Test that rows stored with the same hash are neither new nor updated."""
+        new_data_df = self.make_rows(["2024-01-02", "2024-01-03", "2024-01-04"], [1.0, 2.0, 3.0])
+        existing_df = self.make_rows(
+            [datetime.date(2024, 1, 2), datetime.date(2024, 1, 3)],
+            [1.0, 2.5],
+            # The first row is not compared at all once its hash matches
+            [new_data_df["content_hash"][0], "stale"],
+        )
+        new_records, update_values = diff_records(
+            new_data_df, existing_df, self.columns, self.merge_keys, "price"
+        )
+
+        self.assertEqual(new_records["date"].tolist(), [datetime.date(2024, 1, 4)])
+        self.assertEqual(update_values["date"].tolist(), [datetime.date(2024, 1, 3)])
+        self.assertEqual(update_values["open"].tolist(), [2.0])
+        self.assertEqual(update_values["content_hash"].tolist(), [new_data_df["content_hash"][1]])
+
+    def test_null_stored_hash_is_rewritten(self):
+        """Test that a row stored before hashing gets its hash even if its values are unchanged."""
+        new_data_df = self.make_rows(["2024-01-02"], [1.0])
+        existing_df = self.make_rows([datetime.date(2024, 1, 2)], [1.0], [None])
+        new_records, update_values = diff_records(
+            new_data_df, existing_df, self.columns, self.merge_keys, "price"
+        )
+
+        self.assertTrue(new_records.empty)
+        self.assertNotIn("open", update_values.columns)
+        self.assertEqual(
+            update_values["content_hash"].tolist(), new_data_df["content_hash"].tolist()
+        )
+
+
+class TestRequestQuota(unittest.TestCase):
+    def setUp(self):
+        """Track a daily quota of two calls in a temporary directory."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(reset_quota_tracker)
+        self.config = {
+            "api": {
+                "quota": {
+                    "daily_calls": 2,
+                    "path": os.path.join(tmp_dir.name, "quota.sqlite"),
+                }
+            }
+        }
+        self.client = mock.MagicMock()
+
+    def get_data(self):
+        return get_jsonparsed_data(
+            "profile",
+            "AAPL",
+            "key",
+            base_url="http://api.test",
+            config=self.config,
+            client=self.client,
+            acquire_token=False,
+            retry=False,
+        )
+
+    def get_usage(self):
+        usage = get_quota_tracker(self.config).get_usage()
+        return usage["daily_calls"], usage["monthly_bytes"]
+
+    def test_sent_requests_are_counted(self):
+        """Test that a request and its response bytes are counted."""
+        self.client.get.return_value = b'[{"symbol": "AAPL"}]'
+        self.assertEqual(self.get_data(), [{"symbol": "AAPL"}])
+        self.assertEqual(self.get_usage(), (1, 20))
+
+    def test_error_responses_are_counted(self):
+        """Test that a request answered with an error status is counted."""
+        self.client.get.side_effect = HTTPError("http://api.test", 500, "error", {}, io.BytesIO())
+        with self.assertRaises(HTTPError):
+            self.get_data()
+        self.assertEqual(self.get_usage(), (1, 0))
+
+    def test_unsent_requests_are_not_counted(self):
+        """Test that a request that never reached the API is not counted."""
+        self.client.get.side_effect = RequestNotSentError("connection refused")
+        with self.assertRaises(RequestNotSentError):
+            self.get_data()
+        self.assertEqual(self.get_usage(), (0, 0))
+
+    def test_exhausted_quota(self):
+        """Test that no request is sent once the quota is used up."""
+        self.client.get.return_value = b"[]"
+        self.get_data()
+        self.get_data()
+        with self.assertRaises(QuotaExceededError):
+            self.get_data()
+        self.assertEqual(self.client.get.call_count, 2)
+        self.assertEqual(self.get_usage(), (2, 4))
+
+
+class TestGetTickerJobs(unittest.TestCase):
+    def test_jobs_per_period(self):
+        """Test that "all" and None run both periods and a single period runs its datasets."""
+        both = [("quarter", DEFAULT_QUARTER_DATASETS), ("fy", DEFAULT_FY_DATASETS)]
+        cases = [
+            (None, both),
+            ("all", both),
+            ("quarter", [("quarter", DEFAULT_QUARTER_DATASETS)]),
+            ("fy", [("fy", DEFAULT_QUARTER_DATASETS)]),
+        ]
+        for period, jobs in cases:
+            with self.subTest(period=period):
+                self.assertEqual(
+                    get_ticker_jobs(["aapl", "MSFT", "AAPL"], period),
+                    {"AAPL": jobs, "MSFT": jobs},
+                )
+
+    def test_resumed_run(self):
+        """Test that a resumed run only returns the passes it has not completed."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        store = RunStateStore(os.path.join(tmp_dir.name, "runs.sqlite"))
+        self.addCleanup(store.close)
+        jobs = [
+            (period, [dataset.value for dataset in datasets])
+            for period, datasets in get_ticker_jobs(["AAPL"], "all")["AAPL"]
+        ]
+        run = IngestionRun(store, store.create_run(["AAPL", "MSFT"], jobs))
+        run.record("AAPL", "quarter", jobs[0][1], True)
+        run.record("MSFT", "fy", jobs[1][1], False)
+
+        # The tickers and period given with a run are ignored
+        self.assertEqual(
+            get_ticker_jobs(["GOOG"], "quarter", run=run),
+            {
+                "AAPL": [("fy", DEFAULT_FY_DATASETS)],
+                "MSFT": [("quarter", DEFAULT_QUARTER_DATASETS), ("fy", DEFAULT_FY_DATASETS)],
+            },
+        )
+
+
+class TestIncrementalPriceWindow(unittest.TestCase):
+    def test_price_window_overlaps_stored_bars(self):
+        """Test that the price window starts 5 days before the last stored bar."""
+        self.assertEqual(INCREMENTAL_PRICE_OVERLAP_DAYS, 5)
+        self.assertEqual(
+            get_incremental_price_start(datetime.date(2024, 3, 4)), datetime.date(2024, 2, 28)
+        )
+        self.assertEqual(
+            get_incremental_price_start(datetime.date(2024, 1, 2)), datetime.date(2023, 12, 28)
+        )
+
+    def test_key_index_starts_at_earliest_window(self):
+        """Test that the key index covers the price window of every symbol of the run."""
+        key_index = create_key_index(
+            ["AAPL", "MSFT", "NEWCO"],
+            {"AAPL": datetime.date(2024, 10, 11), "MSFT": datetime.date(2024, 6, 3)},
+        )
+        self.assertEqual(key_index.symbols, ["AAPL", "MSFT", "NEWCO"])
+        self.assertEqual(key_index.since_date, datetime.date(2024, 5, 29))
+
+    def test_full_run_indexes_every_key(self):
+        """Test that every stored key is indexed without incremental price windows."""
+        self.assertIsNone(create_key_index(["AAPL"]).since_date)
+        self.assertIsNone(create_key_index(["AAPL"], {}).since_date)
+
+
+class TestGetIncrementalStatementLimit(unittest.TestCase):
+    today = datetime.date(2024, 10, 15)
+
+    def test_periods_since_latest_statement(self):
+        """Test that every quarter or year ended since the latest statement is requested."""
+        cases = [
+            # (latest stored statement, period, expected new periods)
+            (datetime.date(2024, 3, 31), "quarter", 2),
+            (datetime.date(2024, 3, 31), "fy", 0),
+            (datetime.date(2023, 9, 30), "quarter", 4),
+            (datetime.date(2023, 9, 30), "fy", 1),
+            (datetime.date(2021, 12, 31), "fy", 2),
+        ]
+        for latest_date, period, new_periods in cases:
+            with self.subTest(latest_date=latest_date, period=period):
+                self.assertEqual(
+                    get_incremental_statement_limit(latest_date, period, today=self.today),
+                    new_periods + INCREMENTAL_STATEMENT_OVERLAP_PERIODS,
+                )
+
+    def test_only_overlap_when_up_to_date(self):
+        """Test that statements ending this month or later only re-fetch the overlap."""
+        for latest_date in [datetime.date(2024, 10, 1), datetime.date(2025, 3, 31)]:
+            for period in ["quarter", "fy"]:
+                with self.subTest(latest_date=latest_date, period=period):
+                    self.assertEqual(
+                        get_incremental_statement_limit(latest_date, period, today=self.today),
+                        INCREMENTAL_STATEMENT_OVERLAP_PERIODS,
+                    )
+        self.assertEqual(INCREMENTAL_STATEMENT_OVERLAP_PERIODS, 2)
+
+
+class TestGetIncrementalFetchParams(unittest.TestCase):
+    datasets = [
+        Datasets.PROFILE,
+        Datasets.INCOME_STATEMENT,
+        Datasets.CASH_FLOW_STATEMENT,
+        Datasets.BALANCE_SHEET_STATEMENT,
+        Datasets.HISTORTICAL_PRICE_EOD_FULL,
+    ]
+
+    def setUp(self):
+        today = datetime.date.today()
+        self.latest_price_dates = {"AAPL": datetime.date(2024, 10, 11)}
+        self.latest_statement_periods = {
+            ("quarter", Datasets.INCOME_STATEMENT): {"AAPL": (today, today.year, "Q3")},
+            ("quarter", Datasets.BALANCE_SHEET_STATEMENT): {"MSFT": (today, today.year, "Q3")},
+            ("fy", Datasets.INCOME_STATEMENT): {"AAPL": (today, today.year, "FY")},
+        }
+
+    def get_params(self, symbol, period):
+        return get_incremental_fetch_params(
+            symbol, period, self.datasets, self.latest_price_dates, self.latest_statement_periods
+        )
+
+    def test_stored_datasets_are_limited(self):
+        """Test that only datasets with stored data for the symbol and period get a limit."""
+        since_dates, limits = self.get_params("AAPL", "quarter")
+        self.assertEqual(
+            since_dates, {Datasets.HISTORTICAL_PRICE_EOD_FULL: datetime.date(2024, 10, 6)}
+        )
+        self.assertEqual(
+            limits, {Datasets.INCOME_STATEMENT: INCREMENTAL_STATEMENT_OVERLAP_PERIODS}
+        )
+
+        _, limits = self.get_params("AAPL", "fy")
+        self.assertEqual(
+            limits, {Datasets.INCOME_STATEMENT: INCREMENTAL_STATEMENT_OVERLAP_PERIODS}
+        )
+
+    def test_symbol_without_stored_data(self):
+        """Test that a symbol without stored data is fetched in full."""
+        self.assertEqual(self.get_params("NEWCO", "quarter"), ({}, {}))
+        self.assertEqual(self.get_params("MSFT", "fy"), ({}, {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+"""
+Tests for the index of stored keys.
+
+Stored keys are served by a stubbed ``_load`` or a fake cursor, so no database
+server is needed.
+"""
+import datetime
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from project_eden.db.key_index import ExistingKeyIndex
+
+PRICE_KEYS = ["symbol", "date"]
+STATEMENT_KEYS = ["symbol", "calendaryear", "period"]
+
+
+def make_stored_keys(index_tuples, names, hashes=None):
+    """Create the stored keys of a symbol as returned by ``_load``."""
+    hashes = hashes if hashes is not None else [None] * len(index_tuples)
+    return pd.Series(
+        hashes, index=pd.MultiIndex.from_tuples(index_tuples, names=names), dtype=object
+    )
+
+
+class FakeKeyCursor:
+    """Server-side cursor returning fixed rows, recording the executed query."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.itersize = None
+        self.executed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query, params):
+        self.executed.append((query, params))
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+
+class TestExistingKeyIndex(unittest.TestCase):
+    def test_date_keys_are_normalized(self):
+        """Test that fetched date strings match stored dates."""
+        stored = {
+            "AAPL": make_stored_keys(
+                [(pd.Timestamp("2024-01-02"),), (pd.Timestamp("2024-01-03"),)], ["date"]
+            )
+        }
+        key_index = ExistingKeyIndex(["AAPL"])
+        new_data_df = pd.DataFrame(
+            {"symbol": "AAPL", "date": ["2024-01-02", "2024-01-03", "2024-01-04"]}
+        )
+        with mock.patch.object(ExistingKeyIndex, "_load", return_value=stored):
+            mask = key_index.is_stored(None, "price", PRICE_KEYS, "AAPL", new_data_df)
+        np.testing.assert_array_equal(mask, [True, True, False])
+
+    def test_statement_keys(self):
+        """Test that rows are only stored if every key column matches."""
+        stored = {"AAPL": make_stored_keys([(2023, "Q4"), (2024, "Q1")], STATEMENT_KEYS[1:])}
+        key_index = ExistingKeyIndex(["AAPL"])
+        new_data_df = pd.DataFrame(
+            {"symbol": "AAPL", "calendaryear": [2024, 2024, 2023], "period": ["Q1", "Q2", "Q1"]}
+        )
+        with mock.patch.object(ExistingKeyIndex, "_load", return_value=stored):
+            mask = key_index.is_stored(
+                None, "income_statement_quarter", STATEMENT_KEYS, "AAPL", new_data_df
+            )
+        np.testing.assert_array_equal(mask, [True, False, False])
+
+    def test_since_date_cutoff(self):
+        """Test that rows dated before since_date are treated as stored."""
+        stored = {"AAPL": make_stored_keys([(pd.Timestamp("2024-01-03"),)], ["date"])}
+        key_index = ExistingKeyIndex(["AAPL"], since_date=datetime.date(2024, 1, 3))
+        new_data_df = pd.DataFrame(
+            {"symbol": "AAPL", "date": ["2024-01-02", "2024-01-03", "2024-01-04"]}
+        )
+        with mock.patch.object(ExistingKeyIndex, "_load", return_value=stored):
+            mask = key_index.is_stored(None, "price", PRICE_KEYS, "AAPL", new_data_df)
+        np.testing.assert_array_equal(mask, [True, True, False])
+
+    def test_empty_table(self):
+        """Test that nothing is stored for a table or symbol without keys."""
+        key_index = ExistingKeyIndex(["AAPL"])
+        new_data_df = pd.DataFrame({"symbol": "AAPL", "calendaryear": [2024], "period": ["Q1"]})
+        with mock.patch.object(ExistingKeyIndex, "_load", return_value={}) as load:
+            keys = key_index.get_keys(None, "income_statement_quarter", STATEMENT_KEYS, "AAPL")
+            mask = key_index.is_stored(
+                None, "income_statement_quarter", STATEMENT_KEYS, "AAPL", new_data_df
+            )
+        self.assertTrue(keys.empty)
+        self.assertEqual(list(keys.index.names), STATEMENT_KEYS[1:])
+        np.testing.assert_array_equal(mask, [False])
+        # The keys of a table are loaded once per run
+        load.assert_called_once()
+
+    def test_is_unchanged(self):
+        """Test that only rows stored with the same content hash are unchanged."""
+        stored = {
+            "AAPL": make_stored_keys(
+                [(2023, "Q4"), (2024, "Q1"), (2024, "Q2")], STATEMENT_KEYS[1:], ["a", "b", None]
+            )
+        }
+        key_index = ExistingKeyIndex(["AAPL"])
+        new_data_df = pd.DataFrame(
+            {
+                "symbol": "AAPL",
+                "calendaryear": [2023, 2024, 2024, 2024],
+                "period": ["Q4", "Q1", "Q2", "Q3"],
+                "content_hash": ["a", "changed", "c", "d"],
+            }
+        )
+        with mock.patch.object(ExistingKeyIndex, "_load", return_value=stored):
+            mask = key_index.is_unchanged(
+                None, "income_statement_quarter", STATEMENT_KEYS, "AAPL", new_data_df
+            )
+            without_hash = key_index.is_unchanged(
+                None,
+                "income_statement_quarter",
+                STATEMENT_KEYS,
+                "AAPL",
+                new_data_df.drop(columns="content_hash"),
+            )
+        # A NULL stored hash never matches, so the row is compared and rewritten
+        np.testing.assert_array_equal(mask, [True, False, False, False])
+        np.testing.assert_array_equal(without_hash, [False] * 4)
+
+
+class TestExistingKeyIndexLoad(unittest.TestCase):
+    def make_cursor(self, rows):
+        key_cursor = FakeKeyCursor(rows)
+        cursor = mock.MagicMock()
+        cursor.connection.cursor.return_value = key_cursor
+        return cursor, key_cursor
+
+    @mock.patch("project_eden.db.key_index.get_table_column_types")
+    def test_load_groups_keys_by_symbol(self, column_types):
+        """Test that stored keys are loaded per symbol with dates as timestamps."""
+        column_types.return_value = {"symbol": "text", "date": "date", "content_hash": "text"}
+        cursor, key_cursor = self.make_cursor(
+            [
+                ("AAPL", datetime.date(2024, 1, 2), "a"),
+                ("MSFT", datetime.date(2024, 1, 2), "m"),
+                ("AAPL", datetime.date(2024, 1, 3), "b"),
+            ]
+        )
+        key_index = ExistingKeyIndex(["AAPL", "MSFT"], since_date=datetime.date(2024, 1, 1))
+        keys = key_index.get_keys(cursor, "price", PRICE_KEYS, "AAPL")
+
+        self.assertEqual(
+            list(keys.items()),
+            [((pd.Timestamp("2024-01-02"),), "a"), ((pd.Timestamp("2024-01-03"),), "b")],
+        )
+        query, params = key_cursor.executed[0]
+        self.assertIn("date >= %s", query)
+        self.assertEqual(params, [["AAPL", "MSFT"], datetime.date(2024, 1, 1)])
+
+    @mock.patch("project_eden.db.key_index.get_table_column_types")
+    def test_load_duplicate_keys(self, column_types):
+        """Test that keys stored twice are indexed once without a hash."""
+        column_types.return_value = {
+            "symbol": "text",
+            "calendaryear": "integer",
+            "period": "text",
+            "content_hash": "text",
+        }
+        cursor, _ = self.make_cursor(
+            [("AAPL", 2024, "Q1", "a"), ("AAPL", 2024, "Q1", "b"), ("AAPL", 2024, "Q2", "c")]
+        )
+        key_index = ExistingKeyIndex(["AAPL"])
+        new_data_df = pd.DataFrame(
+            {
+                "symbol": "AAPL",
+                "calendaryear": [2024, 2024],
+                "period": ["Q1", "Q2"],
+                "content_hash": ["a", "c"],
+            }
+        )
+        mask = key_index.is_unchanged(
+            cursor, "income_statement_quarter", STATEMENT_KEYS, "AAPL", new_data_df
+        )
+        np.testing.assert_array_equal(mask, [False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Tests for the helpers of the worker pool engine.
+"""
+import unittest
+from unittest import mock
+
+from project_eden.db.parallel_ingestor import get_diff_processes, get_ticker_shards
+
+
+class TestGetTickerShards(unittest.TestCase):
+    def test_exact_multiple(self):
+        """Test that tickers filling whole shards are split evenly."""
+        self.assertEqual(
+            get_ticker_shards(["A", "B", "C", "D"], shard_size=2), [["A", "B"], ["C", "D"]]
+        )
+
+    def test_remainder_shard(self):
+        """Test that the last shard holds the remaining tickers."""
+        self.assertEqual(
+            get_ticker_shards(["A", "B", "C", "D", "E"], shard_size=2),
+            [["A", "B"], ["C", "D"], ["E"]],
+        )
+
+    def test_tickers_are_normalized(self):
+        """Test that symbols are upper-cased and de-duplicated in order."""
+        self.assertEqual(
+            get_ticker_shards(["aapl", "MSFT", "AAPL", "goog"], shard_size=2),
+            [["AAPL", "MSFT"], ["GOOG"]],
+        )
+
+    def test_empty_tickers(self):
+        """Test that no shards are created without tickers."""
+        self.assertEqual(get_ticker_shards([]), [])
+
+    def test_default_shard_size(self):
+        """Test that shards hold 100 tickers by default."""
+        shards = get_ticker_shards([f"T{i}" for i in range(250)])
+        self.assertEqual([len(shard) for shard in shards], [100, 100, 50])
+
+    def test_invalid_shard_size(self):
+        """Test that a shard size below 1 is rejected."""
+        for shard_size in [0, -1]:
+            with self.subTest(shard_size=shard_size):
+                with self.assertRaises(ValueError):
+                    get_ticker_shards(["AAPL"], shard_size=shard_size)
+
+
+
+class TestGetDiffProcesses(unittest.TestCase):
+    @mock.patch("project_eden.db.parallel_ingestor.os.cpu_count", return_value=4)
+    def test_default_one_per_worker(self, cpu_count):
+        """Test that there is one process per worker thread, up to the number of CPUs."""
+        self.assertEqual(get_diff_processes(2), 2)
+        self.assertEqual(get_diff_processes(8), 4)
+
+    @mock.patch("project_eden.db.parallel_ingestor.os.cpu_count", return_value=None)
+    def test_unknown_cpu_count(self, cpu_count):
+        """Test that one process is used if the number of CPUs is unknown."""
+        self.assertEqual(get_diff_processes(8), 1)
+
+    def test_explicit_override(self):
+        """Test that a requested number of processes is used as is, at least 0."""
+        self.assertEqual(get_diff_processes(2, diff_processes=6), 6)
+        self.assertEqual(get_diff_processes(8, diff_processes=0), 0)
+        self.assertEqual(get_diff_processes(8, diff_processes=-1), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,238 @@
+"""
+Tests for the database utilities.
+
+Cursors are replaced with mocks or a fake in-memory company table, so no database
+server is needed.
+"""
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from project_eden.db.utils import (
+    CompanyIdCache,
+    copy_frame,
+    copy_records_from_df,
+    get_company_id_cache,
+    prepare_copy_frame,
+    reset_company_id_cache,
+)
+
+PRICE_COLUMN_TYPES = {
+    "id": "integer",
+    "company_id": "integer",
+    "symbol": "text",
+    "date": "date",
+    "open": "real",
+    "volume": "bigint",
+}
+
+
+class TestCopyRecords(unittest.TestCase):
+    def setUp(self):
+        patchers = [
+            mock.patch(
+                "project_eden.db.utils.get_table_column_types", return_value=PRICE_COLUMN_TYPES
+            ),
+            mock.patch(
+                "project_eden.db.utils.get_company_ids",
+                side_effect=lambda cursor, symbols: {"AAPL": 1, "MSFT": 2},
+            ),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.df = pd.DataFrame(
+            {
+                "symbol": ["AAPL", "MSFT", "AAPL"],
+                "date": ["2024-01-02", "2024-01-02", "2024-01-03"],
+                "open": [1.5, np.nan, 2.25],
+                "volume": [100.0, 3e9, np.nan],
+            }
+        )
+
+    def test_prepare_copy_frame(self):
+        """Test that company ids are filled in and integer columns become nullable integers."""
+        prepared = prepare_copy_frame(None, self.df, "price")
+
+        self.assertEqual(
+            list(prepared.columns), ["company_id", "symbol", "date", "open", "volume"]
+        )
+        self.assertEqual(prepared["company_id"].tolist(), [1, 2, 1])
+        self.assertEqual(str(prepared["volume"].dtype), "Int64")
+        self.assertEqual(prepared["volume"].tolist()[:2], [100, 3000000000])
+        self.assertIs(prepared["volume"][2], pd.NA)
+        self.assertEqual(prepared["open"].dtype, float)
+        # The frame passed in is left untouched
+        self.assertNotIn("company_id", self.df.columns)
+
+    def test_prepare_copy_frame_validates_columns(self):
+        """Test that frames with a company_id or without a symbol are rejected."""
+        with self.assertRaises(ValueError):
+            prepare_copy_frame(None, self.df.assign(company_id=1), "price")
+        with self.assertRaises(ValueError):
+            prepare_copy_frame(None, self.df.drop(columns="symbol"), "price")
+
+    def test_copy_frame_writes_nulls(self):
+        """Test that the CSV sent to COPY writes missing values as \\N and integers as such."""
+        cursor = mock.MagicMock()
+        copy_records_from_df(cursor, self.df, "price")
+
+        sql, buffer = cursor.copy_expert.call_args.args
+        self.assertEqual(
+            sql,
+            "COPY price (company_id, symbol, date, open, volume) FROM STDIN "
+            "WITH (FORMAT csv, NULL '\\N')",
+        )
+        self.assertEqual(
+            buffer.getvalue().splitlines(),
+            [
+                "1,AAPL,2024-01-02,1.5,100",
+                "2,MSFT,2024-01-02,\\N,3000000000",
+                "1,AAPL,2024-01-03,2.25,\\N",
+            ],
+        )
+
+    def test_copy_frame_company_table(self):
+        """Test that company rows are copied as they are, without a company id."""
+        cursor = mock.MagicMock()
+        copy_frame(cursor, pd.DataFrame({"symbol": ["AAPL"], "companyname": [None]}), "company")
+
+        sql, buffer = cursor.copy_expert.call_args.args
+        self.assertTrue(sql.startswith("COPY company (symbol, companyname) FROM STDIN"))
+        self.assertEqual(buffer.getvalue(), "AAPL,\\N\n")
+
+    def test_empty_frame_is_not_copied(self):
+        """Test that nothing is sent for an empty frame."""
+        cursor = mock.MagicMock()
+        copy_records_from_df(cursor, self.df.iloc[:0], "price")
+        cursor.copy_expert.assert_not_called()
+
+
+class FakeCompanyTable:
+    """In-memory company table answering the queries of the company id cache."""
+
+    def __init__(self, company_ids=None):
+        self.company_ids = dict(company_ids or {})
+        self.lock = threading.Lock()
+
+    def cursor(self):
+        return FakeCompanyCursor(self)
+
+
+class FakeCompanyCursor:
+    """Cursor of a ``FakeCompanyTable``, recording the executed queries."""
+
+    def __init__(self, table):
+        self.table = table
+        self.queries = []
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        company_ids = self.table.company_ids
+        with self.table.lock:
+            if query.startswith("INSERT INTO company"):
+                (symbol,) = params
+                if symbol in company_ids:
+                    self.rows = []
+                else:
+                    company_ids[symbol] = len(company_ids) + 1
+                    self.rows = [(company_ids[symbol],)]
+            elif "symbol = ANY" in query:
+                self.rows = [(s, company_ids[s]) for s in params[0] if s in company_ids]
+            elif "WHERE symbol = %s" in query:
+                self.rows = [(company_ids[params[0]],)]
+            else:
+                self.rows = list(company_ids.items())
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+
+class TestCompanyIdCache(unittest.TestCase):
+    def setUp(self):
+        self.table = FakeCompanyTable({"AAPL": 1, "MSFT": 2})
+
+    def test_warm(self):
+        """Test that a warmed cache answers without querying the database."""
+        cache = CompanyIdCache()
+        cache.warm(self.table.cursor())
+
+        cursor = self.table.cursor()
+        self.assertEqual(cache.get_ids(cursor, ["MSFT", "AAPL"]), {"MSFT": 2, "AAPL": 1})
+        self.assertEqual(cursor.queries, [])
+
+    def test_get_ids(self):
+        """Test that known symbols are looked up once and unknown symbols are registered."""
+        cache = CompanyIdCache()
+        cursor = self.table.cursor()
+        self.assertEqual(cache.get_ids(cursor, ["AAPL", "NEWCO", "AAPL"]), {"AAPL": 1, "NEWCO": 3})
+        self.assertEqual(self.table.company_ids["NEWCO"], 3)
+        self.assertEqual(len(cursor.queries), 2)
+
+        cursor = self.table.cursor()
+        self.assertEqual(cache.get_ids(cursor, ["NEWCO"]), {"NEWCO": 3})
+        self.assertEqual(cursor.queries, [])
+
+    def test_invalidate(self):
+        """Test that invalidated ids are looked up again."""
+        cache = CompanyIdCache()
+        cache.warm(self.table.cursor())
+
+        # The company is registered again with a new id, e.g. after a rollback
+        self.table.company_ids["AAPL"] = 7
+        cache.invalidate("AAPL")
+        cursor = self.table.cursor()
+        self.assertEqual(cache.get_ids(cursor, ["AAPL", "MSFT"]), {"AAPL": 7, "MSFT": 2})
+        self.assertEqual(len(cursor.queries), 1)
+
+        cache.invalidate()
+        cursor = self.table.cursor()
+        cache.get_ids(cursor, ["MSFT"])
+        self.assertEqual(len(cursor.queries), 1)
+
+        # Unknown symbols are ignored
+        cache.invalidate("NEWCO")
+
+    def test_concurrent_access(self):
+        """Test that threads registering the same symbols all get the same ids."""
+        cache = CompanyIdCache()
+        symbols = [f"T{i}" for i in range(50)]
+        start = threading.Barrier(8)
+        results = []
+
+        def get_ids(offset):
+            start.wait()
+            # Every thread asks for the symbols in a different order
+            ordered = symbols[offset:] + symbols[:offset]
+            results.append(cache.get_ids(self.table.cursor(), ordered))
+
+        threads = [threading.Thread(target=get_ids, args=(i * 6,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 8)
+        expected = {symbol: self.table.company_ids[symbol] for symbol in symbols}
+        self.assertEqual(len(set(expected.values())), len(symbols))
+        for result in results:
+            self.assertEqual(result, expected)
+
+    def test_global_cache(self):
+        """Test that the global cache is shared until it is reset."""
+        self.addCleanup(reset_company_id_cache)
+        cache = get_company_id_cache()
+        self.assertIs(get_company_id_cache(), cache)
+        reset_company_id_cache()
+        self.assertIsNot(get_company_id_cache(), cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
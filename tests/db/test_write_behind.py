@@ -0,0 +1,161 @@
+"""
+Tests for the write-behind queue.
+
+The connection pool is replaced with a fake one and the functions writing to the
+database are patched, so no database server is needed.
+"""
+import contextlib
+import threading
+import unittest
+from unittest import mock
+
+from project_eden.db.write_behind import WriteBehindQueue, get_write_behind_settings
+
+FRAMES = {"income_statement": "fetched frame"}
+
+
+class FakePool:
+    """Connection pool handing out fake connections and counting checkouts."""
+
+    def __init__(self):
+        self.connections = []
+
+    @contextlib.contextmanager
+    def connection(self):
+        connection = mock.MagicMock()
+        self.connections.append(connection)
+        yield connection
+
+
+class TestWriteBehindQueue(unittest.TestCase):
+    def setUp(self):
+        self.pool = FakePool()
+        self.reports = []
+        self.reports_lock = threading.Lock()
+
+        patcher = mock.patch(
+            "project_eden.db.write_behind.add_fetched_datasets_to_db",
+            side_effect=lambda connection, symbol, *args, **kwargs: symbol != "BAD",
+        )
+        self.add_fetched = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def on_written(self, symbol, period, datasets, success):
+        with self.reports_lock:
+            self.reports.append((symbol, period, success))
+
+    def make_queue(self, **kwargs):
+        return WriteBehindQueue(self.pool, on_written=self.on_written, **kwargs)
+
+    def test_close_drains_queue(self):
+        """Test that close writes every queued ticker before stopping the writers."""
+        write_queue = self.make_queue(writers=2, queue_size=32, batch_size=3)
+        symbols = [f"T{i}" for i in range(20)]
+        for symbol in symbols:
+            write_queue.put(symbol, [("quarter", [], FRAMES, {})])
+        write_queue.close()
+
+        self.assertEqual(sorted(r[0] for r in self.reports), sorted(symbols))
+        self.assertTrue(all(success for _, _, success in self.reports))
+        self.assertFalse(any(thread.is_alive() for thread in write_queue._threads))
+
+    def test_failed_fetches_are_reported(self):
+        """Test that passes whose fetch failed are reported as failures without a write."""
+        write_queue = self.make_queue(writers=1)
+        write_queue.put("AAPL", [("quarter", [], None, {}), ("fy", [], None, {})])
+        write_queue.close()
+
+        self.assertEqual(self.reports, [("AAPL", "quarter", False), ("AAPL", "fy", False)])
+        self.assertEqual(self.pool.connections, [])
+        self.add_fetched.assert_not_called()
+
+    def test_failed_fetch_does_not_skip_other_passes(self):
+        """Test that the successful passes of a ticker are still written."""
+        write_queue = self.make_queue(writers=1)
+        write_queue.put("AAPL", [("quarter", [], None, {}), ("fy", [], FRAMES, {})])
+        write_queue.close()
+
+        self.assertEqual(self.reports, [("AAPL", "quarter", False), ("AAPL", "fy", True)])
+        self.add_fetched.assert_called_once()
+
+    @mock.patch("project_eden.db.write_behind.get_company_id_cache")
+    @mock.patch("project_eden.db.write_behind.upsert_fetched_datasets_batch")
+    def test_failing_batch_reports_failing_ticker(self, upsert_batch, get_cache):
+        """Test that a failed batch is rolled back and only its failing ticker is reported."""
+
+        def upsert(cursor, writes):
+            if any(symbol == "BAD" for symbol, _, _ in writes):
+                raise ValueError("duplicate key")
+
+        upsert_batch.side_effect = upsert
+
+        # Hold the writer on the first ticker so that the others end up in one batch
+        written, release = threading.Event(), threading.Event()
+        on_written = self.on_written
+
+        def wait_on_first(symbol, period, datasets, success):
+            written.set()
+            release.wait(5)
+            on_written(symbol, period, datasets, success)
+
+        write_queue = WriteBehindQueue(
+            self.pool,
+            writers=1,
+            batch_size=4,
+            write_mode="upsert",
+            on_written=wait_on_first,
+        )
+        write_queue.put("FIRST", [("quarter", [], FRAMES, {})])
+        self.assertTrue(written.wait(5))
+        for symbol in ["AAPL", "BAD", "MSFT"]:
+            write_queue.put(symbol, [("quarter", [], FRAMES, {})])
+        release.set()
+        write_queue.close()
+
+        self.assertEqual(
+            sorted(self.reports),
+            [
+                ("AAPL", "quarter", True),
+                ("BAD", "quarter", False),
+                ("FIRST", "quarter", True),
+                ("MSFT", "quarter", True),
+            ],
+        )
+        self.assertEqual(len(self.pool.connections), 2)
+        self.pool.connections[0].rollback.assert_not_called()
+        self.pool.connections[1].rollback.assert_called_once()
+        self.assertEqual(
+            [c.args[1] for c in self.add_fetched.call_args_list], ["AAPL", "BAD", "MSFT"]
+        )
+        for symbol in ["AAPL", "BAD", "MSFT"]:
+            get_cache.return_value.invalidate.assert_any_call(symbol)
+
+    def test_unexpected_error_reports_batch(self):
+        """Test that an error outside the write reports every pass of the batch as failed."""
+        self.add_fetched.side_effect = RuntimeError("connection lost")
+        write_queue = self.make_queue(writers=1)
+        write_queue.put("AAPL", [("quarter", [], FRAMES, {})])
+        write_queue.close()
+
+        self.assertEqual(self.reports, [("AAPL", "quarter", False)])
+
+
+class TestGetWriteBehindSettings(unittest.TestCase):
+    def test_defaults(self):
+        """Test that the queue holds twice as many tickers as there are fetchers by default."""
+        self.assertEqual(
+            get_write_behind_settings({}, workers=8),
+            {"writers": 2, "queue_size": 16, "batch_size": 4},
+        )
+
+    def test_config_overrides(self):
+        """Test that config values are used and clamped to at least one."""
+        config = {"write_behind": {"writers": 0, "queue_size": 5, "batch_size": 10}}
+        self.assertEqual(
+            get_write_behind_settings(config, workers=8),
+            {"writers": 1, "queue_size": 5, "batch_size": 10},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Tests for the keep-alive HTTP client.
+
+These tests run a local HTTP/1.1 server and verify that the client reuses
+connections, decodes responses and surfaces HTTP errors like urlopen did.
+"""
+import gzip
+import json
+import socket
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+
+from project_eden.utils.http_client import (
+    HTTPClient,
+    RequestNotSentError,
+    get_http_client,
+    reset_http_client,
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        if self.path.startswith("/missing"):
+            body = b"not found"
+            self.send_response(404)
+        elif self.path.startswith("/gzip"):
+            body = gzip.compress(json.dumps({"compressed": True}).encode("utf-8"))
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            body = json.dumps({"path": self.path}).encode("utf-8")
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHTTPClient(unittest.TestCase):
+    def setUp(self):
+        """Start a local keep-alive HTTP server."""
+        reset_http_client()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.connections = set()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.client = HTTPClient()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_get_json(self):
+        """Test that JSON responses are parsed."""
+        data = self.client.get_json(f"{self.base_url}/profile/AAPL?apikey=123")
+        self.assertEqual(data, {"path": "/profile/AAPL?apikey=123"})
+
+    def test_connection_reuse(self):
+        """Test that sequential requests reuse a single keep-alive connection."""
+        for _ in range(5):
+            self.client.get_json(f"{self.base_url}/profile/AAPL")
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_gzip_response(self):
+        """Test that gzip-encoded responses are decompressed."""
+        data = self.client.get_json(f"{self.base_url}/gzip")
+        self.assertEqual(data, {"compressed": True})
+
+    def test_http_error(self):
+        """Test that error statuses raise HTTPError and leave the pool usable."""
+        with self.assertRaises(HTTPError) as context:
+            self.client.get(f"{self.base_url}/missing")
+        self.assertEqual(context.exception.code, 404)
+        self.assertEqual(self.client.get_json(f"{self.base_url}/ok"), {"path": "/ok"})
+
+    def test_connection_refused(self):
+        """Test that a request that could not be sent raises RequestNotSentError."""
+        # Find a port nothing listens on
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        with self.assertRaises(RequestNotSentError) as context:
+            self.client.get(f"http://127.0.0.1:{port}/profile/AAPL")
+        self.assertIsInstance(context.exception.__cause__, ConnectionRefusedError)
+
+    def test_parallel_requests(self):
+        """Test that the client can be shared across threads."""
+        results = []
+        lock = threading.Lock()
+
+        def worker(worker_id):
+            for i in range(10):
+                data = self.client.get_json(f"{self.base_url}/w{worker_id}/{i}")
+                with lock:
+                    results.append(data["path"])
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(results), 40)
+        self.assertEqual(len(set(results)), 40)
+        # Connections are reused, so far fewer than one connection per request is opened
+        self.assertLessEqual(len(self.server.connections), 8)
+
+    def test_global_client_is_shared(self):
+        """Test that the global client is created once and shared."""
+        self.assertIs(get_http_client({}), get_http_client())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+Tests for the daily call and monthly bandwidth quota tracker.
+"""
+import datetime
+import os
+import tempfile
+import threading
+import unittest
+
+from project_eden.utils.quota import (
+    QuotaExceededError,
+    QuotaTracker,
+    get_quota_tracker,
+    reset_quota_tracker,
+)
+
+NOW = datetime.datetime(2024, 6, 21, 15, 0, tzinfo=datetime.timezone.utc)
+
+
+class TestQuotaTracker(unittest.TestCase):
+    def setUp(self):
+        """Keep the usage database in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "quota", "quota.sqlite")
+        self.tracker = QuotaTracker(self.path, daily_call_limit=10, monthly_bandwidth_bytes=1000)
+
+    def tearDown(self):
+        self.tracker.close()
+        reset_quota_tracker()
+        self.tmp_dir.cleanup()
+
+    def test_usage_per_day_and_month(self):
+        """Test that calls count against their day while bytes add up over the month."""
+        self.tracker.record(3, 100, now=NOW - datetime.timedelta(days=1))
+        self.tracker.record(2, 50, now=NOW)
+
+        self.assertEqual(
+            self.tracker.get_usage(now=NOW),
+            {"daily_calls": 2, "monthly_calls": 5, "monthly_bytes": 150},
+        )
+        self.assertEqual(
+            self.tracker.get_remaining(now=NOW), {"daily_calls": 8, "monthly_bytes": 850}
+        )
+        self.assertEqual(
+            self.tracker.get_usage(now=NOW + datetime.timedelta(days=10))["monthly_bytes"], 0
+        )
+
+    def test_daily_limit(self):
+        """Test that requests are refused once the daily calls are used up, until the next day."""
+        self.tracker.record(10, 0, now=NOW)
+        with self.assertRaises(QuotaExceededError):
+            self.tracker.check(now=NOW)
+        self.assertTrue(self.tracker.is_exhausted(now=NOW))
+        self.assertFalse(self.tracker.is_exhausted(now=NOW + datetime.timedelta(days=1)))
+
+    def test_monthly_bandwidth_limit(self):
+        """Test that requests are refused once the monthly bandwidth is used up."""
+        self.tracker.record(1, 1000, now=NOW)
+        with self.assertRaises(QuotaExceededError):
+            self.tracker.check(now=NOW)
+
+    def test_reserve(self):
+        """Test that reserved calls are counted at once and refused beyond the limit."""
+        self.tracker.reserve(4, now=NOW)
+        self.assertEqual(self.tracker.get_usage(now=NOW)["daily_calls"], 4)
+        # Response bytes are added once the response is received
+        self.tracker.record(0, 100, now=NOW)
+        self.assertEqual(
+            self.tracker.get_usage(now=NOW),
+            {"daily_calls": 4, "monthly_calls": 4, "monthly_bytes": 100},
+        )
+
+        with self.assertRaises(QuotaExceededError):
+            self.tracker.reserve(7, now=NOW)
+        # A refused reservation counts nothing
+        self.assertEqual(self.tracker.get_usage(now=NOW)["daily_calls"], 4)
+        self.tracker.reserve(6, now=NOW)
+        self.assertTrue(self.tracker.is_exhausted(now=NOW))
+
+    def test_release(self):
+        """Test that calls released after a failed send are no longer counted."""
+        self.tracker.reserve(3, now=NOW)
+        self.tracker.release(1, now=NOW)
+        self.assertEqual(self.tracker.get_usage(now=NOW)["daily_calls"], 2)
+        self.tracker.release(5, now=NOW)
+        self.assertEqual(self.tracker.get_usage(now=NOW)["daily_calls"], 0)
+
+    def test_concurrent_reservations(self):
+        """Test that concurrent reservations never exceed the daily limit."""
+        granted = []
+        start = threading.Barrier(8)
+
+        def reserve_calls():
+            # Every tracker has its own connection, like separate processes do
+            tracker = QuotaTracker(self.path, daily_call_limit=10)
+            start.wait()
+            for _ in range(5):
+                try:
+                    tracker.reserve(now=NOW)
+                except QuotaExceededError:
+                    granted.append(False)
+                else:
+                    granted.append(True)
+            tracker.close()
+
+        threads = [threading.Thread(target=reserve_calls) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(granted), 40)
+        self.assertEqual(sum(granted), 10)
+        self.assertEqual(self.tracker.get_usage(now=NOW)["daily_calls"], 10)
+
+    def test_usage_persists(self):
+        """Test that usage survives reopening the tracker."""
+        self.tracker.record(4, 10, now=NOW)
+        self.tracker.close()
+
+        self.tracker = QuotaTracker(self.path, daily_call_limit=10)
+        self.assertEqual(self.tracker.get_usage(now=NOW)["daily_calls"], 4)
+
+    def test_affordable_tickers(self):
+        """Test the estimate of how many tickers the remaining budgets afford."""
+        self.assertEqual(self.tracker.get_affordable_tickers(3, bytes_per_ticker=100, now=NOW), 3)
+
+        # Bandwidth per ticker is estimated from this month's average response size
+        self.tracker.record(2, 400, now=NOW)
+        self.assertEqual(self.tracker.get_affordable_tickers(2, now=NOW), 1)
+
+        unlimited = QuotaTracker(os.path.join(self.tmp_dir.name, "unlimited.sqlite"))
+        self.assertIsNone(unlimited.get_affordable_tickers(2, now=NOW))
+        unlimited.close()
+
+    def test_global_tracker_disabled_by_default(self):
+        """Test that quotas are only tracked when configured."""
+        self.assertIsNone(get_quota_tracker({"api": {}}))
+        config = {
+            "api": {
+                "quota": {
+                    "daily_calls": 5,
+                    "path": os.path.join(self.tmp_dir.name, "global.sqlite"),
+                }
+            }
+        }
+        tracker = get_quota_tracker(config)
+        self.assertEqual(tracker.daily_call_limit, 5)
+        self.assertIs(get_quota_tracker(), tracker)
+
+
+if __name__ == "__main__":
+    unittest.main()
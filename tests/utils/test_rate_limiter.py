@@ -4,10 +4,41 @@ Tests for the token bucket rate limiter.
 These tests verify that the rate limiter correctly throttles API calls
 to respect the configured rate limit.
 """
+import asyncio
+import multiprocessing
+import os
+import tempfile
 import time
 import threading
 import unittest
-from project_eden.utils.rate_limiter import TokenBucketRateLimiter, reset_rate_limiter
+from unittest import mock
+from urllib.error import HTTPError
+
+from project_eden.utils.rate_limiter import (
+    APIKeyPool,
+    AsyncSharedTokenBucketRateLimiter,
+    AsyncTokenBucketRateLimiter,
+    PRIORITY_LANES,
+    PriorityLanes,
+    SharedTokenBucketRateLimiter,
+    TokenBucketRateLimiter,
+    create_async_api_key_pool,
+    create_async_rate_limiter,
+    get_api_key_pool,
+    get_api_keys,
+    get_priority_lane,
+    get_rate_limiter,
+    reset_rate_limiter,
+    set_priority_lane,
+)
+
+
+def _acquire_shared_tokens(path, rate_limit_per_min, num_calls, lane=None):
+    """Acquire single tokens from a shared bucket in a separate process."""
+    limiter = SharedTokenBucketRateLimiter(rate_limit_per_min, path)
+    for _ in range(num_calls):
+        limiter.acquire(1, lane)
+    limiter.close()
 
 
 class TestRateLimiter(unittest.TestCase):
@@ -114,6 +145,372 @@ class TestRateLimiter(unittest.TestCase):
         self.assertLessEqual(available, 60)
 
 
+class TestAsyncRateLimiter(unittest.TestCase):
+    def test_basic_token_acquisition(self):
+        """Test that coroutines wait for tokens to accumulate."""
+        # 600/min = 10 tokens/sec, so 5 tokens take ~0.5 seconds from empty.
+        async def run():
+            limiter = AsyncTokenBucketRateLimiter(rate_limit_per_min=600)
+            start = time.time()
+            await limiter.acquire(5)
+            return time.time() - start
+
+        elapsed = asyncio.run(run())
+        self.assertGreaterEqual(elapsed, 0.4)
+        self.assertLess(elapsed, 1.5)
+
+    def test_concurrent_coroutines(self):
+        """Test that many concurrent coroutines are metered at the configured rate."""
+        # 1200/min = 20 tokens/sec. 30 single-token requests take ~1.5 seconds.
+        async def run():
+            limiter = AsyncTokenBucketRateLimiter(rate_limit_per_min=1200)
+            start = time.time()
+            await asyncio.gather(*(limiter.acquire(1) for _ in range(30)))
+            return time.time() - start
+
+        elapsed = asyncio.run(run())
+        self.assertGreaterEqual(elapsed, 1.3)
+        self.assertLess(elapsed, 2.5)
+
+    def test_request_above_max_tokens(self):
+        """Test that requesting more tokens than the bucket holds raises."""
+        limiter = AsyncTokenBucketRateLimiter(rate_limit_per_min=10)
+        with self.assertRaises(ValueError):
+            asyncio.run(limiter.acquire(11))
+
+
+class TestSharedRateLimiter(unittest.TestCase):
+    def setUp(self):
+        """Keep the bucket state in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "limiter", "rate_limiter.state")
+
+    def tearDown(self):
+        reset_rate_limiter()
+        self.tmp_dir.cleanup()
+
+    def test_basic_token_acquisition(self):
+        """Test that a new shared bucket starts empty and refills at the configured rate."""
+        limiter = SharedTokenBucketRateLimiter(rate_limit_per_min=600, path=self.path)
+
+        start = time.time()
+        limiter.acquire(5)
+        elapsed = time.time() - start
+        limiter.close()
+
+        self.assertGreaterEqual(elapsed, 0.4)
+        self.assertLess(elapsed, 1.5)
+
+    def test_budget_shared_between_instances(self):
+        """Test that tokens taken through one instance are gone for another."""
+        first = SharedTokenBucketRateLimiter(rate_limit_per_min=600, path=self.path)
+        second = SharedTokenBucketRateLimiter(rate_limit_per_min=600, path=self.path)
+
+        time.sleep(1)
+        first.acquire(9)
+        self.assertLess(second.get_available_tokens(), 3)
+        first.close()
+        second.close()
+
+    def test_backoff_shared_between_instances(self):
+        """Test that a backoff in one instance slows down the token grants of another."""
+        first = SharedTokenBucketRateLimiter(rate_limit_per_min=600, path=self.path)
+        second = SharedTokenBucketRateLimiter(rate_limit_per_min=600, path=self.path)
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+
+        # 600/min = 10 tokens/sec, backed off to 60/min = 1 token/sec
+        first.set_rate_limit(60)
+        start = time.time()
+        second.acquire(2)
+        self.assertGreaterEqual(time.time() - start, 1.8)
+        self.assertEqual(second.rate_limit_per_min, 600)
+
+        # A lower backoff of another instance takes precedence over a ramp-up
+        second.set_rate_limit(30)
+        first.set_rate_limit(300)
+        time.sleep(1)
+        self.assertLess(first.get_available_tokens(), 0.8)
+
+        # Once every instance is back at its configured rate, the bucket refills at full speed
+        second.set_rate_limit(600)
+        first.set_rate_limit(600)
+        start = time.time()
+        second.acquire(5)
+        self.assertLess(time.time() - start, 1.0)
+
+    def test_stale_backoff_is_lifted(self):
+        """Test that a backoff its instance stopped renewing no longer slows the others."""
+        first = SharedTokenBucketRateLimiter(rate_limit_per_min=600, path=self.path)
+        second = SharedTokenBucketRateLimiter(rate_limit_per_min=600, path=self.path)
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+
+        with mock.patch("project_eden.utils.rate_limiter.BACKOFF_STALE_SECONDS", 0.2):
+            first.set_rate_limit(60)
+        time.sleep(0.3)
+        start = time.time()
+        second.acquire(5)
+        self.assertLess(time.time() - start, 1.0)
+
+    def test_parallel_processes(self):
+        """Test that separate processes are metered by one budget."""
+        # 1200/min = 20 tokens/sec. 3 processes × 10 calls = 30 tokens take ~1.5 s in total,
+        # where a bucket per process would let them finish in ~0.5 s.
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=_acquire_shared_tokens, args=(self.path, 1200, 10))
+            for _ in range(3)
+        ]
+        # Create the bucket before the processes start so their start-up time is not counted
+        SharedTokenBucketRateLimiter(rate_limit_per_min=1200, path=self.path).close()
+
+        start = time.time()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.time() - start
+
+        self.assertTrue(all(process.exitcode == 0 for process in processes))
+        self.assertGreaterEqual(elapsed, 1.3)
+
+    def test_async_coroutines(self):
+        """Test that coroutines drawing from the shared bucket are metered at the set rate."""
+        async def run():
+            limiter = AsyncSharedTokenBucketRateLimiter(
+                SharedTokenBucketRateLimiter(1200, self.path)
+            )
+            start = time.time()
+            await asyncio.gather(*(limiter.acquire(1) for _ in range(30)))
+            limiter.limiter.close()
+            return time.time() - start
+
+        elapsed = asyncio.run(run())
+        self.assertGreaterEqual(elapsed, 1.3)
+        self.assertLess(elapsed, 2.5)
+
+    def test_backend_from_config(self):
+        """Test that the backend is selected from the configuration."""
+        config = {
+            "api": {
+                "rate_limit_per_min": 60,
+                "rate_limiter": {"backend": "file", "path": self.path},
+            }
+        }
+        self.assertIsInstance(get_rate_limiter(config), SharedTokenBucketRateLimiter)
+        async_limiter = create_async_rate_limiter(config)
+        self.assertIsInstance(async_limiter, AsyncSharedTokenBucketRateLimiter)
+        async_limiter.limiter.close()
+
+        reset_rate_limiter()
+        self.assertIsInstance(
+            get_rate_limiter({"api": {"rate_limit_per_min": 60}}), TokenBucketRateLimiter
+        )
+
+        with self.assertRaises(ValueError):
+            create_async_rate_limiter(
+                {"api": {"rate_limit_per_min": 60, "rate_limiter": {"backend": "redis"}}}
+            )
+
+
+class TestPriorityLanes(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "rate_limiter.state")
+
+    def tearDown(self):
+        set_priority_lane("interactive")
+        self.tmp_dir.cleanup()
+
+    def _serve(self, lanes, indices, num_tokens, now=0.0):
+        """Hand out tokens one by one to the waiting lane whose turn it is."""
+        served = []
+        for _ in range(num_tokens):
+            index = next(i for i in indices if lanes.is_turn(i, now))
+            lanes.charge(index, 1)
+            served.append(PRIORITY_LANES[index])
+        return served
+
+    def test_weighted_shares(self):
+        """Test that busy lanes share the tokens in proportion to their weights."""
+        lanes = PriorityLanes({"interactive": 4, "incremental": 2, "backfill": 1})
+        for index in range(3):
+            lanes.register(index, 0.0)
+
+        served = self._serve(lanes, range(3), 70)
+        self.assertEqual([served.count(lane) for lane in PRIORITY_LANES], [40, 20, 10])
+
+    def test_idle_lane_does_not_bank_tokens(self):
+        """Test that a lane joining late is served first, but only gets its share afterwards."""
+        lanes = PriorityLanes({"interactive": 4, "backfill": 1})
+        backfill = PRIORITY_LANES.index("backfill")
+        lanes.register(backfill, 0.0)
+        self.assertEqual(set(self._serve(lanes, [backfill], 100)), {"backfill"})
+
+        lanes.register(0, 0.0)
+        served = self._serve(lanes, [0, backfill], 50)
+        self.assertEqual(served[:4], ["interactive"] * 4)
+        self.assertAlmostEqual(served.count("backfill"), 10, delta=1)
+
+    def test_stale_lane_is_forgotten(self):
+        """Test that waiters that stopped polling, e.g. of a dead process, do not block lanes."""
+        lanes = PriorityLanes(stale_after=5.0)
+        lanes.register(0, 0.0)
+        lanes.register(2, 0.0)
+        lanes.charge(2, 1)
+        self.assertFalse(lanes.is_turn(2, 1.0))
+        self.assertTrue(lanes.is_turn(2, 10.0))
+
+    def test_process_lane(self):
+        """Test that the process' lane is used when a request does not name one."""
+        self.assertEqual(get_priority_lane(), "interactive")
+        set_priority_lane("backfill")
+        self.assertEqual(PriorityLanes.get_index(), PRIORITY_LANES.index("backfill"))
+        with self.assertRaises(ValueError):
+            set_priority_lane("urgent")
+        with self.assertRaises(ValueError):
+            PriorityLanes({"backfill": 0})
+
+    def test_interactive_ahead_of_backfill_threads(self):
+        """Test that interactive requests are not starved by threads saturating the bucket."""
+        # 1200/min = 20 tokens/sec. With equal footing against 4 backfill threads, 10 interactive
+        # tokens would take ~2.5 s; with a 16:1 weight they take ~0.55 s.
+        limiter = TokenBucketRateLimiter(rate_limit_per_min=1200)
+        stop = threading.Event()
+
+        def backfill():
+            while not stop.is_set():
+                limiter.acquire(1, "backfill")
+
+        threads = [threading.Thread(target=backfill) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.5)
+
+        start = time.time()
+        for _ in range(10):
+            limiter.acquire(1, "interactive")
+        elapsed = time.time() - start
+
+        stop.set()
+        for thread in threads:
+            thread.join()
+        self.assertLess(elapsed, 1.0)
+
+    def test_interactive_ahead_of_backfill_coroutines(self):
+        """Test that interactive coroutines are served ahead of queued backfill coroutines."""
+        async def run():
+            limiter = AsyncTokenBucketRateLimiter(rate_limit_per_min=1200)
+            backfill = [asyncio.create_task(limiter.acquire(1, "backfill")) for _ in range(40)]
+            await asyncio.sleep(0.5)
+
+            start = time.time()
+            await asyncio.gather(*(limiter.acquire(1, "interactive") for _ in range(10)))
+            elapsed = time.time() - start
+            for task in backfill:
+                task.cancel()
+            await asyncio.gather(*backfill, return_exceptions=True)
+            return elapsed
+
+        self.assertLess(asyncio.run(run()), 1.0)
+
+    def test_interactive_ahead_of_backfill_processes(self):
+        """Test that lanes are honoured across processes sharing a bucket."""
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=_acquire_shared_tokens, args=(self.path, 1200, 40, "backfill"))
+            for _ in range(3)
+        ]
+        limiter = SharedTokenBucketRateLimiter(rate_limit_per_min=1200, path=self.path)
+        for process in processes:
+            process.start()
+        time.sleep(1.5)
+
+        # On equal footing with 3 backfill processes, 10 tokens would take ~2 s
+        start = time.time()
+        for _ in range(10):
+            limiter.acquire(1, "interactive")
+        elapsed = time.time() - start
+
+        for process in processes:
+            process.join()
+        limiter.close()
+        self.assertTrue(all(process.exitcode == 0 for process in processes))
+        self.assertLess(elapsed, 1.2)
+
+
+class TestAPIKeyPool(unittest.TestCase):
+    def tearDown(self):
+        reset_rate_limiter()
+
+    def test_get_api_keys(self):
+        """Test that keys are read from api.keys, falling back to the single api.key."""
+        config = {"api": {"key": "a", "rate_limit_per_min": 300}}
+        self.assertEqual(get_api_keys(config), [("a", 300)])
+
+        config["api"]["keys"] = ["b", {"key": "c", "rate_limit_per_min": 750}]
+        self.assertEqual(get_api_keys(config), [("b", 300), ("c", 750)])
+
+    def test_single_key_uses_global_rate_limiter(self):
+        """Test that a single key is metered by the global rate limiter."""
+        config = {"api": {"key": "a", "rate_limit_per_min": 60}}
+        pool = get_api_key_pool(config)
+        self.assertIs(pool.limiters["a"], get_rate_limiter(config))
+        self.assertIs(get_api_key_pool(), pool)
+
+    def test_requests_spread_over_keys(self):
+        """Test that requests go to the key with a token soonest, so throughput adds up."""
+        # 1200/min + 2400/min = 60 tokens/sec in total; 60 requests take ~1 s
+        pool = APIKeyPool({"a": TokenBucketRateLimiter(1200), "b": TokenBucketRateLimiter(2400)})
+
+        start = time.time()
+        used = [pool.acquire() for _ in range(60)]
+        elapsed = time.time() - start
+
+        self.assertLess(elapsed, 1.6)
+        self.assertGreater(used.count("b"), used.count("a"))
+        self.assertEqual(pool.rate_limit_per_min, 3600)
+
+    def test_rejected_key_is_dropped(self):
+        """Test that a key rejected with HTTP 401 is no longer used while other keys remain."""
+        pool = APIKeyPool({"a": TokenBucketRateLimiter(6000), "b": TokenBucketRateLimiter(6000)})
+        rejected = HTTPError("http://example.com", 401, "Unauthorized", None, None)
+
+        self.assertTrue(pool.record_error("a", rejected))
+        self.assertEqual({pool.acquire() for _ in range(5)}, {"b"})
+        self.assertEqual(pool.acquire(preferred="a"), "b")
+
+        self.assertFalse(pool.record_error("b", rejected))
+        with self.assertRaises(RuntimeError):
+            pool.acquire()
+
+    def test_throttled_key_slows_down(self):
+        """Test that throttling responses only reduce the rate of the key they were sent with."""
+        pool = APIKeyPool({"a": TokenBucketRateLimiter(600), "b": TokenBucketRateLimiter(600)})
+        pool.record_error(
+            "a", HTTPError("http://example.com", 429, "Too Many Requests", None, None)
+        )
+
+        self.assertEqual(pool.limiters["a"].rate_limit_per_min, 300)
+        self.assertEqual(pool.limiters["b"].rate_limit_per_min, 600)
+
+    def test_async_pool(self):
+        """Test that coroutines draw from the per-key asyncio rate limiters."""
+        config = {"api": {"keys": ["a", "b"], "rate_limit_per_min": 1200}}
+
+        async def run():
+            pool = create_async_api_key_pool(config)
+            start = time.time()
+            used = await asyncio.gather(*(pool.acquire_async() for _ in range(40)))
+            return time.time() - start, used
+
+        # 2 keys × 20 tokens/sec: 40 requests take ~1 s instead of ~2 s with one key
+        elapsed, used = asyncio.run(run())
+        self.assertLess(elapsed, 1.6)
+        self.assertEqual(set(used), {"a", "b"})
+
+
 if __name__ == "__main__":
     unittest.main()
 
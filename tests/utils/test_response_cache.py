@@ -0,0 +1,98 @@
+"""
+Tests for the on-disk API response cache.
+"""
+import json
+import os
+import tempfile
+import time
+import unittest
+import zlib
+
+from project_eden.utils.response_cache import (
+    ResponseCache,
+    get_response_cache,
+    reset_response_cache,
+)
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        """Create a cache in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "cache", "responses.sqlite")
+        self.cache = ResponseCache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        reset_response_cache()
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        """Test that stored responses are returned and counted as hits."""
+        self.assertIsNone(self.cache.get("profile"))
+        self.cache.set("profile", [{"symbol": "AAPL", "price": 1.5}], ttl_seconds=60)
+
+        self.assertEqual(self.cache.get("profile"), [{"symbol": "AAPL", "price": 1.5}])
+        self.assertEqual(self.cache.get_stats(), {"hits": 1, "misses": 1})
+
+    def test_expiry(self):
+        """Test that expired responses are treated as misses."""
+        self.cache.set("profile", [], ttl_seconds=0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get("profile"))
+
+    def test_make_key(self):
+        """Test that keys ignore parameter order and the API key."""
+        key = ResponseCache.make_key(
+            "income-statement", "v3", "AAPL", {"period": "quarter", "limit": 4}
+        )
+        self.assertEqual(
+            key,
+            ResponseCache.make_key(
+                "income-statement",
+                "v3",
+                "AAPL",
+                {"limit": "4", "apikey": "secret", "period": "quarter"},
+            ),
+        )
+        self.assertNotIn("secret", key)
+        self.assertNotEqual(
+            key, ResponseCache.make_key("income-statement", "v3", "AAPL", {"period": "fy"})
+        )
+
+    def test_lru_eviction(self):
+        """Test that the least recently used responses are evicted once the cache is full."""
+        payload = [os.urandom(512).hex()]
+        entry_size = len(zlib.compress(json.dumps(payload).encode("utf-8")))
+        self.cache.max_size_bytes = entry_size * 3
+
+        for key in ["a", "b", "c"]:
+            self.cache.set(key, payload, ttl_seconds=60)
+            time.sleep(0.01)
+        self.cache.get("a")
+        self.cache.set("d", payload, ttl_seconds=60)
+
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNotNone(self.cache.get("d"))
+        self.assertLessEqual(self.cache.get_size(), self.cache.max_size_bytes)
+
+    def test_persistence(self):
+        """Test that responses survive reopening the cache."""
+        self.cache.set("profile", {"ok": True}, ttl_seconds=60)
+        self.cache.close()
+
+        self.cache = ResponseCache(self.path)
+        self.assertEqual(self.cache.get("profile"), {"ok": True})
+
+    def test_global_cache_disabled_by_default(self):
+        """Test that no global cache is created unless enabled in config."""
+        self.assertIsNone(get_response_cache({}))
+        config = {
+            "cache": {"enabled": True, "path": os.path.join(self.tmp_dir.name, "global.sqlite")}
+        }
+        self.assertIs(get_response_cache(config), get_response_cache())
+
+
+if __name__ == "__main__":
+    unittest.main()
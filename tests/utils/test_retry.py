@@ -0,0 +1,229 @@
+"""
+Tests for the retry handler, adaptive rate control and circuit breaker.
+"""
+import asyncio
+import email.message
+import os
+import tempfile
+import time
+import unittest
+from urllib.error import HTTPError
+
+from project_eden.utils.rate_limiter import (
+    SharedTokenBucketRateLimiter,
+    TokenBucketRateLimiter,
+    reset_rate_limiter,
+)
+from project_eden.utils.retry import (
+    AdaptiveRateController,
+    CircuitBreaker,
+    RetryHandler,
+    RetryPolicy,
+    get_circuit_breaker,
+    parse_retry_after,
+    reset_retry_handler,
+)
+
+
+def make_http_error(code, retry_after=None):
+    """Build an HTTPError like the ones raised by the HTTP client."""
+    headers = email.message.Message()
+    if retry_after is not None:
+        headers["Retry-After"] = retry_after
+    return HTTPError("http://example.com", code, "error", headers, None)
+
+
+class FlakyRequest:
+    """Callable that raises the given errors in turn before succeeding."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"ok": True}
+
+
+class TestRetryHandler(unittest.TestCase):
+    def setUp(self):
+        """Use short delays so retries are fast."""
+        self.policy = RetryPolicy(max_retries=3, base_delay=0.01, max_delay=0.05)
+
+    def test_parse_retry_after(self):
+        """Test that both forms of the Retry-After header are understood."""
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertAlmostEqual(parse_retry_after("Thu, 01 Jan 1970 00:01:00 GMT", now=30.0), 30.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+    def test_backoff_is_bounded(self):
+        """Test that jittered delays grow with the attempt but never exceed the maximum."""
+        policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+        for attempt in range(6):
+            self.assertLessEqual(policy.get_delay(attempt), min(4.0, 2**attempt))
+        self.assertGreaterEqual(policy.get_delay(0, retry_after=2.0), 2.0)
+
+    def test_retries_transient_errors(self):
+        """Test that server errors and connection errors are retried until the request succeeds."""
+        request = FlakyRequest(make_http_error(503), ConnectionResetError())
+        handler = RetryHandler(self.policy)
+
+        self.assertEqual(handler.call(request), {"ok": True})
+        self.assertEqual(request.calls, 3)
+
+    def test_does_not_retry_client_errors(self):
+        """Test that errors other than throttling are raised right away for 4xx responses."""
+        request = FlakyRequest(make_http_error(404))
+        with self.assertRaises(HTTPError):
+            RetryHandler(self.policy).call(request)
+        self.assertEqual(request.calls, 1)
+
+    def test_gives_up_after_max_retries(self):
+        """Test that the last error is raised once the retries are exhausted."""
+        request = FlakyRequest(*[make_http_error(500)] * 5)
+        with self.assertRaises(HTTPError):
+            RetryHandler(self.policy).call(request)
+        self.assertEqual(request.calls, 4)
+
+    def test_honors_retry_after(self):
+        """Test that the delay requested by the provider is waited for."""
+        request = FlakyRequest(make_http_error(429, retry_after="0.3"))
+
+        start = time.time()
+        RetryHandler(self.policy).call(request)
+        self.assertGreaterEqual(time.time() - start, 0.3)
+
+    def test_async_retries(self):
+        """Test that coroutines are retried the same way."""
+        request = FlakyRequest(make_http_error(502))
+
+        async def send():
+            return request()
+
+        result = asyncio.run(RetryHandler(self.policy).call_async(send))
+        self.assertEqual(result, {"ok": True})
+        self.assertEqual(request.calls, 2)
+
+
+class TestAdaptiveRateController(unittest.TestCase):
+    def test_throttling_reduces_rate(self):
+        """Test that the rate is halved when throttled and ramped back up on clean responses."""
+        limiter = TokenBucketRateLimiter(rate_limit_per_min=300)
+        controller = AdaptiveRateController(limiter, increase_fraction=0.25, success_threshold=2)
+
+        controller.record_throttle()
+        self.assertEqual(limiter.rate_limit_per_min, 150)
+        self.assertAlmostEqual(limiter.refill_rate, 2.5)
+
+        # Throttling responses to requests sent at the old rate only count once
+        controller.record_throttle()
+        self.assertEqual(limiter.rate_limit_per_min, 150)
+
+        for _ in range(4):
+            controller.record_success()
+        self.assertEqual(limiter.rate_limit_per_min, 300)
+        for _ in range(4):
+            controller.record_success()
+        self.assertEqual(limiter.rate_limit_per_min, 300)
+
+    def test_rate_has_a_floor(self):
+        """Test that the rate never drops below the minimum fraction."""
+        limiter = TokenBucketRateLimiter(rate_limit_per_min=100)
+        controller = AdaptiveRateController(limiter, min_rate_fraction=0.2, decrease_cooldown=0)
+        for _ in range(10):
+            controller.record_throttle()
+        self.assertEqual(limiter.rate_limit_per_min, 20)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_consecutive_failures(self):
+        """Test that the breaker opens after too many failures and later lets a probe through."""
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.2)
+        for _ in range(2):
+            breaker.record_failure()
+        self.assertEqual(breaker.get_wait_time(), 0)
+
+        breaker.record_failure()
+        self.assertGreater(breaker.get_wait_time(), 0)
+
+        time.sleep(0.25)
+        self.assertEqual(breaker.get_wait_time(), 0)  # the probe
+        self.assertGreater(breaker.get_wait_time(), 0)  # everyone else waits for it
+
+        breaker.record_success()
+        self.assertEqual(breaker.get_wait_time(), 0)
+
+    def test_failed_probe_reopens(self):
+        """Test that a failed probe opens the breaker again."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+        breaker.record_failure()
+        time.sleep(0.15)
+        self.assertEqual(breaker.get_wait_time(), 0)
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+
+    def test_handler_waits_for_open_breaker(self):
+        """Test that requests are held back while the breaker is open."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.3)
+        handler = RetryHandler(
+            RetryPolicy(max_retries=1, base_delay=0.01), circuit_breaker=breaker
+        )
+        request = FlakyRequest(make_http_error(503))
+
+        start = time.time()
+        self.assertEqual(handler.call(request), {"ok": True})
+        self.assertGreaterEqual(time.time() - start, 0.3)
+        self.assertEqual(breaker.state, "closed")
+
+    def test_breaker_shared_between_processes(self):
+        """Test that a breaker opened in one process pauses the breakers sharing its state."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        path = os.path.join(tmp_dir.name, "rate_limiter.state")
+        breakers = []
+        for _ in range(2):
+            state = SharedTokenBucketRateLimiter(rate_limit_per_min=60, path=path)
+            self.addCleanup(state.close)
+            breakers.append(
+                CircuitBreaker(failure_threshold=1, reset_timeout=0.3, shared_state=state)
+            )
+        first, second = breakers
+
+        self.assertEqual(second.get_wait_time(), 0)
+        first.record_failure()
+        self.assertGreater(second.get_wait_time(), 0.2)
+        self.assertEqual(second.state, "closed")
+
+        time.sleep(0.35)
+        self.assertEqual(second.get_wait_time(), 0)
+
+    def test_global_breaker_uses_file_backend(self):
+        """Test that the global breaker shares its state through the file rate limiter."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(reset_rate_limiter)
+        self.addCleanup(reset_retry_handler)
+        config = {
+            "api": {
+                "rate_limit_per_min": 60,
+                "rate_limiter": {
+                    "backend": "file",
+                    "path": os.path.join(tmp_dir.name, "rate_limiter.state"),
+                },
+            }
+        }
+        reset_retry_handler()
+        self.assertIsInstance(
+            get_circuit_breaker(config).shared_state, SharedTokenBucketRateLimiter
+        )
+
+        reset_retry_handler()
+        self.assertIsNone(get_circuit_breaker({"api": {"rate_limit_per_min": 60}}).shared_state)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests for the checkpointed ingestion run state.
+"""
+import os
+import tempfile
+import unittest
+
+from project_eden.utils.run_state import (
+    IngestionRun,
+    RunStateStore,
+    get_run_state_store,
+    reset_run_state_store,
+)
+
+JOBS = [("quarter", ["profile", "income-statement"]), ("fy", ["income-statement"])]
+
+
+class TestRunStateStore(unittest.TestCase):
+    def setUp(self):
+        """Keep the run database in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "runs", "runs.sqlite")
+        self.store = RunStateStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        reset_run_state_store()
+        self.tmp_dir.cleanup()
+
+    def test_new_run_is_pending(self):
+        """Test that every item of a new run is pending, with the options stored."""
+        run_id = self.store.create_run(["AAPL", "MSFT"], JOBS, options={"period": None})
+
+        run = self.store.get_run(run_id)
+        self.assertEqual(run["options"], {"period": None})
+        self.assertEqual((run["num_tickers"], run["cursor"]), (2, 0))
+        self.assertEqual((run["pending"], run["done"], run["failed"]), (6, 0, 0))
+        self.assertEqual(
+            self.store.get_pending_work(run_id),
+            {"AAPL": JOBS, "MSFT": JOBS},
+        )
+
+    def test_completed_items_are_skipped(self):
+        """Test that only failed and pending items are left to process, in ticker order."""
+        run_id = self.store.create_run(["AAPL", "MSFT", "GOOG"], JOBS)
+        self.store.record(run_id, "AAPL", "quarter", ["profile", "income-statement"], True)
+        self.store.record(run_id, "AAPL", "fy", ["income-statement"], True)
+        self.store.record(
+            run_id, "MSFT", "quarter", ["profile", "income-statement"], False, "boom"
+        )
+
+        self.assertEqual(list(self.store.get_pending_work(run_id)), ["MSFT", "GOOG"])
+        run = self.store.get_run(run_id)
+        self.assertEqual((run["done"], run["failed"], run["pending"]), (3, 2, 4))
+        self.assertEqual(run["cursor"], 2)
+
+        # A failed pass that succeeds on retry is done
+        self.store.record(run_id, "MSFT", "quarter", ["profile", "income-statement"], True)
+        self.assertEqual(
+            self.store.get_pending_work(run_id)["MSFT"], [("fy", ["income-statement"])]
+        )
+
+    def test_state_persists(self):
+        """Test that a run survives reopening the store."""
+        run_id = self.store.create_run(["AAPL"], JOBS)
+        self.store.record(run_id, "AAPL", "quarter", ["profile", "income-statement"], True)
+        self.store.close()
+
+        self.store = RunStateStore(self.path)
+        run = IngestionRun(self.store, run_id)
+        self.assertEqual(run.get_pending_work(), {"AAPL": [("fy", ["income-statement"])]})
+        self.assertEqual(run.get_summary()["done"], 2)
+
+    def test_unknown_run(self):
+        """Test that an unknown run id is reported."""
+        with self.assertRaises(KeyError):
+            self.store.get_run("missing")
+
+    def test_old_runs_are_pruned(self):
+        """Test that only the most recent runs are kept, newest first."""
+        self.store.max_runs = 2
+        run_ids = [self.store.create_run(["AAPL"], JOBS) for _ in range(3)]
+
+        self.assertEqual([run["run_id"] for run in self.store.list_runs()], run_ids[:0:-1])
+        with self.assertRaises(KeyError):
+            self.store.get_run(run_ids[0])
+        self.assertEqual(self.store.get_pending_work(run_ids[0]), {})
+
+    def test_global_store(self):
+        """Test that the global store uses the configured path."""
+        path = os.path.join(self.tmp_dir.name, "global.sqlite")
+        store = get_run_state_store({"run_state": {"path": path, "max_runs": 3}})
+        self.assertEqual((store.path, store.max_runs), (path, 3))
+        self.assertIs(get_run_state_store(), store)
+
+
+if __name__ == "__main__":
+    unittest.main()
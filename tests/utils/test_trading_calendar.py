@@ -0,0 +1,62 @@
+"""
+Tests for the exchange trading-day calendar and price chunk planner.
+"""
+import datetime
+import unittest
+
+from project_eden.utils.trading_calendar import (
+    is_trading_day,
+    plan_trading_day_chunks,
+    trading_days,
+)
+
+
+class TestTradingCalendar(unittest.TestCase):
+    def test_trading_days_per_year(self):
+        """Test that yearly session counts match the published NYSE calendar."""
+        self.assertEqual(len(trading_days("2023-01-01", "2023-12-31")), 250)
+        self.assertEqual(len(trading_days("2024-01-01", "2024-12-31")), 252)
+
+    def test_holidays(self):
+        """Test that regular holidays and weekends are not trading days."""
+        self.assertFalse(is_trading_day("2024-03-29"))  # Good Friday
+        self.assertFalse(is_trading_day("2024-07-04"))  # Independence Day
+        self.assertFalse(is_trading_day("2024-06-19"))  # Juneteenth
+        self.assertFalse(is_trading_day("2024-06-22"))  # Saturday
+        self.assertTrue(is_trading_day("2024-06-21"))
+
+    def test_saturday_sessions(self):
+        """Test that Saturdays count as sessions before the NYSE dropped them in 1952."""
+        self.assertTrue(is_trading_day("1950-06-03"))
+        self.assertFalse(is_trading_day("1953-06-06"))
+
+    def test_plan_chunks_are_contiguous(self):
+        """Test that chunks cover the whole range without gaps or overlap."""
+        chunks = plan_trading_day_chunks("1980-12-12", "2024-12-31", max_trading_days=4900)
+
+        self.assertEqual(chunks[0][0], "1980-12-12")
+        self.assertEqual(chunks[-1][1], "2024-12-31")
+        for (_, previous_end), (next_start, _) in zip(chunks, chunks[1:]):
+            previous_end = datetime.date.fromisoformat(previous_end)
+            gap = datetime.date.fromisoformat(next_start) - previous_end
+            self.assertEqual(gap, datetime.timedelta(days=1))
+
+    def test_plan_chunks_are_full(self):
+        """Test that every chunk but the last holds exactly the trading-day limit."""
+        chunks = plan_trading_day_chunks("1980-12-12", "2024-12-31", max_trading_days=4900)
+
+        self.assertEqual(len(chunks), 3)
+        for chunk_from, chunk_to in chunks[:-1]:
+            self.assertEqual(len(trading_days(chunk_from, chunk_to)), 4900)
+        self.assertLessEqual(len(trading_days(*chunks[-1])), 4900)
+
+    def test_plan_chunks_without_trading_days(self):
+        """Test that a range with no sessions needs no request."""
+        self.assertEqual(plan_trading_day_chunks("2024-06-22", "2024-06-23"), [])
+        self.assertEqual(
+            plan_trading_day_chunks("2024-06-21", "2024-06-21"), [("2024-06-21", "2024-06-21")]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()